@@ -0,0 +1,357 @@
+// Site Sector Mapper - Airtable Sync
+//
+// Sector-based sync (one Airtable row per sector). The table is fetched once
+// and diffed against local sectors by a stable key (site name + sector name);
+// only new rows and changed fields are sent, in batch create/update calls of
+// up to 10 records. Requests share a token bucket kept just under Airtable's
+// limit of 5 requests per second per base (a 429 costs a 30 s back-off), run
+// with bounded concurrency and retry 429/5xx and network failures with
+// exponential backoff. Creates are only retried on 429: after a 5xx or a
+// dropped connection Airtable may already have written the rows, so the batch
+// is reported as failed and the next sync, which lists the table again,
+// matches whatever was created.
+//
+// DOM-free: the client takes an `apiUrl`, so it can be pointed at the mock
+// server in sitemapper/mock_airtable.py.
+
+const AIRTABLE_API_URL = 'https://api.airtable.com/v0';
+const AIRTABLE_BATCH_SIZE = 10;
+const AIRTABLE_PAGE_SIZE = 100;
+
+/**
+ * Token bucket: `rate` tokens per second, holding at most `burst`
+ */
+class TokenBucket {
+    constructor(rate, burst = rate) {
+        this.rate = rate;
+        this.burst = burst;
+        this.tokens = burst;
+        this.updated = Date.now();
+        this.queue = Promise.resolve();
+    }
+
+    refill() {
+        const now = Date.now();
+        this.tokens = Math.min(this.burst, this.tokens + (now - this.updated) / 1000 * this.rate);
+        this.updated = now;
+    }
+
+    /**
+     * Resolves once a token is available; callers are served in order
+     */
+    take() {
+        const turn = this.queue.then(async () => {
+            this.refill();
+            if (this.tokens < 1) {
+                await sleep((1 - this.tokens) / this.rate * 1000);
+                this.refill();
+            }
+            this.tokens -= 1;
+        });
+        this.queue = turn;
+        return turn;
+    }
+
+    /**
+     * Empties the bucket, e.g. after the server answered 429
+     */
+    drain() {
+        this.refill();
+        this.tokens = Math.min(this.tokens, 0);
+    }
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+/**
+ * Runs `task(item)` for every item with at most `concurrency` in flight
+ * @returns {Promise<Array>} Results in item order
+ */
+async function runWithConcurrency(items, concurrency, task) {
+    const results = new Array(items.length);
+    let next = 0;
+    const workers = Array.from({ length: Math.min(concurrency, items.length) }, async () => {
+        while (next < items.length) {
+            const index = next++;
+            results[index] = await task(items[index], index);
+        }
+    });
+    await Promise.all(workers);
+    return results;
+}
+
+class AirtableError extends Error {
+    constructor(message, status) {
+        super(message);
+        this.name = 'AirtableError';
+        this.status = status;
+    }
+}
+
+class AirtableClient {
+    /**
+     * @param {Object} options
+     * @param {string} options.apiKey
+     * @param {string} options.baseId
+     * @param {string} options.tableName
+     * @param {string} [options.apiUrl] - API root, e.g. a local mock server
+     * @param {number} [options.rate=4] - Requests per second, below Airtable's 5 to absorb network jitter
+     * @param {number} [options.concurrency=3] - Requests in flight
+     * @param {number} [options.maxRetries=5]
+     */
+    constructor({ apiKey, baseId, tableName, apiUrl = AIRTABLE_API_URL, rate = 4, concurrency = 3, maxRetries = 5 }) {
+        this.apiKey = apiKey;
+        this.tableUrl = `${apiUrl.replace(/\/+$/, '')}/${baseId}/${encodeURIComponent(tableName)}`;
+        // No burst: evenly spaced requests never exceed the per-second limit
+        this.bucket = new TokenBucket(rate, 1);
+        this.concurrency = concurrency;
+        this.maxRetries = maxRetries;
+    }
+
+    /**
+     * One API call, rate limited and retried on 429, 5xx and network errors
+     * (POST on 429 only: it is not idempotent)
+     * @returns {Promise<Object>} Parsed JSON body
+     */
+    async request(method, path = '', body = null) {
+        for (let attempt = 0; ; attempt++) {
+            await this.bucket.take();
+
+            let response = null;
+            let error = null;
+            try {
+                response = await fetch(this.tableUrl + path, {
+                    method,
+                    headers: {
+                        'Authorization': `Bearer ${this.apiKey}`,
+                        ...(body ? { 'Content-Type': 'application/json' } : {})
+                    },
+                    body: body ? JSON.stringify(body) : undefined
+                });
+                if (response.ok) return await response.json();
+                error = new AirtableError(`Airtable API Error: ${response.status} ${response.statusText}`, response.status);
+            } catch (e) {
+                error = e; // Network failure
+            }
+
+            const throttled = !!response && response.status === 429;
+            const retryable = throttled || (method !== 'POST' && (!response || response.status >= 500));
+            if (!retryable || attempt >= this.maxRetries) throw error;
+
+            // Airtable asks clients to back off for 30 s after a 429
+            let delay = Math.min(30000, 500 * 2 ** attempt) * (0.5 + Math.random() / 2);
+            if (throttled) {
+                this.bucket.drain();
+                const retryAfter = Number(response.headers.get('Retry-After'));
+                delay = retryAfter > 0 ? retryAfter * 1000 : Math.max(delay, 30000);
+            }
+            await sleep(delay);
+        }
+    }
+
+    /**
+     * Every record of the table, following pagination
+     * @param {Object} [options]
+     * @param {string} [options.filterByFormula]
+     * @param {Function} [options.onPage] - (recordsSoFar) after each page
+     */
+    async listRecords({ filterByFormula = null, onPage = null } = {}) {
+        const records = [];
+        let offset = null;
+        do {
+            const params = new URLSearchParams({ pageSize: AIRTABLE_PAGE_SIZE });
+            if (filterByFormula) params.set('filterByFormula', filterByFormula);
+            if (offset) params.set('offset', offset);
+            const data = await this.request('GET', `?${params}`);
+            if (data.records) records.push(...data.records);
+            offset = data.offset;
+            if (onPage) onPage(records.length);
+        } while (offset);
+        return records;
+    }
+
+    /**
+     * Creates up to 10 records in one call
+     * @param {Array<Object>} fieldsList
+     */
+    createBatch(fieldsList) {
+        return this.request('POST', '', { records: fieldsList.map(fields => ({ fields })) });
+    }
+
+    /**
+     * Patches up to 10 records in one call; only the given fields change
+     * @param {Array<{id, fields}>} records
+     */
+    updateBatch(records) {
+        return this.request('PATCH', '', { records });
+    }
+
+    deleteRecord(recordId) {
+        return this.request('DELETE', `/${recordId}`);
+    }
+}
+
+// ==================== DIFFING ====================
+
+function recordSiteName(fields) {
+    return String(fields['Name'] || fields['name'] || fields['site_name'] || fields['Site Name'] || '').trim();
+}
+
+function recordSectorName(fields) {
+    return String(fields['Sector Name'] || fields['sector_name'] || fields['Sector_Name'] || '').trim();
+}
+
+function airtableSectorKey(siteName, sectorName) {
+    return `${String(siteName || '').trim()}\u0000${String(sectorName || '').trim()}`;
+}
+
+/**
+ * Airtable fields for a sector, named like the table's existing columns
+ * (matched case-insensitively against `columns`), or a default set for an
+ * empty table
+ */
+function airtableSectorFields(site, sector, columns) {
+    const values = {
+        'Name': site.name,
+        'latitude': site.latitude,
+        'longitude': site.longitude,
+        'description': site.description || '',
+        'Sector Name': sector.name,
+        'sector_name': sector.name,
+        'Azimuth': sector.azimuth,
+        'Beamwidth': sector.beamwidth,
+        'Range': sector.range,
+        'Technology': sector.technology,
+        'Frequency': sector.frequency,
+        'Color': sector.color,
+        'Opacity': sector.opacity
+    };
+
+    if (!columns) {
+        const fields = { ...values };
+        delete fields['sector_name'];
+        return fields;
+    }
+
+    const fields = {};
+    Object.keys(values).forEach(key => {
+        const column = columns.get(key.toLowerCase());
+        if (column && !(column in fields)) fields[column] = values[key];
+    });
+    return Object.keys(fields).length > 0 ? fields : values;
+}
+
+function isEmptyFieldValue(value) {
+    return value === undefined || value === null || value === '';
+}
+
+/**
+ * Fields whose values differ from the record; Airtable omits empty cells
+ */
+function changedFields(fields, recordFields) {
+    const changed = {};
+    Object.keys(fields).forEach(key => {
+        const value = fields[key];
+        const current = recordFields[key];
+        if (isEmptyFieldValue(value) && isEmptyFieldValue(current)) return;
+        if (isEmptyFieldValue(value) !== isEmptyFieldValue(current) || String(value) !== String(current)) {
+            changed[key] = value;
+        }
+    });
+    return changed;
+}
+
+/**
+ * Plans a sync: which sectors need new rows and which rows need which fields
+ * @param {Array<Object>} siteList
+ * @param {Array<Object>} records - Current table records
+ * @returns {{creates: Array<Object>, updates: Array<{id, fields}>, unchanged: number}}
+ */
+function diffSectorsWithRecords(siteList, records) {
+    // Column names from the records themselves (Airtable drops empty cells)
+    let columns = null;
+    records.forEach(record => {
+        Object.keys(record.fields).forEach(name => {
+            if (!columns) columns = new Map();
+            if (!columns.has(name.toLowerCase())) columns.set(name.toLowerCase(), name);
+        });
+    });
+
+    // Duplicate keys (e.g. unnamed sectors) are paired with records in order
+    const recordsByKey = new Map();
+    records.forEach(record => {
+        const key = airtableSectorKey(recordSiteName(record.fields), recordSectorName(record.fields));
+        if (!recordsByKey.has(key)) recordsByKey.set(key, []);
+        recordsByKey.get(key).push(record);
+    });
+
+    const creates = [];
+    const updates = [];
+    let unchanged = 0;
+
+    siteList.forEach(site => {
+        (site.sectors || []).forEach(sector => {
+            const fields = airtableSectorFields(site, sector, columns);
+            const candidates = recordsByKey.get(airtableSectorKey(site.name, sector.name));
+            const record = candidates && candidates.shift();
+            if (!record) {
+                creates.push(fields);
+                return;
+            }
+            const changed = changedFields(fields, record.fields);
+            if (Object.keys(changed).length > 0) updates.push({ id: record.id, fields: changed });
+            else unchanged++;
+        });
+    });
+
+    return { creates, updates, unchanged };
+}
+
+/**
+ * Syncs the sectors of `siteList` to the table
+ * @param {AirtableClient} client
+ * @param {Array<Object>} siteList
+ * @param {Object} [options]
+ * @param {Array<Object>} [options.records] - Records already fetched (otherwise the whole table is)
+ * @param {Function} [options.onProgress] - ({stage, done, total})
+ * @returns {Promise<{created, updated, unchanged, failed, errors}>}
+ */
+async function syncSectorsToAirtable(client, siteList, { records = null, onProgress = null } = {}) {
+    const report = (stage, done, total) => { if (onProgress) onProgress({ stage, done, total }); };
+
+    if (!records) {
+        records = await client.listRecords({ onPage: count => report('fetching', count, 0) });
+    }
+
+    const { creates, updates, unchanged } = diffSectorsWithRecords(siteList, records);
+    const total = creates.length + updates.length;
+    const result = { created: 0, updated: 0, unchanged, failed: 0, errors: [] };
+    let done = 0;
+    report('sending', 0, total);
+
+    // Creates and updates share one pool of requests
+    const jobs = [];
+    for (let i = 0; i < creates.length; i += AIRTABLE_BATCH_SIZE) {
+        const batch = creates.slice(i, i + AIRTABLE_BATCH_SIZE);
+        jobs.push({ kind: 'created', count: batch.length, send: () => client.createBatch(batch) });
+    }
+    for (let i = 0; i < updates.length; i += AIRTABLE_BATCH_SIZE) {
+        const batch = updates.slice(i, i + AIRTABLE_BATCH_SIZE);
+        jobs.push({ kind: 'updated', count: batch.length, send: () => client.updateBatch(batch) });
+    }
+
+    await runWithConcurrency(jobs, client.concurrency, async job => {
+        try {
+            await job.send();
+            result[job.kind] += job.count;
+        } catch (e) {
+            result.failed += job.count;
+            result.errors.push(e);
+        }
+        done += job.count;
+        report('sending', done, total);
+    });
+    return result;
+}
@@ -0,0 +1,302 @@
+// Site Sector Mapper - Alarm Index
+//
+// Imported alarm rows indexed by normalised site name. The site column is
+// detected once per import: a known header first, then the column whose
+// values match the most loaded site names. Rows without a value in that
+// column (or every row, when no column is found) are indexed under each of
+// their values, which is what the old per-click scan matched. Per-site
+// severity counts are kept alongside for the badge layer.
+//
+// AlarmBadgeLayer draws one badge per site with alarms on a single canvas,
+// coloured by the worst severity, like point-layer.js draws KML points.
+
+const ALARM_SITE_COLUMNS = ['site', 'sitename', 'node', 'nodename'];
+const ALARM_SEVERITY_COLUMNS = ['severity', 'alarmseverity', 'perceivedseverity', 'priority', 'level'];
+const ALARM_DETECT_SAMPLE = 1000; // Rows sampled when matching columns against site names
+
+// Index = level; 0 collects cleared/indeterminate/unknown values
+const ALARM_SEVERITIES = ['other', 'warning', 'minor', 'major', 'critical'];
+const ALARM_SEVERITY_COLORS = ['#64748b', '#3b82f6', '#eab308', '#f97316', '#ef4444'];
+const ALARM_SEVERITY_LEVELS = { warning: 1, minor: 2, major: 3, critical: 4 };
+
+function normalizeAlarmSiteName(value) {
+    return value === undefined || value === null ? '' : value.toString().trim().toLowerCase();
+}
+
+function normalizeAlarmHeader(key) {
+    return key.toLowerCase().replace(/[\s_-]+/g, '');
+}
+
+/**
+ * Severity level (0-4) of a cell value such as 'Critical' or 'MAJOR'
+ */
+function alarmSeverityLevel(value) {
+    return ALARM_SEVERITY_LEVELS[normalizeAlarmSiteName(value)] || 0;
+}
+
+function alarmColumns(rows) {
+    const columns = new Set();
+    const sample = Math.min(rows.length, 50);
+    for (let i = 0; i < sample; i++) Object.keys(rows[i]).forEach(key => columns.add(key));
+    return [...columns];
+}
+
+function findAlarmColumn(columns, candidates) {
+    for (const candidate of candidates) {
+        const column = columns.find(key => normalizeAlarmHeader(key) === candidate);
+        if (column) return column;
+    }
+    return null;
+}
+
+/**
+ * Detects the site and severity columns of an alarm sheet
+ * @param {Array<Object>} rows - Rows from XLSX sheet_to_json
+ * @param {Iterable<string>} [siteNames] - Loaded site names, for sheets without a known site header
+ * @returns {{siteColumn: string|null, severityColumn: string|null}}
+ */
+function detectAlarmColumns(rows, siteNames = []) {
+    const columns = alarmColumns(rows);
+    const severityColumn = findAlarmColumn(columns, ALARM_SEVERITY_COLUMNS);
+    let siteColumn = findAlarmColumn(columns, ALARM_SITE_COLUMNS);
+
+    if (!siteColumn) {
+        const names = new Set();
+        for (const name of siteNames) names.add(normalizeAlarmSiteName(name));
+        names.delete('');
+
+        let bestHits = 0;
+        if (names.size > 0) {
+            const sample = Math.min(rows.length, ALARM_DETECT_SAMPLE);
+            columns.forEach(column => {
+                let hits = 0;
+                for (let i = 0; i < sample; i++) {
+                    if (names.has(normalizeAlarmSiteName(rows[i][column]))) hits++;
+                }
+                if (hits > bestHits) {
+                    bestHits = hits;
+                    siteColumn = column;
+                }
+            });
+        }
+    }
+    return { siteColumn, severityColumn };
+}
+
+class AlarmIndex {
+    /**
+     * @param {Array<Object>} rows - Alarm rows
+     * @param {Object} columns - From detectAlarmColumns()
+     */
+    constructor(rows, { siteColumn = null, severityColumn = null } = {}) {
+        this.rows = rows;
+        this.siteColumn = siteColumn;
+        this.severityColumn = severityColumn;
+        this.rowsByName = new Map();
+        this.summaries = new Map(); // name -> { count, levels: [5 counts], level }
+
+        for (let i = 0; i < rows.length; i++) {
+            const row = rows[i];
+            const level = severityColumn ? alarmSeverityLevel(row[severityColumn]) : 0;
+            const siteValue = siteColumn ? row[siteColumn] : null;
+
+            if (siteValue) {
+                this.add(normalizeAlarmSiteName(siteValue), row, level);
+                continue;
+            }
+
+            // No site cell: any value of the row may name the site
+            const names = new Set();
+            for (const key in row) {
+                const value = row[key];
+                if (value) names.add(normalizeAlarmSiteName(value));
+            }
+            names.delete('');
+            names.forEach(name => this.add(name, row, level));
+        }
+    }
+
+    add(name, row, level) {
+        let list = this.rowsByName.get(name);
+        let summary = this.summaries.get(name);
+        if (!list) {
+            list = [];
+            summary = { count: 0, levels: [0, 0, 0, 0, 0], level: 0 };
+            this.rowsByName.set(name, list);
+            this.summaries.set(name, summary);
+        }
+        list.push(row);
+        summary.count++;
+        summary.levels[level]++;
+        if (level > summary.level) summary.level = level;
+    }
+
+    /**
+     * Alarm rows of a site, in sheet order
+     */
+    rowsFor(siteName) {
+        return this.rowsByName.get(normalizeAlarmSiteName(siteName)) || [];
+    }
+
+    /**
+     * { count, levels, level } for a site, or null without alarms
+     */
+    summaryFor(siteName) {
+        return this.summaries.get(normalizeAlarmSiteName(siteName)) || null;
+    }
+}
+
+// ==================== BADGE LAYER ====================
+
+const ALARM_BADGE_RADIUS = 9;
+const ALARM_BADGE_OFFSET = { x: 12, y: -12 }; // From the site, in CSS pixels
+
+function formatAlarmCount(count) {
+    if (count < 1000) return String(count);
+    if (count < 10000) return `${(count / 1000).toFixed(1).replace(/\.0$/, '')}k`;
+    return `${Math.round(count / 1000)}k`;
+}
+
+const AlarmBadgeLayer = L.Layer.extend({
+    options: {
+        pane: 'markerPane',
+        radius: ALARM_BADGE_RADIUS,
+        padding: 0.1
+    },
+
+    initialize(options) {
+        L.setOptions(this, options);
+        this._badges = [];
+        this._drawn = [];
+        this._onContainerClick = this._onContainerClick.bind(this);
+    },
+
+    /**
+     * Replaces the badges
+     * @param {Array<{site, summary}>} badges
+     */
+    setBadges(badges) {
+        // Worst first, so it wins when badges overlap
+        this._badges = badges.slice().sort((a, b) =>
+            b.summary.level - a.summary.level || b.summary.count - a.summary.count);
+        return this.redraw();
+    },
+
+    onAdd(map) {
+        this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-animated');
+        this._canvas.style.pointerEvents = 'none';
+        this.getPane().appendChild(this._canvas);
+        this._ctx = this._canvas.getContext('2d');
+        map.getContainer().addEventListener('click', this._onContainerClick, true);
+        this.redraw();
+    },
+
+    onRemove(map) {
+        map.getContainer().removeEventListener('click', this._onContainerClick, true);
+        L.DomUtil.remove(this._canvas);
+        this._canvas = null;
+        this._ctx = null;
+        this._drawn = [];
+    },
+
+    getEvents() {
+        const events = { viewreset: this.redraw, moveend: this.redraw, resize: this.redraw };
+        if (this._zoomAnimated) events.zoomanim = this._animateZoom;
+        return events;
+    },
+
+    _animateZoom(e) {
+        const scale = this._map.getZoomScale(e.zoom, this._zoom);
+        const offset = this._map._latLngToNewLayerPoint(this._topLeft, e.zoom, e.center);
+        L.DomUtil.setTransform(this._canvas, offset, scale);
+    },
+
+    redraw() {
+        if (!this._map || !this._canvas) return this;
+
+        const map = this._map;
+        const size = map.getSize();
+        const pad = size.multiplyBy(this.options.padding).round();
+        const width = size.x + 2 * pad.x;
+        const height = size.y + 2 * pad.y;
+        const dpr = window.devicePixelRatio || 1;
+
+        const origin = map.containerPointToLayerPoint([-pad.x, -pad.y]).round();
+        this._zoom = map.getZoom();
+        this._topLeft = map.layerPointToLatLng(origin);
+        this._pad = pad;
+        L.DomUtil.setPosition(this._canvas, origin);
+
+        const canvas = this._canvas;
+        canvas.width = Math.round(width * dpr);
+        canvas.height = Math.round(height * dpr);
+        canvas.style.width = `${width}px`;
+        canvas.style.height = `${height}px`;
+
+        const ctx = this._ctx;
+        ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+        ctx.clearRect(0, 0, width, height);
+        this._drawn = [];
+
+        const r = this.options.radius;
+        const cell = 2 * r + 2;
+        const columns = Math.ceil(width / cell) + 1;
+        const occupied = new Uint8Array(columns * (Math.ceil(height / cell) + 1));
+
+        ctx.font = `bold ${Math.round(r * 1.1)}px sans-serif`;
+        ctx.textAlign = 'center';
+        ctx.textBaseline = 'middle';
+        ctx.lineWidth = 1.5;
+        ctx.strokeStyle = '#fff';
+
+        for (const badge of this._badges) {
+            const p = map.latLngToLayerPoint([badge.site.latitude, badge.site.longitude]);
+            const x = p.x - origin.x + ALARM_BADGE_OFFSET.x;
+            const y = p.y - origin.y + ALARM_BADGE_OFFSET.y;
+            if (x < -r || y < -r || x > width + r || y > height + r) continue;
+
+            // One badge per cell: worse ones were placed first
+            const slot = Math.floor(y / cell) * columns + Math.floor(x / cell);
+            if (slot < 0 || slot >= occupied.length || occupied[slot]) continue;
+            occupied[slot] = 1;
+
+            ctx.beginPath();
+            ctx.arc(x, y, r, 0, 2 * Math.PI);
+            ctx.fillStyle = ALARM_SEVERITY_COLORS[badge.summary.level];
+            ctx.fill();
+            ctx.stroke();
+            ctx.fillStyle = '#fff';
+            ctx.fillText(formatAlarmCount(badge.summary.count), x, y + 0.5);
+            this._drawn.push({ badge, x, y });
+        }
+        return this;
+    },
+
+    /**
+     * Badge under a container pixel, or null
+     */
+    getBadgeAt(containerPoint) {
+        const x = containerPoint.x + this._pad.x;
+        const y = containerPoint.y + this._pad.y;
+        const r2 = (this.options.radius + 2) * (this.options.radius + 2);
+        for (const drawn of this._drawn) {
+            const dx = drawn.x - x, dy = drawn.y - y;
+            if (dx * dx + dy * dy <= r2) return drawn.badge;
+        }
+        return null;
+    },
+
+    _onContainerClick(e) {
+        if (!this._map || !this.listens('badgeclick') || this._drawn.length === 0) return;
+        if (e.target.closest && e.target.closest('.leaflet-popup-pane, .leaflet-control-container')) return;
+        const map = this._map;
+        if ((map.dragging && map.dragging.moved()) || (map.boxZoom && map.boxZoom.moved())) return;
+
+        const badge = this.getBadgeAt(map.mouseEventToContainerPoint(e));
+        if (!badge) return;
+
+        // The badge sits above the site marker: keep the marker from opening too
+        e.stopPropagation();
+        this.fire('badgeclick', { site: badge.site, summary: badge.summary, originalEvent: e });
+    }
+});
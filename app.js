@@ -9,8 +9,13 @@ let map = null;
 // logDebug removed
 let markersLayer = null;
 let pointsLayer = null;
+let kmlPointLayer = null; // Canvas layer for KML points (point-layer.js)
+let coverageLayer = null; // Coverage raster of the KML points (coverage-layer.js)
+let kmlDisplayMode = 'points'; // 'points', or the coverage raster mode: 'mean' | 'idw'
 // kmlLayer removed
 let sectorsLayer = null;
+let sectorTileLayer = null; // Precomputed sector tiles (sector-tiles.js), when loaded
+let sectorSiteFilter = null; // Ids of the sites the map is filtered to (selection), or null
 let sectorCounter = 0;
 let editingId = null; // Track which site is being edited
 let showSiteNames = false; // Control site name visibility
@@ -28,6 +33,8 @@ let hiddenKmlGroups = new Set(); // Track hidden KML groups
 let hiddenSiteGroups = new Set(); // Track hidden Site groups
 let activeThematicSettings = { sites: null, kml: null }; // Independent settings for Sites and KML
 let alarmsData = []; // Store imported alarm data
+let alarmIndex = null; // Alarm rows by site name (alarm-index.js)
+let alarmBadgeLayer = null; // Canvas layer of per-site alarm badges
 let connectionLinesLayer = null; // Track connection lines (LayerGroup)
 let isConnectionLinesEnabled = false; // Toggle state
 let connectionSettings = {
@@ -49,103 +56,23 @@ try {
     console.error('Error loading connection settings', e);
 }
 
+// Hidden groups are remembered so startup can skip loading them
+try {
+    const savedHiddenGroups = localStorage.getItem('siteSectorMapper_hiddenGroups');
+    if (savedHiddenGroups) {
+        const parsed = JSON.parse(savedHiddenGroups);
+        hiddenKmlGroups = new Set(parsed.kml || []);
+        hiddenSiteGroups = new Set(parsed.sites || []);
+    }
+} catch (e) {
+    console.error('Error loading hidden groups', e);
+}
+
 // Helper to generate unique ID
 function generateId() {
     return Date.now().toString(36) + Math.random().toString(36).substr(2);
 }
 
-/**
- * Normalizes CSV headers to standard keys
- * @param {Array} headers - Row object keys
- * @returns {Object} Map of original header -> standard key
- */
-function normalizeCSVHeaders(headers) {
-    const map = {};
-    const standardKeys = {
-        'site_name': ['site', 'name', 'sitename', 'site name', 'site_name', 'identifier'],
-        'latitude': ['lat', 'latitude', 'lat.', 'y'],
-        'longitude': ['lon', 'lng', 'long', 'longitude', 'long.', 'x'],
-        'azimuth': ['azimuth', 'azi', 'heading', 'dir', 'direction', 'azimut'],
-        'beamwidth': ['beamwidth', 'beam', 'hbws', 'bw', 'h_beamwidth', 'bandwith'],
-        'range': ['range', 'radius', 'dist', 'distance', 'rang'],
-        'description': ['description', 'desc', 'notes', 'comment'],
-        'sector_name': ['sector', 'sector_name', 'cell', 'cellid', 'sectorid'],
-        'color': ['color', 'colour', 'rgb'],
-        'opacity': ['opacity', 'alpha', 'transparency'],
-        'technology': ['technology', 'tech', 'system', 'rat'],
-        'frequency': ['frequency', 'freq', 'band']
-    };
-
-    headers.forEach(header => {
-        const normalized = header.toLowerCase().trim().replace(/[\s\._-]/g, '');
-        let match = null;
-
-        // Check standard keys
-        for (const [key, variants] of Object.entries(standardKeys)) {
-            // Check direct match or variants
-            if (key.replace(/_/g, '') === normalized || variants.some(v => v.replace(/[\s\._-]/g, '') === normalized)) {
-                match = key;
-                break;
-            }
-        }
-
-        // If no match, check startsWith for partial matches (e.g. "Site Name (Primary)")
-        if (!match) {
-            for (const [key, variants] of Object.entries(standardKeys)) {
-                if (variants.some(v => normalized.startsWith(v.replace(/[\s\._-]/g, '')))) {
-                    match = key;
-                    break;
-                }
-            }
-        }
-
-        if (match) {
-            map[header] = match;
-        }
-    });
-    return map;
-}
-
-/**
- * Robust number parser handling commas and non-numeric chars
- * Also auto-scales huge integers to valid coordinate ranges if specified
- * @param {string|number} val 
- * @param {boolean} isCoordinate - If true, restricts to -180/180 range
- * @returns {number|null}
- */
-function parseNumber(val, isCoordinate = false) {
-    if (val === null || val === undefined || val === '') return null;
-
-    let num = val;
-
-    if (typeof val === 'string') {
-        let cleanVal = val.trim();
-        // Handle "1.234.567" format (European thousands separators or just bad formatting)
-        // If multiple dots, remove all of them and treat as integer
-        if ((cleanVal.match(/\./g) || []).length > 1) {
-            cleanVal = cleanVal.replace(/\./g, '');
-        } else if (cleanVal.includes(',') && !cleanVal.includes('.')) {
-            cleanVal = cleanVal.replace(',', '.');
-        }
-        num = parseFloat(cleanVal);
-    }
-
-    if (isNaN(num)) return null;
-
-    // Auto-scale coordinates that are clearly too big (e.g. 3356858611 -> 33.568...)
-    if (isCoordinate) {
-        // While larger than 180 (max long) or smaller than -180, divide by 10
-        // Limit iterations to avoid infinite loop
-        let iterations = 0;
-        while ((num > 180 || num < -180) && iterations < 15) {
-            num = num / 10;
-            iterations++;
-        }
-    }
-
-    return num;
-}
-
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
     initializeMap();
@@ -351,10 +278,34 @@ function initializeMap() {
     // Initialize points layer (unclustered)
     pointsLayer = L.layerGroup().addTo(map);
 
+    // KML points: one canvas above the sectors, below the site markers
+    map.createPane('kmlPointsPane');
+    map.getPane('kmlPointsPane').style.zIndex = 450;
+    map.getPane('kmlPointsPane').style.pointerEvents = 'none';
+    kmlPointLayer = new KmlPointLayer({ pane: 'kmlPointsPane', radius: 5 }).addTo(map);
+    kmlPointLayer.on('pointclick', handleKmlPointClick);
+    // Shown instead of the points while a numeric attribute is drawn as a raster
+    coverageLayer = new CoverageRasterLayer({ pane: 'kmlPointsPane' });
+
     // Initialize sectors layer
     sectorsLayer = L.layerGroup();
     map.addLayer(sectorsLayer);
 
+    // Alarm badges: above the site markers, below the connection lines
+    map.createPane('alarmBadgePane');
+    map.getPane('alarmBadgePane').style.zIndex = 620;
+    map.getPane('alarmBadgePane').style.pointerEvents = 'none';
+    alarmBadgeLayer = new AlarmBadgeLayer({ pane: 'alarmBadgePane' }).addTo(map);
+    alarmBadgeLayer.on('badgeclick', e => showAlarmsModal(e.site.name, getAlarmsForSite(e.site.name)));
+
+    // Sector tiles loaded in the last session
+    const savedSectorTiles = localStorage.getItem('siteSectorMapper_sectorTiles');
+    if (savedSectorTiles) {
+        const tilesInput = document.getElementById('sectorTilesUrl');
+        if (tilesInput) tilesInput.value = savedSectorTiles;
+        loadSectorTiles(savedSectorTiles);
+    }
+
     // Initialize Connection Lines Layer
     // Create custom pane for neon effects (z-index 650 to be above markers which are around 600)
     map.createPane('neonPane');
@@ -366,10 +317,55 @@ function initializeMap() {
 
     connectionLinesLayer = L.layerGroup().addTo(map);
 
-    // Initialize Draw Controls
+    // Initialize Draw Controls; leaflet.draw is loaded on the first click of the selection button
     const drawnItems = new L.FeatureGroup();
     map.addLayer(drawnItems);
+    map.addControl(new SelectionLauncher({ onOpen: launcher => openSelectionTools(launcher, drawnItems) }));
+}
+
+/**
+ * Stands in for the leaflet.draw toolbar until leaflet.draw is loaded
+ */
+const SelectionLauncher = L.Control.extend({
+    options: {
+        position: 'topleft',
+        onOpen: null
+    },
+
+    onAdd() {
+        const container = L.DomUtil.create('div', 'leaflet-bar selection-launcher');
+        const button = L.DomUtil.create('a', '', container);
+        button.href = '#';
+        button.title = 'Select sites and points in an area';
+        button.setAttribute('role', 'button');
+        button.innerHTML = `<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+            <rect x="3" y="3" width="18" height="18" rx="1" stroke-dasharray="4 3"></rect></svg>`;
+        L.DomEvent.disableClickPropagation(container);
+        L.DomEvent.on(button, 'click', e => {
+            L.DomEvent.preventDefault(e);
+            container.classList.add('loading');
+            this.options.onOpen(this);
+        });
+        return container;
+    }
+});
+
+/**
+ * Loads leaflet.draw, swaps the launcher for the draw toolbar and starts a rectangle
+ * @param {L.Control} launcher
+ * @param {L.FeatureGroup} drawnItems - Holds the current selection shape
+ */
+function openSelectionTools(launcher, drawnItems) {
+    loadVendorLibrary('draw').then(() => {
+        map.removeControl(launcher);
+        addDrawControl(drawnItems);
+    }, error => {
+        launcher.getContainer().classList.remove('loading');
+        showNotification('Could not load the selection tools: ' + error.message, 'error');
+    });
+}
 
+function addDrawControl(drawnItems) {
     const drawControl = new L.Control.Draw({
         draw: {
             polyline: false,
@@ -391,6 +387,7 @@ function initializeMap() {
         }
     });
     map.addControl(drawControl);
+    new L.Draw.Rectangle(map, drawControl.options.draw.rectangle).enable();
 
     map.on(L.Draw.Event.CREATED, function (e) {
         const type = e.layerType;
@@ -405,7 +402,6 @@ function initializeMap() {
 
     map.on(L.Draw.Event.DELETED, function (e) {
         // Clear selection when shape is deleted
-        console.log('Selection cleared');
         // Restore all points
         updateMapMarkers({ fitBounds: false });
         showNotification('Selection cleared. All points visible.', 'info');
@@ -413,8 +409,8 @@ function initializeMap() {
 }
 
 function handleSelection(layer) {
-    const selectedSites = [];
-    const selectedPoints = [];
+    let selectedSites = [];
+    let selectedPoints = [];
 
     // Helper to check if point is in polygon/rectangle
     // Leaflet Draw layers (Polygon/Rectangle) have .getBounds() and .contains() (for Rectangle)
@@ -431,63 +427,21 @@ function handleSelection(layer) {
 
     if (layer instanceof L.Rectangle) {
         const bounds = layer.getBounds();
-
-        sites.forEach(site => {
-            if (bounds.contains([site.latitude, site.longitude])) {
-                selectedSites.push(site);
-            }
-        });
-
-        points.forEach(point => {
-            if (bounds.contains([point.lat, point.lng])) {
-                selectedPoints.push(point);
-            }
-        });
+        selectedSites = searchIndexInBounds(siteIndex, bounds);
+        selectedPoints = searchIndexInBounds(pointIndex, bounds);
     } else if (layer instanceof L.Polygon) {
         // Ray casting algorithm for point in polygon
-        const polyPoints = layer.getLatLngs()[0]; // Assumes simple polygon (no holes)
-
-        sites.forEach(site => {
-            if (isPointInPolygon([site.latitude, site.longitude], polyPoints)) {
-                selectedSites.push(site);
-            }
-        });
-
-        points.forEach(point => {
-            if (isPointInPolygon([point.lat, point.lng], polyPoints)) {
-                selectedPoints.push(point);
-            }
-        });
+        const polyPoints = layer.getLatLngs()[0].map(ll => [ll.lat, ll.lng]); // Assumes simple polygon (no holes)
+        selectedSites = siteIndex.searchPolygon(polyPoints);
+        selectedPoints = pointIndex.searchPolygon(polyPoints);
     }
 
-    console.log('Selected Sites:', selectedSites);
-    console.log('Selected Points:', selectedPoints);
-
     showNotification(`Selected ${selectedSites.length} sites and ${selectedPoints.length} points`, 'info');
 
     // Filter the map to show only selected items
     updateMapMarkers({ fitBounds: false }, selectedSites, selectedPoints);
 }
 
-function isPointInPolygon(point, vs) {
-    // point = [lat, lng]
-    // vs = array of LatLng objects
-
-    const x = point[0], y = point[1];
-
-    let inside = false;
-    for (let i = 0, j = vs.length - 1; i < vs.length; j = i++) {
-        const xi = vs[i].lat, yi = vs[i].lng;
-        const xj = vs[j].lat, yj = vs[j].lng;
-
-        const intersect = ((yi > y) != (yj > y))
-            && (x < (xj - xi) * (y - yi) / (yj - yi) + xi);
-        if (intersect) inside = !inside;
-    }
-
-    return inside;
-}
-
 // ==================== SEARCH HANDLER ====================
 
 function handleSearch(e) {
@@ -538,6 +492,7 @@ function initializeEventListeners() {
 
 
     document.getElementById('centerMapBtn').addEventListener('click', centerMap);
+    setupPerfHud();
 
     // CSV upload
     const dropZone = document.getElementById('dropZone');
@@ -552,6 +507,7 @@ function initializeEventListeners() {
 
     document.getElementById('importCsvBtn')?.addEventListener('click', importCsvData);
     document.getElementById('cancelCsvBtn')?.addEventListener('click', cancelCsvPreview);
+    document.getElementById('cancelCsvImportBtn')?.addEventListener('click', cancelCsvPreview);
 
     // KML upload
     const kmlDropZone = document.getElementById('kmlDropZone');
@@ -566,8 +522,6 @@ function initializeEventListeners() {
     if (selectKmlFileBtn) selectKmlFileBtn.addEventListener('click', () => kmlFileInput.click());
     if (kmlFileInput) kmlFileInput.addEventListener('change', handleKmlFileSelect);
 
-    if (kmlFileInput) kmlFileInput.addEventListener('change', handleKmlFileSelect);
-
     const importKmlBtn = document.getElementById('importKmlBtn');
     if (importKmlBtn) {
         console.log('Import KML Button found, adding listener via addEventListener');
@@ -609,10 +563,17 @@ function initializeEventListeners() {
     }
 
     document.getElementById('cancelKmlBtn')?.addEventListener('click', cancelKmlPreview);
+    document.getElementById('cancelKmlImportBtn')?.addEventListener('click', cancelKmlPreview);
 
     // Airtable
     document.getElementById('connectAirtableBtn').addEventListener('click', fetchFromAirtable);
 
+    // Precomputed sector tiles
+    document.getElementById('loadSectorTilesBtn')?.addEventListener('click', () => {
+        loadSectorTiles(document.getElementById('sectorTilesUrl').value.trim());
+    });
+    document.getElementById('removeSectorTilesBtn')?.addEventListener('click', removeSectorTiles);
+
     // Export KML
     const exportModal = document.getElementById('exportModal');
 
@@ -687,12 +648,12 @@ function initializeEventListeners() {
     });
 
     document.getElementById('exportSitesOnlyBtn').addEventListener('click', () => {
-        exportToKML('sites');
+        exportToKML('sites', { kmz: document.getElementById('exportKmzCheckbox').checked });
         exportModal.style.display = 'none';
     });
 
     document.getElementById('exportFullBtn').addEventListener('click', () => {
-        exportToKML('full');
+        exportToKML('full', { kmz: document.getElementById('exportKmzCheckbox').checked });
         exportModal.style.display = 'none';
     });
 
@@ -993,32 +954,31 @@ function removeSector(sectorId) {
     }
 }
 
-// Helper to fetch all records for a specific site (Sector-Based)
-async function fetchSiteRecords(siteName) {
-    const apiKey = document.getElementById('airtableApiKey').value;
-    const baseId = document.getElementById('airtableBaseId').value;
-    const tableName = document.getElementById('airtableTableName').value;
+// Airtable client for the credentials in the import form, or null if incomplete
+function airtableClientFromForm() {
+    const apiKey = document.getElementById('airtableApiKey').value.trim();
+    const baseId = document.getElementById('airtableBaseId').value.trim();
+    const tableName = document.getElementById('airtableTableName').value.trim();
+    const apiUrl = document.getElementById('airtableApiUrl')?.value.trim();
+
+    if (!apiKey || !baseId || !tableName) return null;
+    return new AirtableClient({ apiKey, baseId, tableName, apiUrl: apiUrl || AIRTABLE_API_URL });
+}
 
-    if (!apiKey || !baseId || !tableName || !siteName) return [];
+// Helper to fetch all records for a specific site (Sector-Based)
+async function fetchSiteRecords(client, siteName) {
+    if (!siteName) return [];
 
     // Try common field names for Site Name
     const fieldNames = ['Name', 'name', 'site_name', 'Site Name'];
+    const value = String(siteName).replace(/\\/g, '\\\\').replace(/'/g, "\\'");
 
     for (const fieldName of fieldNames) {
-        const url = `https://api.airtable.com/v0/${baseId}/${tableName}?filterByFormula=({${fieldName}}='${encodeURIComponent(siteName)}')`;
-
         try {
-            const response = await fetch(url, {
-                headers: { 'Authorization': `Bearer ${apiKey}` }
-            });
-
-            if (response.ok) {
-                const data = await response.json();
-                if (data.records && data.records.length > 0) {
-                    return data.records;
-                }
-            }
+            const records = await client.listRecords({ filterByFormula: `({${fieldName}}='${value}')` });
+            if (records.length > 0) return records;
         } catch (e) {
+            // Unknown field names are rejected with 422
             console.warn(`Error searching Airtable with field ${fieldName}:`, e);
         }
     }
@@ -1027,120 +987,13 @@ async function fetchSiteRecords(siteName) {
 
 // Sync a site and its sectors to Airtable (Sector-Based: 1 Row per Sector)
 async function syncSiteSectors(site) {
-    const records = await fetchSiteRecords(site.name);
-    const sectors = site.sectors || [];
-    let updated = 0;
-    let created = 0;
-
-    // Map existing records by Sector Name (assuming a field exists)
-    // We'll try to find a field that looks like "Sector Name" or "sector_name"
-    // If not found, we might have to rely on other heuristics or just create new ones?
-    // Let's assume 'Sector Name' or 'sector_name' exists.
-
-    // Helper to find sector name in record fields
-    const getSectorName = (record) => {
-        return record.fields['Sector Name'] || record.fields['sector_name'] || record.fields['Sector_Name'] || record.fields['name'] || ''; // 'name' might be used if Site Name is in another column
-    };
-
-    // Strategy:
-    // 1. Iterate local sectors.
-    // 2. Find matching Airtable record.
-    // 3. Update or Create.
-
-    for (const sector of sectors) {
-        const match = records.find(r => getSectorName(r) === sector.name);
-
-        const fields = {
-            'Name': site.name, // Site Name
-            'latitude': site.latitude,
-            'longitude': site.longitude,
-            'description': site.description || '',
-
-            // Sector Fields
-            'Sector Name': sector.name, // We'll try standard names
-            'sector_name': sector.name,
-            'Azimuth': sector.azimuth,
-            'azimuth': sector.azimuth,
-            'Beamwidth': sector.beamwidth,
-            'beamwidth': sector.beamwidth,
-            'Range': sector.range,
-            'range': sector.range,
-            'Technology': sector.technology,
-            'technology': sector.technology,
-            'Frequency': sector.frequency,
-            'frequency': sector.frequency,
-            'Color': sector.color,
-            'color': sector.color,
-            'Opacity': sector.opacity,
-            'opacity': sector.opacity
-        };
-
-        // Clean up fields: Airtable rejects unknown fields if typecast is false, but with typecast=true it might be lenient?
-        // Actually, sending extra fields usually causes error 422.
-        // We should only send fields that exist? We don't know schema.
-        // But we can try to send a superset and hope? No.
-        // We should probably use a standard set or try to infer from fetched records.
-
-        let validFields = {};
-
-        if (records.length > 0) {
-            // Infer fields from existing record
-            const sample = records[0].fields;
-            Object.keys(fields).forEach(key => {
-                // If key exists in sample (even if null), or if we want to force it
-                // This is tricky. Let's try to send common variations.
-                // Better strategy: Send keys that match the casing of the sample, or standard ones if sample is empty.
-                // If sample has 'azimuth', send 'azimuth'. If 'Azimuth', send 'Azimuth'.
-
-                // Check case-insensitive match
-                const sampleKey = Object.keys(sample).find(k => k.toLowerCase() === key.toLowerCase());
-                if (sampleKey) {
-                    validFields[sampleKey] = fields[key];
-                } else {
-                    // If not in sample, maybe it's a new field?
-                    // Let's include it if it's one of our core fields
-                    // But we can't send duplicates (e.g. Azimuth and azimuth).
-                    // So we prioritize:
-                    // 1. Exact match in sample
-                    // 2. Case-insensitive match in sample
-                    // 3. Default (Capitalized for proper nouns, lowercase for others?)
-                }
-            });
-
-            // If validFields is empty (e.g. new record has no fields?), fallback to all
-            if (Object.keys(validFields).length === 0) validFields = fields;
-
-        } else {
-            // No existing records to infer from. Send all variations? No, that will fail.
-            // Send a safe subset: Capitalized usually works for labels.
-            validFields = {
-                'Name': site.name,
-                'Sector Name': sector.name,
-                'Azimuth': sector.azimuth,
-                'Beamwidth': sector.beamwidth,
-                'Range': sector.range,
-                'Technology': sector.technology,
-                'Frequency': sector.frequency,
-                'Color': sector.color,
-                'Opacity': sector.opacity,
-                'latitude': site.latitude,
-                'longitude': site.longitude,
-                'description': site.description
-            };
-        }
-
-        if (match) {
-            // Update
-            const result = await updateAirtableRecord(match.id, validFields);
-            if (result) updated++;
-        } else {
-            // Create
-            const result = await createAirtableRecord(validFields);
-            if (result) created++;
-        }
-    }
+    const client = airtableClientFromForm();
+    if (!client) return { updated: 0, created: 0, unchanged: 0, failed: 0 };
 
-    return { updated, created };
+    const records = await fetchSiteRecords(client, site.name);
+    const result = await syncSectorsToAirtable(client, [site], { records });
+    result.errors.forEach(error => console.error('Error syncing sectors to Airtable:', error));
+    return result;
 }
 
 async function handleManualSubmit(e) {
@@ -1178,6 +1031,7 @@ async function handleManualSubmit(e) {
         const siteIndex = sites.findIndex(s => s.id === editingId);
         if (siteIndex !== -1) {
             // Update local - PRESERVE EXISTING PROPERTIES
+            sectorGeometryCache.invalidateSite(sites[siteIndex]);
             sites[siteIndex] = {
                 ...sites[siteIndex], // Preserve group, id, etc.
                 name: siteName,
@@ -1186,13 +1040,18 @@ async function handleManualSubmit(e) {
                 description,
                 sectors
             };
+            markSiteDirty(sites[siteIndex]);
 
             // Update Airtable (Sector-Based)
             showNotification('Syncing sectors to Airtable...', 'info');
-            const { updated, created } = await syncSiteSectors(sites[siteIndex]);
+            const { updated, created, unchanged, failed } = await syncSiteSectors(sites[siteIndex]);
 
-            if (updated > 0 || created > 0) {
+            if (failed > 0) {
+                showNotification(`Sync incomplete: ${failed} sectors failed (${updated} updated, ${created} created).`, 'warning');
+            } else if (updated > 0 || created > 0) {
                 showNotification(`Synced: ${updated} updated, ${created} created.`, 'success');
+            } else if (unchanged > 0) {
+                showNotification('Airtable already up to date.', 'info');
             } else {
                 showNotification('Sync finished (no changes or failed).', 'warning');
             }
@@ -1218,11 +1077,12 @@ async function handleManualSubmit(e) {
         };
 
         sites.push(newSite);
+        markSiteDirty(newSite);
 
         showNotification('Creating site sectors in Airtable...', 'info');
-        const { updated, created } = await syncSiteSectors(newSite);
+        const { updated, created, failed } = await syncSiteSectors(newSite);
 
-        if (updated > 0 || created > 0) {
+        if (failed === 0 && (updated > 0 || created > 0)) {
             showNotification(`Site added and synced: ${created} sectors created.`, 'success');
         } else {
             showNotification('Site added locally (Airtable sync failed)', 'warning');
@@ -1239,7 +1099,7 @@ async function handleManualSubmit(e) {
     sectorCounter = 0;
 }
 
-function handleBulkEditSubmit(e) {
+async function handleBulkEditSubmit(e) {
     e.preventDefault();
 
     const beamwidth = document.getElementById('bulkBeamwidth').value;
@@ -1252,6 +1112,10 @@ function handleBulkEditSubmit(e) {
 
     let updatedCount = 0;
 
+    // Bulk edit applies to every site, including groups that are hidden and not loaded yet
+    await ensureSiteGroupsLoaded();
+    sectorGeometryCache.clear();
+
     sites.forEach(site => {
         if (site.sectors) {
             site.sectors.forEach(sector => {
@@ -1259,6 +1123,7 @@ function handleBulkEditSubmit(e) {
                 if (range) sector.range = parseFloat(range);
                 updatedCount++;
             });
+            markSiteDirty(site);
         }
     });
 
@@ -1272,6 +1137,148 @@ function handleBulkEditSubmit(e) {
     showNotification(`Updated ${updatedCount} sectors successfully!`, 'success');
 }
 
+// ==================== IMPORT WORKER ====================
+
+// CSV/Excel/KML files are parsed by import-worker.js and come back as
+// transferred buffers in batches. Without a usable worker (e.g. pages opened
+// from file://) each importer falls back to parsing on the main thread.
+
+let importWorker = null;
+let importJob = null; // { id, kind, resolve, reject, onBatch, onProgress }
+let importJobCounter = 0;
+
+const IMPORT_STAGE_LABELS = {
+    reading: 'Reading file',
+    parsing: 'Parsing',
+    mapping: 'Processing rows'
+};
+
+function getImportWorker() {
+    if (importWorker) return importWorker;
+    if (typeof Worker === 'undefined') return null;
+
+    try {
+        importWorker = new Worker('import-worker.js?v=1');
+    } catch (error) {
+        console.warn('Import worker unavailable, parsing on the main thread:', error);
+        return null;
+    }
+
+    importWorker.onmessage = handleImportWorkerMessage;
+    importWorker.onerror = (event) => {
+        // Script load failures land here as well: drop the worker so the job can fall back
+        event.preventDefault();
+        const job = importJob;
+        terminateImportWorker();
+        if (job) job.reject(importWorkerFailure(event.message || 'Import worker failed'));
+    };
+    return importWorker;
+}
+
+function importWorkerFailure(message) {
+    const error = new Error(message);
+    error.workerFailure = true;
+    return error;
+}
+
+function terminateImportWorker() {
+    importJob = null;
+    if (importWorker) {
+        importWorker.terminate();
+        importWorker = null;
+    }
+}
+
+/**
+ * Parses a file in the import worker. Starting a job cancels the running one.
+ * @param {string} kind - 'csv' | 'excel' | 'kml' | 'kml-excel' | 'alarms'
+ * @param {File} file
+ * @param {Object} handlers - { onBatch(message), onProgress(message) }
+ * @returns {Promise<Object>} The worker's summary. Rejects with an AbortError when
+ *   cancelled and with `error.workerFailure` set when no worker could run the job.
+ */
+function runImportJob(kind, file, handlers) {
+    cancelImportJob();
+    const worker = getImportWorker();
+    if (!worker) return Promise.reject(importWorkerFailure('Web Workers are not available'));
+
+    return new Promise((resolve, reject) => {
+        importJob = { id: ++importJobCounter, kind, resolve, reject, ...handlers };
+        worker.postMessage({ type: 'parse', jobId: importJob.id, kind, file, localVendor: vendorInstalled() });
+    });
+}
+
+function handleImportWorkerMessage(e) {
+    const message = e.data;
+    const job = importJob;
+    if (!job || message.jobId !== job.id) return; // Late message from a cancelled job
+
+    if (message.type === 'progress') {
+        if (job.onProgress) job.onProgress(message);
+    } else if (message.type === 'batch') {
+        try {
+            job.onBatch(message);
+        } catch (error) {
+            terminateImportWorker();
+            job.reject(error);
+        }
+    } else if (message.type === 'done') {
+        importJob = null;
+        job.resolve(message.summary);
+    } else if (message.type === 'error') {
+        importJob = null;
+        job.reject(new Error(message.message));
+    }
+}
+
+/**
+ * Stops the running import by terminating the worker; a new one is created for the next file
+ * @param {Array<string>} [kinds] - Only cancel jobs of these kinds
+ * @returns {boolean} True if a job was cancelled
+ */
+function cancelImportJob(kinds = null) {
+    const job = importJob;
+    if (!job || (kinds && !kinds.includes(job.kind))) return false;
+
+    terminateImportWorker();
+    const error = new Error('Import cancelled');
+    error.name = 'AbortError';
+    job.reject(error);
+    return true;
+}
+
+function decodeJsonBatch(buffer) {
+    return JSON.parse(new TextDecoder().decode(buffer));
+}
+
+/**
+ * @param {string} elementId - Progress container
+ * @param {Object} progress - Worker progress message { stage, loaded, total, count }
+ */
+function showImportProgress(elementId, progress) {
+    const container = document.getElementById(elementId);
+    if (!container) return;
+
+    const fill = container.querySelector('.import-progress-fill');
+    const label = container.querySelector('.import-progress-label');
+    const determinate = progress.total > 0;
+    const percent = determinate ? Math.round(100 * progress.loaded / progress.total) : 0;
+
+    let text = IMPORT_STAGE_LABELS[progress.stage] || 'Importing';
+    if (determinate) text += ` ${percent}%`;
+    if (progress.count) text += ` · ${progress.count.toLocaleString()} records`;
+
+    container.classList.toggle('indeterminate', !determinate);
+    fill.style.width = determinate ? `${percent}%` : '';
+    label.textContent = text;
+    container.classList.remove('d-none');
+}
+
+function hideImportProgress(elementId) {
+    const container = document.getElementById(elementId);
+    if (container) container.classList.add('d-none');
+}
+
 // ==================== CSV IMPORT ====================
 
 let csvData = null;
@@ -1309,25 +1316,34 @@ function handleFileSelect(e) {
     }
 }
 
-function processExcelFile(file) {
-    const reader = new FileReader();
-
-    reader.onload = (e) => {
-        try {
-            const data = new Uint8Array(e.target.result);
-            const workbook = XLSX.read(data, { type: 'array' });
-            const firstSheetName = workbook.SheetNames[0];
-            const worksheet = workbook.Sheets[firstSheetName];
+/**
+ * Runs `callback` once a library loaded on first use (vendor.js) is in the page
+ * @param {string} name - Key of VENDOR_LIBRARIES
+ * @param {Function} callback
+ */
+function withVendorLibrary(name, callback) {
+    loadVendorLibrary(name).then(callback, error => {
+        console.error(error);
+        showNotification(`Could not load ${VENDOR_LIBRARIES[name].global}: ${error.message}`, 'error');
+    });
+}
 
-            // Get raw JSON
-            const jsonData = XLSX.utils.sheet_to_json(worksheet);
-            processImportData(jsonData);
-        } catch (error) {
-            console.error(error);
-            showNotification('Error parsing Excel file: ' + error.message, 'error');
-        }
-    };
-    reader.readAsArrayBuffer(file);
+function processExcelFile(file) {
+    parseSiteFileInWorker('excel', file, () => withVendorLibrary('xlsx', () => {
+        const reader = new FileReader();
+
+        reader.onload = (e) => {
+            try {
+                const data = new Uint8Array(e.target.result);
+                const { fields, rows } = readSiteSheet(XLSX.read(data, { type: 'array' }));
+                processImportData(rows, fields);
+            } catch (error) {
+                console.error(error);
+                showNotification('Error parsing Excel file: ' + error.message, 'error');
+            }
+        };
+        reader.readAsArrayBuffer(file);
+    }));
 }
 
 function processCSVFile(file) {
@@ -1336,135 +1352,106 @@ function processCSVFile(file) {
         return;
     }
 
-    Papa.parse(file, {
-        header: true,
-        skipEmptyLines: true,
-        complete: (results) => {
-            if (results.data.length === 0) {
-                showNotification('CSV file is empty', 'error');
-                return;
+    parseSiteFileInWorker('csv', file, () => withVendorLibrary('papaparse', () => {
+        Papa.parse(file, {
+            header: true,
+            skipEmptyLines: true,
+            complete: (results) => {
+                if (results.data.length === 0) {
+                    showNotification('CSV file is empty', 'error');
+                    return;
+                }
+                processImportData(results.data, results.meta.fields);
+            },
+            error: (error) => {
+                showNotification('Error parsing CSV: ' + error.message, 'error');
             }
-            processImportData(results.data);
-        },
-        error: (error) => {
-            showNotification('Error parsing CSV: ' + error.message, 'error');
-        }
-    });
+        });
+    }));
 }
 
-function normalizeCSVHeaders(keys) {
-    const headerMap = {};
-    const standardMappings = {
-        'site name': 'site_name',
-        'site_name': 'site_name',
-        'name': 'site_name',
-        'latitude': 'latitude',
-        'lat': 'latitude',
-        'longitude': 'longitude',
-        'lon': 'longitude',
-        'lng': 'longitude',
-        'description': 'description',
-        'sector name': 'sector_name',
-        'sector_name': 'sector_name',
-        'azimuth': 'azimuth',
-        'bearing': 'azimuth',
-        'azimut': 'azimuth', // Added French spelling
-        'beamwidth': 'beamwidth',
-        'range': 'range',
-        'radius': 'range',
-        'technology': 'technology',
-        'tech': 'technology',
-        'frequency': 'frequency',
-        'freq': 'frequency',
-        'color': 'color',
-        'opacity': 'opacity',
-        // New Mappings
-        'physical_cell_id': 'pci',
-        'physical cell id': 'pci',
-        'pci': 'pci',
-        'sc physical cell id': 'pci',
-        'cell_name': 'cell_name',
-        'cell name': 'cell_name',
-        'cellname': 'cell_name',
-        'cellid': 'cell_name'
-    };
-
-    keys.forEach(key => {
-        const normalizedKey = key.toLowerCase().trim();
-        if (standardMappings[normalizedKey]) {
-            headerMap[key] = standardMappings[normalizedKey];
+/**
+ * Parses a CSV/Excel site file in the import worker; mapped rows arrive in
+ * batches and are previewed once the whole file is read
+ * @param {string} kind - 'csv' or 'excel'
+ * @param {File} file
+ * @param {Function} parseOnMainThread - Fallback when no worker can run
+ */
+function parseSiteFileInWorker(kind, file, parseOnMainThread) {
+    const tables = [];
+    csvData = null;
+    document.getElementById('csvPreview').classList.add('d-none');
+    showImportProgress('csvImportProgress', { stage: 'reading', loaded: 0, total: file.size, count: 0 });
+
+    runImportJob(kind, file, {
+        onProgress: (message) => showImportProgress('csvImportProgress', message),
+        onBatch: (message) => tables.push(message.table)
+    }).then(summary => {
+        hideImportProgress('csvImportProgress');
+        if (summary.rawCount === 0) {
+            showNotification(kind === 'csv' ? 'CSV file is empty' : 'No data found in file', 'error');
+            return;
+        }
+        setParsedSiteRows(concatSiteRowTables(tables), summary);
+    }).catch(error => {
+        hideImportProgress('csvImportProgress');
+        if (error.name === 'AbortError') return;
+        if (error.workerFailure) {
+            parseOnMainThread();
+            return;
         }
+        showNotification(`Error parsing ${kind === 'csv' ? 'CSV' : 'Excel file'}: ${error.message}`, 'error');
     });
-    return headerMap;
 }
 
-function processImportData(rawData) {
+/**
+ * @param {Array<Object>} rawData - Rows keyed by header
+ * @param {Array<string>} fields - Every column header of the file
+ */
+function processImportData(rawData, fields) {
     if (!rawData || rawData.length === 0) {
         showNotification('No data found in file', 'error');
         return;
     }
 
-    // Normalize headers
-    // Use the keys from the first row if checking rawData
-    const keys = Object.keys(rawData[0]);
-    const headerMap = normalizeCSVHeaders(keys);
-
-    // Map data to standard keys
-    csvData = rawData.map(row => {
-        const newRow = {};
-        for (const [key, val] of Object.entries(row)) {
-            if (headerMap[key]) {
-                newRow[headerMap[key]] = val;
-            } else {
-                newRow[key] = val; // Keep original if no match
-            }
-        }
-        return newRow;
-    }).filter(row => {
-        // Flexible validation: needs site name and coordinates
-        const hasName = row.site_name;
-        const hasLat = parseNumber(row.latitude, true) !== null;
-        const hasLng = parseNumber(row.longitude, true) !== null;
-        return hasName && hasLat && hasLng;
-    });
+    // Compile the header mapping from the file's header, not one row's keys:
+    // Papa leaves the missing fields out of short rows
+    const plan = compileSiteImportPlan(fields, rawData);
+    const rows = mapImportRows(rawData, plan);
+    setParsedSiteRows(rows, summarizeImportRows(rows));
+}
 
-    if (csvData.length === 0) {
+/**
+ * @param {Object} rows - Site row table (mapImportRows)
+ * @param {Object} summary - From summarizeImportRows
+ */
+function setParsedSiteRows(rows, summary) {
+    csvData = rows;
+    if (rows.length === 0) {
         showNotification('No valid sites found. Check file headers (Site Name, Latitude, Longitude required).', 'error');
     } else {
-        showCSVPreview(csvData);
+        showCSVPreview(summary);
     }
 }
 
-function showCSVPreview(data) {
+/**
+ * @param {Object} summary - From summarizeImportRows
+ */
+function showCSVPreview(summary) {
     const preview = document.getElementById('csvPreview');
     const content = document.getElementById('csvPreviewContent');
 
-    // ... rest of function ...
-    // (Simplifying replacement for brevity, keeping original logic mostly)
-
-    let html = `<p><strong>${data.length} sites</strong> found in CSV</p><ul style="list-style: none; padding: 0;">`;
-
-    const uniqueSites = {};
-    data.forEach(row => {
-        if (!uniqueSites[row.site_name]) {
-            uniqueSites[row.site_name] = [];
-        }
-        uniqueSites[row.site_name].push(row);
-    });
+    let html = `<p><strong>${summary.rowCount} sites</strong> found in CSV</p><ul style="list-style: none; padding: 0;">`;
 
-    let count = 0;
-    for (const [siteName, rows] of Object.entries(uniqueSites)) {
-        if (count < 5) {
-            html += `<li style="padding: 0.5rem; background: var(--bg-card); margin-bottom: 0.5rem; border-radius: var(--radius-sm);">
-                <strong>${siteName}</strong> - ${rows.length} sector(s)<br>
-                <small style="color: var(--text-muted);">${rows[0].latitude}, ${rows[0].longitude}</small>
+    summary.sample.forEach(site => {
+        html += `<li style="padding: 0.5rem; background: var(--bg-card); margin-bottom: 0.5rem; border-radius: var(--radius-sm);">
+                <strong>${site.name}</strong> - ${site.sectorCount} sector(s)<br>
+                <small style="color: var(--text-muted);">${site.latitude}, ${site.longitude}</small>
             </li>`;
-            count++;
-        }
-    }
+    });
 
-    if (Object.keys(uniqueSites).length > 5) {
-        html += `<li style="color: var(--text-muted); padding: 0.5rem;">... and ${Object.keys(uniqueSites).length - 5} more</li>`;
+    if (summary.siteCount > 5) {
+        html += `<li style="color: var(--text-muted); padding: 0.5rem;">... and ${summary.siteCount - 5} more</li>`;
     }
 
     html += '</ul>';
@@ -1526,11 +1513,16 @@ function renderPointsList(filter = '') {
 }
 
 function panToPoint(pointId) {
+    flushMapMarkers();
     const point = points.find(p => p.id == pointId);
     if (point) {
+        if (point.type === 'kml_point') {
+            focusKmlPoint(point, 16);
+            return;
+        }
         map.setView([point.latitude, point.longitude], 16);
         // Open popup
-        markersLayer.eachLayer(layer => {
+        pointsLayer.eachLayer(layer => {
             if (layer.options.pointId == pointId) {
                 layer.openPopup();
             }
@@ -1544,61 +1536,11 @@ function importCsvData() {
     }
 
     // Group by site name
-    const sitesMap = {};
-
-    csvData.forEach(row => {
-        const siteName = row.site_name;
-
-        if (!sitesMap[siteName]) {
-            sitesMap[siteName] = {
-                id: generateId(),
-                name: row.site_name,
-                latitude: parseNumber(row.latitude, true),
-                longitude: parseNumber(row.longitude, true),
-                description: row.description || '',
-                group: 'CSV Import',
-                sectors: []
-            };
-        }
-
-        // Add sector if azimuth is present (and valid)
-        const azimuth = parseNumber(row.azimuth);
-
-        // Only add sector if we have at least an azimuth
-        if (azimuth !== null) {
-            // identifying Extra Props
-            const standardProps = ['site_name', 'latitude', 'longitude', 'description', 'sector_name', 'azimuth', 'beamwidth', 'range', 'color', 'opacity', 'technology', 'frequency', 'pci', 'cell_name'];
-            const customProperties = [];
-
-            Object.keys(row).forEach(key => {
-                // Check if it's NOT a standard prop (using normalized keys from earlier might be needed,
-                // but here 'row' has keys from headerMap or original if not mapped.
-                // The headerMap normalized them. So we check against those.
-                // Actually, let's just exclude the ones we explicitly used.
-                if (!standardProps.includes(key)) {
-                    customProperties.push({ name: key, value: row[key] });
-                }
-            });
-
-            sitesMap[siteName].sectors.push({
-                name: row.sector_name || '',
-                azimuth: azimuth,
-                beamwidth: parseNumber(row.beamwidth) || 65,
-                range: parseNumber(row.range) || 500,
-                color: row.color || '#3388ff',
-                opacity: parseNumber(row.opacity) || 0.5,
-                technology: row.technology || '',
-                frequency: row.frequency || '',
-                pci: row.pci || '',
-                cell_name: row.cell_name || '',
-                customProperties: customProperties
-            });
-        }
-    });
+    const newSites = groupRowsIntoSites(csvData, generateId);
 
     // Add to sites
-    const newSites = Object.values(sitesMap);
     sites.push(...newSites);
+    newSites.forEach(markSiteDirty);
 
     // Save and update
     saveData();
@@ -1617,6 +1559,8 @@ function importCsvData() {
 }
 
 function cancelCsvPreview() {
+    cancelImportJob(['csv', 'excel']);
+    hideImportProgress('csvImportProgress');
     csvData = null;
     document.getElementById('csvPreview').classList.add('d-none');
     document.getElementById('csvFileInput').value = '';
@@ -1650,56 +1594,129 @@ function handleKmlFileSelect(event) {
 }
 
 function processKmlFile(file) {
-    if (!file.name.endsWith('.kml') && !file.name.endsWith('.xml')) {
+    const isIngestedJson = file.name.endsWith('.json');
+    const isColumnar = file.name.endsWith('.ssmc');
+    if (!file.name.endsWith('.kml') && !file.name.endsWith('.xml') && !isIngestedJson && !isColumnar) {
         showNotification('Please select a valid KML file', 'error');
         return;
     }
 
-    currentKmlFilename = file.name; // Store filename for import
-
-    const reader = new FileReader();
-    reader.onload = (e) => {
-        const text = e.target.result;
-        try {
-            const parsedData = parseKml(text);
-            if (parsedData.length === 0) {
-                showNotification('No valid points found in KML file.', 'warning');
-                // alert('Debug: No valid points found in KML');
-            } else {
-                kmlData = parsedData;
-                // alert(`Debug: Parsed ${kmlData.length} points`); // Debug
-                console.log(`KML Data populated with ${kmlData.length} items`);
-                showKmlPreview(kmlData);
-
-                // Auto-import (Fully Automatic)
-                setTimeout(() => {
-                    importKmlData();
-                }, 500);
+    // Pre-ingested points (python -m sitemapper.kml_ingest / sitemapper.columnar) keep the original KML name as group
+    currentKmlFilename = (isIngestedJson || isColumnar) ? file.name.replace(/\.(json|ssmc)$/, '.kml') : file.name; // Store filename for import
+
+    const readOnMainThread = () => {
+        const reader = new FileReader();
+        reader.onload = (e) => {
+            const text = e.target.result;
+            try {
+                let parsedData;
+                if (isColumnar) {
+                    const table = decodeColumnarPoints(text);
+                    if (table.columns.group) currentKmlFilename = columnarValue(table.columns.group, 0) || currentKmlFilename;
+                    // importKmlData reads the KML colour from `color`
+                    parsedData = columnarToPoints(table, currentKmlFilename).map(p => ({ ...p, color: p.iconColor }));
+                } else {
+                    parsedData = isIngestedJson ? JSON.parse(text) : parseKml(text);
+                }
+                showParsedKmlPoints(parsedData);
+            } catch (error) {
+                console.error('KML Parse Error:', error);
+                showNotification('Error parsing KML: ' + error.message, 'error');
             }
-        } catch (error) {
-            console.error('KML Parse Error:', error);
-            showNotification('Error parsing KML: ' + error.message, 'error');
+        };
+        reader.onerror = () => {
+            showNotification('Error reading file', 'error');
+        };
+        if (isColumnar) {
+            reader.readAsArrayBuffer(file);
+        } else {
+            reader.readAsText(file);
         }
     };
-    reader.onerror = () => {
-        showNotification('Error reading file', 'error');
-    };
-    reader.readAsText(file);
-}
-
-function parseKml(xmlText) {
-    const parser = new DOMParser();
-    const xmlDoc = parser.parseFromString(xmlText, "text/xml");
 
-    // Check for parsing errors
-    const parserError = xmlDoc.getElementsByTagName("parsererror");
-    if (parserError.length > 0) {
-        throw new Error("Invalid XML format");
+    // Pre-ingested files are already parsed; only raw KML is worth a worker
+    if (isIngestedJson || isColumnar) {
+        readOnMainThread();
+        return;
     }
 
-    // Parse Styles
-    const styles = {};
-    const styleElements = xmlDoc.getElementsByTagName("Style");
+    parsePointFileInWorker('kml', file, readOnMainThread)
+        .then(result => showParsedKmlPoints(result.points))
+        .catch(error => {
+            console.error('KML Parse Error:', error);
+            showNotification('Error parsing KML: ' + error.message, 'error');
+        });
+}
+
+/**
+ * Parses a KML or Excel point file in the import worker
+ * @param {string} kind - 'kml' or 'kml-excel'
+ * @param {File} file
+ * @param {Function} parseOnMainThread - Fallback when no worker can run
+ * @returns {Promise<{points, summary}|undefined>} Pending forever when cancelled or
+ *   handed to the fallback, which reports its own result
+ */
+function parsePointFileInWorker(kind, file, parseOnMainThread) {
+    const parsed = [];
+    kmlData = [];
+    document.getElementById('kmlPreview').classList.add('d-none');
+    showImportProgress('kmlImportProgress', { stage: 'reading', loaded: 0, total: file.size, count: 0 });
+
+    return new Promise((resolve, reject) => {
+        runImportJob(kind, file, {
+            onProgress: (message) => showImportProgress('kmlImportProgress', message),
+            onBatch: (message) => {
+                const batch = columnarToPoints(decodeColumnarPoints(message.buffer), currentKmlFilename);
+                for (let i = 0; i < batch.length; i++) {
+                    // importKmlData reads the KML colour from `color`
+                    batch[i].color = batch[i].iconColor;
+                    parsed.push(batch[i]);
+                }
+            }
+        }).then(summary => {
+            hideImportProgress('kmlImportProgress');
+            resolve({ points: parsed, summary });
+        }).catch(error => {
+            hideImportProgress('kmlImportProgress');
+            if (error.name === 'AbortError') return;
+            if (error.workerFailure) {
+                parseOnMainThread();
+                return;
+            }
+            reject(error);
+        });
+    });
+}
+
+function showParsedKmlPoints(parsedData) {
+    if (parsedData.length === 0) {
+        showNotification('No valid points found in KML file.', 'warning');
+        return;
+    }
+
+    kmlData = parsedData;
+    console.log(`KML Data populated with ${kmlData.length} items`);
+    showKmlPreview(kmlData);
+
+    // Auto-import (Fully Automatic)
+    setTimeout(() => {
+        importKmlData();
+    }, 500);
+}
+
+function parseKml(xmlText) {
+    const parser = new DOMParser();
+    const xmlDoc = parser.parseFromString(xmlText, "text/xml");
+
+    // Check for parsing errors
+    const parserError = xmlDoc.getElementsByTagName("parsererror");
+    if (parserError.length > 0) {
+        throw new Error("Invalid XML format");
+    }
+
+    // Parse Styles
+    const styles = {};
+    const styleElements = xmlDoc.getElementsByTagName("Style");
     for (let i = 0; i < styleElements.length; i++) {
         const style = styleElements[i];
         const id = style.getAttribute("id");
@@ -1873,8 +1890,6 @@ function parseKml(xmlText) {
                             });
                         }
 
-                        if (customProperties.length > 0) console.log('Parsed properties for point:', name, customProperties); // Debug
-
                         parsedPoints.push({
                             name,
                             description,
@@ -1894,154 +1909,58 @@ function parseKml(xmlText) {
 
 // Parse Excel File
 function parseExcelFile(file) {
-    const reader = new FileReader();
-    reader.onload = (e) => {
-        const data = new Uint8Array(e.target.result);
-        const workbook = XLSX.read(data, { type: 'array' });
-
-        // Assume first sheet
-        const firstSheetName = workbook.SheetNames[0];
-        const worksheet = workbook.Sheets[firstSheetName];
-
-        // Convert to Array of Arrays first to find header
-        const rawData = XLSX.utils.sheet_to_json(worksheet, { header: 1 });
-
-        if (!rawData || rawData.length === 0) {
-            alert('No data found in Excel file.');
-            return;
-        }
-
-        // Find Header Row (Scan first 20 rows)
-        let headerRowIndex = -1;
-        let foundKeys = [];
-
-        for (let i = 0; i < Math.min(20, rawData.length); i++) {
-            const row = rawData[i];
-            if (!row || row.length === 0) continue;
-
-            const rowStr = row.map(c => String(c).trim().toLowerCase());
-
-            const hasLat = rowStr.some(k => ['latitude', 'lat', 'y'].includes(k) || k.includes('lat'));
-            const hasLng = rowStr.some(k => ['longitude', 'long', 'lng', 'x'].includes(k) || k.includes('lon') || k.includes('lng'));
-
-            if (hasLat && hasLng) {
-                headerRowIndex = i;
-                foundKeys = row;
-                break;
+    const readOnMainThread = () => {
+        const reader = new FileReader();
+        reader.onload = (e) => {
+            try {
+                const { points, attributes } = parseExcelPoints(new Uint8Array(e.target.result));
+                showParsedExcelPoints(points, attributes);
+            } catch (error) {
+                console.error('Excel Parse Error:', error);
+                alert(error.message);
             }
-        }
-
-        if (headerRowIndex === -1) {
-            // Fallback to row 0 if not found, let the standard check handle failure
-            console.warn('Could not auto-detect header row. Defaulting to first row.');
-            headerRowIndex = 0;
-        }
-
-        console.log(`Detected header at row index: ${headerRowIndex}`);
-
-        // Re-parse with correct header row
-        const jsonData = XLSX.utils.sheet_to_json(worksheet, { defval: "", range: headerRowIndex });
-
-        if (!jsonData || jsonData.length === 0) {
-            alert('No data found in Excel file.');
-            return;
-        }
-
-        // Identify Columns
-        const keys = Object.keys(jsonData[0]);
-        console.log('Excel Keys Found:', keys);
-
-        // Normalize keys (trim whitespace and lowercase)
-        const normalizedKeys = keys.map(k => k.trim().toLowerCase());
-
-        // Heuristics for Latitude
-        let latIndex = normalizedKeys.findIndex(k => ['latitude', 'lat', 'y'].includes(k));
-        if (latIndex === -1) latIndex = normalizedKeys.findIndex(k => k.includes('lat'));
-
-        // Heuristics for Longitude
-        let lngIndex = normalizedKeys.findIndex(k => ['longitude', 'long', 'lng', 'x'].includes(k));
-        if (lngIndex === -1) lngIndex = normalizedKeys.findIndex(k => k.includes('lon') || k.includes('lng'));
-
-        if (latIndex === -1 || lngIndex === -1) {
-            console.error('Could not find Lat/Lng. Keys:', keys);
-            alert(`Could not identify Latitude/Longitude columns.\n\nFound columns: ${keys.join(', ')}\n\nPlease ensure your Excel file has columns named "Latitude" and "Longitude".`);
-            return;
-        }
-
-        const latKey = keys[latIndex];
-        const lngKey = keys[lngIndex];
-
-        console.log(`Using Latitude Key: "${latKey}"`);
-        console.log(`Using Longitude Key: "${lngKey}"`);
-
-        const parsedPoints = jsonData.map((row, index) => {
-            const parseCoord = (val) => {
-                if (typeof val === 'number') return val;
-                if (typeof val === 'string') {
-                    // Replace comma with dot and parse
-                    const normalized = val.replace(/,/g, '.').trim();
-                    return parseFloat(normalized);
-                }
-                return NaN;
-            };
-
-            const lat = parseCoord(row[latKey]);
-            const lng = parseCoord(row[lngKey]);
-
-            if (isNaN(lat) || isNaN(lng)) return null;
-
-            // Extract Custom Properties (exclude lat/lng)
-            const customProperties = [];
-            keys.forEach(key => {
-                if (key !== latKey && key !== lngKey) {
-                    customProperties.push({
-                        name: key,
-                        value: row[key] // Keep as is (string or number)
-                    });
-                }
-            });
+        };
+        reader.onerror = (err) => {
+            console.error("Error reading Excel file:", err);
+            alert("Error reading Excel file.");
+        };
+        reader.readAsArrayBuffer(file);
+    };
 
-            return {
-                name: `Point ${index + 1}`,
-                latitude: lat,
-                longitude: lng,
-                description: '',
-                color: '#3b82f6', // Default blue for Excel
-                customProperties: customProperties
-            };
-        }).filter(p => p !== null);
+    parsePointFileInWorker('kml-excel', file, () => withVendorLibrary('xlsx', readOnMainThread))
+        .then(result => showParsedExcelPoints(result.points, result.summary.attributes))
+        .catch(error => {
+            console.error('Excel Parse Error:', error);
+            alert(error.message);
+        });
+}
 
-        kmlData = parsedPoints;
+function showParsedExcelPoints(parsedPoints, attributes) {
+    kmlData = parsedPoints;
 
-        // Render Preview
-        const previewContent = document.getElementById('kmlPreviewContent');
-        if (previewContent) {
-            let html = `<p>Found ${parsedPoints.length} valid points.</p>`;
-            html += `<p><strong>Attributes found:</strong> ${keys.filter(k => k !== latKey && k !== lngKey).join(', ')}</p>`;
-            html += '<table class="table table-sm table-striped"><thead><tr><th>Lat</th><th>Lng</th><th>Attributes (First 5)</th></tr></thead><tbody>';
+    // Render Preview
+    const previewContent = document.getElementById('kmlPreviewContent');
+    if (previewContent) {
+        let html = `<p>Found ${parsedPoints.length} valid points.</p>`;
+        html += `<p><strong>Attributes found:</strong> ${attributes.join(', ')}</p>`;
+        html += '<table class="table table-sm table-striped"><thead><tr><th>Lat</th><th>Lng</th><th>Attributes (First 5)</th></tr></thead><tbody>';
 
-            parsedPoints.slice(0, 5).forEach(p => {
-                const props = p.customProperties.map(prop => `${prop.name}: ${prop.value}`).join(', ');
-                html += `<tr><td>${p.latitude.toFixed(5)}</td><td>${p.longitude.toFixed(5)}</td><td>${props}</td></tr>`;
-            });
+        parsedPoints.slice(0, 5).forEach(p => {
+            const props = p.customProperties.map(prop => `${prop.name}: ${prop.value}`).join(', ');
+            html += `<tr><td>${p.latitude.toFixed(5)}</td><td>${p.longitude.toFixed(5)}</td><td>${props}</td></tr>`;
+        });
 
-            html += '</tbody></table>';
-            previewContent.innerHTML = html;
-        }
+        html += '</tbody></table>';
+        previewContent.innerHTML = html;
+    }
 
-        document.getElementById('kmlPreview').classList.remove('d-none');
-        document.getElementById('kmlDropZone').classList.add('d-none');
+    document.getElementById('kmlPreview').classList.remove('d-none');
+    document.getElementById('kmlDropZone').classList.add('d-none');
 
-        // Auto-import (Fully Automatic)
-        setTimeout(() => {
-            importKmlData();
-        }, 500);
-    };
-    reader.onerror = (err) => {
-        console.error("Error reading Excel file:", err);
-        alert("Error reading Excel file.");
-    };
-    reader.readAsArrayBuffer(file);
+    // Auto-import (Fully Automatic)
+    setTimeout(() => {
+        importKmlData();
+    }, 500);
 }
 
 // Import KML Data
@@ -2076,6 +1995,9 @@ async function importKmlData() {
         const totalPoints = kmlData.length;
         let processed = 0;
 
+        // Re-importing into a hidden group: its saved chunk is rewritten below, so load it first
+        await ensureKmlGroupsLoaded([currentKmlFilename]);
+
         // Create new sites array
         const newSites = kmlData.map((point, index) => ({
             id: `kml - ${Date.now()} -${index} `,
@@ -2099,6 +2021,7 @@ async function importKmlData() {
 
         // Push to global sites
         points.push(...newSites);
+        newSites.forEach(markPointDirty);
 
         // console.log(`Added to global points.Total points: ${ points.length } `);
 
@@ -2148,8 +2071,16 @@ function clearKmlData() {
 
     // Filter out KML points
     const initialCount = points.length;
+    points.forEach(p => { if (p.type === 'kml_point') markPointRemoved(p); });
     points = points.filter(p => p.type !== 'kml_point');
-    const removedCount = initialCount - points.length;
+    let removedCount = initialCount - points.length;
+
+    // Groups never loaded from IndexedDB are dropped as well
+    unloadedKmlGroups.forEach((count, group) => {
+        markKmlGroupDirty(group);
+        removedCount += count;
+    });
+    unloadedKmlGroups.clear();
 
     // Clear KML data buffer
     kmlData = [];
@@ -2166,7 +2097,8 @@ function clearKmlData() {
     showNotification(`Cleared ${removedCount} KML points`, 'info');
 }
 
-function exportKmlAttributes() {
+async function exportKmlAttributes() {
+    await ensureKmlGroupsLoaded();
     const kmlPoints = points.filter(p => p.type === 'kml_point');
 
     if (kmlPoints.length === 0) {
@@ -2174,31 +2106,16 @@ function exportKmlAttributes() {
         return;
     }
 
-    // CSV Header
-    let csvContent = "Latitude,Longitude,Attribute,Value\n";
-
-    // Iterate points and attributes
-    kmlPoints.forEach(point => {
-        if (point.customProperties && point.customProperties.length > 0) {
-            point.customProperties.forEach(prop => {
-                // Escape quotes in value
-                const safeValue = prop.value.replace(/"/g, '""');
-                const safeName = prop.name.replace(/"/g, '""');
-                csvContent += `${point.latitude},${point.longitude}, "${safeName}", "${safeValue}"\n`;
-            });
-        }
-    });
+    const sink = await openDownloadSink('kml_attributes.csv', 'text/csv;charset=utf-8;', 'CSV file');
+    if (!sink) return;
 
-    // Create download link
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const url = URL.createObjectURL(blob);
-    const link = document.createElement("a");
-    link.setAttribute("href", url);
-    link.setAttribute("download", "kml_attributes.csv");
-    link.style.visibility = 'hidden';
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
+    try {
+        await writeKmlAttributesCsv(kmlPoints, sink);
+    } catch (e) {
+        console.error('Attribute export failed:', e);
+        showNotification(`Attribute export failed: ${e.message}`, 'error');
+        return;
+    }
 
     showNotification('Exported attributes to CSV', 'success');
 }
@@ -2251,6 +2168,8 @@ function showKmlPreview(data) {
 
 
 function cancelKmlPreview() {
+    cancelImportJob(['kml', 'kml-excel']);
+    hideImportProgress('kmlImportProgress');
     kmlData = null;
     document.getElementById('kmlPreview').classList.add('d-none');
     document.getElementById('kmlFileInput').value = '';
@@ -2259,11 +2178,10 @@ function cancelKmlPreview() {
 // ==================== AIRTABLE INTEGRATION ====================
 
 async function fetchFromAirtable() {
-    const apiKey = document.getElementById('airtableApiKey').value;
-    const baseId = document.getElementById('airtableBaseId').value;
+    const client = airtableClientFromForm();
     const tableName = document.getElementById('airtableTableName').value;
 
-    if (!apiKey || !baseId || !tableName) {
+    if (!client) {
         showNotification('Please fill in all Airtable credentials', 'error');
         return;
     }
@@ -2274,37 +2192,10 @@ async function fetchFromAirtable() {
     statusEl.style.display = 'block';
 
     try {
-        let allRecords = [];
-        let offset = null;
-
         // Fetch all pages of records
-        do {
-            const url = offset
-                ? `https://api.airtable.com/v0/${baseId}/${encodeURIComponent(tableName)}?offset=${offset}`
-                : `https://api.airtable.com/v0/${baseId}/${encodeURIComponent(tableName)}`;
-
-            const response = await fetch(url, {
-                headers: {
-                    'Authorization': `Bearer ${apiKey}`
-                }
-            });
-
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-
-            const data = await response.json();
-
-            if (data.records && data.records.length > 0) {
-                allRecords.push(...data.records);
-            }
-
-            offset = data.offset; // Will be undefined when no more pages
-
-            // Update status with progress
-            statusEl.textContent = `Fetching records... (${allRecords.length} so far)`;
-
-        } while (offset);
+        const allRecords = await client.listRecords({
+            onPage: count => { statusEl.textContent = `Fetching records... (${count} so far)`; }
+        });
 
         console.log(`[Airtable] Fetched ${allRecords.length} total records`);
         if (allRecords.length > 0) {
@@ -2369,11 +2260,9 @@ async function fetchFromAirtable() {
 
         const newSites = Object.values(sitesMap);
         console.log(`[Airtable] Processed ${newSites.length} unique sites`);
-        newSites.forEach(s => {
-            if (s.sectors.length > 1) console.log(`[Airtable] Site ${s.name} has ${s.sectors.length} sectors`);
-        });
 
         sites.push(...newSites);
+        newSites.forEach(markSiteDirty);
         saveToLocalStorage();
         updateUI();
         updateMapMarkers();
@@ -2392,84 +2281,12 @@ async function fetchFromAirtable() {
     }
 }
 
-async function createAirtableRecord(data) {
-    const apiKey = document.getElementById('airtableApiKey').value;
-    const baseId = document.getElementById('airtableBaseId').value;
-    const tableName = document.getElementById('airtableTableName').value;
-
-    if (!apiKey || !baseId || !tableName) return null;
-
-    const url = `https://api.airtable.com/v0/${baseId}/${tableName}`;
-
-    try {
-        const response = await fetch(url, {
-            method: 'POST',
-            headers: {
-                'Authorization': `Bearer ${apiKey}`,
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ fields: data })
-        });
-
-        if (!response.ok) throw new Error(`Airtable API Error: ${response.statusText}`);
-        const result = await response.json();
-        return result;
-    } catch (error) {
-        console.error('Error creating Airtable record:', error);
-        showNotification(`Failed to create in Airtable: ${error.message}`, 'error');
-        return null;
-    }
-}
-
-async function updateAirtableRecord(recordId, data) {
-    const apiKey = document.getElementById('airtableApiKey').value;
-    const baseId = document.getElementById('airtableBaseId').value;
-    const tableName = document.getElementById('airtableTableName').value;
-
-    if (!apiKey || !baseId || !tableName || !recordId) return null;
-
-    const url = `https://api.airtable.com/v0/${baseId}/${tableName}/${recordId}`;
-
-    try {
-        const response = await fetch(url, {
-            method: 'PATCH',
-            headers: {
-                'Authorization': `Bearer ${apiKey}`,
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ fields: data })
-        });
-
-        if (!response.ok) throw new Error(`Airtable API Error: ${response.statusText}`);
-        const result = await response.json();
-        return result;
-    } catch (error) {
-        console.error('Error updating Airtable record:', error);
-        showNotification(`Failed to update Airtable: ${error.message}`, 'error');
-        return null;
-    }
-}
-
 async function deleteAirtableRecord(recordId) {
-    const apiKey = document.getElementById('airtableApiKey').value;
-    const baseId = document.getElementById('airtableBaseId').value;
-    const tableName = document.getElementById('airtableTableName').value;
-
-    if (!apiKey || !baseId || !tableName || !recordId) return null;
-
-    const url = `https://api.airtable.com/v0/${baseId}/${tableName}/${recordId}`;
+    const client = airtableClientFromForm();
+    if (!client || !recordId) return null;
 
     try {
-        const response = await fetch(url, {
-            method: 'DELETE',
-            headers: {
-                'Authorization': `Bearer ${apiKey}`
-            }
-        });
-
-        if (!response.ok) throw new Error(`Airtable API Error: ${response.statusText}`);
-        const result = await response.json();
-        return result;
+        return await client.deleteRecord(recordId);
     } catch (error) {
         console.error('Error deleting Airtable record:', error);
         showNotification(`Failed to delete from Airtable: ${error.message}`, 'error');
@@ -2478,198 +2295,107 @@ async function deleteAirtableRecord(recordId) {
 }
 
 async function syncAllToAirtable() {
-    const apiKey = document.getElementById('airtableApiKey').value;
-    const baseId = document.getElementById('airtableBaseId').value;
-    const tableName = document.getElementById('airtableTableName').value;
+    const client = airtableClientFromForm();
 
-    if (!apiKey || !baseId || !tableName) {
+    if (!client) {
         showNotification('Please fill in all Airtable credentials first', 'error');
         return;
     }
 
+    await ensureSiteGroupsLoaded();
+
     if (!confirm(`This will sync ALL ${sites.length} local sites to Airtable (Sector-Based). This may take a while. Continue?`)) return;
 
     showNotification(`Starting sync for ${sites.length} sites...`, 'info');
 
-    let processed = 0;
-    let totalUpdated = 0;
-    let totalCreated = 0;
-    let errors = 0;
-
-    for (let i = 0; i < sites.length; i++) {
-        const site = sites[i];
-
-        // Rate limiting: wait 250ms between requests
-        await new Promise(r => setTimeout(r, 250));
-
-        try {
-            const { updated, created } = await syncSiteSectors(site);
-            totalUpdated += updated;
-            totalCreated += created;
-        } catch (e) {
-            console.error(`Error syncing site ${site.name}:`, e);
-            errors++;
-        }
+    // One table fetch, then only new and changed sectors go out in batches
+    let lastReport = 0;
+    const onProgress = ({ stage, done, total }) => {
+        const now = Date.now();
+        if (now - lastReport < 2000 && done !== total) return;
+        lastReport = now;
+        showNotification(stage === 'fetching'
+            ? `Fetching Airtable records... (${done} so far)`
+            : `Syncing... ${done}/${total} sectors`, 'info');
+    };
 
-        processed++;
-        if (processed % 5 === 0) {
-            showNotification(`Syncing... ${processed}/${sites.length} (${totalUpdated} updated, ${totalCreated} created)`, 'info');
-        }
+    let result;
+    try {
+        result = await syncSectorsToAirtable(client, sites, { onProgress });
+    } catch (e) {
+        console.error('Error fetching Airtable records:', e);
+        showNotification(`Sync failed: ${e.message}`, 'error');
+        return;
     }
 
+    result.errors.forEach(error => console.error('Error syncing sectors to Airtable:', error));
+
     saveToLocalStorage();
     updateUI();
     updateMapMarkers();
-    showNotification(`Sync Complete: ${totalUpdated} sectors updated, ${totalCreated} sectors created, ${errors} site errors.`, 'success');
-}
-
-// ==================== MAP OPERATIONS ====================
-
-function addMarkerToMap(site) {
-    // Create custom div icon with site name
-    const customIcon = L.divIcon({
-        className: 'custom-site-marker',
-        html: `<div class="site-marker-label" style="display: ${showSiteNames ? 'block' : 'none'}">${site.name}</div>`,
-        iconSize: [100, 30],
-        iconAnchor: [50, 15]
-    });
-
-    const marker = L.marker([site.latitude, site.longitude], {
-        icon: customIcon,
-        title: site.name,
-        siteId: site.id // Store site ID for easy retrieval
-    });
-
-    marker.bindPopup(`
-        <div style="min-width: 200px;">
-            <h3 style="margin: 0 0 8px 0; font-size: 1rem;">${site.name}</h3>
-            <p style="margin: 0 0 4px 0; font-size: 0.875rem; color: #888;">
-                ${site.latitude.toFixed(6)}, ${site.longitude.toFixed(6)}
-            </p>
-            ${site.description ? `<p style="margin: 0 0 8px 0; font-size: 0.875rem;">${site.description}</p>` : ''}
-            <p style="margin: 0; font-size: 0.875rem; color: #6366f1;">
-                <strong>${site.sectors.length}</strong> sector(s)
-            </p>
-        </div>
-    `);
-
-    marker.on('click', () => {
-        showSiteDetails(site);
-        highlightSiteInList(site.id);
-    });
-
-    markersLayer.addLayer(marker);
-
-    // Draw sectors for visible area
-    renderVisibleSectors();
+    showNotification(`Sync Complete: ${result.updated} sectors updated, ${result.created} sectors created, ` +
+        `${result.unchanged} unchanged, ${result.failed} failed.`, result.failed > 0 ? 'warning' : 'success');
 }
 
 // Helper function to calculate destination point given start point, bearing, and distance
-function destination(lat, lng, bearing, distance) {
-    const R = 6371e3; // Earth's radius in meters
-    const latRad = (lat * Math.PI) / 180;
-    const lngRad = (lng * Math.PI) / 180;
-    const bearingRad = (bearing * Math.PI) / 180;
-
-    const latDestRad = Math.asin(
-        Math.sin(latRad) * Math.cos(distance / R) +
-        Math.cos(latRad) * Math.sin(distance / R) * Math.cos(bearingRad)
-    );
+// ==================== SECTOR RENDERING (OPTIMIZED) ====================
 
-    const lngDestRad =
-        lngRad +
-        Math.atan2(
-            Math.sin(bearingRad) * Math.sin(distance / R) * Math.cos(latRad),
-            Math.cos(distance / R) - Math.sin(latRad) * Math.sin(latDestRad)
-        );
+// Wedge vertex arrays (sector-geometry.js), reused across pans and zooms
+const sectorGeometryCache = new SectorGeometryCache();
 
-    return {
-        lat: (latDestRad * 180) / Math.PI,
-        lng: (lngDestRad * 180) / Math.PI,
-    };
+/**
+ * Fill colour of a sector: thematic class, its own colour, or by technology
+ */
+function sectorColor(sector) {
+    if (activeThematicSettings.sites) return thematicColor(activeThematicSettings.sites, sector);
+    if (sector.color) return sector.color;
+    if (sector.technology?.includes('5G')) return '#8b5cf6'; // Purple
+    if (sector.technology?.includes('4G')) return '#3b82f6'; // Blue
+    if (sector.technology?.includes('3G')) return '#10b981'; // Green
+    if (sector.technology?.includes('2G')) return '#f59e0b'; // Amber
+    return '#3388ff'; // Default blue
 }
 
-// ==================== SECTOR RENDERING (OPTIMIZED) ====================
-
 function renderVisibleSectors() {
     sectorsLayer.clearLayers();
 
     const bounds = map.getBounds();
     const zoom = map.getZoom();
 
-    // Performance optimization: 
-    // 1. Only render sectors for sites in current viewport
-    // 2. Hide sector labels when zoomed out (zoom < 14)
-    // 3. Hide sectors completely when very zoomed out (zoom < 10) unless few sites
+    // Precomputed tiles replace the browser's wedges in their zoom range; their
+    // loaded wedges follow hidden groups and thematic colours like the others
+    if (sectorTileLayer) sectorTileLayer.refresh();
+    if (sectorTilesInUse() && sectorTileLayer.coversZoom(zoom)) return;
 
-    const visibleSites = sites.filter(site =>
-        bounds.contains([site.latitude, site.longitude]) &&
-        !hiddenSiteGroups.has(site.group || 'Other')
-    );
+    // Only sites in the viewport; how much of them is drawn depends on the
+    // zoom and how many sectors are in view (sector-lod.js)
+    const visibleSites = searchIndexInBounds(siteIndex, bounds, isSectorSiteVisible);
+    let sectorCount = 0;
+    visibleSites.forEach(site => { sectorCount += site.sectors ? site.sectors.length : 0; });
+
+    const level = sectorLodLevel(zoom, visibleSites.length, sectorCount);
+    if (level === 'aggregate') {
+        renderSectorGlyphs(visibleSites);
+        return;
+    }
 
-    // Don't render anything if too many sites and zoomed out
-    if (zoom < 10 && visibleSites.length > 100) return;
+    // Coarser arcs when zoomed out; labels only at full detail
+    const steps = level === 'full' ? sectorArcSteps(zoom) : Math.min(SECTOR_LOD_SIMPLE_STEPS, sectorArcSteps(zoom));
+    const showLabels = showSectorNames && level === 'full';
 
     visibleSites.forEach(site => {
         if (!site.sectors) return;
 
         site.sectors.forEach(sector => {
-            const center = [site.latitude, site.longitude];
             const azimuth = sector.azimuth;
             const beamwidth = sector.beamwidth;
             const range = sector.range;
-
-            // Use custom color or default based on technology
-            let color = sector.color;
-
-            // Thematic Override
-            if (typeof activeThematicSettings !== 'undefined' && activeThematicSettings.sites) {
-                const settings = activeThematicSettings.sites;
-                let val;
-                if (settings.isCustom) {
-                    const prop = sector.customProperties?.find(p => p.name === settings.attribute);
-                    val = prop ? prop.value : null;
-                } else {
-                    val = sector[settings.attribute];
-                }
-
-                if (settings.type === 'categorical') {
-                    color = settings.mapping[val] || '#999999';
-                } else if (settings.type === 'numerical') {
-                    // Find range
-                    const numVal = parseFloat(val);
-                    if (!isNaN(numVal)) {
-                        const range = settings.ranges.find(r => numVal >= r.min && numVal <= r.max);
-                        if (range) color = range.color;
-                        else color = '#999999';
-                    } else {
-                        color = '#999999';
-                    }
-                }
-            } else if (!color) {
-                if (sector.technology?.includes('5G')) color = '#8b5cf6'; // Purple
-                else if (sector.technology?.includes('4G')) color = '#3b82f6'; // Blue
-                else if (sector.technology?.includes('3G')) color = '#10b981'; // Green
-                else if (sector.technology?.includes('2G')) color = '#f59e0b'; // Amber
-                else color = '#3388ff'; // Default blue
-            }
+            const color = sectorColor(sector);
 
             const opacity = sector.opacity || 0.5;
 
-            // Calculate sector polygon points
-            const points = [center];
-            const startAngle = (azimuth - beamwidth / 2);
-            const endAngle = (azimuth + beamwidth / 2);
-
-            // Create arc points
-            const steps = 15; // Reduced steps for performance
-            for (let i = 0; i <= steps; i++) {
-                const angle = startAngle + (i / steps) * (endAngle - startAngle);
-                const dest = destination(site.latitude, site.longitude, angle, range);
-                points.push([dest.lat, dest.lng]);
-            }
-
-            points.push(center); // Close the polygon
+            // Sector polygon points (cached per geometry)
+            const points = sectorGeometryCache.getWedge(site.latitude, site.longitude, azimuth, beamwidth, range, steps);
 
             const polygon = L.polygon(points, {
                 color: color,
@@ -2688,17 +2414,15 @@ function renderVisibleSectors() {
             }
             if (!title) title = 'Sector';
 
-            // Add popup
-            let popupContent = `
-                <div style="min-width: 150px;">
+            // Add popup; sample statistics are read when it opens
+            const popupContent = `
                     <h4 style="margin: 0 0 5px 0; color: ${color};">${title}</h4>
                     <p style="margin: 0; font-size: 0.875rem;">Azimuth: ${azimuth}°</p>
                     <p style="margin: 0; font-size: 0.875rem;">Beamwidth: ${beamwidth}°</p>
                     <p style="margin: 0; font-size: 0.875rem;">Range: ${range}m</p>
                     ${sector.technology ? `<p style="margin: 0; font-size: 0.875rem;">Tech: ${sector.technology}</p>` : ''}
-                </div>
             `;
-            polygon.bindPopup(popupContent);
+            polygon.bindPopup(() => `<div style="min-width: 150px;">${popupContent}${servingStatsHtml(sector)}</div>`);
 
             polygon.on('click', (e) => {
                 // Connection Line Logic
@@ -2735,7 +2459,7 @@ function renderVisibleSectors() {
             sectorsLayer.addLayer(polygon);
 
             // Add sector label if enabled AND zoomed in enough
-            if (showSectorNames && sector.name && zoom >= 14) {
+            if (showLabels && sector.name) {
                 const labelPos = destination(site.latitude, site.longitude, sector.azimuth, sector.range * 1.1);
                 const labelIcon = L.divIcon({
                     className: 'sector-label-icon',
@@ -2749,6 +2473,119 @@ function renderVisibleSectors() {
     });
 }
 
+/**
+ * Coverage glyphs for zoomed-out views: one per screen cell, petals pointing
+ * where the cell's sectors point
+ */
+function renderSectorGlyphs(siteList) {
+    const glyphs = aggregateSectorGlyphs(siteList,
+        site => map.latLngToLayerPoint([site.latitude, site.longitude]), sectorColor);
+
+    glyphs.forEach(glyph => {
+        sectorGlyphRings(glyph).forEach((rings, color) => {
+            // One multi-polygon per colour
+            const latLngs = rings.map(ring => [ring.map(p => map.layerPointToLatLng([p.x, p.y]))]);
+            const polygon = L.polygon(latLngs, {
+                color: color,
+                fillColor: color,
+                fillOpacity: 0.6,
+                weight: 1
+            });
+            polygon.bindTooltip(`${glyph.siteCount} site(s), ${glyph.sectorCount} sector(s)`);
+            polygon.on('click', () => zoomToSectorGlyph(glyph));
+            sectorsLayer.addLayer(polygon);
+        });
+    });
+}
+
+// ==================== PRECOMPUTED SECTOR TILES ====================
+
+/**
+ * Shows the sector tiles built by `python -m sitemapper tiles` (sector-tiles.js)
+ * @param {string} url - tileset.json of the pyramid
+ */
+async function loadSectorTiles(url) {
+    if (!url) {
+        showNotification('Enter the URL of a tileset.json', 'error');
+        return;
+    }
+
+    let tilejson;
+    try {
+        tilejson = await loadSectorTileJson(url);
+    } catch (error) {
+        console.error('Error loading sector tiles:', error);
+        showNotification(`Could not load sector tiles: ${error.message}`, 'error');
+        return;
+    }
+
+    if (sectorTileLayer) sectorTileLayer.remove();
+    sectorTileLayer = new SectorTileLayer(tilejson, {
+        featureStyle: feature => ({
+            color: sectorColor(feature.properties),
+            fillColor: sectorColor(feature.properties),
+            fillOpacity: feature.properties.opacity || 0.5,
+            weight: 1
+        }),
+        featureFilter: feature => sectorTilesInUse() && !hiddenSiteGroups.has(feature.properties.group || 'Other'),
+        onEachFeature: bindSectorTilePopup
+    }).addTo(map);
+    localStorage.setItem('siteSectorMapper_sectorTiles', url);
+
+    renderVisibleSectors();
+    showNotification(`Sector tiles loaded: ${tilejson.sectors ?? '?'} sectors, zoom ${tilejson.minzoom}+`, 'success');
+}
+
+/**
+ * Whether the loaded tiles show what the browser would draw. They hold every
+ * sector of the sites they were built from with a few sector fields, so a
+ * selection, a cleared site list, a thematic on another field, or hidden
+ * groups in a tileset without groups fall back to the browser's wedges.
+ */
+function sectorTilesInUse() {
+    if (!sectorTileLayer || sites.length === 0 || sectorSiteFilter) return false;
+    if (hiddenSiteGroups.size > 0 && !sectorTileLayer.hasField('group')) return false;
+    const settings = activeThematicSettings.sites;
+    return !settings || (!settings.isCustom && sectorTileLayer.hasField(settings.attribute));
+}
+
+function removeSectorTiles() {
+    if (!sectorTileLayer) return;
+    sectorTileLayer.remove();
+    sectorTileLayer = null;
+    localStorage.removeItem('siteSectorMapper_sectorTiles');
+    renderVisibleSectors();
+    showNotification('Sector tiles removed', 'info');
+}
+
+function bindSectorTilePopup(feature, layer) {
+    const p = feature.properties;
+    const color = sectorColor(p);
+    layer.bindPopup(`
+        <div style="min-width: 150px;">
+            <h4 style="margin: 0 0 5px 0; color: ${color};">${p.cell_name || p.name || 'Sector'}</h4>
+            <p style="margin: 0; font-size: 0.875rem;">Site: ${p.site}</p>
+            <p style="margin: 0; font-size: 0.875rem;">Azimuth: ${p.azimuth}°</p>
+            <p style="margin: 0; font-size: 0.875rem;">Beamwidth: ${p.beamwidth}°</p>
+            <p style="margin: 0; font-size: 0.875rem;">Range: ${p.range}m</p>
+            ${p.technology ? `<p style="margin: 0; font-size: 0.875rem;">Tech: ${p.technology}</p>` : ''}
+        </div>
+    `);
+    layer.on('click', () => {
+        const site = sites.find(s => (p.site_id !== undefined && s.id === p.site_id) || s.name === p.site);
+        if (site) highlightSiteInList(site.id);
+    });
+}
+
+function zoomToSectorGlyph(glyph) {
+    if (glyph.sites.length === 1) {
+        const site = glyph.sites[0];
+        map.setView([site.latitude, site.longitude], Math.max(map.getZoom() + 2, SECTOR_LOD_AGGREGATE_BELOW));
+        return;
+    }
+    map.fitBounds(L.latLngBounds(glyph.sites.map(site => [site.latitude, site.longitude])), { padding: [40, 40] });
+}
+
 function toggleSiteNames() {
     showSiteNames = !showSiteNames;
     // Updated ID from toggleSiteNamesBtn to toggleNamesBtn
@@ -2762,10 +2599,11 @@ function toggleSiteNames() {
         }
     }
 
-    // Update existing markers
+    // Update existing markers; the icons of clustered ones are replaced on the next frame
     document.querySelectorAll('.site-marker-label').forEach(el => {
         el.style.display = showSiteNames ? 'block' : 'none';
     });
+    updateMapMarkers({ fitBounds: false });
 }
 
 function toggleSectorNames() {
@@ -2803,62 +2641,11 @@ function drawConnectionLine(point) {
 
     if (!point) return;
 
-    // 2. Identify "Cell Name" from point
-    let cellName = null;
-    if (point.customProperties) {
-        const prop = point.customProperties.find(p =>
-            p.name.toLowerCase().includes('cell') && p.name.toLowerCase().includes('name')
-        );
-        if (prop) cellName = prop.value;
-    }
-    // Also check top level if not found
-    if (!cellName && point.cellName) cellName = point.cellName; // If we ever stored it there
-    if (!cellName && point.name) cellName = point.name; // Fallback? Maybe risky. Let's stick to properties.
-
-    if (!cellName) {
-        console.log('No Cell Name found for connection line');
-        return;
-    }
-
-    // 3. Find Matching Sector
-    // Normalize target cell name
-    const targetName = String(cellName).trim().toLowerCase();
-
-    let matchedSector = null;
-    let matchedSite = null;
-
-    // Iterate all sites
-    for (const site of sites) {
-        if (site.sectors) {
-            for (const sector of site.sectors) {
-                // Check standard cell_name
-                if (sector.cell_name && String(sector.cell_name).trim().toLowerCase() === targetName) {
-                    matchedSector = sector;
-                    matchedSite = site;
-                    break;
-                }
-                // Check sector name
-                if (sector.name && String(sector.name).trim().toLowerCase() === targetName) {
-                    matchedSector = sector;
-                    matchedSite = site;
-                    break;
-                }
-                // Check custom properties
-                if (sector.customProperties) {
-                    const cProp = sector.customProperties.find(p =>
-                        p.name.toLowerCase().includes('cell') && p.name.toLowerCase().includes('name') &&
-                        String(p.value).trim().toLowerCase() === targetName
-                    );
-                    if (cProp) {
-                        matchedSector = sector;
-                        matchedSite = site;
-                        break;
-                    }
-                }
-            }
-        }
-        if (matchedSector) break;
-    }
+    // 2. Serving sector: by cell name or EARFCN, else by wedge or nearest site
+    // (serving-index.js). Reused cell names resolve to the nearest visible site.
+    const assignment = servingAssignments().assignmentFor(point);
+    const matchedSector = assignment ? assignment.sector : null;
+    const matchedSite = assignment ? assignment.site : null;
 
     if (matchedSector && matchedSite) {
         // 4. Calculate Sector Tip
@@ -2886,18 +2673,8 @@ function drawConnectionLine(point) {
             connectionLinesLayer.addLayer(polyline);
 
             // Also highlight the target sector
-            const center = [matchedSite.latitude, matchedSite.longitude];
-            const sectorPolyPoints = [center];
-            const startAngle = (matchedSector.azimuth - matchedSector.beamwidth / 2);
-            const endAngle = (matchedSector.azimuth + matchedSector.beamwidth / 2);
-            const range = matchedSector.range;
-
-            for (let i = 0; i <= 15; i++) {
-                const angle = startAngle + (i / 15) * (endAngle - startAngle);
-                const dest = destination(matchedSite.latitude, matchedSite.longitude, angle, range);
-                sectorPolyPoints.push([dest.lat, dest.lng]);
-            }
-            sectorPolyPoints.push(center);
+            const sectorPolyPoints = sectorGeometryCache.getWedge(matchedSite.latitude, matchedSite.longitude,
+                matchedSector.azimuth, matchedSector.beamwidth, matchedSector.range);
 
             const matchPoly = L.polygon(sectorPolyPoints, {
                 color: '#ff073a',
@@ -2909,13 +2686,9 @@ function drawConnectionLine(point) {
                 pane: 'neonPane'
             });
             connectionLinesLayer.addLayer(matchPoly);
-
-            console.log(`Drawn line from ${cellName} to ${matchedSector.name || 'Sector'}`);
         } catch (e) {
             console.error('Error drawing line:', e);
         }
-    } else {
-        console.log('No matching sector found for cell name:', cellName);
     }
 }
 
@@ -2925,94 +2698,10 @@ function drawSectorToPoints(sector, site, clearLayer = true) {
     // Clear previous lines
     if (clearLayer && connectionLinesLayer) connectionLinesLayer.clearLayers();
 
-    // Determine target identifiers from Sector
-    const targetName = sector.cell_name ? String(sector.cell_name).trim().toLowerCase() : (sector.name ? String(sector.name).trim().toLowerCase() : null);
-    const siteName = site.name ? String(site.name).trim().toLowerCase() : null;
-
-    // Extract EARFCNs from Sector (if any)
-    const sectorEarfcnValues = [];
-    if (sector.customProperties) {
-        sector.customProperties.forEach(prop => {
-            if (prop.name.toLowerCase().includes('earfcn') && prop.value) {
-                // Split by common delimiters (comma, semicolon, space, slash)
-                const parts = String(prop.value).split(/[,;/\s]+/);
-                parts.forEach(p => {
-                    const clean = p.trim().toLowerCase();
-                    if (clean) sectorEarfcnValues.push(clean);
-                });
-            }
-        });
-    }
-
-    if (!targetName && sectorEarfcnValues.length === 0) return;
-
-    // Find all matching KML points
-    const matches = points.filter(p => {
-        if (p.type !== 'kml_point') return false;
+    const sectorEarfcns = sectorEarfcnValues(sector);
 
-        const pointValues = []; // For name matching
-        let pointEarfcn = null;
-        let pointHasSiteMatch = false;
-
-        // 1. Gather Point Properties for Name Match
-        // Check Point Name
-        if (p.name) {
-            const val = String(p.name).trim().toLowerCase();
-            pointValues.push(val);
-            if (siteName && val.includes(siteName)) pointHasSiteMatch = true;
-        }
-
-        // Check "Cell Name" field
-        if (p.cellName) {
-            const val = String(p.cellName).trim().toLowerCase();
-            pointValues.push(val);
-            if (siteName && val.includes(siteName)) pointHasSiteMatch = true;
-        }
-
-        // Check All Custom Properties
-        if (p.customProperties) {
-            p.customProperties.forEach(prop => {
-                if (!prop.value) return;
-                const val = String(prop.value).trim().toLowerCase();
-                const key = prop.name.toLowerCase();
-
-                // Add to general values for Name check
-                pointValues.push(val);
-
-                // Check for Site Name match in properties
-                if (key.includes('site') && val === siteName) pointHasSiteMatch = true;
-
-                // Check for EARFCN in Point
-                if (key.includes('earfcn')) {
-                    // Assume point has only one EARFCN usually, but splitting is safe
-                    // We just store the first one found or check inclusion later?
-                    // Simplest: Check if this value matches any sector EARFCN
-                    // Actually, let's store it to compare.
-                    // But there might be multiple EAFRCN props?
-                    // Let's just check immediately:
-                    const parts = val.split(/[,;/\s]+/);
-                    parts.forEach(part => {
-                        if (sectorEarfcnValues.includes(part.trim())) {
-                            pointEarfcn = part.trim();
-                        }
-                    });
-                }
-            });
-        }
-
-        // MATCHING LOGIC:
-
-        // 1. Name Match (Original Strict/Broad)
-        if (targetName && pointValues.includes(targetName)) return true;
-
-        // 2. EARFCN Match (If Sector has EARFCNs AND Point matches Site Context)
-        // We require 'pointHasSiteMatch' to avoid global EARFCN matches.
-        if (sectorEarfcnValues.length > 0 && pointEarfcn && pointHasSiteMatch) {
-            return true;
-        }
-
-        return false;
-    });
+    // Samples served by the sector (serving-index.js)
+    const matches = servingAssignments().pointsFor(sector);
 
     if (matches.length === 0) {
         showNotification('No matching KML points found for this sector', 'info');
@@ -3060,8 +2749,8 @@ function drawSectorToPoints(sector, site, clearLayer = true) {
                 lineColor = style.color;
                 lineClass = style.className;
             }
-        } else if (sectorEarfcnValues.length === 1) {
-            const style = getEarfcnColor(sectorEarfcnValues[0]);
+        } else if (sectorEarfcns.length === 1) {
+            const style = getEarfcnColor(sectorEarfcns[0]);
             if (style) {
                 lineColor = style.color;
                 lineClass = style.className;
@@ -3113,9 +2802,9 @@ function drawSectorToPoints(sector, site, clearLayer = true) {
     let sectorClass = 'neon-sector-pulse';
 
     // Pick first valid EARFCN from sector to color the sector itself?
-    if (sectorEarfcnValues.length > 0) {
+    if (sectorEarfcns.length > 0) {
         // Check if any EARFCN gives a color
-        for (const val of sectorEarfcnValues) {
+        for (const val of sectorEarfcns) {
             const valInt = parseInt(val);
             if (valInt === 1320) { sectorColor = '#3b82f6'; sectorClass = 'neon-sector-pulse-blue'; break; }
             if (valInt === 6300) { sectorColor = '#10b981'; sectorClass = 'neon-sector-pulse-green'; break; }
@@ -3125,18 +2814,8 @@ function drawSectorToPoints(sector, site, clearLayer = true) {
 
     // Highlight the Source Sector with Neon Pulse
     // Re-calculate polygon
-    const center = [site.latitude, site.longitude];
-    const sectorPolyPoints = [center];
-    const startAngle = (sector.azimuth - sector.beamwidth / 2);
-    const endAngle = (sector.azimuth + sector.beamwidth / 2);
-    const range = sector.range;
-
-    for (let i = 0; i <= 15; i++) {
-        const angle = startAngle + (i / 15) * (endAngle - startAngle);
-        const dest = destination(site.latitude, site.longitude, angle, range);
-        sectorPolyPoints.push([dest.lat, dest.lng]);
-    }
-    sectorPolyPoints.push(center);
+    const sectorPolyPoints = sectorGeometryCache.getWedge(site.latitude, site.longitude,
+        sector.azimuth, sector.beamwidth, sector.range);
 
     const matchPoly = L.polygon(sectorPolyPoints, {
         color: sectorColor,
@@ -3180,36 +2859,200 @@ function setupConnectionLineToggle() {
     });
 }
 
-// Update Map Markers 
+// ==================== MAP MARKERS ====================
+
+// Site and manual point markers are kept per id and reconciled with the data
+// rather than cleared and rebuilt: a call only adds the markers of new ids,
+// removes those of ids that are gone or hidden, and moves or restyles the
+// rest. Calls are coalesced into one update per animation frame, so a burst
+// of edits or group toggles costs a single pass. KML points are drawn by
+// their canvas layer (point-layer.js) and never touch the markers.
+
+const siteMarkers = new Map(); // site id -> { item, marker, latitude, longitude, iconKey }
+const pointMarkers = new Map(); // point id -> { item, marker, latitude, longitude, iconKey }
+let pendingMarkerUpdate = null; // { fitBounds, sites, points } for the next frame
+let markerUpdateFrame = null;
+
+/**
+ * Schedules a map update for the next animation frame; calls before it runs
+ * are merged (the latest filter wins, fitBounds if any call asked for it)
+ * @param {Object} [options] - { fitBounds }
+ * @param {Array} [filteredSites] - Only these sites (selection); all sites when null
+ * @param {Array} [filteredPoints] - Only these points; all points when null
+ */
 function updateMapMarkers(options = { fitBounds: true }, filteredSites = null, filteredPoints = null) {
-    markersLayer.clearLayers();
-    if (pointsLayer) pointsLayer.clearLayers();
-    sectorsLayer.clearLayers();
+    pendingMarkerUpdate = {
+        fitBounds: !!options.fitBounds || (pendingMarkerUpdate !== null && pendingMarkerUpdate.fitBounds),
+        sites: filteredSites,
+        points: filteredPoints
+    };
+    if (markerUpdateFrame === null) markerUpdateFrame = requestAnimationFrame(flushMapMarkers);
+}
+
+/**
+ * Applies a scheduled update now, e.g. before reading the marker layers
+ */
+function flushMapMarkers() {
+    if (markerUpdateFrame !== null) cancelAnimationFrame(markerUpdateFrame);
+    markerUpdateFrame = null;
+    const update = pendingMarkerUpdate;
+    pendingMarkerUpdate = null;
+    if (update) reconcileMapMarkers(update.fitBounds, update.sites, update.points);
+}
 
+function reconcileMapMarkers(fitBounds, filteredSites, filteredPoints) {
     const sitesToRender = filteredSites || sites;
     const pointsToRender = filteredPoints || points;
 
-    console.log('Rendering Sites:', sitesToRender.length);
+    const visibleSites = sitesToRender.filter(site => !hiddenSiteGroups.has(site.group || 'Other'));
+    applyMarkerChanges(markersLayer,
+        reconcileMarkers(siteMarkers, visibleSites, siteIconKey, createSiteMarker, site => siteIcon(site)));
 
-    // Render Sites
-    sitesToRender.forEach(site => {
-        if (hiddenSiteGroups.has(site.group || 'Other')) return;
+    // KML points go to the canvas layer, manual points keep their markers
+    const kmlPointsToRender = [];
+    const manualPoints = [];
+    pointsToRender.forEach(point => {
+        if (point.type !== 'kml_point') manualPoints.push(point);
+        else if (!hiddenKmlGroups.has(point.group)) kmlPointsToRender.push(point);
+    });
+    applyMarkerChanges(pointsLayer,
+        reconcileMarkers(pointMarkers, manualPoints, pointIconKey, createPointMarker, point => createCustomIcon(point, getPointColor(point))));
 
-        // Standard Site Marker (Blue Pin)
-        const siteIcon = L.divIcon({
-            className: 'custom-site-marker',
-            html: `<div class="site-marker-label" style="display: ${showSiteNames ? 'block' : 'none'}">${site.name}</div>`,
-            iconSize: [100, 30],
-            iconAnchor: [50, 15]
-        });
+    if (coverageRasterActive()) {
+        kmlPointLayer.setPoints([], getPointColor);
+        updateCoverageRaster(kmlPointsToRender);
+    } else {
+        kmlPointLayer.setPoints(kmlPointsToRender, getPointColor);
+        if (map.hasLayer(coverageLayer)) map.removeLayer(coverageLayer);
+    }
+    refreshAlarmBadges(sitesToRender);
 
-        const marker = L.marker([site.latitude, site.longitude], {
-            icon: siteIcon,
-            title: site.name,
-            siteId: site.id // Store site ID for easy retrieval
-        });
+    // Draw sectors for visible area
+    sectorSiteFilter = filteredSites ? new Set(filteredSites.map(site => site.id)) : null;
+    renderVisibleSectors();
+
+    if (fitBounds && (sitesToRender.length > 0 || pointsToRender.length > 0)) {
+        const allCoords = [
+            ...sitesToRender.map(s => [s.latitude, s.longitude]),
+            ...pointsToRender.map(p => [p.latitude, p.longitude])
+        ];
+        if (allCoords.length > 0) {
+            const bounds = L.latLngBounds(allCoords);
+            map.fitBounds(bounds, { padding: [50, 50] });
+        }
+    }
+}
+
+/**
+ * Brings a marker map in line with a list of items
+ * @param {Map} entries - id -> entry, updated in place
+ * @param {Array} items - Objects with id/latitude/longitude
+ * @param {Function} iconKey - item -> string; a change means a new icon
+ * @param {Function} createMarker - entry -> L.Marker for a new id
+ * @param {Function} createIcon - item -> L.Icon for a changed key
+ * @returns {Object} { added, removed, moved } markers
+ */
+function reconcileMarkers(entries, items, iconKey, createMarker, createIcon) {
+    const added = [], removed = [], moved = [];
+    const seen = new Set();
+
+    items.forEach(item => {
+        if (seen.has(item.id)) return;
+        seen.add(item.id);
+        const key = iconKey(item);
+        let entry = entries.get(item.id);
+
+        if (!entry) {
+            entry = { item, marker: null, latitude: item.latitude, longitude: item.longitude, iconKey: key };
+            entry.marker = createMarker(entry);
+            entries.set(item.id, entry);
+            added.push(entry.marker);
+            return;
+        }
+
+        entry.item = item; // Edits may replace the object
+        if (entry.latitude !== item.latitude || entry.longitude !== item.longitude) {
+            entry.latitude = item.latitude;
+            entry.longitude = item.longitude;
+            moved.push(entry.marker);
+        }
+        if (entry.iconKey !== key) {
+            entry.iconKey = key;
+            entry.marker.options.title = item.name;
+            entry.marker.setIcon(createIcon(item));
+        }
+    });
+
+    entries.forEach((entry, id) => {
+        if (seen.has(id)) return;
+        removed.push(entry.marker);
+        entries.delete(id);
+    });
+    return { added, removed, moved };
+}
+
+/**
+ * Applies reconcileMarkers() output to a layer. Moved markers are taken out
+ * before their position changes: the cluster group finds markers by position.
+ */
+function applyMarkerChanges(layer, { added, removed, moved }) {
+    const clustered = typeof layer.addLayers === 'function';
+    const outgoing = removed.concat(moved);
+    if (outgoing.length > 0) {
+        if (clustered) layer.removeLayers(outgoing);
+        else outgoing.forEach(marker => layer.removeLayer(marker));
+    }
+    moved.forEach(marker => {
+        const entry = marker.options.entry;
+        marker.setLatLng([entry.latitude, entry.longitude]);
+    });
+    const incoming = added.concat(moved);
+    if (incoming.length > 0) {
+        if (clustered) layer.addLayers(incoming);
+        else incoming.forEach(marker => layer.addLayer(marker));
+    }
+}
+
+function siteIconKey(site) {
+    return `${site.name}|${showSiteNames}`;
+}
+
+function siteIcon(site) {
+    return L.divIcon({
+        className: 'custom-site-marker',
+        html: `<div class="site-marker-label" style="display: ${showSiteNames ? 'block' : 'none'}">${site.name}</div>`,
+        iconSize: [100, 30],
+        iconAnchor: [50, 15]
+    });
+}
 
-        marker.bindPopup(`
+/**
+ * Site marker; its popup and click handler read the entry, so they follow later edits
+ */
+function createSiteMarker(entry) {
+    const site = entry.item;
+    const marker = L.marker([site.latitude, site.longitude], {
+        icon: siteIcon(site),
+        title: site.name,
+        siteId: site.id, // Store site ID for easy retrieval
+        entry
+    });
+
+    marker.bindPopup(() => sitePopupContent(entry.item));
+
+    marker.on('click', (e) => {
+        if (isMeasuring) {
+            L.DomEvent.stopPropagation(e);
+            handleMeasureClick(e.latlng);
+        } else {
+            showSiteDetails(entry.item);
+        }
+    });
+    return marker;
+}
+
+function sitePopupContent(site) {
+    return `
             <div style="min-width: 200px;">
                 <h3 style="margin: 0 0 8px 0; font-size: 1rem;">${site.name}</h3>
                 <p style="margin: 0 0 4px 0; font-size: 0.875rem; color: #888;">
@@ -3220,52 +3063,49 @@ function updateMapMarkers(options = { fitBounds: true }, filteredSites = null, f
                     <strong>${site.sectors.length}</strong> sector(s)
                 </p>
             </div>
-        `);
+        `;
+}
 
-        marker.on('click', (e) => {
-            if (isMeasuring) {
-                L.DomEvent.stopPropagation(e);
-                handleMeasureClick(e.latlng);
-            } else {
-                showSiteDetails(site);
-            }
-        });
-        markersLayer.addLayer(marker);
-    });
+function pointIconKey(point) {
+    return `${point.name}|${getPointColor(point)}|${point.shape || point.iconShape}|${point.size || point.iconSize}`;
+}
 
-    // Render Points
-    pointsToRender.forEach(point => {
-        // Check if point belongs to a hidden KML group
-        if (point.type === 'kml_point' && hiddenKmlGroups.has(point.group)) {
-            return;
-        }
+/**
+ * Marker of a manually added point
+ */
+function createPointMarker(entry) {
+    const point = entry.item;
+    const marker = L.marker([point.latitude, point.longitude], {
+        icon: createCustomIcon(point, getPointColor(point)),
+        pointId: point.id,
+        entry
+    });
 
-        // High Performance Rendering for KML Points
-        const pointColor = getPointColor(point);
-        let marker;
+    marker.bindPopup(() => pointPopupContent(entry.item));
 
-        if (point.type === 'kml_point') {
-            // Use CircleMarker (Canvas/SVG) for performance with many points
-            marker = L.circleMarker([point.latitude, point.longitude], {
-                radius: 5,
-                fillColor: pointColor,
-                color: '#fff',
-                weight: 1,
-                opacity: 1,
-                fillOpacity: 0.8,
-                pointId: point.id // Store ID
-            });
+    marker.on('click', (e) => {
+        if (isMeasuring) {
+            L.DomEvent.stopPropagation(e);
+            handleMeasureClick(e.latlng);
+        } else if (isConnectionLinesEnabled) {
+            // Only draw connection line, do not show popup
+            drawConnectionLine(entry.item);
         } else {
-            // Use Custom Icon for manually added points
-            const customIcon = createCustomIcon(point, pointColor);
-            marker = L.marker([point.latitude, point.longitude], {
-                icon: customIcon,
-                pointId: point.id
-            });
+            highlightSiteInList(entry.item.id); // Highlight in list
+            L.popup()
+                .setLatLng(e.latlng)
+                .setContent(pointPopupContent(entry.item))
+                .openOn(map);
         }
+    });
+    return marker;
+}
 
-        // Create popup content
-        let popupContent = `
+/**
+ * Popup HTML for a point (edit/delete actions and custom properties)
+ */
+function pointPopupContent(point) {
+    let popupContent = `
             <div style="min-width: 200px;">
                 <h3 style="margin: 0 0 8px 0; color: var(--primary-600);">${point.name}</h3>
                 ${point.description ? `<p style="margin: 0 0 8px 0; font-size: 0.9em;">${point.description}</p>` : ''}
@@ -3276,51 +3116,50 @@ function updateMapMarkers(options = { fitBounds: true }, filteredSites = null, f
             </div>
         `;
 
-        // Add custom properties to popup
-        if (point.customProperties && point.customProperties.length > 0) {
-            popupContent += '<hr style="margin: 5px 0;">';
-            point.customProperties.forEach(prop => {
-                popupContent += `<b>${prop.name}:</b> ${prop.value}<br>`;
-            });
-        }
-
-        marker.bindPopup(popupContent);
-
-        marker.on('click', (e) => {
-            if (isMeasuring) {
-                L.DomEvent.stopPropagation(e);
-                handleMeasureClick(e.latlng);
-            } else if (isConnectionLinesEnabled) {
-                // Only draw connection line, do not show popup
-                drawConnectionLine(point);
-            } else {
-                highlightSiteInList(point.id); // Highlight in list
-                L.popup()
-                    .setLatLng(e.latlng)
-                    .setContent(popupContent)
-                    .openOn(map);
-            }
+    // Add custom properties to popup
+    if (point.customProperties && point.customProperties.length > 0) {
+        popupContent += '<hr style="margin: 5px 0;">';
+        point.customProperties.forEach(prop => {
+            popupContent += `<b>${prop.name}:</b> ${prop.value}<br>`;
         });
-        pointsLayer.addLayer(marker);
-    });
+    }
+    return popupContent;
+}
 
-    // Draw sectors for visible area
-    renderVisibleSectors();
+function openPointPopup(point, latlng = [point.latitude, point.longitude]) {
+    L.popup()
+        .setLatLng(latlng)
+        .setContent(pointPopupContent(point))
+        .openOn(map);
+}
 
-    if (options.fitBounds && (sitesToRender.length > 0 || pointsToRender.length > 0)) {
-        const allCoords = [
-            ...sitesToRender.map(s => [s.latitude, s.longitude]),
-            ...pointsToRender.map(p => [p.latitude, p.longitude])
-        ];
-        console.log('Fitting bounds for', allCoords.length, 'coords');
-        if (allCoords.length > 0) {
-            const bounds = L.latLngBounds(allCoords);
-            console.log('Bounds:', bounds);
-            map.fitBounds(bounds, { padding: [50, 50] });
-        }
+/**
+ * Click on a point of the KML canvas layer
+ * @param {Object} e - { point, latlng, originalEvent }
+ */
+function handleKmlPointClick(e) {
+    if (isMeasuring) {
+        handleMeasureClick(e.latlng);
+    } else if (isConnectionLinesEnabled) {
+        // Only draw connection line, do not show popup
+        drawConnectionLine(e.point);
+    } else {
+        highlightSiteInList(e.point.id); // Highlight in list
+        openPointPopup(e.point, e.latlng);
     }
 }
 
+/**
+ * Centers a KML point, opens its popup and rings it on the canvas layer
+ */
+function focusKmlPoint(point, zoom) {
+    flushMapMarkers();
+    map.setView([point.latitude, point.longitude], zoom);
+    if (!isPointVisible(point)) return;
+    openPointPopup(point);
+    kmlPointLayer.highlight(point);
+}
+
 function centerMap() {
     if (sites.length > 0 || points.length > 0) {
         const allCoords = [
@@ -3338,6 +3177,7 @@ function centerMap() {
 
 
 function panToSite(id) {
+    flushMapMarkers();
     const site = sites.find(s => s.id === id);
     const point = points.find(p => p.id === id);
 
@@ -3345,6 +3185,10 @@ function panToSite(id) {
     if (!target) return;
 
     // Check if it's a point (unclustered)
+    if (point && point.type === 'kml_point') {
+        focusKmlPoint(point, 18);
+        return;
+    }
     if (point) {
         const marker = pointsLayer.getLayers().find(l => l.options.pointId === id);
         if (marker) {
@@ -3391,6 +3235,7 @@ function panToSite(id) {
 }
 
 function locateSite(siteId) {
+    flushMapMarkers();
     const site = sites.find(s => s.id == siteId);
     if (!site) return;
 
@@ -3416,143 +3261,68 @@ function locateSite(siteId) {
 
 // ==================== KML EXPORT ====================
 
-function exportToKML(mode = 'sites') {
+/**
+ * Destination of an export download: a file stream when the browser offers a
+ * save dialog (showSaveFilePicker), otherwise a Blob downloaded on close
+ * @returns {Promise<Object|null>} Sink for kml-export.js, null if the user cancelled
+ */
+async function openDownloadSink(filename, type, description) {
+    if (window.showSaveFilePicker) {
+        try {
+            const handle = await window.showSaveFilePicker({
+                suggestedName: filename,
+                types: [{ description, accept: { [type.split(';')[0]]: ['.' + filename.split('.').pop()] } }]
+            });
+            return createStreamSink(await handle.createWritable());
+        } catch (e) {
+            if (e.name === 'AbortError') return null;
+            // e.g. SecurityError once the click's user activation has expired
+            console.warn('Save dialog unavailable, downloading instead:', e);
+        }
+    }
+
+    const sink = createBlobSink(type);
+    const closeBlob = sink.close;
+    sink.close = async () => {
+        await closeBlob();
+        const url = URL.createObjectURL(sink.blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = filename;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        URL.revokeObjectURL(url);
+    };
+    return sink;
+}
+
+async function exportToKML(mode = 'sites', { kmz = false } = {}) {
+    await ensureSiteGroupsLoaded();
+
     if (sites.length === 0) {
         showNotification('No sites to export', 'error');
         return;
     }
-
-    let kml = `<?xml version="1.0" encoding="UTF-8"?>
-<kml xmlns="http://www.opengis.net/kml/2.2">
-  <Document>
-    <name>Site Sector Map</name>
-    <description>Exported from Site Sector Mapper</description>
-    
-    <Style id="siteIcon">
-      <IconStyle>
-        <color>ff6366f1</color>
-        <scale>1.2</scale>
-        <Icon>
-          <href>http://maps.google.com/mapfiles/kml/shapes/placemark_circle.png</href>
-        </Icon>
-      </IconStyle>
-    </Style>
-`;
-
-    // Add styles for sectors if in full mode
-    if (mode === 'full') {
-        // We'll use inline styles for sectors to support custom colors, 
-        // but define a base style here if needed.
+    if (kmz && typeof CompressionStream === 'undefined') {
+        showNotification('KMZ export is not supported by this browser', 'error');
+        return;
     }
 
-    sites.forEach(site => {
-        // 1. Add Site Point
-        kml += `    <Placemark>
-      <name>${escapeXml(site.name)}</name>
-      <description><![CDATA[
-        <h3>${escapeXml(site.name)}</h3>
-        ${site.description ? `<p>${escapeXml(site.description)}</p>` : ''}
-        <p><strong>Coordinates:</strong> ${site.latitude}, ${site.longitude}</p>
-        <p><strong>Sectors:</strong> ${site.sectors.length}</p>
-      ]]></description>
-      <styleUrl>#siteIcon</styleUrl>
-      <Point>
-        <coordinates>${site.longitude},${site.latitude},0</coordinates>
-      </Point>
-    </Placemark>
-`;
-
-        // 2. Add Sector Polygons (if full mode)
-        if (mode === 'full' && site.sectors) {
-            site.sectors.forEach((sector, i) => {
-                const center = { lat: site.latitude, lng: site.longitude };
-                const azimuth = sector.azimuth;
-                const beamwidth = sector.beamwidth;
-                const range = sector.range;
-
-                // Determine color (KML uses AABBGGRR hex format)
-                let color = sector.color || '#3388ff';
-                // Convert #RRGGBB to AABBGGRR
-                const kmlColor = '80' + color.substring(5, 7) + color.substring(3, 5) + color.substring(1, 3); // 50% opacity (80 hex)
-
-                // Calculate polygon coordinates
-                let coords = `${center.lng},${center.lat},0 `; // Start at center
-
-                const startAngle = (azimuth - beamwidth / 2);
-                const endAngle = (azimuth + beamwidth / 2);
-                const steps = 10;
-
-                for (let j = 0; j <= steps; j++) {
-                    const angle = startAngle + (j / steps) * (endAngle - startAngle);
-                    const dest = destination(center.lat, center.lng, angle, range);
-                    coords += `${dest.lng},${dest.lat},0 `;
-                }
+    const format = kmz ? 'KMZ' : 'KML';
+    const filename = `sites_${mode}_${new Date().toISOString().split('T')[0]}.${format.toLowerCase()}`;
+    const sink = await openDownloadSink(filename, kmz ? KMZ_MIME_TYPE : KML_MIME_TYPE, `${format} file`);
+    if (!sink) return;
 
-                coords += `${center.lng},${center.lat},0`; // Close loop
-
-                // Calculate label position (midpoint of the sector arc)
-                const midAngle = azimuth;
-                const labelPos = destination(center.lat, center.lng, midAngle, range * 0.7);
-
-                kml += `    <Placemark>
-      <name>${escapeXml(site.name)} - Sector ${i + 1}</name>
-      <Style>
-        <IconStyle>
-          <scale>0</scale>
-        </IconStyle>
-        <LineStyle>
-          <color>${kmlColor}</color>
-          <width>1</width>
-        </LineStyle>
-        <PolyStyle>
-          <color>${kmlColor}</color>
-        </PolyStyle>
-      </Style>
-      <MultiGeometry>
-        <Point>
-          <coordinates>${labelPos.lng},${labelPos.lat},0</coordinates>
-        </Point>
-        <Polygon>
-          <outerBoundaryIs>
-            <LinearRing>
-              <coordinates>${coords}</coordinates>
-            </LinearRing>
-          </outerBoundaryIs>
-        </Polygon>
-      </MultiGeometry>
-    </Placemark>
-`;
-            });
-        }
-    });
+    try {
+        await writeSitesKml(sites, mode, kmz ? createKmzSink(sink) : sink);
+    } catch (e) {
+        console.error('KML export failed:', e);
+        showNotification(`${format} export failed: ${e.message}`, 'error');
+        return;
+    }
 
-    kml += `  </Document>
-</kml>`;
-
-    // Download KML file
-    const blob = new Blob([kml], { type: 'application/vnd.google-earth.kml+xml' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `sites_${mode}_${new Date().toISOString().split('T')[0]}.kml`;
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
-    URL.revokeObjectURL(url);
-
-    showNotification('KML file downloaded successfully!', 'success');
-}
-
-function escapeXml(unsafe) {
-    return (unsafe || '').replace(/[<>&'"]/g, (c) => {
-        switch (c) {
-            case '<': return '&lt;';
-            case '>': return '&gt;';
-            case '&': return '&amp;';
-            case '\'': return '&apos;';
-            case '"': return '&quot;';
-        }
-    });
+    showNotification(`${format} file downloaded successfully!`, 'success');
 }
 
 // ==================== UI UPDATES ====================
@@ -3566,343 +3336,294 @@ function updateUI() {
 
 
 function updateSiteCounter() {
-    document.getElementById('siteCount').textContent = sites.length;
+    let unloadedCount = 0;
+    unloadedSiteGroups.forEach(count => { unloadedCount += count; });
+    document.getElementById('siteCount').textContent = sites.length + unloadedCount;
 }
 
 
-function renderSitesList(filter = '') {
-    const container = document.getElementById('sitesListContainer');
+// Sites and KML lists are virtualized (virtual-list.js): only rows in view are
+// rendered, and searches run against name indexes rebuilt on data changes
+const SITE_LIST_ROW_HEIGHT = 96;
+const KML_LIST_ROW_HEIGHT = 68;
+const LIST_GROUP_HEADER_HEIGHT = 48;
 
-    const filteredSites = sites.filter(site =>
-        site.type !== 'kml_point' && // Exclude KML points
-        site.name.toLowerCase().includes(filter.toLowerCase())
-    );
+let siteListView = null;
+let kmlListView = null;
+let siteNameIndex = null;
+let kmlNameIndex = null;
 
-    if (filteredSites.length === 0) {
-        container.innerHTML = `
-            <div class="empty-state">
-                <svg width="64" height="64" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="1">
-                    <path d="M21 10c0 7-9 13-9 13s-9-6-9-13a9 9 0 0 1 18 0z"/>
-                    <circle cx="12" cy="10" r="3"/>
-                </svg>
-                <p>No sites found</p>
-            </div>
-        `;
-        return;
+const LIST_GROUP_ICON = `
+    <span class="group-icon">
+        <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+            <polyline points="6 9 12 15 18 9"></polyline>
+        </svg>
+    </span>`;
+
+const LIST_RENAME_ICON = `
+    <svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+        <path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>
+        <path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path>
+    </svg>`;
+
+const LIST_EDIT_ICON = `
+    <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+        <path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>
+        <path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path>
+    </svg>`;
+
+const LIST_DELETE_ICON = `
+    <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+        <polyline points="3 6 5 6 21 6"></polyline>
+        <path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path>
+        <line x1="10" y1="11" x2="10" y2="17"></line>
+        <line x1="14" y1="11" x2="14" y2="17"></line>
+    </svg>`;
+
+function listEmptyState(message) {
+    return `
+        <div class="empty-state">
+            <svg width="64" height="64" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="1">
+                <path d="M21 10c0 7-9 13-9 13s-9-6-9-13a9 9 0 0 1 18 0z"/>
+                <circle cx="12" cy="10" r="3"/>
+            </svg>
+            <p>${message}</p>
+        </div>
+    `;
+}
+
+/**
+ * Creates the list views on first use; the name indexes are dropped whenever
+ * the data they cover changes
+ */
+function ensureListViews() {
+    if (siteListView) return;
+
+    siteListView = new VirtualGroupedList(document.getElementById('sitesListContainer'), {
+        headerHeight: LIST_GROUP_HEADER_HEIGHT,
+        rowHeight: SITE_LIST_ROW_HEIGHT,
+        getId: site => site.id,
+        renderHeader: renderSiteGroupHeader,
+        renderRow: renderSiteRow,
+        emptyHtml: listEmptyState('No sites found')
+    });
+    kmlListView = new VirtualGroupedList(document.getElementById('kmlListContainer'), {
+        headerHeight: LIST_GROUP_HEADER_HEIGHT,
+        rowHeight: KML_LIST_ROW_HEIGHT,
+        getId: point => point.id,
+        renderHeader: renderKmlGroupHeader,
+        renderRow: renderKmlRow,
+        emptyHtml: listEmptyState('No KML files imported')
+    });
+
+    onDataChange((kind) => {
+        if (kind === 'site') siteNameIndex = null;
+        else kmlNameIndex = null;
+    });
+}
+
+function getSiteNameIndex() {
+    // `sites` is also replaced wholesale (clear all, reloads)
+    if (!siteNameIndex || siteNameIndex.source !== sites) {
+        siteNameIndex = new NameSearchIndex(sites.filter(site => site.type !== 'kml_point'), site => site.name);
+        siteNameIndex.source = sites;
     }
+    return siteNameIndex;
+}
 
-    // Group sites
-    const groups = {};
-    filteredSites.forEach(site => {
-        const groupName = site.group || 'Other';
-        if (!groups[groupName]) {
-            groups[groupName] = [];
-        }
-        groups[groupName].push(site);
+function getKmlNameIndex() {
+    if (!kmlNameIndex || kmlNameIndex.source !== points) {
+        kmlNameIndex = new NameSearchIndex(points.filter(point => point.type === 'kml_point'), point => point.name);
+        kmlNameIndex.source = points;
+    }
+    return kmlNameIndex;
+}
+
+/**
+ * Groups list items by name, sorted, adding empty groups for names that only
+ * have unloaded records
+ * @returns {Array<{name, items, extraCount}>}
+ */
+function groupListItems(items, defaultGroup, unloadedGroups) {
+    const groups = new Map();
+    items.forEach(item => {
+        const groupName = item.group || defaultGroup;
+        if (!groups.has(groupName)) groups.set(groupName, []);
+        groups.get(groupName).push(item);
     });
+    if (unloadedGroups) {
+        unloadedGroups.forEach((count, groupName) => {
+            if (!groups.has(groupName)) groups.set(groupName, []);
+        });
+    }
+    return Array.from(groups.keys()).sort().map(name => ({
+        name,
+        items: groups.get(name),
+        extraCount: unloadedGroups ? unloadedGroups.get(name) || 0 : 0
+    }));
+}
+
+function renderSiteGroupHeader(group, collapsed) {
+    const groupName = group.name;
+    return `
+        <div class="site-group-header${collapsed ? ' collapsed' : ''}">
+            ${LIST_GROUP_ICON}
+            <span class="group-name">${groupName}</span>
+            <span class="group-count">${group.items.length + group.extraCount}</span>
+            <div class="group-actions">
+                <button class="btn-icon" onclick="renameSiteGroup('${groupName.replace(/'/g, "\\'")}')" title="Rename Group" style="margin-right: 5px; padding: 2px;">
+                    ${LIST_RENAME_ICON}
+                </button>
+                <input type="checkbox" 
+                    ${!hiddenSiteGroups.has(groupName) ? 'checked' : ''} 
+                    onclick="toggleSiteGroupVisibility('${groupName.replace(/'/g, "\\'")}')"
+                    title="Toggle Visibility"
+                    style="cursor: pointer; width: 16px; height: 16px;">
+            </div>
+        </div>
+    `;
+}
 
-    // Render groups
-    container.innerHTML = Object.keys(groups).sort().map(groupName => {
-        const groupSites = groups[groupName];
-        const groupId = `group-${groupName.replace(/\s+/g, '-')}`;
-
-        return `
-            <div class="site-group">
-                <div class="site-group-header" onclick="toggleGroup('${groupId}')">
-                    <span class="group-icon">
-                        <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                            <polyline points="6 9 12 15 18 9"></polyline>
-                        </svg>
+function renderSiteRow(site, highlighted) {
+    return `
+        <div id="site-item-${site.id}" class="site-list-item${highlighted ? ' highlighted' : ''}" onclick="panToSite('${site.id}')">
+            <div class="site-info">
+                <div class="site-name">${site.name}</div>
+                <div class="site-coords">${site.latitude.toFixed(5)}, ${site.longitude.toFixed(5)}</div>
+                <div class="site-sectors-info" style="font-size: 0.8em; color: var(--text-muted); margin-top: 4px;">
+                    <strong>${site.sectors ? site.sectors.length : 0} Sectors:</strong>
+                    <span style="margin-left: 4px;">
+                        ${site.sectors ? site.sectors.map(s => `${s.name || 'Sec'} (${s.azimuth}°)`).join(', ') : 'None'}
                     </span>
-                    <span class="group-name">${groupName}</span>
-                    <span class="group-count">${groupSites.length}</span>
-                    <div class="group-actions" onclick="event.stopPropagation()">
-                        <button class="btn-icon" onclick="renameSiteGroup('${groupName.replace(/'/g, "\\'")}')" title="Rename Group" style="margin-right: 5px; padding: 2px;">
-                            <svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>
-                                <path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path>
-                            </svg>
-                        </button>
-                        <input type="checkbox" 
-                            ${!hiddenSiteGroups.has(groupName) ? 'checked' : ''} 
-                            onclick="toggleSiteGroupVisibility('${groupName.replace(/'/g, "\\'")}')"
-                            title="Toggle Visibility"
-                            style="cursor: pointer; width: 16px; height: 16px;">
-                    </div>
-                </div>
-                <div id="${groupId}" class="site-group-content">
-                    ${groupSites.map(site => `
-                        <div id="site-item-${site.id}" class="site-list-item" onclick="panToSite('${site.id}')">
-                            <div class="site-info">
-                                <div class="site-name">${site.name}</div>
-                                <div class="site-coords">${site.latitude.toFixed(5)}, ${site.longitude.toFixed(5)}</div>
-                                <div class="site-sectors-info" style="font-size: 0.8em; color: var(--text-muted); margin-top: 4px;">
-                                    <strong>${site.sectors ? site.sectors.length : 0} Sectors:</strong>
-                                    <span style="margin-left: 4px;">
-                                        ${site.sectors ? site.sectors.map(s => `${s.name || 'Sec'} (${s.azimuth}°)`).join(', ') : 'None'}
-                                    </span>
-                                </div>
-                            </div>
-                            <div class="site-actions">
-                                <button class="edit-btn" onclick="editSite('${site.id}'); event.stopPropagation();" title="Edit Site">
-                                    <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                        <path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>
-                                        <path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path>
-                                    </svg>
-                                </button>
-                                <button class="delete-btn" onclick="deleteSite('${site.id}'); event.stopPropagation();" title="Delete Site">
-                                    <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                        <polyline points="3 6 5 6 21 6"></polyline>
-                                        <path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path>
-                                        <line x1="10" y1="11" x2="10" y2="17"></line>
-                                        <line x1="14" y1="11" x2="14" y2="17"></line>
-                                    </svg>
-                                </button>
-                            </div>
-                        </div>
-                    `).join('')}
                 </div>
             </div>
-        `;
-    }).join('');
+            <div class="site-actions">
+                <button class="edit-btn" onclick="editSite('${site.id}'); event.stopPropagation();" title="Edit Site">
+                    ${LIST_EDIT_ICON}
+                </button>
+                <button class="delete-btn" onclick="deleteSite('${site.id}'); event.stopPropagation();" title="Delete Site">
+                    ${LIST_DELETE_ICON}
+                </button>
+            </div>
+        </div>
+    `;
+}
+
+function renderSitesList(filter = '') {
+    ensureListViews();
+
+    const filteredSites = getSiteNameIndex().search(filter);
+
+    // Hidden groups that have not been loaded from IndexedDB are listed by their stored count
+    const showUnloaded = !filter && unloadedSiteGroups.size > 0;
+
+    siteListView.setGroups(groupListItems(filteredSites, 'Other', showUnloaded ? unloadedSiteGroups : null));
 }
 
 function highlightSiteInList(siteId) {
-    console.log('Highlighting site:', siteId);
     // Remove existing highlights
-    document.querySelectorAll('.site-list-item.highlighted, .site-item.highlighted').forEach(el => {
+    ensureListViews();
+    siteListView.clearHighlight();
+    kmlListView.clearHighlight();
+    document.querySelectorAll('.site-item.highlighted').forEach(el => {
         el.classList.remove('highlighted');
     });
 
-    // Find and highlight new item
+    // Virtualized lists only hold the rows in view: switch to the tab first so
+    // the list can measure its viewport, then scroll the row into the window
+    const views = [[siteListView, 'sites-list'], [kmlListView, 'kml-list']];
+    for (const [view, tabName] of views) {
+        if (view.groups.some(group => group.items.some(item => item.id === siteId))) {
+            switchTab(tabName);
+            view.reveal(siteId);
+            return;
+        }
+    }
+
+    // Find and highlight new item (points list)
     const item = document.getElementById(`site-item-${siteId}`);
     if (item) {
-        console.log('Found item:', item);
         item.classList.add('highlighted');
-
-        // Ensure parent group is open (for Sites)
-        const groupContent = item.closest('.site-group-content');
-        if (groupContent) {
-            // Force display block if hidden
-            if (groupContent.style.display === 'none' || getComputedStyle(groupContent).display === 'none') {
-                groupContent.style.display = 'block';
-                // Update icon rotation
-                const header = groupContent.previousElementSibling;
-                if (header) header.classList.add('active');
-            }
-        }
-
-        // Scroll into view
         item.scrollIntoView({ behavior: 'smooth', block: 'center' });
-
-        // Switch to appropriate tab
-        // Check if it's a point (in points-list) or site (in sites-list)
-        if (item.closest('#pointsListContainer')) {
-            switchTab('points-list');
-        } else {
-            switchTab('sites-list');
-        }
+        switchTab('points-list');
     } else {
         console.warn('Site item not found in list:', siteId);
-        // Try to re-render list if not found?
-        // renderSitesList(); 
-        // But that might be recursive if not careful.
     }
 }
 
-function renderKmlList(searchTerm = '') {
-    console.log('renderKmlList called');
-    const kmlListContainer = document.getElementById('kmlListContainer');
-    const kmlTotalCount = document.getElementById('kmlTotalCount');
-
-    if (!kmlListContainer) {
-        console.error('Error: kmlListContainer not found');
-        return;
-    }
-
-    kmlListContainer.innerHTML = '';
-
-    // Filter for KML points
-    const kmlSites = points.filter(site => site.type === 'kml_point' && site.name.toLowerCase().includes(searchTerm.toLowerCase()));
-    console.log(`Found ${kmlSites.length} KML sites in global array (Total points: ${points.length})`);
-
-    // Debug first site to check type
-    if (sites.length > 0) {
-        console.log('First site sample:', sites[0]);
-    }
-
-    if (kmlTotalCount) {
-        kmlTotalCount.textContent = `(${kmlSites.length})`;
-    }
-
-    if (kmlSites.length === 0) {
-        kmlListContainer.innerHTML = `
-            <div class="empty-state">
-                <svg width="64" height="64" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="1">
-                    <path d="M21 10c0 7-9 13-9 13s-9-6-9-13a9 9 0 0 1 18 0z"/>
-                    <circle cx="12" cy="10" r="3"/>
-                </svg>
-                <p>No KML files imported</p>
-            </div>
-        `;
-        return;
-    }
-
-    // Group sites by filename (group property)
-    const groups = {};
-    kmlSites.forEach(site => {
-        const groupName = site.group || 'Unknown KML';
-        if (!groups[groupName]) {
-            groups[groupName] = [];
-        }
-        groups[groupName].push(site);
-    });
-
-    // Render groups
-    kmlListContainer.innerHTML = Object.keys(groups).sort().map(groupName => {
-        const groupSites = groups[groupName];
-        const groupId = `kml-group-${groupName.replace(/\s+/g, '-')}`;
-        const initialLimit = 50;
-        const hasMore = groupSites.length > initialLimit;
-        const visibleSites = groupSites.slice(0, initialLimit);
-
-        return `
-            <div class="site-group">
-                <div class="site-group-header" onclick="toggleGroup('${groupId}')">
-                    <span class="group-icon">
-                        <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                            <polyline points="6 9 12 15 18 9"></polyline>
-                        </svg>
-                    </span>
-                    <span class="group-name">${groupName}</span>
-                    <span class="group-count">${groupSites.length}</span>
-                    <div class="group-actions" onclick="event.stopPropagation()">
-                        <button class="btn-icon" onclick="renameKmlGroup('${groupName.replace(/'/g, "\\'")}')" title="Rename Group" style="margin-right: 5px; padding: 2px;">
-                            <svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>
-                                <path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path>
-                            </svg>
-                        </button>
-                        <button class="btn-icon" onclick="deleteKmlGroup('${groupName.replace(/'/g, "\\'")}')" title="Delete Group" style="margin-right: 5px; padding: 2px; color: var(--error);">
-                            <svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                <polyline points="3 6 5 6 21 6"></polyline>
-                                <path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path>
-                                <line x1="10" y1="11" x2="10" y2="17"></line>
-                                <line x1="14" y1="11" x2="14" y2="17"></line>
-                            </svg>
-                        </button>
-                        <input type="checkbox" 
-                            ${!hiddenKmlGroups.has(groupName) ? 'checked' : ''} 
-                            onclick="toggleKmlGroupVisibility('${groupName.replace(/'/g, "\\'")}')"
-                            title="Toggle Visibility"
-                            style="cursor: pointer; width: 16px; height: 16px;">
-                    </div>
-                </div>
-                <div id="${groupId}" class="site-group-content">
-                    <div id="${groupId}-list">
-                        ${visibleSites.map(site => `
-                            <div class="site-list-item" onclick="panToSite('${site.id}')">
-                                <div class="site-info">
-                                    <div class="site-name">
-                                        <span class="site-color-dot" style="background-color: ${getPointColor(site)}; display: inline-block; width: 10px; height: 10px; border-radius: 50%; margin-right: 5px;"></span>
-                                        ${site.name}
-                                    </div>
-                                    <div class="site-coords">${site.latitude.toFixed(5)}, ${site.longitude.toFixed(5)}</div>
-                                </div>
-                                <button class="edit-btn" onclick="openEditModal('${site.id}', 'point'); event.stopPropagation();" title="Edit Point" style="margin-right: 5px;">
-                                    <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                        <path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>
-                                        <path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path>
-                                    </svg>
-                                </button>
-                                <button class="delete-btn" onclick="deletePoint('${site.id}'); event.stopPropagation();" title="Delete Point">
-                                    <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                                        <polyline points="3 6 5 6 21 6"></polyline>
-                                        <path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path>
-                                        <line x1="10" y1="11" x2="10" y2="17"></line>
-                                        <line x1="14" y1="11" x2="14" y2="17"></line>
-                                    </svg>
-                                </button>
-                            </div>
-                        `).join('')}
-                    </div>
-                    ${hasMore ? `
-                        <button class="btn btn-sm btn-secondary" style="width: 100%; margin-top: 8px;" onclick="loadMoreKmlPoints('${groupId}', '${groupName}', ${initialLimit})">
-                            Load More (${groupSites.length - initialLimit} remaining)
-                        </button>
-                    ` : ''}
-                </div>
+function renderKmlGroupHeader(group, collapsed) {
+    const groupName = group.name;
+    return `
+        <div class="site-group-header${collapsed ? ' collapsed' : ''}">
+            ${LIST_GROUP_ICON}
+            <span class="group-name">${groupName}</span>
+            <span class="group-count">${group.items.length + group.extraCount}</span>
+            <div class="group-actions">
+                <button class="btn-icon" onclick="renameKmlGroup('${groupName.replace(/'/g, "\\'")}')" title="Rename Group" style="margin-right: 5px; padding: 2px;">
+                    ${LIST_RENAME_ICON}
+                </button>
+                <button class="btn-icon" onclick="deleteKmlGroup('${groupName.replace(/'/g, "\\'")}')" title="Delete Group" style="margin-right: 5px; padding: 2px; color: var(--error);">
+                    ${LIST_DELETE_ICON.replace('width="16" height="16"', 'width="14" height="14"')}
+                </button>
+                <input type="checkbox" 
+                    ${!hiddenKmlGroups.has(groupName) ? 'checked' : ''} 
+                    onclick="toggleKmlGroupVisibility('${groupName.replace(/'/g, "\\'")}')"
+                    title="Toggle Visibility"
+                    style="cursor: pointer; width: 16px; height: 16px;">
             </div>
-        `;
-    }).join('');
+        </div>
+    `;
 }
 
-function loadMoreKmlPoints(groupId, groupName, currentCount) {
-    const batchSize = 100;
-    const listContainer = document.getElementById(`${groupId}-list`);
-    const button = listContainer.nextElementSibling; // The "Load More" button
-
-    // Find the group data
-    const kmlSites = points.filter(site => site.type === 'kml_point');
-    const groupSites = kmlSites.filter(site => (site.group || 'Unknown KML') === groupName);
-
-    const nextBatch = groupSites.slice(currentCount, currentCount + batchSize);
-
-    // Append new items
-    const newItemsHtml = nextBatch.map(site => `
-        <div id="site-item-${site.id}" class="site-list-item" onclick="panToSite('${site.id}')">
+function renderKmlRow(point, highlighted) {
+    return `
+        <div id="site-item-${point.id}" class="site-list-item${highlighted ? ' highlighted' : ''}" onclick="panToSite('${point.id}')">
             <div class="site-info">
                 <div class="site-name">
-                    <span class="site-color-dot" style="background-color: ${site.iconColor || '#ef4444'}; display: inline-block; width: 10px; height: 10px; border-radius: 50%; margin-right: 8px;"></span>
-                    ${site.name}
+                    <span class="site-color-dot" style="background-color: ${getPointColor(point)};"></span>
+                    ${point.name}
                 </div>
-                <div class="site-coords">${site.latitude.toFixed(5)}, ${site.longitude.toFixed(5)}</div>
+                <div class="site-coords">${point.latitude.toFixed(5)}, ${point.longitude.toFixed(5)}</div>
             </div>
-            <button class="edit-btn" onclick="openEditModal('${site.id}', 'point'); event.stopPropagation();" title="Edit Point" style="margin-right: 5px;">
-                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                    <path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path>
-                    <path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path>
-                </svg>
+            <button class="edit-btn" onclick="openEditModal('${point.id}', 'point'); event.stopPropagation();" title="Edit Point" style="margin-right: 5px;">
+                ${LIST_EDIT_ICON}
             </button>
-            <button class="delete-btn" onclick="deletePoint('${site.id}'); event.stopPropagation();" title="Delete Point">
-                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                    <polyline points="3 6 5 6 21 6"></polyline>
-                    <path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path>
-                    <line x1="10" y1="11" x2="10" y2="17"></line>
-                    <line x1="14" y1="11" x2="14" y2="17"></line>
-                </svg>
+            <button class="delete-btn" onclick="deletePoint('${point.id}'); event.stopPropagation();" title="Delete Point">
+                ${LIST_DELETE_ICON}
             </button>
         </div>
-    `).join('');
+    `;
+}
 
-    listContainer.insertAdjacentHTML('beforeend', newItemsHtml);
+function renderKmlList(searchTerm = '') {
+    ensureListViews();
+    const kmlTotalCount = document.getElementById('kmlTotalCount');
 
-    // Update button or remove if done
-    const newCount = currentCount + nextBatch.length;
-    if (newCount < groupSites.length) {
-        button.setAttribute('onclick', `loadMoreKmlPoints('${groupId}', '${groupName}', ${newCount})`);
-        button.textContent = `Load More (${groupSites.length - newCount} remaining)`;
-    } else {
-        button.remove();
-    }
-}
+    const kmlPoints = getKmlNameIndex().search(searchTerm);
 
-function toggleGroup(groupId) {
-    const group = document.getElementById(groupId);
-    const header = group.previousElementSibling;
+    // Hidden groups that have not been loaded from IndexedDB are listed by their stored count
+    let unloadedCount = 0;
+    if (!searchTerm) unloadedKmlGroups.forEach(count => { unloadedCount += count; });
 
-    if (group && header) {
-        group.classList.toggle('collapsed');
-        header.classList.toggle('collapsed');
+    if (kmlTotalCount) {
+        kmlTotalCount.textContent = `(${kmlPoints.length + unloadedCount})`;
     }
+
+    kmlListView.setGroups(groupListItems(kmlPoints, 'Unknown KML', unloadedCount > 0 ? unloadedKmlGroups : null));
 }
 
-function toggleKmlGroupVisibility(groupName) {
+async function toggleKmlGroupVisibility(groupName) {
     if (hiddenKmlGroups.has(groupName)) {
         hiddenKmlGroups.delete(groupName);
     } else {
         hiddenKmlGroups.add(groupName);
     }
+    saveHiddenGroups();
+
+    // Groups hidden since startup are still in IndexedDB
+    if (!hiddenKmlGroups.has(groupName) && await ensureKmlGroupsLoaded([groupName])) {
+        updateUI();
+    }
 
     // Update map
     updateMapMarkers({ fitBounds: false });
@@ -3911,25 +3632,33 @@ function toggleKmlGroupVisibility(groupName) {
     // But if we wanted to update other UI elements, we could.
 }
 
-function toggleSiteGroupVisibility(groupName) {
+async function toggleSiteGroupVisibility(groupName) {
     if (hiddenSiteGroups.has(groupName)) {
         hiddenSiteGroups.delete(groupName);
     } else {
         hiddenSiteGroups.add(groupName);
     }
+    servingIndex.invalidate(); // Reused cell names prefer visible sites
+    saveHiddenGroups();
+
+    if (!hiddenSiteGroups.has(groupName) && await ensureSiteGroupsLoaded([groupName])) {
+        updateUI();
+    }
     updateMapMarkers({ fitBounds: false });
 }
 
-function renameSiteGroup(oldName) {
+async function renameSiteGroup(oldName) {
     const newName = prompt(`Rename group "${oldName}" to:`, oldName);
     if (newName && newName.trim() !== "" && newName !== oldName) {
         const trimmedName = newName.trim();
+        await ensureSiteGroupsLoaded([oldName, trimmedName]);
 
         // Update sites
         let updatedCount = 0;
         sites.forEach(site => {
             if ((site.group || 'Other') === oldName) {
                 site.group = trimmedName;
+                markSiteDirty(site);
                 updatedCount++;
             }
         });
@@ -3939,6 +3668,7 @@ function renameSiteGroup(oldName) {
             if (hiddenSiteGroups.has(oldName)) {
                 hiddenSiteGroups.delete(oldName);
                 hiddenSiteGroups.add(trimmedName);
+                saveHiddenGroups();
             }
 
             saveToLocalStorage();
@@ -3949,10 +3679,11 @@ function renameSiteGroup(oldName) {
     }
 }
 
-function renameKmlGroup(oldName) {
+async function renameKmlGroup(oldName) {
     const newName = prompt(`Rename KML group "${oldName}" to:`, oldName);
     if (newName && newName.trim() !== "" && newName !== oldName) {
         const trimmedName = newName.trim();
+        await ensureKmlGroupsLoaded([oldName, trimmedName]);
 
         // Update points
         let updatedCount = 0;
@@ -3964,10 +3695,15 @@ function renameKmlGroup(oldName) {
         });
 
         if (updatedCount > 0) {
+            // The old chunk is deleted and the points rewritten under the new name
+            markKmlGroupDirty(oldName);
+            markKmlGroupDirty(trimmedName);
+
             // Update hidden groups
             if (hiddenKmlGroups.has(oldName)) {
                 hiddenKmlGroups.delete(oldName);
                 hiddenKmlGroups.add(trimmedName);
+                saveHiddenGroups();
             }
 
             saveToLocalStorage();
@@ -3982,13 +3718,23 @@ function deleteKmlGroup(groupName) {
     if (confirm(`Are you sure you want to delete the group "${groupName}" and all its points?`)) {
         // Filter out points belonging to this group
         const initialCount = points.length;
-        points = points.filter(point => !(point.type === 'kml_point' && (point.group || 'Unknown KML') === groupName));
-        const deletedCount = initialCount - points.length;
+        points = points.filter(point => {
+            if (point.type === 'kml_point' && (point.group || 'Unknown KML') === groupName) {
+                markPointRemoved(point);
+                return false;
+            }
+            return true;
+        });
+        const deletedCount = initialCount - points.length + (unloadedKmlGroups.get(groupName) || 0);
+        unloadedKmlGroups.delete(groupName);
 
         if (deletedCount > 0) {
+            markKmlGroupDirty(groupName);
+
             // Remove from hidden groups if present
             if (hiddenKmlGroups.has(groupName)) {
                 hiddenKmlGroups.delete(groupName);
+                saveHiddenGroups();
             }
 
             saveToLocalStorage();
@@ -4093,6 +3839,7 @@ async function handleEditSiteSubmit(e) {
             // Update Site
             const siteIndex = sites.findIndex(s => s.id === editingPointId);
             if (siteIndex !== -1) {
+                sectorGeometryCache.invalidateSite(sites[siteIndex]);
                 sites[siteIndex] = {
                     ...sites[siteIndex],
                     name,
@@ -4100,6 +3847,7 @@ async function handleEditSiteSubmit(e) {
                     longitude: lng,
                     description
                 };
+                markSiteDirty(sites[siteIndex]);
                 showNotification('Site updated', 'success');
             }
         } else {
@@ -4134,6 +3882,7 @@ async function handleEditSiteSubmit(e) {
                         color,
                         customProperties
                     };
+                    markPointDirty(points[pointIndex]);
                     showNotification('Point updated', 'success');
                 } else {
                     console.error('Point not found for update:', editingPointId);
@@ -4154,6 +3903,7 @@ async function handleEditSiteSubmit(e) {
                     customProperties
                 };
                 points.push(newPoint);
+                markPointDirty(newPoint);
                 showNotification('Point created', 'success');
             }
         }
@@ -4306,6 +4056,7 @@ async function deleteSite(id) {
         const result = await deleteAirtableRecord(id);
 
         if (result) {
+            sites.forEach(s => { if (s.id === id) markSiteRemoved(s); });
             sites = sites.filter(s => s.id !== id);
             saveToLocalStorage();
             updateUI();
@@ -4317,6 +4068,7 @@ async function deleteSite(id) {
             // For safety, let's ask or just warn.
             // Let's delete locally but warn.
             if (confirm('Airtable delete failed. Delete locally anyway?')) {
+                sites.forEach(s => { if (s.id === id) markSiteRemoved(s); });
                 sites = sites.filter(s => s.id !== id);
                 saveToLocalStorage();
                 updateUI();
@@ -4350,6 +4102,7 @@ function clearAllSites() {
         // Clear Global State
         sites = [];
         if (typeof points !== 'undefined') points = [];
+        rebuildSpatialIndexes();
         kmlData = null;
         currentKmlFilename = '';
 
@@ -4358,9 +4111,7 @@ function clearAllSites() {
         // localStorage.removeItem('siteSectorMapper_points');
         clearDB().then(() => console.log('DB Cleared')).catch(err => console.error('Error clearing DB', err));
 
-        // Clear Map
-        if (markersLayer) markersLayer.clearLayers();
-        if (pointsLayer) pointsLayer.clearLayers();
+        // Clear Map (updateMapMarkers below removes the markers)
         if (sectorsLayer) sectorsLayer.clearLayers();
 
         // Update UI
@@ -4384,22 +4135,109 @@ function clearAllSites() {
 }
 
 function saveToLocalStorage() {
-    try {
-        localStorage.setItem('siteSectorMapper_sites', JSON.stringify(sites));
-        localStorage.setItem('siteSectorMapper_points', JSON.stringify(points));
-        return true;
-    } catch (e) {
-        console.error('Storage quota exceeded:', e);
-        return false;
-    }
+    // Kept for existing callers: the JSON copy in localStorage was never read back
+    // (loadData restores from IndexedDB) and hit the quota on large KML imports.
+    saveData();
+    return true;
 }
 
 // ==================== INDEXEDDB PERSISTENCE ====================
+//
+// Sites and manual points are stored one record per id, KML points as one
+// columnar chunk (columnar.js) per KML group. Code that changes data records
+// what it touched with the mark* functions below; saveData() then writes only
+// those records instead of structured-cloning the whole dataset. The same calls
+// notify onDataChange() listeners, which keep in-memory indexes up to date.
 
 let db = null;
 const DB_NAME = 'SiteMapperDB';
-const DB_VERSION = 1;
-const STORE_NAME = 'data';
+const DB_VERSION = 2;
+const STORE_NAME = 'data'; // Whole-array saves from DB version 1, migrated on load
+const SITES_STORE = 'sites';
+const POINTS_STORE = 'points';
+const KML_GROUPS_STORE = 'kmlGroups';
+
+let persistJournal = createPersistJournal();
+
+// Groups hidden at startup stay in IndexedDB until they are shown (group -> count)
+let unloadedKmlGroups = new Map();
+let unloadedSiteGroups = new Map();
+
+// Listeners receive (kind: 'site'|'point', action: 'update'|'remove', item)
+const dataChangeListeners = [];
+
+function onDataChange(listener) {
+    dataChangeListeners.push(listener);
+}
+
+function notifyDataChange(kind, action, item) {
+    for (let i = 0; i < dataChangeListeners.length; i++) {
+        dataChangeListeners[i](kind, action, item);
+    }
+}
+
+function createPersistJournal() {
+    return {
+        sites: new Set(),
+        removedSites: new Set(),
+        points: new Set(),
+        removedPoints: new Set(),
+        kmlGroups: new Set()
+    };
+}
+
+function siteGroupName(site) {
+    return site.group || 'Other';
+}
+
+function kmlGroupName(point) {
+    return point.group || 'Unknown KML';
+}
+
+function markSiteDirty(site) {
+    persistJournal.removedSites.delete(site.id);
+    persistJournal.sites.add(site.id);
+    notifyDataChange('site', 'update', site);
+}
+
+function markSiteRemoved(site) {
+    persistJournal.sites.delete(site.id);
+    persistJournal.removedSites.add(site.id);
+    notifyDataChange('site', 'remove', site);
+}
+
+function markKmlGroupDirty(groupName) {
+    persistJournal.kmlGroups.add(groupName);
+}
+
+function markPointDirty(point) {
+    notifyDataChange('point', 'update', point);
+    if (point.type === 'kml_point') {
+        markKmlGroupDirty(kmlGroupName(point));
+        return;
+    }
+    persistJournal.removedPoints.delete(point.id);
+    persistJournal.points.add(point.id);
+}
+
+function markPointRemoved(point) {
+    notifyDataChange('point', 'remove', point);
+    if (point.type === 'kml_point') {
+        markKmlGroupDirty(kmlGroupName(point));
+        return;
+    }
+    persistJournal.points.delete(point.id);
+    persistJournal.removedPoints.add(point.id);
+}
+
+function mergePersistJournal(journal) {
+    // Put back the entries of a failed save so the next saveData() retries them
+    journal.sites.forEach(id => { if (!persistJournal.removedSites.has(id)) persistJournal.sites.add(id); });
+    journal.removedSites.forEach(id => { if (!persistJournal.sites.has(id)) persistJournal.removedSites.add(id); });
+    journal.points.forEach(id => { if (!persistJournal.removedPoints.has(id)) persistJournal.points.add(id); });
+    journal.removedPoints.forEach(id => { if (!persistJournal.points.has(id)) persistJournal.removedPoints.add(id); });
+    journal.kmlGroups.forEach(group => persistJournal.kmlGroups.add(group));
+}
 
 function setupDB() {
     return new Promise((resolve, reject) => {
@@ -4410,6 +4248,18 @@ function setupDB() {
             if (!db.objectStoreNames.contains(STORE_NAME)) {
                 db.createObjectStore(STORE_NAME);
             }
+            if (!db.objectStoreNames.contains(SITES_STORE)) {
+                const sitesStore = db.createObjectStore(SITES_STORE, { keyPath: 'id' });
+                sitesStore.createIndex('group', 'group');
+            }
+            if (!db.objectStoreNames.contains(POINTS_STORE)) {
+                db.createObjectStore(POINTS_STORE, { keyPath: 'id' });
+            }
+            if (!db.objectStoreNames.contains(KML_GROUPS_STORE)) {
+                // The count index lets startup list group sizes without reading the chunks
+                const kmlStore = db.createObjectStore(KML_GROUPS_STORE, { keyPath: 'group' });
+                kmlStore.createIndex('count', 'count');
+            }
         };
 
         request.onsuccess = (event) => {
@@ -4424,6 +4274,13 @@ function setupDB() {
     });
 }
 
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
 function saveToDB(key, value) {
     return new Promise((resolve, reject) => {
         if (!db) return reject('DB not initialized');
@@ -4449,42 +4306,255 @@ function getFromDB(key) {
 }
 
 function clearDB() {
+    // Nothing in memory is waiting to be saved once everything is gone
+    persistJournal = createPersistJournal();
+    unloadedKmlGroups.clear();
+    unloadedSiteGroups.clear();
+
     return new Promise((resolve, reject) => {
         if (!db) return reject('DB not initialized');
-        const transaction = db.transaction([STORE_NAME], 'readwrite');
-        const store = transaction.objectStore(STORE_NAME);
-        const request = store.clear();
+        const transaction = db.transaction([STORE_NAME, SITES_STORE, POINTS_STORE, KML_GROUPS_STORE], 'readwrite');
+        transaction.objectStore(STORE_NAME).clear();
+        transaction.objectStore(SITES_STORE).clear();
+        transaction.objectStore(POINTS_STORE).clear();
+        transaction.objectStore(KML_GROUPS_STORE).clear();
+
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
 
-        request.onsuccess = () => resolve();
-        request.onerror = (event) => reject(event.target.error);
+/**
+ * Writes one batch of record changes in a single transaction
+ * @param {Object} changes - { sites, removedSites, points, removedPoints, kmlChunks: Map(group -> points), legacyKeys }
+ */
+function writeStoreChanges(changes) {
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction([STORE_NAME, SITES_STORE, POINTS_STORE, KML_GROUPS_STORE], 'readwrite');
+        const sitesStore = transaction.objectStore(SITES_STORE);
+        const pointsStore = transaction.objectStore(POINTS_STORE);
+        const kmlStore = transaction.objectStore(KML_GROUPS_STORE);
+
+        (changes.removedSites || []).forEach(id => sitesStore.delete(id));
+        (changes.sites || []).forEach(site => sitesStore.put({ id: site.id, group: siteGroupName(site), site }));
+        (changes.removedPoints || []).forEach(id => pointsStore.delete(id));
+        (changes.points || []).forEach(point => pointsStore.put({ id: point.id, point }));
+        (changes.kmlChunks || new Map()).forEach((groupPoints, group) => {
+            if (groupPoints.length === 0) {
+                kmlStore.delete(group);
+            } else {
+                kmlStore.put({ group, count: groupPoints.length, buffer: encodeColumnarPoints(groupPoints) });
+            }
+        });
+        (changes.legacyKeys || []).forEach(key => transaction.objectStore(STORE_NAME).delete(key));
+
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+        transaction.onabort = () => reject(transaction.error);
     });
 }
 
 async function saveData() {
+    // Take the journal now: edits made while this save is running go to the next one
+    const journal = persistJournal;
+    persistJournal = createPersistJournal();
+
     try {
         if (!db) await setupDB();
-        await saveToDB('sites', sites);
-        await saveToDB('points', points);
-        // Also save metadata if needed
-        console.log('Data saved to IndexedDB');
+
+        const changes = {
+            sites: journal.sites.size > 0 ? sites.filter(site => journal.sites.has(site.id)) : [],
+            removedSites: Array.from(journal.removedSites),
+            points: journal.points.size > 0 ? points.filter(p => p.type !== 'kml_point' && journal.points.has(p.id)) : [],
+            removedPoints: Array.from(journal.removedPoints),
+            kmlChunks: new Map()
+        };
+
+        // Rebuild the chunk of every touched KML group that is in memory (empty chunk = delete)
+        journal.kmlGroups.forEach(group => {
+            if (!unloadedKmlGroups.has(group)) changes.kmlChunks.set(group, []);
+        });
+        if (changes.kmlChunks.size > 0) {
+            points.forEach(p => {
+                if (p.type !== 'kml_point') return;
+                const chunk = changes.kmlChunks.get(kmlGroupName(p));
+                if (chunk) chunk.push(p);
+            });
+        }
+
+        if (changes.sites.length || changes.removedSites.length || changes.points.length ||
+            changes.removedPoints.length || changes.kmlChunks.size) {
+            await writeStoreChanges(changes);
+            console.log(`Data saved to IndexedDB (${changes.sites.length + changes.removedSites.length} sites, ${changes.points.length + changes.removedPoints.length} points, ${changes.kmlChunks.size} KML groups)`);
+        }
     } catch (e) {
         console.error('Error saving data to DB:', e);
+        mergePersistJournal(journal);
+    }
+}
+
+async function migrateLegacyData() {
+    // DB version 1 kept the whole 'sites'/'points' arrays (and a columnar KML buffer) in the data store
+    const legacyKeys = ['sites', 'points', 'kmlPointsColumnar'];
+    const [legacySites, legacyPoints, legacyKml] = await Promise.all(legacyKeys.map(key => getFromDB(key)));
+    if (!legacySites && !legacyPoints && !legacyKml) return;
+
+    const allPoints = (legacyPoints || []).slice();
+    if (legacyKml) {
+        const kmlPoints = columnarToPoints(decodeColumnarPoints(legacyKml));
+        for (let i = 0; i < kmlPoints.length; i++) allPoints.push(kmlPoints[i]);
+    }
+
+    const kmlChunks = new Map();
+    const manualPoints = [];
+    allPoints.forEach(p => {
+        if (p.type !== 'kml_point') {
+            manualPoints.push(p);
+            return;
+        }
+        const group = kmlGroupName(p);
+        if (!kmlChunks.has(group)) kmlChunks.set(group, []);
+        kmlChunks.get(group).push(p);
+    });
+
+    await writeStoreChanges({ sites: legacySites || [], points: manualPoints, kmlChunks, legacyKeys });
+    console.log('Migrated saved data to per-record storage');
+}
+
+function getStoredKmlGroups() {
+    // Group names and point counts from the count index, without reading the chunks
+    return new Promise((resolve, reject) => {
+        const groups = new Map();
+        const index = db.transaction([KML_GROUPS_STORE], 'readonly').objectStore(KML_GROUPS_STORE).index('count');
+        const request = index.openKeyCursor();
+        request.onsuccess = () => {
+            const cursor = request.result;
+            if (cursor) {
+                groups.set(cursor.primaryKey, cursor.key);
+                cursor.continue();
+            } else {
+                resolve(groups);
+            }
+        };
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function getStoredSiteGroups() {
+    // Distinct site groups with their record counts, from the group index only
+    return new Promise((resolve, reject) => {
+        const groups = new Map();
+        const index = db.transaction([SITES_STORE], 'readonly').objectStore(SITES_STORE).index('group');
+        const request = index.openKeyCursor(null, 'nextunique');
+        const pending = [];
+        request.onsuccess = () => {
+            const cursor = request.result;
+            if (cursor) {
+                const group = cursor.key;
+                pending.push(idbRequest(index.count(IDBKeyRange.only(group))).then(count => groups.set(group, count)));
+                cursor.continue();
+            } else {
+                Promise.all(pending).then(() => resolve(groups), reject);
+            }
+        };
+        request.onerror = () => reject(request.error);
+    });
+}
+
+async function loadSiteGroupRecords(groupNames) {
+    const known = new Set(sites.map(s => s.id));
+    for (const group of groupNames) {
+        const store = db.transaction([SITES_STORE], 'readonly').objectStore(SITES_STORE);
+        const records = await idbRequest(store.index('group').getAll(IDBKeyRange.only(group)));
+        records.forEach(record => {
+            // Sites added to the group while it was unloaded are already in memory
+            if (known.has(record.id)) return;
+            sites.push(record.site);
+            notifyDataChange('site', 'update', record.site);
+        });
+    }
+}
+
+async function loadKmlGroupRecords(groupNames) {
+    for (const group of groupNames) {
+        const store = db.transaction([KML_GROUPS_STORE], 'readonly').objectStore(KML_GROUPS_STORE);
+        const record = await idbRequest(store.get(group));
+        if (!record) continue;
+        const groupPoints = columnarToPoints(decodeColumnarPoints(record.buffer), group);
+        for (let i = 0; i < groupPoints.length; i++) {
+            points.push(groupPoints[i]);
+            notifyDataChange('point', 'update', groupPoints[i]);
+        }
     }
 }
 
+/**
+ * Loads site groups left in IndexedDB at startup
+ * @param {Array<string>} [groupNames] - Defaults to every unloaded group
+ * @returns {Promise<boolean>} true when anything was loaded
+ */
+async function ensureSiteGroupsLoaded(groupNames = Array.from(unloadedSiteGroups.keys())) {
+    const pending = groupNames.filter(group => unloadedSiteGroups.has(group));
+    if (pending.length === 0) return false;
+    pending.forEach(group => unloadedSiteGroups.delete(group));
+    await loadSiteGroupRecords(pending);
+    return true;
+}
+
+/**
+ * Loads KML group chunks left in IndexedDB at startup
+ * @param {Array<string>} [groupNames] - Defaults to every unloaded group
+ * @returns {Promise<boolean>} true when anything was loaded
+ */
+async function ensureKmlGroupsLoaded(groupNames = Array.from(unloadedKmlGroups.keys())) {
+    const pending = groupNames.filter(group => unloadedKmlGroups.has(group));
+    if (pending.length === 0) return false;
+    pending.forEach(group => unloadedKmlGroups.delete(group));
+    await loadKmlGroupRecords(pending);
+    return true;
+}
+
+function saveHiddenGroups() {
+    localStorage.setItem('siteSectorMapper_hiddenGroups', JSON.stringify({
+        kml: Array.from(hiddenKmlGroups),
+        sites: Array.from(hiddenSiteGroups)
+    }));
+}
+
 async function loadData() {
     try {
         await setupDB();
-        const storedSites = await getFromDB('sites');
-        if (storedSites) sites = storedSites;
+        await migrateLegacyData();
+
+        // Only groups that are visible are read now; hidden ones load when shown
+        const siteGroups = await getStoredSiteGroups();
+        const visibleSiteGroups = [];
+        siteGroups.forEach((count, group) => {
+            if (hiddenSiteGroups.has(group)) unloadedSiteGroups.set(group, count);
+            else visibleSiteGroups.push(group);
+        });
+        await loadSiteGroupRecords(visibleSiteGroups);
+
+        const storedPoints = await idbRequest(db.transaction([POINTS_STORE], 'readonly').objectStore(POINTS_STORE).getAll());
+        storedPoints.forEach(record => {
+            points.push(record.point);
+            notifyDataChange('point', 'update', record.point);
+        });
 
-        const storedPoints = await getFromDB('points');
-        if (storedPoints) points = storedPoints;
+        const kmlGroups = await getStoredKmlGroups();
+        const visibleKmlGroups = [];
+        kmlGroups.forEach((count, group) => {
+            if (hiddenKmlGroups.has(group)) unloadedKmlGroups.set(group, count);
+            else visibleKmlGroups.push(group);
+        });
+        await loadKmlGroupRecords(visibleKmlGroups);
 
-        if (sites.length > 0 || points.length > 0) {
+        const unloadedCount = unloadedSiteGroups.size + unloadedKmlGroups.size;
+        if (sites.length > 0 || points.length > 0 || unloadedCount > 0) {
             updateUI(); // Refresh UI with loaded data
             updateMapMarkers({ fitBounds: true });
-            showNotification(`Restored ${sites.length} sites and ${points.length} points`, 'info');
+            const hiddenNote = unloadedCount > 0 ? ` (${unloadedCount} hidden groups load when shown)` : '';
+            showNotification(`Restored ${sites.length} sites and ${points.length} points${hiddenNote}`, 'info');
         }
 
         loadThematicSettings();
@@ -4493,6 +4563,105 @@ async function loadData() {
     }
 }
 
+// ==================== SPATIAL INDEX ====================
+//
+// One grid index (spatial-index.js) each for sites and points, shared by
+// viewport culling, rectangle/polygon selection and nearest-site lookups.
+
+const siteIndex = new SpatialGridIndex(0.02);
+const pointIndex = new SpatialGridIndex(0.01);
+
+onDataChange((kind, action, item) => {
+    const index = kind === 'site' ? siteIndex : pointIndex;
+    if (action === 'remove') index.remove(item.id);
+    else index.insert(item);
+    if (kind === 'site' && action === 'remove') sectorGeometryCache.invalidateSite(item);
+});
+
+function rebuildSpatialIndexes() {
+    siteIndex.load(sites);
+    pointIndex.load(points);
+    connectionIndex.load(sites, points);
+    servingIndex.invalidate();
+}
+
+/**
+ * Items of an index inside Leaflet bounds
+ * @param {SpatialGridIndex} index
+ * @param {L.LatLngBounds} bounds
+ * @param {Function} [filter]
+ */
+function searchIndexInBounds(index, bounds, filter = null) {
+    return index.search(bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast(), filter);
+}
+
+function isSiteVisible(site) {
+    return !hiddenSiteGroups.has(site.group || 'Other');
+}
+
+/**
+ * Sites whose sectors are drawn: visible, and in the selection the map is filtered to
+ */
+function isSectorSiteVisible(site) {
+    return isSiteVisible(site) && (!sectorSiteFilter || sectorSiteFilter.has(site.id));
+}
+
+function isPointVisible(point) {
+    return !(point.type === 'kml_point' && hiddenKmlGroups.has(point.group));
+}
+
+// ==================== CONNECTION INDEX ====================
+//
+// Cell name / site name / EARFCN lookups (connection-index.js) behind
+// drawConnectionLine and drawSectorToPoints, kept current the same way.
+
+const connectionIndex = new ConnectionIndex();
+
+onDataChange((kind, action, item) => {
+    if (kind === 'site') {
+        if (action === 'remove') connectionIndex.removeSite(item);
+        else connectionIndex.addSite(item);
+    } else if (action === 'remove') {
+        connectionIndex.removePoint(item);
+    } else {
+        connectionIndex.addPoint(item);
+    }
+});
+
+// ==================== SERVING INDEX ====================
+//
+// Serving sector of every KML sample (serving-index.js), assigned in bulk on
+// first use after an import or edit and read by connection lines and popups.
+
+const servingIndex = new ServingIndex(connectionIndex, siteIndex, isSiteVisible);
+
+onDataChange((kind, action, item) => {
+    if (kind === 'site') servingIndex.invalidate();
+    else servingIndex.forgetPoint(item);
+});
+
+/**
+ * The serving index, with any samples added or edited since its last use assigned
+ * @returns {ServingIndex}
+ */
+function servingAssignments() {
+    servingIndex.assign(points, sites);
+    return servingIndex;
+}
+
+/**
+ * Popup lines for the samples a sector serves
+ */
+function servingStatsHtml(sector) {
+    const stats = servingAssignments().statsFor(sector);
+    if (stats.count === 0) return '';
+    const methods = SERVING_METHODS.filter(method => stats.methods[method] > 0)
+        .map(method => `${method} ${stats.methods[method]}`).join(', ');
+    const measures = stats.measures.slice(0, 3).map(m =>
+        `<p style="margin: 0; font-size: 0.875rem;">${m.name}: ${m.mean.toFixed(1)} (${m.min.toFixed(1)} to ${m.max.toFixed(1)})</p>`).join('');
+    return `<p style="margin: 4px 0 0 0; font-size: 0.875rem;"><b>Samples: ${stats.count}</b> (${methods})</p>${measures}`;
+}
+
 // Deprecated: loadFromLocalStorage (kept for reference but unused)
 function loadFromLocalStorage_OLD() {
     const storedSites = localStorage.getItem('siteSectorMapper_sites');
@@ -4531,6 +4700,12 @@ function loadThematicSettings() {
             if (settings.kmlAttribute) {
                 document.getElementById('kmlAttribute').value = settings.kmlAttribute;
             }
+            if (settings.breaks && document.getElementById('thematicBreaks')) {
+                document.getElementById('thematicBreaks').value = settings.breaks;
+            }
+            if (settings.kmlDisplay && document.getElementById('kmlDisplay')) {
+                document.getElementById('kmlDisplay').value = settings.kmlDisplay;
+            }
 
             // Apply if either is set
             if (settings.siteAttribute !== 'n_a' || settings.kmlAttribute !== 'n_a') {
@@ -4771,6 +4946,7 @@ async function deletePoint(pointId) {
         // Points are local only for now, but if we wanted to sync:
         // await deleteAirtableRecord(pointId);
 
+        points.forEach(p => { if (p.id == pointId) markPointRemoved(p); });
         points = points.filter(p => p.id != pointId);
         saveData();
         updateMapMarkers({ fitBounds: false });
@@ -4935,7 +5111,6 @@ if (exportAttributesBtn) {
 
 // Make functions global for HTML onclick handlers
 window.importKmlData = importKmlData;
-window.toggleGroup = toggleGroup;
 window.showSiteDetails = showSiteDetails;
 window.locateSite = locateSite;
 window.deleteSite = deleteSite;
@@ -5103,50 +5278,126 @@ function updateThematicAttributes() {
 
 function getPointColor(point) {
     if (activeThematicSettings.kml && point.type === 'kml_point') {
-        const settings = activeThematicSettings.kml;
-        let val;
-        if (settings.isCustom) {
-            const prop = point.customProperties?.find(p => p.name === settings.attributeName);
-            val = prop ? prop.value : 'Unknown';
-        } else {
-            val = point[settings.attribute];
-        }
-
-        if (settings.type === 'categorical') {
-            return settings.mapping[val] || '#999999';
-        } else {
-            const numVal = parseFloat(val);
-            if (!isNaN(numVal)) {
-                const range = settings.ranges.find(r => numVal >= r.min && numVal <= r.max);
-                if (range) return range.color;
-            }
-            return '#999999';
-        }
+        return thematicColor(activeThematicSettings.kml, point);
     }
     return point.iconColor || '#ef4444';
 }
 
+// ==================== OFFLINE ====================
+
+// sw.js precaches the page, its scripts and the vendor/ libraries, so later
+// visits start from cache and the app works without a network. Service
+// workers need http(s); opening index.html as a file skips this.
+if ('serviceWorker' in navigator && location.protocol.startsWith('http')) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('sw.js').catch(error => {
+            console.warn('Service worker registration failed:', error);
+        });
+    });
+}
+
+// ==================== INSTRUMENTATION ====================
+//
+// Spans (perf-trace.js) around the import, render, thematic, sync and
+// persistence entry points. Hot render paths are sampled. The HUD is toggled
+// with the Perf map control or Alt+Shift+P and remembered across reloads.
+
+const perfTrace = new PerfTrace();
+let perfHud = null;
+
+importCsvData = perfTrace.wrap('import.csv', importCsvData);
+importKmlData = perfTrace.wrap('import.kml', importKmlData);
+parsePointFileInWorker = perfTrace.wrap('import.parse', parsePointFileInWorker);
+reconcileMapMarkers = perfTrace.wrap('render.markers', reconcileMapMarkers);
+renderVisibleSectors = perfTrace.wrap('render.sectors', renderVisibleSectors, { sampled: true });
+renderSitesList = perfTrace.wrap('render.siteList', renderSitesList, { sampled: true });
+renderKmlList = perfTrace.wrap('render.kmlList', renderKmlList, { sampled: true });
+handleSelection = perfTrace.wrap('render.selection', handleSelection);
+generateThematicSettings = perfTrace.wrap('thematic.settings', generateThematicSettings);
+applyThematicAnalysis = perfTrace.wrap('thematic.apply', applyThematicAnalysis);
+servingAssignments = perfTrace.wrap('thematic.serving', servingAssignments, { sampled: true });
+fetchFromAirtable = perfTrace.wrap('sync.fetch', fetchFromAirtable);
+syncSectorsToAirtable = perfTrace.wrap('sync.push', syncSectorsToAirtable);
+saveData = perfTrace.wrap('persist.save', saveData);
+loadData = perfTrace.wrap('persist.load', loadData);
+
+/**
+ * Layers on the map, by kind
+ */
+function perfLayerCounts() {
+    let mapLayers = 0;
+    map.eachLayer(() => { mapLayers++; });
+    return {
+        layers: mapLayers,
+        sites: markersLayer ? markersLayer.getLayers().length : 0,
+        sectors: sectorsLayer ? sectorsLayer.getLayers().length : 0,
+        points: pointsLayer ? pointsLayer.getLayers().length : 0,
+        kmlPoints: kmlPointLayer ? kmlPointLayer.getPoints().length : 0,
+        coverageCells: coverageLayer && coverageLayer.getRaster() ? coverageLayer.getRaster().length : 0,
+        lines: connectionLinesLayer ? connectionLinesLayer.getLayers().length : 0
+    };
+}
+
+function exportPerfTrace() {
+    const report = perfHud ? perfHud.snapshot() : perfTrace.toJSON({ counts: perfLayerCounts() });
+    const blob = new Blob([JSON.stringify(report, null, 2)], { type: 'application/json' });
+    const link = document.createElement('a');
+    link.href = URL.createObjectURL(blob);
+    link.download = `site-sector-mapper-perf-${new Date().toISOString().replace(/[:.]/g, '-')}.json`;
+    link.click();
+    setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+}
+
+function togglePerfHud(show = !perfHud) {
+    if (show && !perfHud) {
+        perfHud = new PerfHud(perfTrace, { counts: perfLayerCounts, onExport: exportPerfTrace }).addTo(map);
+    } else if (!show && perfHud) {
+        perfHud.remove();
+        perfHud = null;
+    }
+    document.getElementById('togglePerfHudBtn')?.classList.toggle('active', !!perfHud);
+    localStorage.setItem('siteSectorMapper_perfHud', perfHud ? '1' : '0');
+}
+
+function setupPerfHud() {
+    document.getElementById('togglePerfHudBtn')?.addEventListener('click', () => togglePerfHud());
+    document.addEventListener('keydown', (e) => {
+        if (e.altKey && e.shiftKey && e.code === 'KeyP') togglePerfHud();
+    });
+    if (localStorage.getItem('siteSectorMapper_perfHud') === '1') togglePerfHud(true);
+}
+
 console.log('App.js initialization complete');
 
 
 // ==================== THEMATIC ANALYSIS ====================
 
+// Edited items drop out of the thematic column and are classified from their live values
+onDataChange((kind, action, item) => {
+    const settings = kind === 'site' ? activeThematicSettings.sites : activeThematicSettings.kml;
+    if (!settings || !settings.column) return;
+    if (kind === 'site') (item.sectors || []).forEach(sector => settings.column.forget(sector));
+    else settings.column.forget(item);
+});
+
 function applyThematicAnalysis() {
     const siteAttribute = document.getElementById('siteAttribute').value;
     const kmlAttribute = document.getElementById('kmlAttribute').value;
+    const breaks = document.getElementById('thematicBreaks')?.value || 'equal';
+    kmlDisplayMode = document.getElementById('kmlDisplay')?.value || 'points';
 
     // 1. Process Sites Settings
     if (siteAttribute === 'n_a') {
         activeThematicSettings.sites = null;
     } else {
-        activeThematicSettings.sites = generateThematicSettings('sites', siteAttribute);
+        activeThematicSettings.sites = generateThematicSettings('sites', siteAttribute, breaks);
     }
 
     // 2. Process KML Settings
     if (kmlAttribute === 'n_a') {
         activeThematicSettings.kml = null;
     } else {
-        activeThematicSettings.kml = generateThematicSettings('kml', kmlAttribute);
+        activeThematicSettings.kml = generateThematicSettings('kml', kmlAttribute, breaks);
     }
 
     // 3. LEGEND SYNCHRONIZATION
@@ -5196,7 +5447,9 @@ function applyThematicAnalysis() {
     renderThematicLegend();
     renderMapLegend();
 
-    if (activeThematicSettings.sites || activeThematicSettings.kml) {
+    if (kmlDisplayMode !== 'points' && activeThematicSettings.kml && !coverageRasterActive()) {
+        showNotification('Coverage raster needs a numeric KML attribute; showing points', 'warning');
+    } else if (activeThematicSettings.sites || activeThematicSettings.kml) {
         showNotification('Thematic analysis applied', 'success');
     } else {
         showNotification('Analysis cleared (N#A selected for both)', 'info');
@@ -5205,11 +5458,19 @@ function applyThematicAnalysis() {
     // Save settings to localStorage
     localStorage.setItem('siteSectorMapper_thematicSettings', JSON.stringify({
         siteAttribute,
-        kmlAttribute
+        kmlAttribute,
+        breaks,
+        kmlDisplay: kmlDisplayMode
     }));
 }
 
-function generateThematicSettings(source, attribute) {
+/**
+ * Thematic settings for an attribute of all sectors ('sites') or KML points ('kml')
+ * @param {string} source - 'sites' | 'kml'
+ * @param {string} attribute - Attribute name, or 'custom:<name>' for a custom property
+ * @param {string} [breaks='equal'] - 'equal' | 'quantile' classes for generic numeric attributes
+ */
+function generateThematicSettings(source, attribute, breaks = 'equal') {
     let dataItems = [];
     if (source === 'sites') {
         sites.forEach(site => {
@@ -5231,34 +5492,12 @@ function generateThematicSettings(source, attribute) {
         isCustom = true;
     }
 
-    // Analyze Values
-    const values = [];
-    const uniqueValues = new Set();
-    const counts = {};
-
-    dataItems.forEach(item => {
-        let val;
-        if (isCustom) {
-            // Handle both KML and Site Sectors
-            const prop = item.customProperties?.find(p => p.name === attributeName);
-            val = prop ? prop.value : null;
-        } else {
-            val = item[attributeName];
-        }
-
-        if (val !== undefined && val !== null && val !== '') {
-            values.push(val);
-            uniqueValues.add(val);
-            counts[val] = (counts[val] || 0) + 1;
-        }
-    });
-
-    if (values.length === 0) return null;
+    // Analyze Values: one pass into typed columns (thematic-engine.js)
+    const column = new ThematicColumn(dataItems, attributeName, isCustom);
+    if (column.count === 0) return null;
 
     // Determine Type (Numerical vs Categorical)
-    // Use parseNumber to check if values are numerical
-    const isNumerical = values.every(v => parseNumber(v) !== null);
-    let type = isNumerical && uniqueValues.size > 5 ? 'numerical' : 'categorical'; // Heuristic
+    let type = column.allNumeric && column.categories.length > 5 ? 'numerical' : 'categorical'; // Heuristic
 
     // Force categorical for certain attributes
     if (['technology', 'name', 'group', 'sc physical cell id', 'physical cell id', 'pci', 'cell name', 'cell_name'].includes(attributeName.toLowerCase())) {
@@ -5278,27 +5517,28 @@ function generateThematicSettings(source, attribute) {
         type = 'categorical';
     }
 
+    // Numerical attributes with many distinct values are never listed value by value
+    if (type === 'categorical') column.ensureCategories();
+    const listValues = column.categoriesComplete;
+
     const settings = {
         source,
         attribute: attributeName, // Store raw attribute name
         attributeName: attributeName, // Store for custom lookups
         isCustom,
         type,
-        total: values.length,
-        counts,
-        uniqueValues: Array.from(uniqueValues).sort()
+        total: column.count,
+        counts: listValues ? column.counts() : {},
+        uniqueValues: listValues ? column.categories.slice().sort() : [],
+        column
     };
 
     if (type === 'numerical') {
-        // Use parseNumber to robustly parse values (handles commas)
-        const numValues = values.map(v => parseNumber(v)).filter(v => v !== null);
-        const min = Math.min(...numValues);
-        const max = Math.max(...numValues);
+        const min = column.min;
+        const max = column.max;
 
         // Default Ranges Logic
         let ranges = [];
-        console.log('Generating settings for attribute:', attributeName, 'Lower:', attrLower);
-
         if (attrLower.includes('throughput') || attrLower.includes('http download')) {
             ranges = [
                 { min: -Infinity, max: 2000, color: '#ef4444', label: 'Poor (< 2000)' },
@@ -5336,12 +5576,13 @@ function generateThematicSettings(source, attribute) {
                 { min: -10, max: Infinity, color: '#22c55e', label: 'Excellent (> -10 dB)' }
             ];
         } else {
-            // Generic 5-bucket equal interval
-            const step = (max - min) / 5;
+            // Generic 5 classes: equal interval or quantile
+            const bounds = breaks === 'quantile' ? column.quantileBreaks(5) : column.equalIntervalBreaks(5);
             const colors = ['#fee2e2', '#fca5a5', '#f87171', '#ef4444', '#b91c1c']; // Red ramp
+            const classCount = bounds.length - 1;
 
             // Handle single value case
-            if (step === 0) {
+            if (min === max) {
                 ranges.push({
                     min: min,
                     max: max,
@@ -5349,26 +5590,21 @@ function generateThematicSettings(source, attribute) {
                     label: `${min}`
                 });
             } else {
-                for (let i = 0; i < 5; i++) {
+                for (let i = 0; i < classCount; i++) {
                     ranges.push({
-                        min: min + (i * step),
-                        max: min + ((i + 1) * step),
-                        color: colors[i],
-                        label: `${Math.round(min + (i * step))} - ${Math.round(min + ((i + 1) * step))}`
+                        min: bounds[i],
+                        max: bounds[i + 1],
+                        color: colors[Math.round(i * (colors.length - 1) / Math.max(1, classCount - 1))],
+                        label: `${Math.round(bounds[i])} - ${Math.round(bounds[i + 1])}`
                     });
                 }
             }
         }
 
-        // Calculate counts for each range
-        numValues.forEach(val => {
-            const range = ranges.find(r => val >= r.min && val <= r.max);
-            if (range) {
-                range.count = (range.count || 0) + 1;
-            }
-        });
-
+        // Class of every item (also sets the range counts) and the value distribution
         settings.ranges = ranges;
+        settings.classes = column.classify(ranges);
+        if (column.numericCount > 0) settings.histogram = column.histogram(THEMATIC_HISTOGRAM_BINS);
     } else {
         // Categorical Mapping
         const mapping = {};
@@ -5399,6 +5635,45 @@ function clearThematicAnalysis() {
     showNotification('Thematic analysis cleared', 'info');
 }
 
+// ==================== COVERAGE RASTER ====================
+
+// A numeric KML attribute can be drawn as a raster of grid cells instead of
+// one dot per sample (coverage-layer.js), coloured with the same ranges, so
+// the thematic legend applies unchanged.
+
+// A point edited in place keeps its list position: send every sample again
+onDataChange((kind) => {
+    if (kind === 'point' && coverageLayer) coverageLayer.invalidate();
+});
+
+function coverageRasterActive() {
+    const settings = activeThematicSettings.kml;
+    return kmlDisplayMode !== 'points' && !!settings && settings.type === 'numerical';
+}
+
+/**
+ * Value of a KML point under the active settings: the thematic column's
+ * number, or the live value for points added or edited since
+ */
+function coverageSampleValue(settings, point) {
+    const row = settings.column ? settings.column.rowOf(point) : undefined;
+    if (row !== undefined) return settings.column.numbers[row];
+    const value = thematicItemValue(point, settings.attribute, settings.isCustom);
+    return isThematicValuePresent(value) ? thematicNumber(value) : NaN;
+}
+
+/**
+ * Draws the visible KML points as the coverage raster
+ * @param {Array} kmlPoints - Points not in a hidden group
+ */
+function updateCoverageRaster(kmlPoints) {
+    const settings = activeThematicSettings.kml;
+    coverageLayer.setMode(kmlDisplayMode);
+    coverageLayer.setColors(value => thematicRangeColor(settings, value));
+    coverageLayer.setSamples(kmlPoints, point => coverageSampleValue(settings, point), settings);
+    if (!map.hasLayer(coverageLayer)) coverageLayer.addTo(map);
+}
+
 async function searchAddress(query) {
     if (!query || query.trim() === '') {
         showNotification('Please enter an address', 'warning');
@@ -5500,7 +5775,6 @@ let mapLegendControl = null;
 // ==================== DYNAMIC MAP LEGEND ====================
 
 function renderMapLegend() {
-    console.log('Rendering Map Legend...', activeThematicSettings);
     // 1. Remove existing control if it exists (legacy cleanup)
     if (mapLegendControl) {
         map.removeControl(mapLegendControl);
@@ -5758,6 +6032,8 @@ function renderLegendControls(settings, container, title) {
             container.appendChild(item);
         });
     } else {
+        if (settings.histogram) container.appendChild(renderThematicHistogram(settings));
+
         settings.ranges.forEach((range, index) => {
             const item = document.createElement('div');
             item.className = 'legend-item';
@@ -5798,6 +6074,7 @@ function renderLegendControls(settings, container, title) {
 
             minInput.addEventListener('change', (e) => {
                 range.min = parseFloat(e.target.value);
+                reclassifyThematic(settings);
                 // Only update label if it hasn't been customized
                 if (!range.customLabel) {
                     range.label = `${Math.round(range.min)} - ${Math.round(range.max)}`;
@@ -5823,6 +6100,7 @@ function renderLegendControls(settings, container, title) {
 
             maxInput.addEventListener('change', (e) => {
                 range.max = parseFloat(e.target.value);
+                reclassifyThematic(settings);
                 if (!range.customLabel) {
                     range.label = `${Math.round(range.min)} - ${Math.round(range.max)}`;
                 }
@@ -5881,6 +6159,30 @@ function renderLegendControls(settings, container, title) {
     }
 }
 
+/**
+ * Bar chart of the value distribution, bars coloured by their range
+ */
+function renderThematicHistogram(settings) {
+    const { histogram, column } = settings;
+    const chart = document.createElement('div');
+    chart.className = 'thematic-histogram';
+    chart.title = `${column.numericCount.toLocaleString()} values, ${column.min} to ${column.max}`;
+
+    const peak = Math.max(1, ...histogram);
+    const width = (column.max - column.min) / histogram.length;
+    const mins = Float64Array.from(settings.ranges, r => r.min);
+    const maxs = Float64Array.from(settings.ranges, r => r.max);
+
+    histogram.forEach((count, bin) => {
+        const bar = document.createElement('span');
+        const rangeIndex = thematicRangeIndex(column.min + (bin + 0.5) * width, mins, maxs);
+        bar.style.height = `${Math.max(count > 0 ? 4 : 0, Math.round(100 * count / peak))}%`;
+        bar.style.backgroundColor = rangeIndex === THEMATIC_NO_DATA ? THEMATIC_NO_DATA_COLOR : settings.ranges[rangeIndex].color;
+        chart.appendChild(bar);
+    });
+    return chart;
+}
+
 function addThematicRange(settings) {
     if (!settings || settings.type !== 'numerical') return;
 
@@ -5902,6 +6204,7 @@ function addThematicRange(settings) {
     };
 
     ranges.push(newRange);
+    reclassifyThematic(settings);
     renderThematicLegend();
 
     if (settings.source === 'sites') renderVisibleSectors();
@@ -5915,6 +6218,7 @@ function deleteThematicRange(settings, index) {
     if (!settings || settings.type !== 'numerical') return;
 
     settings.ranges.splice(index, 1);
+    reclassifyThematic(settings);
     renderThematicLegend();
 
     if (settings.source === 'sites') renderVisibleSectors();
@@ -5937,13 +6241,36 @@ function generatePalette(count) {
 // ==================== ALARM DATA INTEGRATION ====================
 
 function handleAlarmImport(event) {
-    console.log('handleAlarmImport triggered');
     const file = event.target.files[0];
     if (!file) {
         console.warn('No file selected');
         return;
     }
+    // Reset input so the same file can be picked again
+    event.target.value = '';
+
+    const rows = [];
+    showNotification('Reading alarm workbook...', 'info');
 
+    runImportJob('alarms', file, {
+        onBatch: (message) => {
+            const batch = decodeJsonBatch(message.buffer);
+            for (let i = 0; i < batch.length; i++) rows.push(batch[i]);
+        }
+    }).then(() => {
+        setAlarmRows(rows);
+    }).catch(error => {
+        if (error.name === 'AbortError') return;
+        if (error.workerFailure) {
+            withVendorLibrary('xlsx', () => readAlarmWorkbookOnMainThread(file));
+            return;
+        }
+        console.error('Error parsing Excel file:', error);
+        showNotification('Error parsing Excel file: ' + error.message, 'error');
+    });
+}
+
+function readAlarmWorkbookOnMainThread(file) {
     const reader = new FileReader();
 
     reader.onload = function (e) {
@@ -5952,75 +6279,56 @@ function handleAlarmImport(event) {
             const workbook = XLSX.read(data, { type: 'array' });
 
             // Assume first sheet contains the data
-            const firstSheetName = workbook.SheetNames[0];
-            const worksheet = workbook.Sheets[firstSheetName];
-
-            // Convert to JSON
-            const jsonResults = XLSX.utils.sheet_to_json(worksheet);
-
-            if (jsonResults.length === 0) {
-                showNotification('No data found in the Excel file.', 'warning');
-                return;
-            }
-
-            alarmsData = jsonResults;
-            console.log('Imported Alarms:', alarmsData);
-
-            showNotification(`Successfully imported ${alarmsData.length} alarm records.`, 'success');
-
-            // Re-render map to update click handlers (optional, but good if markers are recreated)
-            // Actually, markers are already created. We modified the click handler in updateMapMarkers.
-            // But existing markers won't have the updated click logic unless we re-render.
-            // Wait, I modified the code to ALWAYS check alarmsData. So if alarmsData is populated, it should work.
-            // BUT, I need to make sure updateMapMarkers was actually updated in the previous step. Yes it was.
-
+            const worksheet = workbook.Sheets[workbook.SheetNames[0]];
+            setAlarmRows(XLSX.utils.sheet_to_json(worksheet));
         } catch (error) {
             console.error('Error parsing Excel file:', error);
             showNotification('Error parsing Excel file: ' + error.message, 'error');
         }
-
-        // Reset input
-        event.target.value = '';
     };
 
     reader.readAsArrayBuffer(file);
 }
 
-function getAlarmsForSite(siteName) {
-    if (!alarmsData || alarmsData.length === 0) return [];
-
-    // Normalize site name for comparison (trim, lowercase?)
-    // Let's try exact match first, then case-insensitive
-    const target = siteName.toString().trim().toLowerCase();
-
-    return alarmsData.filter(row => {
-        // Try to find a column that looks like 'Site' or 'Site Name'
-        // We'll search all keys of the first row to determine the column name?
-        // Or just search all values in the row?
-        // Let's assume common column names.
+/**
+ * Indexes imported alarm rows by site and shows the badges
+ */
+function setAlarmRows(rows) {
+    if (rows.length === 0) {
+        showNotification('No data found in the Excel file.', 'warning');
+        return;
+    }
 
-        const keys = Object.keys(row);
-        let nameInRow = '';
+    alarmsData = rows;
+    alarmIndex = new AlarmIndex(rows, detectAlarmColumns(rows, sites.map(site => site.name)));
+    console.log(`Imported ${rows.length} alarms (site column: ${alarmIndex.siteColumn || 'any'}, severity column: ${alarmIndex.severityColumn || 'none'})`);
 
-        // Priority keys
-        const nameKeys = ['Site', 'Site Name', 'SITE', 'Site_Name', 'Sitename', 'Node', 'NodeName'];
+    refreshAlarmBadges();
+    showNotification(`Successfully imported ${alarmsData.length} alarm records.`, 'success');
+}
 
-        for (const key of keys) {
-            if (nameKeys.includes(key)) {
-                nameInRow = row[key];
-                break;
-            }
-        }
+function getAlarmsForSite(siteName) {
+    return alarmIndex ? alarmIndex.rowsFor(siteName) : [];
+}
 
-        // Fallback: Check if any value matches exactly
-        if (!nameInRow) {
-            return Object.values(row).some(val =>
-                val && val.toString().trim().toLowerCase() === target
-            );
-        }
+/**
+ * Badges for the visible sites that have alarms
+ * @param {Array} [siteList] - Sites on the map
+ */
+function refreshAlarmBadges(siteList = sites) {
+    if (!alarmBadgeLayer) return;
+    if (!alarmIndex) {
+        alarmBadgeLayer.setBadges([]);
+        return;
+    }
 
-        return nameInRow && nameInRow.toString().trim().toLowerCase() === target;
+    const badges = [];
+    siteList.forEach(site => {
+        if (!isSiteVisible(site)) return;
+        const summary = alarmIndex.summaryFor(site.name);
+        if (summary) badges.push({ site, summary });
     });
+    alarmBadgeLayer.setBadges(badges);
 }
 
 function showAlarmsModal(siteName, alarms) {
@@ -0,0 +1,172 @@
+// Times the app's data paths on a sites CSV and a drive-test KML, usually
+// the synthetic ones from sitemapper/synth.py. `python -m sitemapper bench`
+// generates the data, runs this script and merges its results with the
+// Python pipelines; on its own:
+//
+//   node bench.js --sites sites.csv --kml drive.kml [--repeat 3] [--dom-limit 64]
+//
+// The shared modules run as they do in the page (classic scripts in one
+// global scope); parseKml and generateThematicSettings are taken from app.js
+// as written. Prints one JSON object on stdout; app logging goes to stderr.
+const fs = require("fs");
+const path = require("path");
+const vm = require("vm");
+
+const args = {};
+for (let i = 2; i < process.argv.length; i += 2) args[process.argv[i].replace(/^--/, "")] = process.argv[i + 1];
+if (!args.sites || !args.kml) {
+    console.error("usage: node bench.js --sites sites.csv --kml drive.kml [--repeat 3] [--dom-limit MB]");
+    process.exit(2);
+}
+const repeat = Math.max(1, parseInt(args.repeat || "1", 10));
+const domLimit = parseFloat(args["dom-limit"] || "64") * 1024 * 1024;
+
+console.log = (...parts) => console.error(...parts);
+
+["columnar.js", "import-parsers.js", "thematic-engine.js", "sector-geometry.js", "kml-export.js"].forEach(file => {
+    vm.runInThisContext(fs.readFileSync(path.join(__dirname, file), "utf8"), { filename: file });
+});
+
+/**
+ * A top-level function of app.js, by name; they all end at a "}" in column 0
+ */
+function appFunction(name) {
+    const source = fs.readFileSync(path.join(__dirname, "app.js"), "utf8");
+    const start = source.search(new RegExp(`^(async )?function ${name}\\(`, "m"));
+    if (start === -1) throw new Error(`${name} not found in app.js`);
+    return source.slice(start, source.indexOf("\n}", start) + 2);
+}
+
+// The globals generateThematicSettings reads
+vm.runInThisContext(`var sites = [], points = [];\n${appFunction("generateThematicSettings")}`, { filename: "app.js" });
+
+const results = [];
+
+async function bench(name, items, run) {
+    const times = [];
+    let output;
+    for (let i = 0; i < repeat; i++) {
+        const started = process.hrtime.bigint();
+        output = await run();
+        times.push(Number(process.hrtime.bigint() - started) / 1e9);
+    }
+    times.sort((a, b) => a - b);
+    const seconds = times[0];
+    results.push({
+        name,
+        runtime: "node",
+        items: typeof items === "function" ? items(output) : items,
+        seconds,
+        median: times[Math.floor(times.length / 2)],
+        heapMB: Math.round(process.memoryUsage().heapUsed / 1048576)
+    });
+    return output;
+}
+
+function skip(name, reason) {
+    results.push({ name, runtime: "node", skipped: reason });
+}
+
+/**
+ * The rows PapaParse hands processImportData (header: true); synth.py writes
+ * no quoted fields, so splitting on commas is enough here
+ */
+function readCsvRows(file) {
+    const lines = fs.readFileSync(file, "utf8").split(/\r?\n/).filter(Boolean);
+    const header = lines[0].split(",");
+    const rows = lines.slice(1).map(line => {
+        const fields = line.split(",");
+        const row = {};
+        header.forEach((key, i) => { row[key] = fields[i]; });
+        return row;
+    });
+    rows.fields = header;
+    return rows;
+}
+
+/**
+ * Streams a file through KmlPointScanner in the import worker's chunk size
+ */
+function scanKmlFile(file) {
+    const found = [];
+    const scanner = new KmlPointScanner();
+    const decoder = new TextDecoder();
+    const buffer = Buffer.alloc(4 * 1024 * 1024);
+    const onPoint = point => {
+        point.type = "kml_point";
+        point.description = ""; // Not kept by the columnar import batches
+        found.push(point);
+    };
+    const fd = fs.openSync(file, "r");
+    try {
+        let read;
+        while ((read = fs.readSync(fd, buffer, 0, buffer.length, null)) > 0) {
+            scanner.write(decoder.decode(buffer.subarray(0, read), { stream: true }), onPoint);
+        }
+        scanner.write(decoder.decode(), onPoint);
+    } finally {
+        fs.closeSync(fd);
+    }
+    return found;
+}
+
+function countingSink() {
+    const sink = { bytes: 0, write(bytes) { sink.bytes += bytes.length; }, close() {} };
+    return sink;
+}
+
+async function main() {
+    const kmlBytes = fs.statSync(args.kml).size;
+
+    // KML import: the worker's streaming scanner, then the DOMParser path
+    const parsed = await bench("KmlPointScanner", list => list.length, () => scanKmlFile(args.kml));
+
+    let JSDOM = null;
+    try {
+        ({ JSDOM } = require("jsdom"));
+    } catch (e) {
+        skip("parseKml", "jsdom is not installed (npm install)");
+    }
+    if (JSDOM && kmlBytes > domLimit) {
+        skip("parseKml", `KML is ${Math.round(kmlBytes / 1048576)} MB, over --dom-limit`);
+    } else if (JSDOM) {
+        global.DOMParser = new JSDOM("<!DOCTYPE html>").window.DOMParser;
+        vm.runInThisContext(appFunction("parseKml"), { filename: "app.js" });
+        const text = fs.readFileSync(args.kml, "utf8");
+        await bench("parseKml", list => list.length, () => parseKml(text));
+    }
+
+    // Site import: what processImportData and importCsvData do with the rows
+    const rawRows = readCsvRows(args.sites);
+    let counter = 0;
+    const siteList = await bench("processImportData", rawRows.length, () => {
+        const rows = mapImportRows(rawRows, compileSiteImportPlan(rawRows.fields, rawRows));
+        summarizeImportRows(rows);
+        return groupRowsIntoSites(rows, () => `site-${++counter}`);
+    });
+
+    // Thematic analysis over every sector and every sample
+    sites = siteList;
+    points = parsed;
+    const sectorCount = siteList.reduce((total, site) => total + site.sectors.length, 0);
+    await bench("generateThematicSettings sites/technology", sectorCount,
+        () => generateThematicSettings("sites", "technology"));
+    await bench("generateThematicSettings kml/RSCP", parsed.length,
+        () => generateThematicSettings("kml", "custom:Categorized RSCP:A1"));
+    await bench("generateThematicSettings kml/Cell Name", parsed.length,
+        () => generateThematicSettings("kml", "custom:Cell Name"));
+
+    // Export: writeSitesKml is exportToKML without the file picker
+    await bench("exportToKML full", sectorCount, () => writeSitesKml(siteList, "full", countingSink()));
+    if (typeof CompressionStream !== "undefined") {
+        await bench("exportToKML full kmz", sectorCount,
+            () => writeSitesKml(siteList, "full", createKmzSink(countingSink())));
+    }
+
+    process.stdout.write(JSON.stringify({ node: process.version, kmlBytes, results }) + "\n");
+}
+
+main().catch(error => {
+    console.error(error);
+    process.exit(1);
+});
@@ -0,0 +1,287 @@
+// Site Sector Mapper - Columnar Point Storage
+//
+// Compact binary layout for KML/drive-test points ("SSMC"), shared by the app,
+// the import worker and the Python converter (sitemapper/columnar.py).
+//
+//   0   'SSMC' magic
+//   4   uint32 LE format version
+//   8   uint32 LE header length (UTF-8 JSON)
+//   12  header JSON, zero-padded to an 8-byte boundary
+//   ..  data section: one 8-byte aligned buffer per column array
+//
+// Header: { count, columns: [{ name, role: 'field'|'attribute', type, ... }] }
+//   float64  Float64Array, NaN = missing. valueType 'string' attributes are
+//            restored with String(value).
+//   dict     Uint8/16/32 indices into `dictionary`; index 0 = missing.
+//   text     Uint32 UTF-16 offsets (count + 1) into one UTF-8 blob, plus an
+//            optional Uint8 presence array when some rows are missing.
+
+const COLUMNAR_MAGIC = 'SSMC';
+const COLUMNAR_VERSION = 1;
+
+// Top-level point fields stored as columns (column name -> point property)
+const COLUMNAR_FIELDS = {
+    id: 'id',
+    name: 'name',
+    description: 'description',
+    group: 'group',
+    color: 'iconColor'
+};
+
+function isCanonicalNumberString(value) {
+    // Only strings that survive a Number -> String round trip can be stored as float64
+    if (typeof value !== 'string' || value === '' || value === '-0') return false;
+    const num = Number(value);
+    return Number.isFinite(num) && String(num) === value;
+}
+
+function columnarIndexType(dictionarySize) {
+    if (dictionarySize < 0xFF) return 'uint8';
+    if (dictionarySize < 0xFFFF) return 'uint16';
+    return 'uint32';
+}
+
+const COLUMNAR_ARRAY_TYPES = {
+    float64: Float64Array,
+    uint8: Uint8Array,
+    uint16: Uint16Array,
+    uint32: Uint32Array
+};
+
+/**
+ * Chooses the storage for one column of raw values (undefined = missing)
+ * @param {Array} values
+ * @returns {Object} Column descriptor with typed arrays still attached
+ */
+function buildColumnarColumn(name, role, values) {
+    const count = values.length;
+    let present = 0;
+    let allNumbers = true;
+    let allNumericStrings = true;
+    const distinct = new Map();
+
+    for (let i = 0; i < count; i++) {
+        const v = values[i];
+        if (v === undefined || v === null) continue;
+        present++;
+        if (typeof v !== 'number') allNumbers = false;
+        if (!isCanonicalNumberString(v)) allNumericStrings = false;
+        if (distinct.size <= 0xFFFF && !distinct.has(v)) distinct.set(v, distinct.size + 1);
+    }
+
+    if (present > 0 && role === 'attribute' && (allNumbers || allNumericStrings)) {
+        const data = new Float64Array(count);
+        for (let i = 0; i < count; i++) {
+            const v = values[i];
+            data[i] = (v === undefined || v === null) ? NaN : Number(v);
+        }
+        return { name, role, type: 'float64', valueType: allNumbers ? 'number' : 'string', arrays: { data } };
+    }
+
+    if (distinct.size <= 0xFFFF && distinct.size <= Math.max(16, count >> 2)) {
+        const indexType = columnarIndexType(distinct.size + 1);
+        const indices = new COLUMNAR_ARRAY_TYPES[indexType](count);
+        for (let i = 0; i < count; i++) {
+            const v = values[i];
+            indices[i] = (v === undefined || v === null) ? 0 : distinct.get(v);
+        }
+        return { name, role, type: 'dict', index: indexType, dictionary: Array.from(distinct.keys()), arrays: { indices } };
+    }
+
+    // High-cardinality strings (ids, descriptions)
+    const offsets = new Uint32Array(count + 1);
+    const presence = present < count ? new Uint8Array(count) : null;
+    const parts = [];
+    let length = 0;
+    for (let i = 0; i < count; i++) {
+        const v = values[i];
+        if (v !== undefined && v !== null) {
+            const str = String(v);
+            parts.push(str);
+            length += str.length;
+            if (presence) presence[i] = 1;
+        }
+        offsets[i + 1] = length;
+    }
+    const arrays = { offsets, blob: new TextEncoder().encode(parts.join('')) };
+    if (presence) arrays.presence = presence;
+    return { name, role, type: 'text', arrays };
+}
+
+/**
+ * Encodes KML points into a single SSMC ArrayBuffer
+ * @param {Array} pointList - kml_point objects
+ * @returns {ArrayBuffer}
+ */
+function encodeColumnarPoints(pointList) {
+    const count = pointList.length;
+    const latitude = new Float64Array(count);
+    const longitude = new Float64Array(count);
+    const fieldValues = {};
+    Object.keys(COLUMNAR_FIELDS).forEach(col => { fieldValues[col] = new Array(count); });
+    const attributeValues = new Map();
+
+    for (let i = 0; i < count; i++) {
+        const point = pointList[i];
+        latitude[i] = point.latitude;
+        longitude[i] = point.longitude;
+        for (const [col, prop] of Object.entries(COLUMNAR_FIELDS)) {
+            fieldValues[col][i] = point[prop];
+        }
+        const props = point.customProperties;
+        if (props) {
+            for (let j = 0; j < props.length; j++) {
+                const prop = props[j];
+                let column = attributeValues.get(prop.name);
+                if (!column) {
+                    column = new Array(count);
+                    attributeValues.set(prop.name, column);
+                }
+                column[i] = prop.value;
+            }
+        }
+    }
+
+    const columns = [
+        { name: 'latitude', role: 'field', type: 'float64', arrays: { data: latitude } },
+        { name: 'longitude', role: 'field', type: 'float64', arrays: { data: longitude } }
+    ];
+    for (const col of Object.keys(COLUMNAR_FIELDS)) {
+        columns.push(buildColumnarColumn(col, 'field', fieldValues[col]));
+    }
+    for (const [name, values] of attributeValues) {
+        columns.push(buildColumnarColumn(name, 'attribute', values));
+    }
+
+    return writeColumnarBuffer(count, columns);
+}
+
+function writeColumnarBuffer(count, columns) {
+    // Lay out the data section, 8-byte aligned per array
+    let dataLength = 0;
+    const headerColumns = columns.map(column => {
+        const { arrays, ...descriptor } = column;
+        descriptor.buffers = {};
+        for (const [key, array] of Object.entries(arrays)) {
+            descriptor.buffers[key] = { offset: dataLength, byteLength: array.byteLength };
+            dataLength += Math.ceil(array.byteLength / 8) * 8;
+        }
+        return descriptor;
+    });
+
+    const headerBytes = new TextEncoder().encode(JSON.stringify({ count, columns: headerColumns }));
+    const dataStart = Math.ceil((12 + headerBytes.byteLength) / 8) * 8;
+    const buffer = new ArrayBuffer(dataStart + dataLength);
+    const bytes = new Uint8Array(buffer);
+    const view = new DataView(buffer);
+
+    for (let i = 0; i < 4; i++) bytes[i] = COLUMNAR_MAGIC.charCodeAt(i);
+    view.setUint32(4, COLUMNAR_VERSION, true);
+    view.setUint32(8, headerBytes.byteLength, true);
+    bytes.set(headerBytes, 12);
+
+    columns.forEach((column, i) => {
+        for (const [key, array] of Object.entries(column.arrays)) {
+            const target = headerColumns[i].buffers[key];
+            bytes.set(new Uint8Array(array.buffer, array.byteOffset, array.byteLength), dataStart + target.offset);
+        }
+    });
+
+    return buffer;
+}
+
+/**
+ * Decodes an SSMC buffer into typed column views (no per-point objects)
+ * @param {ArrayBuffer} buffer
+ * @returns {{count: number, columns: Object}} columns keyed by name
+ */
+function decodeColumnarPoints(buffer) {
+    const bytes = new Uint8Array(buffer);
+    const magic = String.fromCharCode(bytes[0], bytes[1], bytes[2], bytes[3]);
+    if (magic !== COLUMNAR_MAGIC) throw new Error('Not a columnar point file');
+
+    const view = new DataView(buffer);
+    const version = view.getUint32(4, true);
+    if (version > COLUMNAR_VERSION) throw new Error(`Unsupported columnar format version ${version}`);
+
+    const headerLength = view.getUint32(8, true);
+    const header = JSON.parse(new TextDecoder().decode(bytes.subarray(12, 12 + headerLength)));
+    const dataStart = Math.ceil((12 + headerLength) / 8) * 8;
+
+    const columns = {};
+    header.columns.forEach(descriptor => {
+        const column = { ...descriptor };
+        for (const [key, ref] of Object.entries(descriptor.buffers)) {
+            let ArrayType;
+            if (descriptor.type === 'float64') ArrayType = Float64Array;
+            else if (descriptor.type === 'dict') ArrayType = COLUMNAR_ARRAY_TYPES[descriptor.index];
+            else ArrayType = key === 'offsets' ? Uint32Array : Uint8Array;
+            column[key] = new ArrayType(buffer, dataStart + ref.offset, ref.byteLength / ArrayType.BYTES_PER_ELEMENT);
+        }
+        if (descriptor.type === 'text') {
+            // One decode for the whole column; rows are cheap substrings
+            column.text = new TextDecoder().decode(column.blob);
+        }
+        columns[descriptor.name] = column;
+    });
+
+    return { count: header.count, columns };
+}
+
+/**
+ * Reads one cell of a decoded column
+ * @returns {*} value, or undefined when missing
+ */
+function columnarValue(column, i) {
+    if (column.type === 'float64') {
+        const num = column.data[i];
+        if (Number.isNaN(num)) return undefined;
+        return column.valueType === 'string' ? String(num) : num;
+    }
+    if (column.type === 'dict') {
+        const idx = column.indices[i];
+        return idx === 0 ? undefined : column.dictionary[idx - 1];
+    }
+    if (column.presence && !column.presence[i]) return undefined;
+    return column.text.substring(column.offsets[i], column.offsets[i + 1]);
+}
+
+/**
+ * Materializes decoded columns as kml_point objects
+ * @param {{count: number, columns: Object}} table
+ * @param {string} defaultGroup - Group for files without a group column
+ * @returns {Array}
+ */
+function columnarToPoints(table, defaultGroup = 'Unknown KML') {
+    const { count, columns } = table;
+    const lat = columns.latitude.data;
+    const lng = columns.longitude.data;
+    const attributes = Object.values(columns).filter(c => c.role === 'attribute');
+    const get = (name, i) => columns[name] ? columnarValue(columns[name], i) : undefined;
+    const idBase = `kml-${Date.now().toString(36)}-`;
+
+    const result = new Array(count);
+    for (let i = 0; i < count; i++) {
+        const customProperties = [];
+        for (let j = 0; j < attributes.length; j++) {
+            const value = columnarValue(attributes[j], i);
+            if (value !== undefined) customProperties.push({ name: attributes[j].name, value });
+        }
+        const color = get('color', i) || '#ef4444';
+        result[i] = {
+            id: get('id', i) || idBase + i,
+            name: get('name', i) || 'Untitled Point',
+            latitude: lat[i],
+            longitude: lng[i],
+            description: get('description', i) || '',
+            type: 'kml_point',
+            group: get('group', i) || defaultGroup,
+            sectors: [],
+            iconShape: 'circle',
+            iconColor: color,
+            iconSize: 10,
+            customProperties
+        };
+    }
+    return result;
+}
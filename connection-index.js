@@ -0,0 +1,222 @@
+// Site Sector Mapper - Connection Index
+//
+// Hash lookups behind the connection lines: normalized cell name -> sectors
+// for a clicked sample, and cell name / site name / EARFCN -> KML points for a
+// clicked sector. Every site and point remembers the keys it was filed under,
+// so an edit or delete only touches its own entries.
+
+function normalizeMatchKey(value) {
+    return String(value).trim().toLowerCase();
+}
+
+function isCellNameProperty(name) {
+    const key = name.toLowerCase();
+    return key.includes('cell') && key.includes('name');
+}
+
+/**
+ * EARFCN values of a property, split on common delimiters
+ * @returns {Array<string>} Normalized values
+ */
+function splitEarfcnValues(value) {
+    return String(value).split(/[,;/\s]+/).map(part => part.trim().toLowerCase()).filter(Boolean);
+}
+
+/**
+ * The serving cell name of a sample: its "Cell Name" attribute, else cellName/name
+ */
+function pointCellName(point) {
+    let cellName = null;
+    if (point.customProperties) {
+        const prop = point.customProperties.find(p => isCellNameProperty(p.name));
+        if (prop) cellName = prop.value;
+    }
+    if (!cellName && point.cellName) cellName = point.cellName;
+    if (!cellName && point.name) cellName = point.name;
+    return cellName;
+}
+
+/**
+ * Names a sector can be referenced by: cell_name, name and "Cell Name" attributes
+ */
+function sectorCellKeys(sector) {
+    const keys = [];
+    if (sector.cell_name) keys.push(normalizeMatchKey(sector.cell_name));
+    if (sector.name) keys.push(normalizeMatchKey(sector.name));
+    if (sector.customProperties) {
+        sector.customProperties.forEach(p => {
+            if (isCellNameProperty(p.name)) keys.push(normalizeMatchKey(p.value));
+        });
+    }
+    return Array.from(new Set(keys.filter(Boolean)));
+}
+
+function sectorEarfcnValues(sector) {
+    const values = [];
+    if (sector.customProperties) {
+        sector.customProperties.forEach(prop => {
+            if (prop.name.toLowerCase().includes('earfcn') && prop.value) values.push(...splitEarfcnValues(prop.value));
+        });
+    }
+    return values;
+}
+
+function isNumericMatchValue(value) {
+    return value !== '' && Number.isFinite(Number(value));
+}
+
+function addToMultiMap(map, key, value) {
+    let bucket = map.get(key);
+    if (!bucket) {
+        bucket = new Set();
+        map.set(key, bucket);
+    }
+    bucket.add(value);
+}
+
+function removeFromMultiMap(map, key, value) {
+    const bucket = map.get(key);
+    if (!bucket) return;
+    bucket.delete(value);
+    if (bucket.size === 0) map.delete(key);
+}
+
+class ConnectionIndex {
+    constructor() {
+        this.sectorsByCell = new Map(); // cell key -> Set of { site, sector }
+        this.siteEntries = new Map(); // site id -> [[cell key, entry], ...]
+        this.pointsByValue = new Map(); // cell/identifier value -> Set of points
+        this.pointsBySite = new Map(); // "site" attribute value -> Set of points
+        this.pointsByEarfcn = new Map(); // EARFCN -> Set of points
+        this.pointRecords = new Map(); // point id -> { point, values, siteValues, earfcns, names }
+    }
+
+    clear() {
+        this.sectorsByCell.clear();
+        this.siteEntries.clear();
+        this.pointsByValue.clear();
+        this.pointsBySite.clear();
+        this.pointsByEarfcn.clear();
+        this.pointRecords.clear();
+    }
+
+    load(siteList, pointList) {
+        this.clear();
+        siteList.forEach(site => this.addSite(site));
+        pointList.forEach(point => this.addPoint(point));
+    }
+
+    /**
+     * Files a site's sectors, replacing whatever the same site id had before
+     */
+    addSite(site) {
+        this.removeSite(site);
+        const entries = [];
+        (site.sectors || []).forEach(sector => {
+            const entry = { site, sector };
+            sectorCellKeys(sector).forEach(key => {
+                addToMultiMap(this.sectorsByCell, key, entry);
+                entries.push([key, entry]);
+            });
+        });
+        this.siteEntries.set(site.id, entries);
+    }
+
+    removeSite(site) {
+        const entries = this.siteEntries.get(site.id);
+        if (!entries) return;
+        entries.forEach(([key, entry]) => removeFromMultiMap(this.sectorsByCell, key, entry));
+        this.siteEntries.delete(site.id);
+    }
+
+    /**
+     * Files a KML point, replacing whatever the same point id had before
+     */
+    addPoint(point) {
+        this.removePoint(point);
+        if (point.type !== 'kml_point') return;
+
+        const values = new Set();
+        const siteValues = new Set();
+        const earfcns = new Set();
+        const names = [];
+
+        [point.name, point.cellName].forEach(value => {
+            if (!value) return;
+            const key = normalizeMatchKey(value);
+            values.add(key);
+            names.push(key);
+        });
+
+        if (point.customProperties) {
+            point.customProperties.forEach(prop => {
+                if (!prop.value) return;
+                const value = normalizeMatchKey(prop.value);
+                const name = prop.name.toLowerCase();
+                // Measurements are numeric; cell references may be too (cell ids)
+                if (name.includes('cell') || !isNumericMatchValue(value)) values.add(value);
+                if (name.includes('site')) siteValues.add(value);
+                if (name.includes('earfcn')) splitEarfcnValues(value).forEach(e => earfcns.add(e));
+            });
+        }
+
+        values.forEach(value => addToMultiMap(this.pointsByValue, value, point));
+        siteValues.forEach(value => addToMultiMap(this.pointsBySite, value, point));
+        earfcns.forEach(value => addToMultiMap(this.pointsByEarfcn, value, point));
+        this.pointRecords.set(point.id, { point, values, siteValues, earfcns, names });
+    }
+
+    removePoint(point) {
+        const record = this.pointRecords.get(point.id);
+        if (!record) return;
+        record.values.forEach(value => removeFromMultiMap(this.pointsByValue, value, record.point));
+        record.siteValues.forEach(value => removeFromMultiMap(this.pointsBySite, value, record.point));
+        record.earfcns.forEach(value => removeFromMultiMap(this.pointsByEarfcn, value, record.point));
+        this.pointRecords.delete(point.id);
+    }
+
+    /**
+     * Sectors referenced by a cell name
+     * @returns {Array<{site, sector}>} In site/sector order
+     */
+    findSectors(cellName) {
+        const bucket = this.sectorsByCell.get(normalizeMatchKey(cellName));
+        return bucket ? Array.from(bucket) : [];
+    }
+
+    /**
+     * KML points served by a sector: points naming its cell, plus points on
+     * one of its EARFCNs that belong to the sector's site
+     * @returns {Array}
+     */
+    findPointsForSector(sector, site) {
+        const targetName = sector.cell_name ? normalizeMatchKey(sector.cell_name) : (sector.name ? normalizeMatchKey(sector.name) : null);
+        const siteName = site.name ? normalizeMatchKey(site.name) : null;
+        const earfcns = sectorEarfcnValues(sector);
+        const matches = new Set();
+
+        if (targetName) {
+            const bucket = this.pointsByValue.get(targetName);
+            if (bucket) bucket.forEach(point => matches.add(point));
+        }
+
+        if (siteName && earfcns.length > 0) {
+            const bySite = this.pointsBySite.get(siteName);
+            earfcns.forEach(earfcn => {
+                const bucket = this.pointsByEarfcn.get(earfcn);
+                if (!bucket) return;
+                bucket.forEach(point => {
+                    if (matches.has(point)) return;
+                    // Site context: a "site" attribute equal to the site name, or the
+                    // site name inside the point's name/cellName
+                    const record = this.pointRecords.get(point.id);
+                    if ((bySite && bySite.has(point)) || record.names.some(name => name.includes(siteName))) {
+                        matches.add(point);
+                    }
+                });
+            });
+        }
+
+        return Array.from(matches);
+    }
+}
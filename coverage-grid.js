@@ -0,0 +1,292 @@
+// Site Sector Mapper - Coverage Grid
+//
+// Bins drive-test samples into square cells fixed to the Web Mercator pixel
+// grid of a zoom level, COVERAGE_CELL_PX screen pixels a side, keeping the
+// sample count and value sum of every occupied cell. A grid remembers how many
+// samples it has binned, so samples appended later (the next KML file) only
+// cost their own pass, and binning can stop after any chunk and resume. A
+// raster is the occupied cells with their mean; in 'idw' mode the empty cells
+// within COVERAGE_IDW_RADIUS of them are filled by inverse distance weighting,
+// which closes the gaps between samples along a route but leaves real
+// coverage holes empty. Loaded by the page and by coverage-worker.js.
+
+const COVERAGE_CELL_PX = 8; // Cell side in CSS pixels at the grid's zoom
+const COVERAGE_MAX_ZOOM = 20; // Finer map zooms draw this grid scaled up
+const COVERAGE_IDW_RADIUS = 2; // Cells filled around each occupied cell in 'idw' mode
+const COVERAGE_CACHED_GRIDS = 6; // Zoom levels whose bins are kept
+const COVERAGE_MAX_LATITUDE = 85.0511287798;
+
+/**
+ * Growable typed columns of projected samples: Web Mercator fractions and values
+ */
+class CoverageSamples {
+    constructor() {
+        this.length = 0;
+        this.mercX = new Float64Array(1024);
+        this.mercY = new Float64Array(1024);
+        this.values = new Float64Array(1024);
+    }
+
+    /**
+     * Projects and stores samples; those without a finite value are skipped
+     * @param {Float64Array} latitudes
+     * @param {Float64Array} longitudes
+     * @param {Float64Array} values - NaN where a sample has no number
+     */
+    append(latitudes, longitudes, values) {
+        this.reserve(this.length + values.length);
+        let length = this.length;
+        for (let i = 0; i < values.length; i++) {
+            const value = values[i];
+            if (!isFinite(value)) continue;
+            const lat = Math.max(-COVERAGE_MAX_LATITUDE, Math.min(COVERAGE_MAX_LATITUDE, latitudes[i]));
+            const sin = Math.sin(lat * Math.PI / 180);
+            this.mercX[length] = 0.5 + longitudes[i] / 360;
+            this.mercY[length] = 0.5 - Math.log((1 + sin) / (1 - sin)) / (4 * Math.PI);
+            this.values[length] = value;
+            length++;
+        }
+        this.length = length;
+    }
+
+    reserve(capacity) {
+        if (capacity <= this.values.length) return;
+        const size = Math.max(capacity, this.values.length * 2);
+        ['mercX', 'mercY', 'values'].forEach(key => {
+            const grown = new Float64Array(size);
+            grown.set(this[key].subarray(0, this.length));
+            this[key] = grown;
+        });
+    }
+}
+
+/**
+ * Open-addressing hash of (row, column) -> cell index on typed arrays; a Map
+ * keyed by row * side + column slows down once keys pass the small-integer range
+ */
+class CoverageCellTable {
+    constructor(capacity = 1024) {
+        this.size = 0;
+        this.allocate(capacity);
+    }
+
+    allocate(capacity) {
+        this.mask = capacity - 1;
+        this.rows = new Int32Array(capacity);
+        this.columns = new Int32Array(capacity);
+        this.cells = new Int32Array(capacity).fill(-1);
+    }
+
+    slot(row, column) {
+        let slot = (Math.imul(row, 0x9e3779b1) ^ Math.imul(column, 0x85ebca6b)) & this.mask;
+        while (this.cells[slot] !== -1 && (this.rows[slot] !== row || this.columns[slot] !== column)) {
+            slot = (slot + 1) & this.mask;
+        }
+        return slot;
+    }
+
+    /**
+     * @returns {number} The cell, or -1
+     */
+    get(row, column) {
+        return this.cells[this.slot(row, column)];
+    }
+
+    set(row, column, cell) {
+        // Kept at most half full, so probe runs stay short
+        if ((this.size + 1) * 2 > this.mask + 1) this.rehash();
+        const slot = this.slot(row, column);
+        if (this.cells[slot] === -1) this.size++;
+        this.rows[slot] = row;
+        this.columns[slot] = column;
+        this.cells[slot] = cell;
+    }
+
+    rehash() {
+        const { rows, columns, cells } = this;
+        this.allocate((this.mask + 1) * 2);
+        for (let i = 0; i < cells.length; i++) {
+            if (cells[i] === -1) continue;
+            const slot = this.slot(rows[i], columns[i]);
+            this.rows[slot] = rows[i];
+            this.columns[slot] = columns[i];
+            this.cells[slot] = cells[i];
+        }
+    }
+}
+
+class CoverageGrid {
+    constructor(zoom) {
+        this.zoom = zoom;
+        this.side = Math.pow(2, zoom) * 256 / COVERAGE_CELL_PX; // Cells across the world
+        this.binned = 0; // Samples added so far
+        this.index = new CoverageCellTable();
+        this.length = 0;
+        this.columns = new Int32Array(256);
+        this.rows = new Int32Array(256);
+        this.counts = new Uint32Array(256);
+        this.sums = new Float64Array(256);
+    }
+
+    /**
+     * Bins samples [binned, end)
+     * @param {CoverageSamples} samples
+     * @param {number} [end] - Defaults to every sample
+     */
+    add(samples, end = samples.length) {
+        const side = this.side;
+        const index = this.index;
+        const mercX = samples.mercX, mercY = samples.mercY, values = samples.values;
+        for (let i = this.binned; i < end; i++) {
+            const column = Math.min(side - 1, Math.max(0, Math.floor(mercX[i] * side)));
+            const row = Math.min(side - 1, Math.max(0, Math.floor(mercY[i] * side)));
+            let cell = index.get(row, column);
+            if (cell === -1) {
+                cell = this.length++;
+                if (cell === this.counts.length) this.grow();
+                index.set(row, column, cell);
+                this.columns[cell] = column;
+                this.rows[cell] = row;
+            }
+            this.counts[cell]++;
+            this.sums[cell] += values[i];
+        }
+        this.binned = Math.max(this.binned, end);
+    }
+
+    grow() {
+        ['columns', 'rows', 'counts', 'sums'].forEach(key => {
+            const grown = new this[key].constructor(this[key].length * 2);
+            grown.set(this[key]);
+            this[key] = grown;
+        });
+    }
+
+    /**
+     * Cells to draw, as parallel arrays: count is 0 for cells filled by IDW
+     * @param {string} mode - 'mean' | 'idw'
+     * @returns {Object} { zoom, mode, samples, length, columns, rows, values, counts }
+     */
+    toRaster(mode) {
+        const occupied = this.length;
+        const fill = mode === 'idw' ? this.interpolate() : null;
+        const length = occupied + (fill ? fill.length : 0);
+        const raster = {
+            zoom: this.zoom,
+            mode,
+            samples: this.binned,
+            length,
+            columns: new Int32Array(length),
+            rows: new Int32Array(length),
+            values: new Float64Array(length),
+            counts: new Uint32Array(length)
+        };
+        raster.columns.set(this.columns.subarray(0, occupied));
+        raster.rows.set(this.rows.subarray(0, occupied));
+        raster.counts.set(this.counts.subarray(0, occupied));
+        for (let cell = 0; cell < occupied; cell++) raster.values[cell] = this.sums[cell] / this.counts[cell];
+        if (fill) {
+            raster.columns.set(fill.columns, occupied);
+            raster.rows.set(fill.rows, occupied);
+            raster.values.set(fill.values, occupied);
+        }
+        return raster;
+    }
+
+    /**
+     * Empty cells within COVERAGE_IDW_RADIUS of an occupied one, valued by the
+     * occupied cells around them weighted by 1 / distance²
+     */
+    interpolate() {
+        const side = this.side;
+        const radius = COVERAGE_IDW_RADIUS;
+        const slots = new CoverageCellTable(); // Empty cell -> index into the arrays below
+        const columns = [], rows = [], weights = [], weighted = [];
+
+        for (let cell = 0; cell < this.length; cell++) {
+            const mean = this.sums[cell] / this.counts[cell];
+            const column = this.columns[cell], row = this.rows[cell];
+            for (let dy = -radius; dy <= radius; dy++) {
+                const y = row + dy;
+                if (y < 0 || y >= side) continue;
+                for (let dx = -radius; dx <= radius; dx++) {
+                    const distance = dx * dx + dy * dy;
+                    const x = column + dx;
+                    if (distance === 0 || distance > radius * radius || x < 0 || x >= side) continue;
+                    if (this.index.get(y, x) !== -1) continue;
+                    let slot = slots.get(y, x);
+                    if (slot === -1) {
+                        slot = columns.length;
+                        slots.set(y, x, slot);
+                        columns.push(x);
+                        rows.push(y);
+                        weights.push(0);
+                        weighted.push(0);
+                    }
+                    weights[slot] += 1 / distance;
+                    weighted[slot] += mean / distance;
+                }
+            }
+        }
+
+        const values = new Float64Array(columns.length);
+        for (let slot = 0; slot < values.length; slot++) values[slot] = weighted[slot] / weights[slot];
+        return { length: values.length, columns, rows, values };
+    }
+}
+
+/**
+ * The samples and the per-zoom grids binned from them
+ */
+class CoverageEngine {
+    constructor() {
+        this.samples = new CoverageSamples();
+        this.grids = new Map(); // zoom -> CoverageGrid
+    }
+
+    reset() {
+        this.samples = new CoverageSamples();
+        this.grids.clear();
+    }
+
+    append(latitudes, longitudes, values) {
+        this.samples.append(latitudes, longitudes, values);
+    }
+
+    grid(zoom) {
+        let grid = this.grids.get(zoom);
+        if (!grid) {
+            grid = new CoverageGrid(zoom);
+            this.grids.set(zoom, grid);
+            // Drop the grid furthest from the zoom in use
+            if (this.grids.size > COVERAGE_CACHED_GRIDS) {
+                const furthest = Array.from(this.grids.keys())
+                    .sort((a, b) => Math.abs(b - zoom) - Math.abs(a - zoom))[0];
+                this.grids.delete(furthest);
+            }
+        }
+        return grid;
+    }
+
+    /**
+     * Bins up to `budget` more samples into a zoom's grid
+     * @returns {boolean} True once the grid holds every sample
+     */
+    bin(zoom, budget = Infinity) {
+        const grid = this.grid(zoom);
+        grid.add(this.samples, Math.min(this.samples.length, grid.binned + budget));
+        return grid.binned === this.samples.length;
+    }
+
+    raster(zoom, mode) {
+        this.bin(zoom);
+        return this.grid(zoom).toRaster(mode);
+    }
+}
+
+/**
+ * Grid zoom used to draw a map zoom
+ */
+function coverageGridZoom(mapZoom) {
+    return Math.max(0, Math.min(COVERAGE_MAX_ZOOM, Math.round(mapZoom)));
+}
@@ -0,0 +1,276 @@
+// Site Sector Mapper - Coverage Raster Layer
+//
+// Draws drive-test samples as a coverage raster on a single canvas: one
+// square per grid cell, coloured from the cell's mean value (or its IDW
+// estimate), so millions of samples cost a few thousand rectangles and the
+// gaps between them show as holes. Binning runs in coverage-worker.js (or on
+// the main thread when workers are unavailable). Finished rasters are cached
+// per zoom level; while a zoom's raster is being binned, the nearest cached
+// one is drawn scaled. Samples appended to the end of the previous list are
+// sent on their own, so importing one more file does not re-send the rest.
+
+const COVERAGE_CACHED_RASTERS = 8; // Zoom levels whose rasters are kept for redraws
+
+const CoverageRasterLayer = L.Layer.extend({
+    options: {
+        pane: 'overlayPane',
+        mode: 'mean', // 'mean' | 'idw'
+        opacity: 0.75,
+        padding: 0.1
+    },
+
+    initialize(options) {
+        L.setOptions(this, options);
+        this._colorOf = () => null;
+        this._rasters = new Map(); // zoom -> raster (coverage-grid.js)
+        this._generation = 0;
+        this._sampleCount = 0; // Valued samples sent for binning (a current raster has binned them all)
+        this._source = { key: null, points: [], valueOf: null, length: 0, first: null, last: null };
+        this._pending = null; // Zoom being binned
+        this._worker = null;
+        this._engine = null; // Main-thread fallback
+    },
+
+    /**
+     * Sets the sampled points. A list that extends the previous one with the
+     * same key only sends its new tail.
+     * @param {Array} pointList - Objects with latitude/longitude
+     * @param {Function} valueOf - point -> number, NaN when it has no value
+     * @param {*} key - Identity of the values (e.g. the thematic settings object)
+     */
+    setSamples(pointList, valueOf, key) {
+        const source = this._source;
+        const count = pointList.length;
+        const appended = source.key === key && count >= source.length && source.length > 0 &&
+            pointList[0] === source.first && pointList[source.length - 1] === source.last;
+        if (appended && count === source.length) return this;
+
+        const start = appended ? source.length : 0;
+        if (!appended) this._reset();
+
+        const length = count - start;
+        const latitudes = new Float64Array(length);
+        const longitudes = new Float64Array(length);
+        const values = new Float64Array(length);
+        let valued = 0;
+        for (let i = 0; i < length; i++) {
+            const point = pointList[start + i];
+            latitudes[i] = point.latitude;
+            longitudes[i] = point.longitude;
+            values[i] = valueOf(point);
+            if (isFinite(values[i])) valued++;
+        }
+        this._post({ type: 'append', latitudes, longitudes, values },
+            [latitudes.buffer, longitudes.buffer, values.buffer]);
+
+        this._source = { key, points: pointList, valueOf, length: count, first: pointList[0] || null, last: pointList[count - 1] || null };
+        this._sampleCount += valued;
+        this._pending = null;
+        return this.redraw();
+    },
+
+    /**
+     * Forgets the sent samples, e.g. after a point was edited in place
+     */
+    invalidate() {
+        this._source = { ...this._source, key: null, length: 0 };
+    },
+
+    /**
+     * @param {Function} colorOf - cell value -> CSS colour, or null to leave the cell empty
+     */
+    setColors(colorOf) {
+        this._colorOf = colorOf;
+        return this.redraw();
+    },
+
+    setMode(mode) {
+        if (mode === this.options.mode) return this;
+        this.options.mode = mode;
+        this._rasters.clear();
+        this._pending = null;
+        return this.redraw();
+    },
+
+    /**
+     * The raster drawn for the current view, if any
+     */
+    getRaster() {
+        return this._map ? this._rasters.get(coverageGridZoom(this._map.getZoom())) || null : null;
+    },
+
+    _reset() {
+        this._generation++;
+        this._sampleCount = 0;
+        this._rasters.clear();
+        this._pending = null;
+        this._post({ type: 'reset', generation: this._generation });
+    },
+
+    _post(message, transfer) {
+        const worker = this._getWorker();
+        if (worker) {
+            worker.postMessage(message, transfer || []);
+            return;
+        }
+        if (!this._engine) this._engine = new CoverageEngine();
+        if (message.type === 'reset') this._engine.reset();
+        else if (message.type === 'append') this._engine.append(message.latitudes, message.longitudes, message.values);
+        else if (message.type === 'raster') {
+            this._onRaster({ generation: message.generation, raster: this._engine.raster(message.zoom, message.mode) });
+        }
+    },
+
+    _getWorker() {
+        if (this._worker !== null) return this._worker;
+        this._worker = false;
+        if (typeof Worker === 'undefined') return false;
+        try {
+            this._worker = new Worker('coverage-worker.js?v=1');
+        } catch (error) {
+            console.warn('Coverage worker unavailable, binning on the main thread:', error);
+            return false;
+        }
+        this._worker.onmessage = e => this._onRaster(e.data);
+        this._worker.onerror = (event) => {
+            // Script load failures land here too: bin the same samples on the main thread
+            event.preventDefault();
+            console.warn('Coverage worker failed, binning on the main thread:', event.message);
+            this._worker.terminate();
+            this._worker = false;
+            const { points, valueOf, key } = this._source;
+            this.invalidate();
+            if (valueOf) this.setSamples(points, valueOf, key);
+        };
+        return this._worker;
+    },
+
+    _onRaster(message) {
+        const raster = message.raster;
+        // Binned before a reset or a mode change
+        if (message.generation !== this._generation || raster.mode !== this.options.mode) return;
+        if (this._pending === raster.zoom) this._pending = null;
+
+        this._rasters.delete(raster.zoom);
+        this._rasters.set(raster.zoom, raster);
+        if (this._rasters.size > COVERAGE_CACHED_RASTERS) {
+            this._rasters.delete(this._rasters.keys().next().value); // Least recently binned
+        }
+        this.fire('rasterload', { raster });
+        if (this._map && raster.zoom === coverageGridZoom(this._map.getZoom())) this.redraw();
+    },
+
+    /**
+     * Asks for the grid zoom's raster unless it is current or on its way
+     */
+    _request(zoom) {
+        const raster = this._rasters.get(zoom);
+        if ((raster && raster.samples === this._sampleCount) || this._pending === zoom) return;
+        this._pending = zoom;
+        this._post({ type: 'raster', zoom, mode: this.options.mode, generation: this._generation });
+    },
+
+    onAdd() {
+        this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-animated coverage-raster');
+        this._canvas.style.pointerEvents = 'none';
+        this._canvas.style.opacity = this.options.opacity;
+        this.getPane().appendChild(this._canvas);
+        this._ctx = this._canvas.getContext('2d');
+        this.redraw();
+    },
+
+    onRemove() {
+        L.DomUtil.remove(this._canvas);
+        this._canvas = null;
+        this._ctx = null;
+    },
+
+    getEvents() {
+        const events = {
+            viewreset: this.redraw,
+            moveend: this.redraw,
+            resize: this.redraw
+        };
+        if (this._zoomAnimated) events.zoomanim = this._animateZoom;
+        return events;
+    },
+
+    _animateZoom(e) {
+        const scale = this._map.getZoomScale(e.zoom, this._zoom);
+        const offset = this._map._latLngToNewLayerPoint(this._topLeft, e.zoom, e.center);
+        L.DomUtil.setTransform(this._canvas, offset, scale);
+    },
+
+    redraw() {
+        if (!this._map || !this._canvas) return this;
+
+        const map = this._map;
+        const size = map.getSize();
+        const pad = size.multiplyBy(this.options.padding).round();
+        const width = size.x + 2 * pad.x;
+        const height = size.y + 2 * pad.y;
+        const dpr = window.devicePixelRatio || 1;
+
+        const origin = map.containerPointToLayerPoint([-pad.x, -pad.y]).round();
+        this._zoom = map.getZoom();
+        this._topLeft = map.layerPointToLatLng(origin);
+        L.DomUtil.setPosition(this._canvas, origin);
+
+        const canvas = this._canvas;
+        canvas.width = Math.round(width * dpr);
+        canvas.height = Math.round(height * dpr);
+        canvas.style.width = `${width}px`;
+        canvas.style.height = `${height}px`;
+
+        const ctx = this._ctx;
+        ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+        ctx.clearRect(0, 0, width, height);
+        if (this._sampleCount === 0) return this;
+
+        const gridZoom = coverageGridZoom(this._zoom);
+        this._request(gridZoom);
+        const raster = this._nearestRaster(gridZoom);
+        if (raster) this._drawRaster(ctx, raster, map.getPixelOrigin().add(origin), width, height);
+        return this;
+    },
+
+    _nearestRaster(zoom) {
+        let best = null;
+        this._rasters.forEach(raster => {
+            if (!best || Math.abs(raster.zoom - zoom) < Math.abs(best.zoom - zoom)) best = raster;
+        });
+        return best;
+    },
+
+    _drawRaster(ctx, raster, pixelOrigin, width, height) {
+        // Cell side in CSS pixels at the map's zoom (grids finer or coarser than it are scaled)
+        const cell = COVERAGE_CELL_PX * Math.pow(2, this._zoom - raster.zoom);
+        const c0 = Math.floor(pixelOrigin.x / cell) - 1, c1 = Math.ceil((pixelOrigin.x + width) / cell);
+        const r0 = Math.floor(pixelOrigin.y / cell) - 1, r1 = Math.ceil((pixelOrigin.y + height) / cell);
+        const columns = raster.columns, rows = raster.rows, values = raster.values;
+
+        // Visible cells grouped by colour: one path per colour
+        const paths = new Map(); // colour -> [cell indices]
+        for (let i = 0; i < raster.length; i++) {
+            const column = columns[i], row = rows[i];
+            if (column < c0 || column > c1 || row < r0 || row > r1) continue;
+            const color = this._colorOf(values[i]);
+            if (!color) continue;
+            let path = paths.get(color);
+            if (!path) paths.set(color, path = []);
+            path.push(i);
+        }
+
+        // Cells overlap by a fraction of a pixel so no seams show between them
+        const side = cell + 0.5;
+        paths.forEach((path, color) => {
+            ctx.fillStyle = color;
+            ctx.beginPath();
+            for (let j = 0; j < path.length; j++) {
+                const i = path[j];
+                ctx.rect(columns[i] * cell - pixelOrigin.x, rows[i] * cell - pixelOrigin.y, side, side);
+            }
+            ctx.fill();
+        });
+    }
+});
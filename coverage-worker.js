@@ -0,0 +1,55 @@
+// Site Sector Mapper - Coverage Worker
+//
+// Keeps the drive-test samples of the coverage raster off the main thread and
+// bins them per zoom level (coverage-grid.js). Protocol:
+//   page -> worker  { type: 'reset', generation }
+//                   { type: 'append', latitudes, longitudes, values } (Float64Array, transferred)
+//                   { type: 'raster', zoom, mode, generation }
+//   worker -> page  { type: 'raster', generation, raster } (typed arrays transferred)
+// Binning runs in chunks; a newer raster request (the map zoomed again) takes
+// over between chunks, and the grid keeps what was binned for when its zoom is
+// asked for again.
+
+importScripts('coverage-grid.js?v=1');
+
+const COVERAGE_CHUNK = 200000; // Samples binned between message checks
+
+const engine = new CoverageEngine();
+let generation = 0;
+let request = null; // Latest raster request
+let scheduled = false;
+
+self.onmessage = (e) => {
+    const message = e.data;
+    if (message.type === 'reset') {
+        engine.reset();
+        generation = message.generation;
+        request = null;
+    } else if (message.type === 'append') {
+        engine.append(message.latitudes, message.longitudes, message.values);
+    } else if (message.type === 'raster') {
+        request = message;
+        schedule();
+    }
+};
+
+function schedule() {
+    if (scheduled) return;
+    scheduled = true;
+    setTimeout(step, 0);
+}
+
+function step() {
+    scheduled = false;
+    const current = request;
+    if (!current || current.generation !== generation) return;
+
+    if (!engine.bin(current.zoom, COVERAGE_CHUNK)) {
+        schedule();
+        return;
+    }
+    request = null;
+    const raster = engine.grid(current.zoom).toRaster(current.mode);
+    self.postMessage({ type: 'raster', generation, raster },
+        [raster.columns.buffer, raster.rows.buffer, raster.values.buffer, raster.counts.buffer]);
+}
@@ -0,0 +1,745 @@
+// Site Sector Mapper - Import Parsers
+//
+// DOM-free parsing shared by the app and the import worker (import-worker.js):
+// compiled CSV/Excel header mapping into typed site row tables, Excel point
+// sheets for the KML tab, and a streaming KML point scanner that mirrors
+// parseKml() (and sitemapper/kml_ingest.py) without DOMParser, which workers
+// do not have.
+
+// Header spellings (lowercase) -> standard key
+const SITE_IMPORT_HEADERS = {
+    'site name': 'site_name',
+    'site_name': 'site_name',
+    'name': 'site_name',
+    'latitude': 'latitude',
+    'lat': 'latitude',
+    'longitude': 'longitude',
+    'lon': 'longitude',
+    'lng': 'longitude',
+    'description': 'description',
+    'sector name': 'sector_name',
+    'sector_name': 'sector_name',
+    'azimuth': 'azimuth',
+    'bearing': 'azimuth',
+    'azimut': 'azimuth', // Added French spelling
+    'beamwidth': 'beamwidth',
+    'range': 'range',
+    'radius': 'range',
+    'technology': 'technology',
+    'tech': 'technology',
+    'frequency': 'frequency',
+    'freq': 'frequency',
+    'color': 'color',
+    'opacity': 'opacity',
+    // New Mappings
+    'physical_cell_id': 'pci',
+    'physical cell id': 'pci',
+    'pci': 'pci',
+    'sc physical cell id': 'pci',
+    'cell_name': 'cell_name',
+    'cell name': 'cell_name',
+    'cellname': 'cell_name',
+    'cellid': 'cell_name'
+};
+
+/**
+ * Normalizes CSV headers to standard keys
+ * @param {Array} keys - Row object keys
+ * @returns {Object} Map of original header -> standard key
+ */
+function normalizeCSVHeaders(keys) {
+    const headerMap = {};
+    keys.forEach(key => {
+        const standardKey = SITE_IMPORT_HEADERS[String(key).toLowerCase().trim()];
+        if (standardKey) headerMap[key] = standardKey;
+    });
+    return headerMap;
+}
+
+/**
+ * Divides coordinates that are clearly too big (e.g. 3356858611 -> 33.568...)
+ * by 10 until they fit in -180..180
+ * @param {number} num
+ * @returns {number}
+ */
+function scaleCoordinate(num) {
+    // Limit iterations to avoid infinite loop
+    let iterations = 0;
+    while ((num > 180 || num < -180) && iterations < 15) {
+        num = num / 10;
+        iterations++;
+    }
+    return num;
+}
+
+/**
+ * Robust number parser handling commas and non-numeric chars
+ * Also auto-scales huge integers to valid coordinate ranges if specified
+ * @param {string|number} val
+ * @param {boolean} isCoordinate - If true, restricts to -180/180 range
+ * @returns {number|null}
+ */
+function parseNumber(val, isCoordinate = false) {
+    if (val === null || val === undefined || val === '') return null;
+
+    let num = val;
+
+    if (typeof val === 'string') {
+        let cleanVal = val.trim();
+        // Handle "1.234.567" format (European thousands separators or just bad formatting)
+        // If multiple dots, remove all of them and treat as integer
+        if ((cleanVal.match(/\./g) || []).length > 1) {
+            cleanVal = cleanVal.replace(/\./g, '');
+        } else if (cleanVal.includes(',') && !cleanVal.includes('.')) {
+            cleanVal = cleanVal.replace(',', '.');
+        }
+        num = parseFloat(cleanVal);
+    }
+
+    if (isNaN(num)) return null;
+
+    return isCoordinate ? scaleCoordinate(num) : num;
+}
+
+// ==================== SITE ROWS ====================
+
+// A site file is mapped with a plan compiled once from its headers: which
+// column feeds each standard key, which columns become custom properties,
+// and a number converter per numeric column picked from a sample of its
+// values. Mapped rows are held column by column in a site row table, with
+// the numeric columns parsed once into Float64Arrays (NaN where empty), so
+// batches cross from the import worker by transfer rather than by copy.
+
+// Normalized keys consumed by groupRowsIntoSites; anything else becomes a custom property
+const SITE_IMPORT_STANDARD_KEYS = ['site_name', 'latitude', 'longitude', 'description', 'sector_name', 'azimuth', 'beamwidth', 'range', 'color', 'opacity', 'technology', 'frequency', 'pci', 'cell_name'];
+const SITE_IMPORT_NUMBER_KEYS = ['latitude', 'longitude', 'azimuth', 'beamwidth', 'range', 'opacity'];
+const SITE_IMPORT_TEXT_KEYS = SITE_IMPORT_STANDARD_KEYS.filter(key => !SITE_IMPORT_NUMBER_KEYS.includes(key));
+const SITE_IMPORT_SAMPLE_SIZE = 50; // Values looked at to pick a column's converter
+
+const PLAIN_NUMBER_RE = /^-?\d+(\.\d+)?$/;
+
+/**
+ * Converter for columns of spreadsheet numbers
+ */
+function convertNumberCell(value) {
+    if (typeof value === 'number') return value === value ? value : null;
+    return parseNumber(value);
+}
+
+/**
+ * Converter for columns of plain decimal strings ("12", "-7.5898")
+ */
+function convertPlainNumber(value) {
+    if (typeof value === 'string' && PLAIN_NUMBER_RE.test(value)) return +value;
+    return parseNumber(value);
+}
+
+/**
+ * The cheapest converter that reads a column's sampled values as parseNumber() does
+ * @param {Array<Object>} sampleRows
+ * @param {string} key - Column header
+ * @returns {Function} value -> number|null
+ */
+function chooseNumberConverter(sampleRows, key) {
+    let numbers = 0, plain = 0, seen = 0;
+    for (let i = 0; i < sampleRows.length && seen < SITE_IMPORT_SAMPLE_SIZE; i++) {
+        const value = sampleRows[i][key];
+        if (value === undefined || value === null || value === '') continue;
+        seen++;
+        if (typeof value === 'number') numbers++;
+        else if (typeof value === 'string' && PLAIN_NUMBER_RE.test(value)) plain++;
+    }
+    if (seen === 0 || numbers === seen) return convertNumberCell;
+    if (plain === seen) return convertPlainNumber;
+    return parseNumber;
+}
+
+/**
+ * Compiles the mapping of a site file from its headers
+ * @param {Array<string>} keys - Column headers (Papa's meta.fields, readSiteSheet's fields)
+ * @param {Array<Object>} [sampleRows] - Leading rows, to pick number converters
+ * @returns {{headerMap, columns, customKeys, converters}}
+ */
+function compileSiteImportPlan(keys, sampleRows = []) {
+    const headerMap = normalizeCSVHeaders(keys);
+    const columns = {}; // standard key -> header; the last matching header wins
+    const customKeys = [];
+    keys.forEach(key => {
+        const target = headerMap[key] || key; // Keep original if no match
+        if (SITE_IMPORT_STANDARD_KEYS.includes(target)) columns[target] = key;
+        else customKeys.push(key);
+    });
+
+    const converters = {};
+    SITE_IMPORT_NUMBER_KEYS.forEach(name => {
+        if (columns[name] !== undefined) converters[name] = chooseNumberConverter(sampleRows, columns[name]);
+    });
+    return { headerMap, columns, customKeys, converters };
+}
+
+/**
+ * Reads the first sheet of a site workbook as row objects keyed by its header
+ * row, so columns that are empty in the leading rows still reach the plan.
+ * Blank and repeated headers get sheet_to_json's names (__EMPTY, Name_1).
+ * Requires the SheetJS `XLSX` global.
+ * @param {Object} workbook - From XLSX.read
+ * @returns {{fields: Array<string>, rows: Array<Object>}}
+ */
+function readSiteSheet(workbook) {
+    const sheet = workbook.Sheets[workbook.SheetNames[0]];
+    if (!sheet || !sheet['!ref']) return { fields: [], rows: [] };
+
+    const range = XLSX.utils.decode_range(sheet['!ref']);
+    const headerRange = { s: range.s, e: { r: range.s.r, c: range.e.c } };
+    const [header = []] = XLSX.utils.sheet_to_json(sheet, { header: 1, range: headerRange, defval: '', raw: false });
+    const seen = new Map();
+    const fields = header.map(cell => {
+        const name = String(cell).trim() === '' ? '__EMPTY' : String(cell);
+        const count = seen.get(name) || 0;
+        seen.set(name, count + 1);
+        return count === 0 ? name : `${name}_${count}`;
+    });
+
+    const rows = XLSX.utils.sheet_to_json(sheet, { header: fields, range: range.s.r + 1, defval: '' });
+    return { fields, rows };
+}
+
+/**
+ * @param {Array<string>} customNames - Custom property columns
+ * @param {number} capacity - Rows the numeric columns can hold
+ */
+function createSiteRowTable(customNames, capacity) {
+    const table = { length: 0, text: {}, numbers: {}, customNames, customValues: customNames.map(() => []) };
+    SITE_IMPORT_TEXT_KEYS.forEach(key => { table.text[key] = []; });
+    SITE_IMPORT_NUMBER_KEYS.forEach(key => { table.numbers[key] = new Float64Array(capacity); });
+    return table;
+}
+
+/**
+ * Maps raw rows with a compiled plan and drops rows without a site name and
+ * coordinates
+ * @param {Array<Object>} rawRows
+ * @param {Object} plan - From compileSiteImportPlan
+ * @returns {Object} Site row table; text columns hold the raw cell values
+ */
+function mapImportRows(rawRows, plan) {
+    const { columns, converters, customKeys } = plan;
+    const table = createSiteRowTable(customKeys, rawRows.length);
+    const nameKey = columns.site_name, latKey = columns.latitude, lngKey = columns.longitude;
+    if (nameKey === undefined || latKey === undefined || lngKey === undefined) {
+        SITE_IMPORT_NUMBER_KEYS.forEach(key => { table.numbers[key] = new Float64Array(0); });
+        return table;
+    }
+
+    const latitude = table.numbers.latitude, longitude = table.numbers.longitude;
+    const toLatitude = converters.latitude, toLongitude = converters.longitude;
+    const numberColumns = SITE_IMPORT_NUMBER_KEYS
+        .filter(name => name !== 'latitude' && name !== 'longitude')
+        .map(name => ({ key: columns[name], convert: converters[name], values: table.numbers[name] }));
+    const textColumns = SITE_IMPORT_TEXT_KEYS.map(name => ({ key: columns[name], values: table.text[name] }));
+
+    let n = 0;
+    for (let i = 0; i < rawRows.length; i++) {
+        const row = rawRows[i];
+        // Flexible validation: needs site name and coordinates
+        if (!row[nameKey]) continue;
+        const lat = toLatitude(row[latKey]);
+        if (lat === null) continue;
+        const lng = toLongitude(row[lngKey]);
+        if (lng === null) continue;
+
+        latitude[n] = scaleCoordinate(lat);
+        longitude[n] = scaleCoordinate(lng);
+        for (let c = 0; c < numberColumns.length; c++) {
+            const column = numberColumns[c];
+            const value = column.key === undefined ? null : column.convert(row[column.key]);
+            column.values[n] = value === null ? NaN : value;
+        }
+        for (let c = 0; c < textColumns.length; c++) {
+            const column = textColumns[c];
+            column.values.push(column.key === undefined ? undefined : row[column.key]);
+        }
+        for (let c = 0; c < customKeys.length; c++) {
+            table.customValues[c].push(row[customKeys[c]]);
+        }
+        n++;
+    }
+
+    table.length = n;
+    if (n < rawRows.length) {
+        SITE_IMPORT_NUMBER_KEYS.forEach(key => { table.numbers[key] = table.numbers[key].slice(0, n); });
+    }
+    return table;
+}
+
+/**
+ * Joins the tables of one file's batches
+ * @param {Array<Object>} tables - From mapImportRows, all with the same plan
+ * @returns {Object} Site row table
+ */
+function concatSiteRowTables(tables) {
+    if (tables.length === 1) return tables[0];
+    const length = tables.reduce((total, table) => total + table.length, 0);
+    const result = createSiteRowTable(tables.length ? tables[0].customNames : [], length);
+
+    let offset = 0;
+    tables.forEach(table => {
+        SITE_IMPORT_NUMBER_KEYS.forEach(key => result.numbers[key].set(table.numbers[key], offset));
+        SITE_IMPORT_TEXT_KEYS.forEach(key => {
+            const values = result.text[key];
+            table.text[key].forEach(value => values.push(value));
+        });
+        table.customValues.forEach((column, c) => {
+            const values = result.customValues[c];
+            column.forEach(value => values.push(value));
+        });
+        offset += table.length;
+    });
+    result.length = length;
+    return result;
+}
+
+/**
+ * Accumulates the preview of a site row table; call once per batch
+ * @param {Object} table - From mapImportRows
+ * @param {Object} [summary] - Summary from the previous batch
+ * @returns {{rowCount, siteCount, sample, names}} `names` only tracks site uniqueness
+ */
+function summarizeImportRows(table, summary = { rowCount: 0, siteCount: 0, sample: [], names: new Set() }) {
+    summary.rowCount += table.length;
+    const names = table.text.site_name;
+    for (let i = 0; i < table.length; i++) {
+        const name = names[i];
+        if (summary.names.has(name)) {
+            const entry = summary.sample.find(s => s.name === name);
+            if (entry) entry.sectorCount++;
+            continue;
+        }
+        summary.names.add(name);
+        summary.siteCount++;
+        if (summary.sample.length < 5) {
+            summary.sample.push({ name, sectorCount: 1, latitude: table.numbers.latitude[i], longitude: table.numbers.longitude[i] });
+        }
+    }
+    return summary;
+}
+
+/**
+ * Groups a site row table (one row per sector) into site objects
+ * @param {Object} table - From mapImportRows or concatSiteRowTables
+ * @param {Function} makeId - Site id generator
+ * @returns {Array<Object>}
+ */
+function groupRowsIntoSites(table, makeId) {
+    const sitesMap = new Map();
+    const { text, numbers, customNames, customValues } = table;
+
+    for (let i = 0; i < table.length; i++) {
+        const siteName = text.site_name[i];
+        let site = sitesMap.get(siteName);
+
+        if (!site) {
+            site = {
+                id: makeId(),
+                name: siteName,
+                latitude: numbers.latitude[i],
+                longitude: numbers.longitude[i],
+                description: text.description[i] || '',
+                group: 'CSV Import',
+                sectors: []
+            };
+            sitesMap.set(siteName, site);
+        }
+
+        // Only add sector if we have at least an azimuth
+        const azimuth = numbers.azimuth[i];
+        if (azimuth !== azimuth) continue;
+
+        const customProperties = [];
+        for (let c = 0; c < customNames.length; c++) {
+            const value = customValues[c][i];
+            if (value !== undefined) customProperties.push({ name: customNames[c], value });
+        }
+
+        site.sectors.push({
+            name: text.sector_name[i] || '',
+            azimuth: azimuth,
+            beamwidth: numbers.beamwidth[i] || 65,
+            range: numbers.range[i] || 500,
+            color: text.color[i] || '#3388ff',
+            opacity: numbers.opacity[i] || 0.5,
+            technology: text.technology[i] || '',
+            frequency: text.frequency[i] || '',
+            pci: text.pci[i] || '',
+            cell_name: text.cell_name[i] || '',
+            customProperties: customProperties
+        });
+    }
+
+    return Array.from(sitesMap.values());
+}
+
+// ==================== EXCEL POINTS ====================
+
+/**
+ * Extracts points from the first sheet of a workbook for the KML tab. The
+ * header row is detected in the first 20 rows by its Latitude/Longitude columns.
+ * Requires the SheetJS `XLSX` global.
+ * @param {Uint8Array} data - Workbook bytes
+ * @returns {{points: Array, attributes: Array<string>}}
+ * @throws {Error} With a user-facing message when no points can be read
+ */
+function parseExcelPoints(data) {
+    const workbook = XLSX.read(data, { type: 'array' });
+
+    // Assume first sheet
+    const worksheet = workbook.Sheets[workbook.SheetNames[0]];
+
+    // Convert to Array of Arrays first to find header
+    const rawData = XLSX.utils.sheet_to_json(worksheet, { header: 1 });
+    if (!rawData || rawData.length === 0) {
+        throw new Error('No data found in Excel file.');
+    }
+
+    let headerRowIndex = -1;
+    for (let i = 0; i < Math.min(20, rawData.length); i++) {
+        const row = rawData[i];
+        if (!row || row.length === 0) continue;
+
+        const rowStr = row.map(c => String(c).trim().toLowerCase());
+        const hasLat = rowStr.some(k => ['latitude', 'lat', 'y'].includes(k) || k.includes('lat'));
+        const hasLng = rowStr.some(k => ['longitude', 'long', 'lng', 'x'].includes(k) || k.includes('lon') || k.includes('lng'));
+
+        if (hasLat && hasLng) {
+            headerRowIndex = i;
+            break;
+        }
+    }
+
+    if (headerRowIndex === -1) {
+        // Fallback to row 0 if not found, let the standard check handle failure
+        console.warn('Could not auto-detect header row. Defaulting to first row.');
+        headerRowIndex = 0;
+    }
+
+    // Re-parse with correct header row
+    const jsonData = XLSX.utils.sheet_to_json(worksheet, { defval: "", range: headerRowIndex });
+    if (!jsonData || jsonData.length === 0) {
+        throw new Error('No data found in Excel file.');
+    }
+
+    const keys = Object.keys(jsonData[0]);
+    const normalizedKeys = keys.map(k => k.trim().toLowerCase());
+
+    // Heuristics for Latitude
+    let latIndex = normalizedKeys.findIndex(k => ['latitude', 'lat', 'y'].includes(k));
+    if (latIndex === -1) latIndex = normalizedKeys.findIndex(k => k.includes('lat'));
+
+    // Heuristics for Longitude
+    let lngIndex = normalizedKeys.findIndex(k => ['longitude', 'long', 'lng', 'x'].includes(k));
+    if (lngIndex === -1) lngIndex = normalizedKeys.findIndex(k => k.includes('lon') || k.includes('lng'));
+
+    if (latIndex === -1 || lngIndex === -1) {
+        throw new Error(`Could not identify Latitude/Longitude columns.\n\nFound columns: ${keys.join(', ')}\n\nPlease ensure your Excel file has columns named "Latitude" and "Longitude".`);
+    }
+
+    const latKey = keys[latIndex];
+    const lngKey = keys[lngIndex];
+    const attributes = keys.filter(k => k !== latKey && k !== lngKey);
+
+    const parseCoord = (val) => {
+        if (typeof val === 'number') return val;
+        if (typeof val === 'string') {
+            // Replace comma with dot and parse
+            return parseFloat(val.replace(/,/g, '.').trim());
+        }
+        return NaN;
+    };
+
+    const points = [];
+    jsonData.forEach((row, index) => {
+        const lat = parseCoord(row[latKey]);
+        const lng = parseCoord(row[lngKey]);
+        if (isNaN(lat) || isNaN(lng)) return;
+
+        points.push({
+            name: `Point ${index + 1}`,
+            latitude: lat,
+            longitude: lng,
+            description: '',
+            color: '#3b82f6', // Default blue for Excel
+            customProperties: attributes.map(key => ({ name: key, value: row[key] })) // Keep as is (string or number)
+        });
+    });
+
+    return { points, attributes };
+}
+
+// ==================== KML POINTS ====================
+
+const KML_DEFAULT_COLOR = '#ef4444';
+
+// One token per match: CDATA | comment | declaration/PI | end tag | start tag | text
+const XML_TOKEN_RE = /<!\[CDATA\[([\s\S]*?)\]\]>|<!--[\s\S]*?-->|<[?!][^>]*>|<\/([^\s>]+)\s*>|<([^\s>\/!?]+)((?:[^>"']|"[^"]*"|'[^']*')*?)(\/?)>|([^<]+)/g;
+const XML_ATTRIBUTE_RE = /([^\s=]+)\s*=\s*(?:"([^"]*)"|'([^']*)')/g;
+const XML_ENTITIES = { amp: '&', lt: '<', gt: '>', quot: '"', apos: "'", nbsp: ' ' };
+
+function decodeXmlEntities(text) {
+    if (text.indexOf('&') === -1) return text;
+    return text.replace(/&(#[xX][0-9a-fA-F]+|#\d+|\w+);/g, (entity, code) => {
+        if (code[0] === '#') {
+            const codePoint = (code[1] === 'x' || code[1] === 'X') ? parseInt(code.slice(2), 16) : parseInt(code.slice(1), 10);
+            return codePoint <= 0x10FFFF ? String.fromCodePoint(codePoint) : entity;
+        }
+        return Object.prototype.hasOwnProperty.call(XML_ENTITIES, code) ? XML_ENTITIES[code] : entity;
+    });
+}
+
+function xmlLocalName(tag) {
+    // 'kml:Placemark' -> 'Placemark'
+    const colon = tag.indexOf(':');
+    return colon === -1 ? tag : tag.slice(colon + 1);
+}
+
+/**
+ * Parses a well-formed XML fragment into { name, attributes, children } nodes;
+ * text and CDATA children are plain strings
+ */
+function parseXmlFragment(xml) {
+    const root = { name: '#fragment', attributes: {}, children: [] };
+    const stack = [root];
+    const tokens = new RegExp(XML_TOKEN_RE.source, 'g');
+    const source = xml.replace(/\r\n?/g, '\n'); // XML end-of-line handling
+    let match;
+
+    while ((match = tokens.exec(source)) !== null) {
+        const parent = stack[stack.length - 1];
+        if (match[1] !== undefined) {
+            parent.children.push(match[1]);
+        } else if (match[2] !== undefined) {
+            if (stack.length > 1) stack.pop();
+        } else if (match[3] !== undefined) {
+            const attributes = {};
+            const attributeTokens = new RegExp(XML_ATTRIBUTE_RE.source, 'g');
+            let attribute;
+            while ((attribute = attributeTokens.exec(match[4])) !== null) {
+                attributes[attribute[1]] = decodeXmlEntities(attribute[2] !== undefined ? attribute[2] : attribute[3]);
+            }
+            const element = { name: xmlLocalName(match[3]), attributes, children: [] };
+            parent.children.push(element);
+            if (!match[5]) stack.push(element);
+        } else if (match[6] !== undefined) {
+            parent.children.push(decodeXmlEntities(match[6]));
+        }
+    }
+    return root;
+}
+
+/**
+ * Descendant elements with a local name, in document order
+ */
+function xmlFindAll(element, name, result = []) {
+    element.children.forEach(child => {
+        if (typeof child === 'string') return;
+        if (child.name === name) result.push(child);
+        xmlFindAll(child, name, result);
+    });
+    return result;
+}
+
+function xmlFind(element, name) {
+    for (const child of element.children) {
+        if (typeof child === 'string') continue;
+        if (child.name === name) return child;
+        const found = xmlFind(child, name);
+        if (found) return found;
+    }
+    return null;
+}
+
+function xmlTextContent(element) {
+    return element.children.map(child => typeof child === 'string' ? child : xmlTextContent(child)).join('');
+}
+
+/**
+ * Trimmed text of the first descendant with a local name, or ''
+ */
+function xmlText(element, name) {
+    const found = xmlFind(element, name);
+    return found ? xmlTextContent(found).trim() : '';
+}
+
+// Convert KML color (aabbggrr) to Hex (#rrggbb)
+function kmlColorToHex(kmlColor) {
+    if (kmlColor && kmlColor.length === 8) {
+        return `#${kmlColor.substring(6, 8)}${kmlColor.substring(4, 6)}${kmlColor.substring(2, 4)}`;
+    }
+    return KML_DEFAULT_COLOR;
+}
+
+function kmlIconStyleColor(style) {
+    const iconStyle = xmlFind(style, 'IconStyle');
+    return iconStyle ? xmlText(iconStyle, 'color') : '';
+}
+
+function htmlCellText(fragment) {
+    return decodeXmlEntities(fragment.replace(/<[^>]+>/g, '')).trim();
+}
+
+/**
+ * Converts one parsed Placemark to the importKmlData() point shape
+ * @param {Object} placemark - Node from parseXmlFragment
+ * @param {Object} styles - '#styleId' -> KML color
+ * @returns {Object|null} null without a usable Point geometry
+ */
+function parseKmlPlacemark(placemark, styles) {
+    const point = xmlFind(placemark, 'Point');
+    if (!point) return null;
+
+    const coordinates = xmlText(point, 'coordinates');
+    if (!coordinates) return null;
+
+    // KML standard is comma-separated: lon,lat,alt
+    const parts = coordinates.split(',').map(s => s.trim());
+    if (parts.length < 2) return null;
+    const lng = parseFloat(parts[0]);
+    const lat = parseFloat(parts[1]);
+    if (isNaN(lat) || isNaN(lng)) return null;
+
+    const name = xmlText(placemark, 'name') || 'Untitled Point';
+    const description = xmlText(placemark, 'description');
+
+    let color = KML_DEFAULT_COLOR;
+    const styleUrl = xmlText(placemark, 'styleUrl');
+    if (styleUrl && styles[styleUrl]) {
+        color = kmlColorToHex(styles[styleUrl]);
+    }
+
+    // Inline style overrides styleUrl
+    const inlineStyle = xmlFind(placemark, 'Style');
+    if (inlineStyle) {
+        const inlineColor = kmlIconStyleColor(inlineStyle);
+        if (inlineColor) color = kmlColorToHex(inlineColor);
+    }
+
+    const customProperties = [];
+    xmlFindAll(placemark, 'Data').forEach(data => {
+        const key = data.attributes.name;
+        const value = xmlText(data, 'value');
+        if (key && value) customProperties.push({ name: key, value });
+    });
+    xmlFindAll(placemark, 'SimpleData').forEach(data => {
+        const key = data.attributes.name;
+        const value = xmlTextContent(data).trim();
+        if (key && value) customProperties.push({ name: key, value });
+    });
+
+    // ExtendedData takes precedence over anything found in the description
+    const addNew = (key, value) => {
+        if (key && value && !customProperties.some(p => p.name === key)) {
+            customProperties.push({ name: key, value });
+        }
+    };
+
+    if (description) {
+        if (description.includes('<table')) {
+            const rows = description.match(/<tr\b[^>]*>[\s\S]*?<\/tr\s*>/gi) || [];
+            rows.forEach(row => {
+                const cells = row.match(/<td\b[^>]*>[\s\S]*?<\/td\s*>/gi) || [];
+                if (cells.length >= 2) {
+                    addNew(htmlCellText(cells[0]).replace(/:$/, ''), htmlCellText(cells[1]));
+                }
+            });
+        }
+
+        // "Key = Value<br>" lines
+        description.split(/<br\s*\/?>/i).forEach(line => {
+            if (line.trim().startsWith('<')) return;
+            const pieces = line.split('=');
+            if (pieces.length >= 2) {
+                addNew(pieces[0].trim(), pieces.slice(1).join('=').trim());
+            }
+        });
+    }
+
+    return { name, description, latitude: lat, longitude: lng, color, customProperties };
+}
+
+/**
+ * Incremental KML point parser: feed text with write() as it is read and
+ * points are emitted as soon as their Placemark closes. Shared styles are
+ * resolved as they are encountered; KML producers emit them ahead of the
+ * Placemarks that reference them.
+ */
+class KmlPointScanner {
+    constructor() {
+        this.styles = {};
+        this.pending = '';
+        this.count = 0;
+    }
+
+    /**
+     * @param {string} text - Next piece of the document
+     * @param {Function} onPoint - Called with each parsed point
+     */
+    write(text, onPoint) {
+        const pending = this.pending + text;
+        const starts = /<((?:[\w.-]+:)?(Placemark|Style))(?=[\s>\/])/g;
+        let keepFrom = -1;
+        let consumed = 0;
+        let match;
+
+        while ((match = starts.exec(pending)) !== null) {
+            const startTagEnd = pending.indexOf('>', match.index);
+            if (startTagEnd === -1) {
+                keepFrom = match.index;
+                break;
+            }
+
+            let end;
+            if (pending[startTagEnd - 1] === '/') {
+                end = startTagEnd + 1; // <Style id="..."/> carries no colour
+            } else {
+                const close = pending.indexOf(`</${match[1]}`, startTagEnd);
+                const closeEnd = close === -1 ? -1 : pending.indexOf('>', close);
+                if (closeEnd === -1) {
+                    keepFrom = match.index;
+                    break;
+                }
+                end = closeEnd + 1;
+
+                const element = parseXmlFragment(pending.slice(match.index, end)).children[0];
+                if (match[2] === 'Style') {
+                    const id = element.attributes.id;
+                    const color = id ? kmlIconStyleColor(element) : '';
+                    if (color) this.styles[`#${id}`] = color;
+                } else {
+                    const point = parseKmlPlacemark(element, this.styles);
+                    if (point) {
+                        this.count++;
+                        onPoint(point);
+                    }
+                }
+            }
+
+            consumed = end;
+            starts.lastIndex = end;
+        }
+
+        if (keepFrom === -1) {
+            // Only a tag split across two writes can still matter
+            keepFrom = Math.max(consumed, pending.lastIndexOf('<'));
+        }
+        this.pending = pending.slice(keepFrom);
+    }
+}
+
+/**
+ * Parses a whole KML document
+ * @returns {Array} importKmlData() points
+ */
+function parseKmlText(text) {
+    const result = [];
+    new KmlPointScanner().write(text, point => result.push(point));
+    return result;
+}
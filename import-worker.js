@@ -0,0 +1,173 @@
+// Site Sector Mapper - Import Worker
+//
+// Parses import files off the main thread. The app posts
+//   { type: 'parse', jobId, kind: 'csv'|'excel'|'kml'|'kml-excel'|'alarms', file, localVendor }
+// and receives, for that jobId:
+//   { type: 'progress', stage, loaded, total, count }
+//   { type: 'batch', format: 'json'|'columnar', buffer }  (buffer is transferred)
+//   { type: 'batch', format: 'sites', table }  (numeric columns are transferred)
+//   { type: 'done', summary } or { type: 'error', message }
+// Site rows are sent as site row tables (import-parsers.js), alarm rows as
+// UTF-8 JSON batches and points as SSMC buffers (columnar.js).
+// Cancelling terminates the worker, so jobs never need to poll for it.
+// localVendor says whether vendor/ holds the libraries (vendorInstalled).
+
+importScripts('vendor.js?v=1', 'columnar.js?v=1', 'import-parsers.js?v=1');
+
+const IMPORT_BATCH_SIZE = 5000;
+const CSV_CHUNK_SIZE = 1024 * 1024;
+const KML_CHUNK_SIZE = 4 * 1024 * 1024;
+
+function postProgress(job, stage, loaded, total, count = 0) {
+    self.postMessage({ type: 'progress', jobId: job.id, stage, loaded, total, count });
+}
+
+function postJsonBatch(job, rows) {
+    const buffer = new TextEncoder().encode(JSON.stringify(rows)).buffer;
+    self.postMessage({ type: 'batch', jobId: job.id, format: 'json', buffer }, [buffer]);
+}
+
+function postSiteTable(job, table) {
+    const buffers = Object.keys(table.numbers).map(key => table.numbers[key].buffer);
+    self.postMessage({ type: 'batch', jobId: job.id, format: 'sites', table }, buffers);
+}
+
+function postPointBatch(job, batch) {
+    // columnar.js stores the KML colour as `iconColor`
+    const buffer = encodeColumnarPoints(batch.map(p => ({ ...p, iconColor: p.color })));
+    self.postMessage({ type: 'batch', jobId: job.id, format: 'columnar', buffer }, [buffer]);
+}
+
+/**
+ * Maps raw rows and posts them in batches, accumulating the preview summary.
+ * The import plan is compiled from the file's header with the first rows.
+ * @param {Array<string>} fields - Column headers of the file
+ */
+function postSiteRows(job, rawRows, fields, state) {
+    if (rawRows.length === 0) return;
+    if (!state.plan) state.plan = compileSiteImportPlan(fields, rawRows);
+    state.rawCount += rawRows.length;
+
+    for (let i = 0; i < rawRows.length; i += IMPORT_BATCH_SIZE) {
+        const table = mapImportRows(rawRows.slice(i, i + IMPORT_BATCH_SIZE), state.plan);
+        if (table.length === 0) continue;
+        state.summary = summarizeImportRows(table, state.summary);
+        postSiteTable(job, table);
+    }
+}
+
+function siteRowsSummary(state) {
+    const { rowCount, siteCount, sample } = state.summary || summarizeImportRows([]);
+    return { rawCount: state.rawCount, rowCount, siteCount, sample };
+}
+
+function parseSiteCsv(job) {
+    importVendorScripts('papaparse', job.localVendor);
+    const state = { plan: null, rawCount: 0, summary: null };
+
+    return new Promise((resolve, reject) => {
+        Papa.parse(job.file, {
+            header: true,
+            skipEmptyLines: true,
+            chunkSize: CSV_CHUNK_SIZE,
+            chunk: (results) => {
+                postSiteRows(job, results.data, results.meta.fields, state);
+                postProgress(job, 'parsing', Math.min(results.meta.cursor, job.file.size), job.file.size, state.rawCount);
+            },
+            complete: () => resolve(siteRowsSummary(state)),
+            error: reject
+        });
+    });
+}
+
+async function parseSiteWorkbook(job) {
+    importVendorScripts('xlsx', job.localVendor);
+    const state = { plan: null, rawCount: 0, summary: null };
+
+    postProgress(job, 'reading', 0, job.file.size);
+    const data = new Uint8Array(await job.file.arrayBuffer());
+    postProgress(job, 'parsing', 0, 0);
+
+    const { fields, rows: rawRows } = readSiteSheet(XLSX.read(data, { type: 'array' }));
+
+    for (let i = 0; i < rawRows.length; i += IMPORT_BATCH_SIZE) {
+        postSiteRows(job, rawRows.slice(i, i + IMPORT_BATCH_SIZE), fields, state);
+        postProgress(job, 'mapping', i, rawRows.length, state.rawCount);
+    }
+    return siteRowsSummary(state);
+}
+
+async function parseKmlPoints(job) {
+    const file = job.file;
+    const scanner = new KmlPointScanner();
+    const decoder = new TextDecoder();
+    let batch = [];
+
+    const onPoint = point => {
+        batch.push(point);
+        if (batch.length >= IMPORT_BATCH_SIZE) {
+            postPointBatch(job, batch);
+            batch = [];
+        }
+    };
+
+    for (let offset = 0; offset < file.size; offset += KML_CHUNK_SIZE) {
+        const chunk = await file.slice(offset, offset + KML_CHUNK_SIZE).arrayBuffer();
+        scanner.write(decoder.decode(chunk, { stream: true }), onPoint);
+        postProgress(job, 'parsing', Math.min(offset + KML_CHUNK_SIZE, file.size), file.size, scanner.count);
+    }
+    scanner.write(decoder.decode(), onPoint);
+    if (batch.length > 0) postPointBatch(job, batch);
+
+    return { count: scanner.count };
+}
+
+async function parseExcelPointSheet(job) {
+    importVendorScripts('xlsx', job.localVendor);
+
+    postProgress(job, 'reading', 0, job.file.size);
+    const data = new Uint8Array(await job.file.arrayBuffer());
+    postProgress(job, 'parsing', 0, 0);
+
+    const { points, attributes } = parseExcelPoints(data);
+    for (let i = 0; i < points.length; i += IMPORT_BATCH_SIZE) {
+        postPointBatch(job, points.slice(i, i + IMPORT_BATCH_SIZE));
+    }
+    return { count: points.length, attributes };
+}
+
+async function parseAlarmWorkbook(job) {
+    importVendorScripts('xlsx', job.localVendor);
+
+    postProgress(job, 'reading', 0, job.file.size);
+    const data = new Uint8Array(await job.file.arrayBuffer());
+    postProgress(job, 'parsing', 0, 0);
+
+    const workbook = XLSX.read(data, { type: 'array' });
+    const rawRows = XLSX.utils.sheet_to_json(workbook.Sheets[workbook.SheetNames[0]]);
+
+    for (let i = 0; i < rawRows.length; i += IMPORT_BATCH_SIZE) {
+        postJsonBatch(job, rawRows.slice(i, i + IMPORT_BATCH_SIZE));
+        postProgress(job, 'mapping', i, rawRows.length, i);
+    }
+    return { count: rawRows.length };
+}
+
+const IMPORT_PARSERS = {
+    'csv': parseSiteCsv,
+    'excel': parseSiteWorkbook,
+    'kml': parseKmlPoints,
+    'kml-excel': parseExcelPointSheet,
+    'alarms': parseAlarmWorkbook
+};
+
+self.onmessage = (e) => {
+    const { type, jobId, kind, file, localVendor } = e.data;
+    if (type !== 'parse') return;
+
+    const job = { id: jobId, file, localVendor };
+    Promise.resolve()
+        .then(() => IMPORT_PARSERS[kind](job))
+        .then(summary => self.postMessage({ type: 'done', jobId, summary }))
+        .catch(error => self.postMessage({ type: 'error', jobId, message: error && error.message ? error.message : String(error) }));
+};
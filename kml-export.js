@@ -0,0 +1,373 @@
+// Site Sector Mapper - KML Export
+//
+// Streaming writers for the KML and attribute CSV exports. Documents are built
+// in batches of sites/points and handed to a sink as ~1 MB UTF-8 chunks, so
+// no export ever holds the whole document as one string:
+//
+//   sink.write(Uint8Array) -> Promise|undefined
+//   sink.close() -> Promise
+//
+// createBlobSink() collects the chunks as Blob parts (which the browser can
+// keep out of the JS heap), createStreamSink() writes them to any
+// WritableStream (e.g. a file from showSaveFilePicker) and createKmzSink()
+// deflates them into a single-entry ZIP on top of either.
+// sitemapper/kml_export.py writes the same KML from a sites CSV or JSON file.
+
+const EXPORT_CHUNK_CHARS = 1024 * 1024;
+const EXPORT_BATCH_SIZE = 500;
+const KML_MIME_TYPE = 'application/vnd.google-earth.kml+xml';
+const KMZ_MIME_TYPE = 'application/vnd.google-earth.kmz';
+
+const XML_ESCAPES = { '<': '&lt;', '>': '&gt;', '&': '&amp;', '\'': '&apos;', '"': '&quot;' };
+const XML_SPECIAL_RE = /[<>&'"]/;
+const XML_SPECIAL_GLOBAL_RE = /[<>&'"]/g;
+
+function escapeXml(unsafe) {
+    return String(unsafe || '').replace(XML_SPECIAL_GLOBAL_RE, c => XML_ESCAPES[c]);
+}
+
+/**
+ * Escapes a batch of fields with one scan: most exports have no markup
+ * characters at all, and those that do are escaped in a single replace
+ * @param {Array<string>} values
+ * @returns {Array<string>}
+ */
+function escapeXmlFields(values) {
+    const strings = values.map(value => String(value || ''));
+    const joined = strings.join('\u0000');
+    if (!XML_SPECIAL_RE.test(joined)) return strings;
+    return joined.replace(XML_SPECIAL_GLOBAL_RE, c => XML_ESCAPES[c]).split('\u0000');
+}
+
+// ==================== SINKS ====================
+
+/**
+ * Collects chunks as Blob parts; `sink.blob` is set on close
+ */
+function createBlobSink(type) {
+    const parts = [];
+    const sink = {
+        blob: null,
+        write(bytes) {
+            parts.push(new Blob([bytes]));
+        },
+        async close() {
+            sink.blob = new Blob(parts, { type });
+        }
+    };
+    return sink;
+}
+
+/**
+ * Writes chunks to a WritableStream, honouring its backpressure
+ */
+function createStreamSink(stream) {
+    const writer = stream.getWriter();
+    return {
+        async write(bytes) {
+            await writer.ready;
+            await writer.write(bytes);
+        },
+        close() {
+            return writer.close();
+        }
+    };
+}
+
+const CRC32_TABLE = (() => {
+    const table = new Uint32Array(256);
+    for (let n = 0; n < 256; n++) {
+        let c = n;
+        for (let k = 0; k < 8; k++) c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+        table[n] = c >>> 0;
+    }
+    return table;
+})();
+
+function updateCrc32(crc, bytes) {
+    crc = ~crc;
+    for (let i = 0; i < bytes.length; i++) {
+        crc = CRC32_TABLE[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+    }
+    return ~crc >>> 0;
+}
+
+function dosDateTime(date) {
+    return {
+        time: (date.getHours() << 11) | (date.getMinutes() << 5) | (date.getSeconds() >> 1),
+        date: ((date.getFullYear() - 1980) << 9) | ((date.getMonth() + 1) << 5) | date.getDate()
+    };
+}
+
+/**
+ * Deflates everything written into one ZIP entry (a KMZ holds doc.kml).
+ * Sizes are not known up front, so they follow the data in a data
+ * descriptor. Needs CompressionStream('deflate-raw'); entries over 4 GB
+ * (ZIP64) are not supported.
+ */
+function createKmzSink(sink, entryName = 'doc.kml') {
+    if (typeof CompressionStream === 'undefined') {
+        throw new Error('KMZ export is not supported by this browser');
+    }
+
+    const name = new TextEncoder().encode(entryName);
+    const { time, date } = dosDateTime(new Date());
+    const compressor = new CompressionStream('deflate-raw');
+    const input = compressor.writable.getWriter();
+    let crc = 0;
+    let size = 0;
+    let compressedSize = 0;
+
+    const localHeader = new DataView(new ArrayBuffer(30 + name.length));
+    localHeader.setUint32(0, 0x04034b50, true);
+    localHeader.setUint16(4, 20, true); // version needed
+    localHeader.setUint16(6, 0x0808, true); // data descriptor + UTF-8 name
+    localHeader.setUint16(8, 8, true); // deflate
+    localHeader.setUint16(10, time, true);
+    localHeader.setUint16(12, date, true);
+    localHeader.setUint16(26, name.length, true);
+    new Uint8Array(localHeader.buffer).set(name, 30);
+    const headerWritten = Promise.resolve(sink.write(new Uint8Array(localHeader.buffer)));
+
+    // Compressed output is forwarded to the sink as it is produced
+    const pumped = headerWritten.then(async () => {
+        const reader = compressor.readable.getReader();
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            compressedSize += value.length;
+            await sink.write(value);
+        }
+    });
+
+    return {
+        async write(bytes) {
+            crc = updateCrc32(crc, bytes);
+            size += bytes.length;
+            await input.ready;
+            await input.write(bytes);
+        },
+        async close() {
+            await input.close();
+            await pumped;
+
+            const centralOffset = 30 + name.length + compressedSize + 16;
+            const tail = new DataView(new ArrayBuffer(16 + 46 + name.length + 22));
+            // Data descriptor
+            tail.setUint32(0, 0x08074b50, true);
+            tail.setUint32(4, crc, true);
+            tail.setUint32(8, compressedSize, true);
+            tail.setUint32(12, size, true);
+            // Central directory header
+            let o = 16;
+            tail.setUint32(o, 0x02014b50, true);
+            tail.setUint16(o + 4, 20, true); // version made by
+            tail.setUint16(o + 6, 20, true);
+            tail.setUint16(o + 8, 0x0808, true);
+            tail.setUint16(o + 10, 8, true);
+            tail.setUint16(o + 12, time, true);
+            tail.setUint16(o + 14, date, true);
+            tail.setUint32(o + 16, crc, true);
+            tail.setUint32(o + 20, compressedSize, true);
+            tail.setUint32(o + 24, size, true);
+            tail.setUint16(o + 28, name.length, true);
+            // extra, comment, disk, attributes and local header offset are all 0
+            new Uint8Array(tail.buffer).set(name, o + 46);
+            // End of central directory
+            o += 46 + name.length;
+            tail.setUint32(o, 0x06054b50, true);
+            tail.setUint16(o + 8, 1, true);
+            tail.setUint16(o + 10, 1, true);
+            tail.setUint32(o + 12, 46 + name.length, true);
+            tail.setUint32(o + 16, centralOffset, true);
+
+            await sink.write(new Uint8Array(tail.buffer));
+            await sink.close();
+        }
+    };
+}
+
+// ==================== TEXT WRITER ====================
+
+/**
+ * Buffers text and hands it to a sink as UTF-8 chunks of ~EXPORT_CHUNK_CHARS
+ */
+class ExportTextWriter {
+    constructor(sink) {
+        this.sink = sink;
+        this.encoder = new TextEncoder();
+        this.parts = [];
+        this.length = 0;
+    }
+
+    async write(text) {
+        this.parts.push(text);
+        this.length += text.length;
+        if (this.length >= EXPORT_CHUNK_CHARS) await this.flush();
+    }
+
+    async flush() {
+        if (this.length === 0) return;
+        const bytes = this.encoder.encode(this.parts.join(''));
+        this.parts = [];
+        this.length = 0;
+        await this.sink.write(bytes);
+    }
+
+    async close() {
+        await this.flush();
+        await this.sink.close();
+    }
+}
+
+// ==================== DOCUMENTS ====================
+
+const SITES_KML_HEADER = `<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+  <Document>
+    <name>Site Sector Map</name>
+    <description>Exported from Site Sector Mapper</description>
+    
+    <Style id="siteIcon">
+      <IconStyle>
+        <color>ff6366f1</color>
+        <scale>1.2</scale>
+        <Icon>
+          <href>http://maps.google.com/mapfiles/kml/shapes/placemark_circle.png</href>
+        </Icon>
+      </IconStyle>
+    </Style>
+`;
+
+const SITES_KML_FOOTER = `  </Document>
+</kml>`;
+
+const KML_WEDGE_STEPS = 10;
+
+function sitePlacemark(site, name, description) {
+    return `    <Placemark>
+      <name>${name}</name>
+      <description><![CDATA[
+        <h3>${name}</h3>
+        ${description ? `<p>${description}</p>` : ''}
+        <p><strong>Coordinates:</strong> ${site.latitude}, ${site.longitude}</p>
+        <p><strong>Sectors:</strong> ${(site.sectors || []).length}</p>
+      ]]></description>
+      <styleUrl>#siteIcon</styleUrl>
+      <Point>
+        <coordinates>${site.longitude},${site.latitude},0</coordinates>
+      </Point>
+    </Placemark>
+`;
+}
+
+function sectorPlacemark(site, sector, index, siteName) {
+    // KML colours are AABBGGRR; sectors export at 50% opacity
+    const color = sector.color || '#3388ff';
+    const kmlColor = '80' + color.substring(5, 7) + color.substring(3, 5) + color.substring(1, 3);
+
+    const wedge = buildSectorWedge(site.latitude, site.longitude, sector.azimuth, sector.beamwidth, sector.range, KML_WEDGE_STEPS);
+    const coords = wedge.map(([lat, lng]) => `${lng},${lat},0`).join(' ');
+    const labelPos = destination(site.latitude, site.longitude, sector.azimuth, sector.range * 0.7);
+
+    return `    <Placemark>
+      <name>${siteName} - Sector ${index + 1}</name>
+      <Style>
+        <IconStyle>
+          <scale>0</scale>
+        </IconStyle>
+        <LineStyle>
+          <color>${kmlColor}</color>
+          <width>1</width>
+        </LineStyle>
+        <PolyStyle>
+          <color>${kmlColor}</color>
+        </PolyStyle>
+      </Style>
+      <MultiGeometry>
+        <Point>
+          <coordinates>${labelPos.lng},${labelPos.lat},0</coordinates>
+        </Point>
+        <Polygon>
+          <outerBoundaryIs>
+            <LinearRing>
+              <coordinates>${coords}</coordinates>
+            </LinearRing>
+          </outerBoundaryIs>
+        </Polygon>
+      </MultiGeometry>
+    </Placemark>
+`;
+}
+
+/**
+ * Writes the sites KML: one point per site, plus sector wedges in 'full' mode
+ * @param {Array<Object>} siteList
+ * @param {'sites'|'full'} mode
+ * @param {Object} sink
+ * @param {Function} [onProgress] - (written, total)
+ */
+async function writeSitesKml(siteList, mode, sink, onProgress = null) {
+    const writer = new ExportTextWriter(sink);
+    await writer.write(SITES_KML_HEADER);
+
+    for (let start = 0; start < siteList.length; start += EXPORT_BATCH_SIZE) {
+        const batch = siteList.slice(start, start + EXPORT_BATCH_SIZE);
+        const escaped = escapeXmlFields(batch.flatMap(site => [site.name, site.description]));
+        let text = '';
+        batch.forEach((site, i) => {
+            const name = escaped[i * 2];
+            text += sitePlacemark(site, name, escaped[i * 2 + 1]);
+            if (mode === 'full' && site.sectors) {
+                site.sectors.forEach((sector, j) => {
+                    text += sectorPlacemark(site, sector, j, name);
+                });
+            }
+        });
+        await writer.write(text);
+        if (onProgress) onProgress(start + batch.length, siteList.length);
+    }
+
+    await writer.write(SITES_KML_FOOTER);
+    await writer.close();
+}
+
+/**
+ * Doubles the quotes of a batch of CSV fields with one scan
+ * @param {Array<string>} values
+ * @returns {Array<string>}
+ */
+function escapeCsvFields(values) {
+    const strings = values.map(value => String(value));
+    const joined = strings.join('\u0000');
+    if (joined.indexOf('"') === -1) return strings;
+    return joined.replace(/"/g, '""').split('\u0000');
+}
+
+/**
+ * Writes one CSV row per KML point attribute
+ * @returns {Promise<number>} Rows written
+ */
+async function writeKmlAttributesCsv(pointList, sink) {
+    const writer = new ExportTextWriter(sink);
+    let rows = 0;
+    await writer.write('Latitude,Longitude,Attribute,Value\n');
+
+    for (let start = 0; start < pointList.length; start += EXPORT_BATCH_SIZE) {
+        const batch = pointList.slice(start, start + EXPORT_BATCH_SIZE).filter(point => point.customProperties);
+        const fields = escapeCsvFields(batch.flatMap(point => point.customProperties.flatMap(prop => [prop.name, prop.value])));
+        let text = '';
+        let f = 0;
+        batch.forEach(point => {
+            point.customProperties.forEach(() => {
+                text += `${point.latitude},${point.longitude}, "${fields[f]}", "${fields[f + 1]}"\n`;
+                f += 2;
+            });
+        });
+        rows += f / 2;
+        await writer.write(text);
+    }
+
+    await writer.close();
+    return rows;
+}
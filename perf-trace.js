@@ -0,0 +1,288 @@
+// Site Sector Mapper - Performance Trace
+//
+// Named spans around imports, rendering, thematic analysis, sync and
+// persistence. Every call updates a per-name count/total/max; recorded calls
+// are also kept in a ring buffer and marked with performance.mark/measure, so
+// they show up in the browser's Performance panel. Hot spans (called on every
+// pan or keystroke) are recorded for a sample of calls only. PerfHud is the
+// on-map panel: frame time, layer counts and the latest spans, with a JSON
+// export for bug reports.
+
+const PERF_TRACE_CAPACITY = 500; // Recorded spans kept
+const PERF_DEFAULT_SAMPLE_RATE = 0.2; // Share of hot-span calls recorded
+const PERF_HUD_SPANS = 12; // Spans listed in the HUD
+const PERF_HUD_REFRESH_MS = 500;
+
+class PerfTrace {
+    constructor(capacity = PERF_TRACE_CAPACITY, sampleRate = PERF_DEFAULT_SAMPLE_RATE) {
+        this.capacity = capacity;
+        this.sampleRate = sampleRate;
+        this.spans = []; // Ring buffer of { name, start, duration, sampled }
+        this.next = 0;
+        this.totals = new Map(); // name -> { count, total, max }
+        this.measures = 0;
+        this.markId = 0;
+        this.hasUserTiming = typeof performance !== 'undefined' && typeof performance.mark === 'function';
+    }
+
+    /**
+     * Starts a span; pass the result to end()
+     * @param {boolean} [sampled] - Record only a sampleRate share of calls
+     */
+    start(name, sampled = false) {
+        const record = !sampled || Math.random() < this.sampleRate;
+        // Calls can overlap (async spans), so every start mark gets its own name
+        const mark = record && this.hasUserTiming ? `${name}#${++this.markId}` : null;
+        if (mark) performance.mark(mark);
+        return { name, start: performance.now(), record, sampled, mark };
+    }
+
+    end(span) {
+        const duration = performance.now() - span.start;
+        let totals = this.totals.get(span.name);
+        if (!totals) this.totals.set(span.name, totals = { count: 0, total: 0, max: 0 });
+        totals.count++;
+        totals.total += duration;
+        if (duration > totals.max) totals.max = duration;
+        if (!span.record) return duration;
+
+        if (span.mark) {
+            performance.measure(span.name, span.mark);
+            performance.clearMarks(span.mark);
+            // The timeline keeps measures until cleared; drop ours once the ring has turned over
+            if (++this.measures >= this.capacity) {
+                this.totals.forEach((_, name) => performance.clearMeasures(name));
+                this.measures = 0;
+            }
+        }
+
+        const entry = { name: span.name, start: span.start, duration, sampled: span.sampled };
+        if (this.spans.length < this.capacity) this.spans.push(entry);
+        else this.spans[this.next] = entry;
+        this.next = (this.next + 1) % this.capacity;
+        return duration;
+    }
+
+    /**
+     * A function timed as a span on every call; promises are timed until they settle
+     * @param {Function} fn
+     * @param {Object} [options] - { sampled }
+     */
+    wrap(name, fn, { sampled = false } = {}) {
+        const trace = this;
+        return function (...args) {
+            const span = trace.start(name, sampled);
+            let result;
+            try {
+                result = fn.apply(this, args);
+            } catch (error) {
+                trace.end(span);
+                throw error;
+            }
+            if (result && typeof result.then === 'function') {
+                return result.finally(() => trace.end(span));
+            }
+            trace.end(span);
+            return result;
+        };
+    }
+
+    /**
+     * Recorded spans, newest first
+     */
+    recent(count = this.capacity) {
+        const ordered = this.spans.length < this.capacity
+            ? this.spans.slice()
+            : this.spans.slice(this.next).concat(this.spans.slice(0, this.next));
+        return ordered.reverse().slice(0, count);
+    }
+
+    /**
+     * Per-name statistics over every call, plus the 95th percentile of the recorded ones
+     */
+    summary() {
+        const durations = new Map();
+        this.spans.forEach(span => {
+            if (!durations.has(span.name)) durations.set(span.name, []);
+            durations.get(span.name).push(span.duration);
+        });
+        const result = {};
+        Array.from(this.totals.keys()).sort().forEach(name => {
+            const { count, total, max } = this.totals.get(name);
+            const recorded = (durations.get(name) || []).sort((a, b) => a - b);
+            result[name] = {
+                count,
+                mean: total / count,
+                max,
+                p95: recorded.length ? recorded[Math.min(recorded.length - 1, Math.floor(recorded.length * 0.95))] : null,
+                recorded: recorded.length
+            };
+        });
+        return result;
+    }
+
+    clear() {
+        this.spans = [];
+        this.next = 0;
+        this.totals.clear();
+    }
+
+    /**
+     * Everything a bug report needs, as plain JSON
+     * @param {Object} [extra] - Merged in (frame times, layer counts, ...)
+     */
+    toJSON(extra = {}) {
+        return {
+            created: new Date().toISOString(),
+            userAgent: typeof navigator !== 'undefined' ? navigator.userAgent : '',
+            sampleRate: this.sampleRate,
+            summary: this.summary(),
+            spans: this.recent().reverse().map(span => ({
+                name: span.name,
+                start: Math.round(span.start * 1000) / 1000,
+                duration: Math.round(span.duration * 1000) / 1000,
+                sampled: span.sampled
+            })),
+            ...extra
+        };
+    }
+}
+
+/**
+ * Frame times from requestAnimationFrame while running
+ */
+class FrameMonitor {
+    constructor() {
+        this.frames = []; // Frame durations of the last second
+        this.longTasks = 0;
+        this.handle = null;
+        this.last = 0;
+        this.observer = null;
+    }
+
+    startMonitoring() {
+        if (this.handle !== null) return;
+        this.last = performance.now();
+        const tick = now => {
+            this.frames.push(now - this.last);
+            this.last = now;
+            let total = 0;
+            for (let i = this.frames.length - 1; i >= 0; i--) {
+                total += this.frames[i];
+                if (total > 1000) {
+                    this.frames.splice(0, i);
+                    break;
+                }
+            }
+            this.handle = requestAnimationFrame(tick);
+        };
+        this.handle = requestAnimationFrame(tick);
+
+        if (typeof PerformanceObserver !== 'undefined' &&
+            (PerformanceObserver.supportedEntryTypes || []).includes('longtask')) {
+            this.observer = new PerformanceObserver(list => { this.longTasks += list.getEntries().length; });
+            this.observer.observe({ entryTypes: ['longtask'] });
+        }
+    }
+
+    stopMonitoring() {
+        if (this.handle !== null) cancelAnimationFrame(this.handle);
+        this.handle = null;
+        this.frames = [];
+        if (this.observer) this.observer.disconnect();
+        this.observer = null;
+    }
+
+    /**
+     * { fps, mean, worst } over the last second, in frames and milliseconds
+     */
+    stats() {
+        if (this.frames.length === 0) return { fps: 0, mean: 0, worst: 0, longTasks: this.longTasks };
+        const total = this.frames.reduce((sum, frame) => sum + frame, 0);
+        return {
+            fps: Math.round(this.frames.length * 1000 / total),
+            mean: total / this.frames.length,
+            worst: Math.max(...this.frames),
+            longTasks: this.longTasks
+        };
+    }
+}
+
+const PerfHud = L.Control.extend({
+    options: {
+        position: 'bottomleft',
+        counts: null, // () -> { label: number }
+        onExport: null
+    },
+
+    initialize(trace, options) {
+        L.setOptions(this, options);
+        this.trace = trace;
+        this.frames = new FrameMonitor();
+        this.timer = null;
+    },
+
+    onAdd() {
+        const container = L.DomUtil.create('div', 'perf-hud');
+        L.DomEvent.disableClickPropagation(container);
+        L.DomEvent.disableScrollPropagation(container);
+        container.innerHTML = `
+            <div class="perf-hud-header">
+                <span>Performance</span>
+                <span>
+                    <button type="button" data-action="export" title="Download as JSON">JSON</button>
+                    <button type="button" data-action="clear" title="Clear spans">Clear</button>
+                </span>
+            </div>
+            <div class="perf-hud-frames"></div>
+            <div class="perf-hud-counts"></div>
+            <table class="perf-hud-spans"></table>`;
+        container.addEventListener('click', e => {
+            const action = e.target.dataset && e.target.dataset.action;
+            if (action === 'export' && this.options.onExport) this.options.onExport();
+            if (action === 'clear') {
+                this.trace.clear();
+                this.refresh();
+            }
+        });
+
+        this.elements = {
+            frames: container.querySelector('.perf-hud-frames'),
+            counts: container.querySelector('.perf-hud-counts'),
+            spans: container.querySelector('.perf-hud-spans')
+        };
+        this.frames.startMonitoring();
+        this.timer = setInterval(() => this.refresh(), PERF_HUD_REFRESH_MS);
+        this.refresh();
+        return container;
+    },
+
+    onRemove() {
+        clearInterval(this.timer);
+        this.timer = null;
+        this.frames.stopMonitoring();
+    },
+
+    counts() {
+        return this.options.counts ? this.options.counts() : {};
+    },
+
+    refresh() {
+        const frames = this.frames.stats();
+        this.elements.frames.textContent =
+            `${frames.fps} fps · ${frames.mean.toFixed(1)} ms avg · ${frames.worst.toFixed(1)} ms worst · ${frames.longTasks} long tasks`;
+
+        const counts = this.counts();
+        this.elements.counts.textContent = Object.keys(counts).map(label => `${label} ${counts[label]}`).join(' · ');
+
+        this.elements.spans.innerHTML = this.trace.recent(PERF_HUD_SPANS).map(span =>
+            `<tr><td>${span.name}</td><td>${span.duration.toFixed(1)} ms</td></tr>`).join('');
+    },
+
+    /**
+     * The trace with the HUD's frame and layer figures, for export
+     */
+    snapshot() {
+        return this.trace.toJSON({ frames: this.frames.stats(), counts: this.counts() });
+    }
+});
@@ -0,0 +1,357 @@
+// Site Sector Mapper - KML Point Layer
+//
+// Draws KML/drive-test points on a single canvas instead of one Leaflet layer
+// per point. Positions are kept as Web Mercator fractions in typed arrays and
+// colours as indices into a small palette, so a redraw is one pass over the
+// arrays plus one filled path per colour. When a view holds more points than
+// can be told apart, each pixel cell is painted once. Clicks are hit-tested
+// against a screen-space bucket grid built during the last redraw.
+
+const POINT_LAYER_DENSE_THRESHOLD = 20000; // Visible points above which overlaps are skipped
+const POINT_LAYER_HIT_CELL = 16; // Hit-test bucket size in CSS pixels
+const POINT_LAYER_MAX_LATITUDE = 85.0511287798;
+
+const KmlPointLayer = L.Layer.extend({
+    options: {
+        pane: 'overlayPane',
+        radius: 5,
+        fillOpacity: 0.8,
+        strokeColor: '#fff',
+        strokeWidth: 1,
+        padding: 0.1, // Fraction of the view drawn beyond each edge, as L.Renderer
+        clickTolerance: 3
+    },
+
+    initialize(options) {
+        L.setOptions(this, options);
+        this._points = [];
+        this._mercX = new Float64Array(0);
+        this._mercY = new Float64Array(0);
+        this._colorIndex = new Uint32Array(0);
+        this._palette = [];
+        this._visibleCount = 0;
+        this._highlight = null;
+        this._hovering = false; // Map container has the kml-point-hover class
+        this._onContainerClick = this._onContainerClick.bind(this);
+        this._onContainerMouseMove = this._onContainerMouseMove.bind(this);
+    },
+
+    /**
+     * Replaces the drawn points
+     * @param {Array} pointList - Objects with latitude/longitude
+     * @param {Function} colorFn - point -> CSS colour (e.g. getPointColor)
+     */
+    setPoints(pointList, colorFn) {
+        const count = pointList.length;
+        const mercX = new Float64Array(count);
+        const mercY = new Float64Array(count);
+        const colorIndex = new Uint32Array(count);
+        const palette = [];
+        const paletteIndex = new Map();
+
+        for (let i = 0; i < count; i++) {
+            const point = pointList[i];
+            const lat = Math.max(-POINT_LAYER_MAX_LATITUDE, Math.min(POINT_LAYER_MAX_LATITUDE, point.latitude));
+            const sin = Math.sin(lat * Math.PI / 180);
+            mercX[i] = 0.5 + point.longitude / 360;
+            mercY[i] = 0.5 - Math.log((1 + sin) / (1 - sin)) / (4 * Math.PI);
+
+            const color = colorFn(point);
+            let index = paletteIndex.get(color);
+            if (index === undefined) {
+                index = palette.length;
+                palette.push(color);
+                paletteIndex.set(color, index);
+            }
+            colorIndex[i] = index;
+        }
+
+        this._points = pointList;
+        this._mercX = mercX;
+        this._mercY = mercY;
+        this._colorIndex = colorIndex;
+        this._palette = palette;
+        this._visible = new Uint32Array(count);
+        this._screenX = new Float32Array(count);
+        this._screenY = new Float32Array(count);
+        this._highlight = null;
+        return this.redraw();
+    },
+
+    getPoints() {
+        return this._points;
+    },
+
+    onAdd(map) {
+        this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-animated');
+        this._canvas.style.pointerEvents = 'none';
+        this.getPane().appendChild(this._canvas);
+        this._ctx = this._canvas.getContext('2d');
+
+        // Capture phase: points sit above the sector canvas, so they are tested first
+        const container = map.getContainer();
+        container.addEventListener('click', this._onContainerClick, true);
+        container.addEventListener('mousemove', this._onContainerMouseMove);
+        this.redraw();
+    },
+
+    onRemove(map) {
+        clearTimeout(this._highlightTimer);
+        const container = map.getContainer();
+        container.removeEventListener('click', this._onContainerClick, true);
+        container.removeEventListener('mousemove', this._onContainerMouseMove);
+        this._setHovering(false);
+        L.DomUtil.remove(this._canvas);
+        this._canvas = null;
+        this._ctx = null;
+    },
+
+    getEvents() {
+        const events = {
+            viewreset: this.redraw,
+            moveend: this.redraw,
+            resize: this.redraw
+        };
+        if (this._zoomAnimated) events.zoomanim = this._animateZoom;
+        return events;
+    },
+
+    _animateZoom(e) {
+        const scale = this._map.getZoomScale(e.zoom, this._zoom);
+        const offset = this._map._latLngToNewLayerPoint(this._topLeft, e.zoom, e.center);
+        L.DomUtil.setTransform(this._canvas, offset, scale);
+    },
+
+    redraw() {
+        if (!this._map || !this._canvas) return this;
+
+        const map = this._map;
+        const size = map.getSize();
+        const pad = size.multiplyBy(this.options.padding).round();
+        const width = size.x + 2 * pad.x;
+        const height = size.y + 2 * pad.y;
+        const dpr = window.devicePixelRatio || 1;
+
+        // Canvas origin, in layer coordinates, sits `pad` above/left of the container
+        const origin = map.containerPointToLayerPoint([-pad.x, -pad.y]).round();
+        this._zoom = map.getZoom();
+        this._topLeft = map.layerPointToLatLng(origin);
+        this._pad = pad;
+        L.DomUtil.setPosition(this._canvas, origin);
+
+        const canvas = this._canvas;
+        canvas.width = Math.round(width * dpr);
+        canvas.height = Math.round(height * dpr);
+        canvas.style.width = `${width}px`;
+        canvas.style.height = `${height}px`;
+
+        const ctx = this._ctx;
+        ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+        ctx.clearRect(0, 0, width, height);
+
+        const count = this._points.length;
+        this._visibleCount = 0;
+        if (count === 0) return this;
+
+        // Global pixel coordinates of the canvas origin
+        const scale = 256 * Math.pow(2, this._zoom);
+        const pixelOrigin = map.getPixelOrigin().add(origin);
+        const r = this.options.radius;
+        const mercX = this._mercX, mercY = this._mercY;
+        const visible = this._visible, screenX = this._screenX, screenY = this._screenY;
+
+        let visibleCount = 0;
+        for (let i = 0; i < count; i++) {
+            const x = mercX[i] * scale - pixelOrigin.x;
+            const y = mercY[i] * scale - pixelOrigin.y;
+            if (x < -r || y < -r || x > width + r || y > height + r) continue;
+            visible[visibleCount] = i;
+            screenX[visibleCount] = x;
+            screenY[visibleCount] = y;
+            visibleCount++;
+        }
+        this._visibleCount = visibleCount;
+
+        this._drawPoints(ctx, width, height, visibleCount > POINT_LAYER_DENSE_THRESHOLD);
+        this._buildHitGrid(width, height);
+        if (this._highlight) this._drawHighlight(ctx, scale, pixelOrigin);
+        return this;
+    },
+
+    _drawPoints(ctx, width, height, dense) {
+        const visibleCount = this._visibleCount;
+        const visible = this._visible, screenX = this._screenX, screenY = this._screenY;
+        const colorIndex = this._colorIndex;
+        const paletteSize = this._palette.length;
+        const r = this.options.radius;
+
+        // Counting sort of the visible points by colour: one path per colour
+        const starts = new Uint32Array(paletteSize + 1);
+        for (let k = 0; k < visibleCount; k++) starts[colorIndex[visible[k]] + 1]++;
+        for (let c = 0; c < paletteSize; c++) starts[c + 1] += starts[c];
+        const order = new Uint32Array(visibleCount);
+        const next = starts.slice(0, paletteSize);
+        for (let k = 0; k < visibleCount; k++) order[next[colorIndex[visible[k]]]++] = k;
+
+        // Dense views: one square per occupied cell, no outline
+        const cell = Math.max(1, Math.round(r * 0.6));
+        const columns = Math.ceil(width / cell) + 1;
+        const occupied = dense ? new Uint8Array(columns * (Math.ceil(height / cell) + 1)) : null;
+
+        ctx.lineWidth = this.options.strokeWidth;
+        ctx.strokeStyle = this.options.strokeColor;
+
+        for (let c = 0; c < paletteSize; c++) {
+            if (starts[c] === starts[c + 1]) continue;
+            ctx.fillStyle = this._palette[c];
+            ctx.globalAlpha = this.options.fillOpacity;
+            ctx.beginPath();
+            for (let j = starts[c]; j < starts[c + 1]; j++) {
+                const k = order[j];
+                const x = screenX[k], y = screenY[k];
+                if (dense) {
+                    const slot = Math.floor(y / cell) * columns + Math.floor(x / cell);
+                    if (slot < 0 || slot >= occupied.length || occupied[slot]) continue;
+                    occupied[slot] = 1;
+                    ctx.rect(x - cell, y - cell, 2 * cell, 2 * cell);
+                } else {
+                    ctx.moveTo(x + r, y);
+                    ctx.arc(x, y, r, 0, 2 * Math.PI);
+                }
+            }
+            ctx.fill();
+            if (!dense && this.options.strokeWidth > 0) {
+                ctx.globalAlpha = 1;
+                ctx.stroke();
+            }
+        }
+        ctx.globalAlpha = 1;
+    },
+
+    _buildHitGrid(width, height) {
+        const visibleCount = this._visibleCount;
+        const screenX = this._screenX, screenY = this._screenY;
+        const columns = Math.ceil(width / POINT_LAYER_HIT_CELL) + 1;
+        const rows = Math.ceil(height / POINT_LAYER_HIT_CELL) + 1;
+        const cellOf = k => {
+            const column = Math.min(columns - 1, Math.max(0, Math.floor(screenX[k] / POINT_LAYER_HIT_CELL)));
+            const row = Math.min(rows - 1, Math.max(0, Math.floor(screenY[k] / POINT_LAYER_HIT_CELL)));
+            return row * columns + column;
+        };
+
+        const starts = new Uint32Array(columns * rows + 1);
+        for (let k = 0; k < visibleCount; k++) starts[cellOf(k) + 1]++;
+        for (let c = 0; c < columns * rows; c++) starts[c + 1] += starts[c];
+        const entries = new Uint32Array(visibleCount);
+        const next = starts.slice(0, columns * rows);
+        for (let k = 0; k < visibleCount; k++) entries[next[cellOf(k)]++] = k;
+
+        this._hitGrid = { columns, rows, starts, entries };
+    },
+
+    /**
+     * Topmost point under a container pixel, or null
+     * @param {L.Point} containerPoint
+     */
+    getPointAt(containerPoint) {
+        if (!this._hitGrid || this._visibleCount === 0) return null;
+
+        const { columns, rows, starts, entries } = this._hitGrid;
+        const x = containerPoint.x + this._pad.x;
+        const y = containerPoint.y + this._pad.y;
+        const tolerance = this.options.radius + this.options.clickTolerance;
+        const c0 = Math.max(0, Math.floor((x - tolerance) / POINT_LAYER_HIT_CELL));
+        const c1 = Math.min(columns - 1, Math.floor((x + tolerance) / POINT_LAYER_HIT_CELL));
+        const r0 = Math.max(0, Math.floor((y - tolerance) / POINT_LAYER_HIT_CELL));
+        const r1 = Math.min(rows - 1, Math.floor((y + tolerance) / POINT_LAYER_HIT_CELL));
+
+        let best = -1;
+        let bestDistance = tolerance * tolerance;
+        for (let row = r0; row <= r1; row++) {
+            for (let column = c0; column <= c1; column++) {
+                const cell = row * columns + column;
+                for (let j = starts[cell]; j < starts[cell + 1]; j++) {
+                    const k = entries[j];
+                    const dx = this._screenX[k] - x, dy = this._screenY[k] - y;
+                    const distance = dx * dx + dy * dy;
+                    // Later points are drawn on top, so they win ties
+                    if (distance < bestDistance || (distance === bestDistance && k > best)) {
+                        best = k;
+                        bestDistance = distance;
+                    }
+                }
+            }
+        }
+        return best === -1 ? null : this._points[this._visible[best]];
+    },
+
+    _mapDragged() {
+        const map = this._map;
+        return (map.dragging && map.dragging.moved()) || (map.boxZoom && map.boxZoom.moved());
+    },
+
+    _isOverOtherLayer(e) {
+        // Markers, popups and controls are stacked above the points
+        return !!(e.target.closest && e.target.closest('.leaflet-marker-pane, .leaflet-popup-pane, .leaflet-tooltip-pane, .leaflet-control-container'));
+    },
+
+    _onContainerClick(e) {
+        if (!this._map || !this.listens('pointclick') || this._mapDragged() || this._isOverOtherLayer(e)) return;
+
+        const containerPoint = this._map.mouseEventToContainerPoint(e);
+        const point = this.getPointAt(containerPoint);
+        if (!point) return;
+
+        // Keep the sector canvas and the map from handling the same click
+        e.stopPropagation();
+        this.fire('pointclick', {
+            point,
+            latlng: this._map.containerPointToLatLng(containerPoint),
+            originalEvent: e
+        });
+    },
+
+    _onContainerMouseMove(e) {
+        if (!this._map || this._isOverOtherLayer(e)) return;
+        const hit = this.listens('pointclick') && this.getPointAt(this._map.mouseEventToContainerPoint(e));
+        this._setHovering(!!hit);
+    },
+
+    /**
+     * Shows the pointer over a point with a class, so a cursor the app set on
+     * the container (crosshair while adding or measuring) is left alone
+     */
+    _setHovering(hovering) {
+        if (hovering === this._hovering || !this._map) return;
+        this._hovering = hovering;
+        if (hovering) L.DomUtil.addClass(this._map.getContainer(), 'kml-point-hover');
+        else L.DomUtil.removeClass(this._map.getContainer(), 'kml-point-hover');
+    },
+
+    /**
+     * Rings a point for a moment (list selection feedback)
+     */
+    highlight(point, duration = 2000) {
+        clearTimeout(this._highlightTimer);
+        this._highlight = point;
+        this.redraw();
+        this._highlightTimer = setTimeout(() => {
+            this._highlight = null;
+            this.redraw();
+        }, duration);
+    },
+
+    _drawHighlight(ctx, scale, pixelOrigin) {
+        const point = this._highlight;
+        const lat = Math.max(-POINT_LAYER_MAX_LATITUDE, Math.min(POINT_LAYER_MAX_LATITUDE, point.latitude));
+        const sin = Math.sin(lat * Math.PI / 180);
+        const x = (0.5 + point.longitude / 360) * scale - pixelOrigin.x;
+        const y = (0.5 - Math.log((1 + sin) / (1 - sin)) / (4 * Math.PI)) * scale - pixelOrigin.y;
+
+        ctx.beginPath();
+        ctx.arc(x, y, this.options.radius + 6, 0, 2 * Math.PI);
+        ctx.lineWidth = 3;
+        ctx.strokeStyle = '#facc15';
+        ctx.stroke();
+    }
+});
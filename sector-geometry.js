@@ -0,0 +1,123 @@
+// Site Sector Mapper - Sector Geometry
+//
+// Wedge (sector polygon) construction shared by the map, the exporters and
+// the workers, plus an LRU cache of wedge vertex arrays. Cache keys contain
+// every geometric parameter, so an edited sector can never hit a stale entry;
+// invalidation only frees the entries its old parameters produced.
+
+/**
+ * Destination point from a start, bearing (degrees) and distance (meters)
+ */
+function destination(lat, lng, bearing, distance) {
+    const R = 6371e3; // Earth's radius in meters
+    const latRad = (lat * Math.PI) / 180;
+    const lngRad = (lng * Math.PI) / 180;
+    const bearingRad = (bearing * Math.PI) / 180;
+
+    const latDestRad = Math.asin(
+        Math.sin(latRad) * Math.cos(distance / R) +
+        Math.cos(latRad) * Math.sin(distance / R) * Math.cos(bearingRad)
+    );
+
+    const lngDestRad =
+        lngRad +
+        Math.atan2(
+            Math.sin(bearingRad) * Math.sin(distance / R) * Math.cos(latRad),
+            Math.cos(distance / R) - Math.sin(latRad) * Math.sin(latDestRad)
+        );
+
+    return {
+        lat: (latDestRad * 180) / Math.PI,
+        lng: (lngDestRad * 180) / Math.PI,
+    };
+}
+
+/**
+ * Closed wedge polygon: center, `steps + 1` arc points, center
+ * @returns {Array<Array<number>>} [[lat, lng], ...]
+ */
+function buildSectorWedge(lat, lng, azimuth, beamwidth, range, steps = 15) {
+    const center = [lat, lng];
+    const vertices = [center];
+    const startAngle = azimuth - beamwidth / 2;
+    const endAngle = azimuth + beamwidth / 2;
+
+    for (let i = 0; i <= steps; i++) {
+        const angle = startAngle + (i / steps) * (endAngle - startAngle);
+        const dest = destination(lat, lng, angle, range);
+        vertices.push([dest.lat, dest.lng]);
+    }
+
+    vertices.push(center);
+    return vertices;
+}
+
+// Arc segments per wedge by zoom: zoomed-out wedges are a few pixels wide
+const SECTOR_ARC_STEPS = [
+    { minZoom: 13, steps: 15 },
+    { minZoom: 11, steps: 8 },
+    { minZoom: 0, steps: 4 }
+];
+
+function sectorArcSteps(zoom) {
+    for (let i = 0; i < SECTOR_ARC_STEPS.length; i++) {
+        if (zoom >= SECTOR_ARC_STEPS[i].minZoom) return SECTOR_ARC_STEPS[i].steps;
+    }
+    return SECTOR_ARC_STEPS[SECTOR_ARC_STEPS.length - 1].steps;
+}
+
+class SectorGeometryCache {
+    constructor(maxEntries = 50000) {
+        this.maxEntries = maxEntries;
+        this.entries = new Map(); // Map iteration order doubles as LRU order
+        this.hits = 0;
+        this.misses = 0;
+    }
+
+    static key(lat, lng, azimuth, beamwidth, range, steps) {
+        return `${lat},${lng},${azimuth},${beamwidth},${range},${steps}`;
+    }
+
+    /**
+     * Cached wedge vertices; callers must not mutate the returned array
+     */
+    getWedge(lat, lng, azimuth, beamwidth, range, steps = 15) {
+        const key = SectorGeometryCache.key(lat, lng, azimuth, beamwidth, range, steps);
+        let vertices = this.entries.get(key);
+        if (vertices) {
+            this.hits++;
+            // Move to the most recently used end
+            this.entries.delete(key);
+            this.entries.set(key, vertices);
+            return vertices;
+        }
+
+        this.misses++;
+        vertices = buildSectorWedge(lat, lng, azimuth, beamwidth, range, steps);
+        this.entries.set(key, vertices);
+        if (this.entries.size > this.maxEntries) {
+            this.entries.delete(this.entries.keys().next().value);
+        }
+        return vertices;
+    }
+
+    /**
+     * Drops the wedges of a site's sectors (at every arc resolution)
+     * @param {Object} site - The site as it was before the change
+     */
+    invalidateSite(site) {
+        if (!site || !site.sectors) return;
+        const stepCounts = new Set(SECTOR_ARC_STEPS.map(level => level.steps));
+        stepCounts.add(15);
+        site.sectors.forEach(sector => {
+            stepCounts.forEach(steps => {
+                this.entries.delete(SectorGeometryCache.key(site.latitude, site.longitude,
+                    sector.azimuth, sector.beamwidth, sector.range, steps));
+            });
+        });
+    }
+
+    clear() {
+        this.entries.clear();
+    }
+}
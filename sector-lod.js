@@ -0,0 +1,125 @@
+// Site Sector Mapper - Sector Level of Detail
+//
+// Chooses how much sector geometry the map draws for a view:
+//   'aggregate' - one coverage glyph per screen grid cell: a petal for each
+//                 direction some sector in the cell points to, coloured by the
+//                 most common sector colour in that direction
+//   'simple'    - every wedge, with a coarse arc and no labels
+//   'full'      - every wedge at full arc resolution, with labels
+// Glyph count is bounded by the grid, not by the number of sectors, so a
+// whole country stays a few thousand polygons.
+//
+// DOM-free: positions are projected and unprojected by the caller.
+
+const SECTOR_LOD_FULL_ZOOM = 14; // Full wedges and labels from here
+const SECTOR_LOD_AGGREGATE_BELOW = 10; // Glyphs below this zoom...
+const SECTOR_LOD_FEW_SITES = 100; // ...unless the view holds at most this many sites
+const SECTOR_LOD_MAX_WEDGES = 8000; // Glyphs at any zoom beyond this many sectors in view
+const SECTOR_LOD_SIMPLE_STEPS = 4; // Arc segments of a simplified wedge
+const SECTOR_GLYPH_CELL = 48; // Grid cell size in CSS pixels
+const SECTOR_GLYPH_DIRECTIONS = 8; // Petals per glyph (45° each)
+
+/**
+ * @param {number} zoom
+ * @param {number} siteCount - Visible sites
+ * @param {number} sectorCount - Sectors of the visible sites
+ * @returns {'aggregate'|'simple'|'full'}
+ */
+function sectorLodLevel(zoom, siteCount, sectorCount) {
+    if (sectorCount > SECTOR_LOD_MAX_WEDGES) return 'aggregate';
+    if (zoom < SECTOR_LOD_AGGREGATE_BELOW && siteCount > SECTOR_LOD_FEW_SITES) return 'aggregate';
+    return zoom < SECTOR_LOD_FULL_ZOOM ? 'simple' : 'full';
+}
+
+function sectorDirection(azimuth) {
+    const step = 360 / SECTOR_GLYPH_DIRECTIONS;
+    const normalized = ((Number(azimuth) % 360) + 360) % 360;
+    return Math.floor(normalized / step + 0.5) % SECTOR_GLYPH_DIRECTIONS;
+}
+
+/**
+ * Groups sites into screen grid cells and counts sector colours per direction
+ * @param {Array<Object>} siteList
+ * @param {Function} project - site -> {x, y} in pixels
+ * @param {Function} colorOf - sector -> CSS colour
+ * @param {number} [cellSize]
+ * @returns {Array<Object>} Glyphs: { x, y, siteCount, sectorCount, sites, directions: [Map colour -> count] }
+ */
+function aggregateSectorGlyphs(siteList, project, colorOf, cellSize = SECTOR_GLYPH_CELL) {
+    const cells = new Map();
+
+    siteList.forEach(site => {
+        const sectors = site.sectors || [];
+        if (sectors.length === 0) return;
+
+        const p = project(site);
+        const key = `${Math.floor(p.x / cellSize)},${Math.floor(p.y / cellSize)}`;
+        let glyph = cells.get(key);
+        if (!glyph) {
+            glyph = { x: 0, y: 0, siteCount: 0, sectorCount: 0, sites: [], directions: [] };
+            for (let d = 0; d < SECTOR_GLYPH_DIRECTIONS; d++) glyph.directions.push(null);
+            cells.set(key, glyph);
+        }
+        glyph.x += p.x;
+        glyph.y += p.y;
+        glyph.siteCount++;
+        glyph.sites.push(site);
+
+        sectors.forEach(sector => {
+            const d = sectorDirection(sector.azimuth);
+            const color = colorOf(sector);
+            const counts = glyph.directions[d] || (glyph.directions[d] = new Map());
+            counts.set(color, (counts.get(color) || 0) + 1);
+            glyph.sectorCount++;
+        });
+    });
+
+    const glyphs = [...cells.values()];
+    glyphs.forEach(glyph => {
+        // Glyph sits on the mean position of its sites
+        glyph.x /= glyph.siteCount;
+        glyph.y /= glyph.siteCount;
+    });
+    return glyphs;
+}
+
+/**
+ * Most common colour in a direction, or null
+ */
+function dominantSectorColor(counts) {
+    if (!counts) return null;
+    let best = null;
+    let bestCount = 0;
+    counts.forEach((count, color) => {
+        if (count > bestCount) {
+            best = color;
+            bestCount = count;
+        }
+    });
+    return best;
+}
+
+/**
+ * Petal rings of a glyph, grouped by colour, in pixels
+ * @returns {Map<string, Array<Array<{x, y}>>>} colour -> rings
+ */
+function sectorGlyphRings(glyph, cellSize = SECTOR_GLYPH_CELL) {
+    const rings = new Map();
+    const step = 360 / SECTOR_GLYPH_DIRECTIONS;
+    // Bigger for busier cells, never past the cell
+    const radius = Math.min(cellSize / 2 - 2, 8 + 3 * Math.log2(glyph.sectorCount));
+
+    glyph.directions.forEach((counts, d) => {
+        const color = dominantSectorColor(counts);
+        if (!color) return;
+
+        const ring = [{ x: glyph.x, y: glyph.y }];
+        for (let i = 0; i <= 2; i++) {
+            const bearing = (d * step - step / 2 + i * step / 2) * Math.PI / 180;
+            ring.push({ x: glyph.x + radius * Math.sin(bearing), y: glyph.y - radius * Math.cos(bearing) });
+        }
+        if (!rings.has(color)) rings.set(color, []);
+        rings.get(color).push(ring);
+    });
+    return rings;
+}
@@ -0,0 +1,159 @@
+// Site Sector Mapper - Sector Tiles
+//
+// Draws the GeoJSON sector pyramids written by sitemapper/tiles.py instead
+// of building wedges in the browser. The tileset's TileJSON gives the tile
+// URL template and zoom range; L.GridLayer requests the tiles in view and
+// over-zooms past the highest level. Tiles hold whole wedges, and a wedge
+// touching several tiles has the same id in each, so copies are reference
+// counted and every wedge is drawn once. Wedges left out by featureFilter
+// stay loaded, so refresh() can show or restyle them without a refetch.
+
+/**
+ * Fetches and checks a tileset.json
+ * @param {string} url
+ * @returns {Promise<Object>} The TileJSON, with `tileUrl` resolved against `url`
+ */
+async function loadSectorTileJson(url) {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Tileset not found (${response.status})`);
+    const tilejson = await response.json();
+    if (!tilejson.tiles || tilejson.tiles.length === 0) throw new Error('Not a TileJSON tileset');
+    if (tilejson.format && tilejson.format !== 'geojson') {
+        throw new Error(`${tilejson.format.toUpperCase()} tiles are for vector tile viewers; build with --format geojson`);
+    }
+    tilejson.tileUrl = new URL(tilejson.tiles[0], new URL(url, location.href)).href;
+    return tilejson;
+}
+
+const SectorTileLayer = L.GridLayer.extend({
+    options: {
+        featureStyle: null, // feature -> path options
+        featureFilter: null, // feature -> false to leave the wedge off the map
+        onEachFeature: null // (feature, layer)
+    },
+
+    /**
+     * @param {Object} tilejson - From loadSectorTileJson()
+     * @param {Object} [options]
+     */
+    initialize(tilejson, options) {
+        L.setOptions(this, {
+            minZoom: tilejson.minzoom,
+            minNativeZoom: tilejson.minzoom,
+            maxNativeZoom: tilejson.maxzoom,
+            bounds: tilejson.bounds ? L.latLngBounds([tilejson.bounds[1], tilejson.bounds[0]],
+                [tilejson.bounds[3], tilejson.bounds[2]]) : undefined,
+            ...options
+        });
+        this.tilejson = tilejson;
+        this._group = L.featureGroup();
+        this._wedges = new Map(); // id -> { layer, refs }
+        this._tileIds = new Map(); // tile key -> ids
+        this._requests = new Map(); // tile key -> AbortController
+        this.on('tileunload', this._onTileUnload, this);
+    },
+
+    /**
+     * Whether tiles are drawn at a zoom (below minzoom the app draws wedges itself)
+     */
+    coversZoom(zoom) {
+        return zoom >= this.tilejson.minzoom;
+    },
+
+    /**
+     * Whether the tileset's features carry a property (older tilesets list no fields)
+     */
+    hasField(name) {
+        return (this.tilejson.fields || []).includes(name);
+    },
+
+    /**
+     * Re-applies featureFilter and featureStyle to the loaded wedges, e.g.
+     * after a group was hidden or the sector colours changed
+     */
+    refresh() {
+        this._wedges.forEach(wedge => this._place(wedge.layer));
+        return this;
+    },
+
+    _place(layer) {
+        if (this.options.featureStyle) layer.setStyle(this.options.featureStyle(layer.feature));
+        if (!this.options.featureFilter || this.options.featureFilter(layer.feature)) this._group.addLayer(layer);
+        else this._group.removeLayer(layer);
+    },
+
+    onAdd(map) {
+        L.GridLayer.prototype.onAdd.call(this, map);
+        this._group.addTo(map);
+    },
+
+    onRemove(map) {
+        this._requests.forEach(controller => controller.abort());
+        this._requests.clear();
+        L.GridLayer.prototype.onRemove.call(this, map);
+        this._group.remove();
+        this._group.clearLayers();
+        this._wedges.clear();
+        this._tileIds.clear();
+    },
+
+    createTile(coords, done) {
+        // Features go to the shared group; the tile element only tracks loading
+        const tile = document.createElement('div');
+        const key = this._tileCoordsToKey(coords);
+        const url = L.Util.template(this.tilejson.tileUrl, { z: coords.z, x: coords.x, y: coords.y });
+        const controller = new AbortController();
+        this._requests.set(key, controller);
+
+        fetch(url, { signal: controller.signal })
+            .then(response => (response.ok ? response.json() : { features: [] })) // Empty tiles are not written
+            .then(data => {
+                this._requests.delete(key);
+                this._addFeatures(key, data.features || []);
+                done(null, tile);
+            })
+            .catch(error => {
+                this._requests.delete(key);
+                if (error.name !== 'AbortError') done(error, tile);
+            });
+        return tile;
+    },
+
+    _addFeatures(key, features) {
+        const ids = [];
+        features.forEach(feature => {
+            let wedge = this._wedges.get(feature.id);
+            if (!wedge) {
+                const latLngs = L.GeoJSON.coordsToLatLngs(feature.geometry.coordinates, 1);
+                const layer = L.polygon(latLngs);
+                layer.feature = feature;
+                if (this.options.onEachFeature) this.options.onEachFeature(feature, layer);
+                wedge = { layer, refs: 0 };
+                this._wedges.set(feature.id, wedge);
+                this._place(layer);
+            }
+            wedge.refs++;
+            ids.push(feature.id);
+        });
+        this._tileIds.set(key, ids);
+    },
+
+    _onTileUnload(e) {
+        const key = this._tileCoordsToKey(e.coords);
+        const controller = this._requests.get(key);
+        if (controller) {
+            controller.abort();
+            this._requests.delete(key);
+        }
+
+        const ids = this._tileIds.get(key);
+        if (!ids) return;
+        this._tileIds.delete(key);
+        ids.forEach(id => {
+            const wedge = this._wedges.get(id);
+            if (!wedge || --wedge.refs > 0) return;
+            this._group.removeLayer(wedge.layer);
+            this._wedges.delete(id);
+        });
+    }
+});
@@ -0,0 +1,321 @@
+// Site Sector Mapper - Serving Index
+//
+// Assigns every KML sample to the sector serving it, in one bulk pass that is
+// cached until the data changes. Each sample goes to the first rule that
+// finds a sector:
+//   cell    - its cell name names a sector (ConnectionIndex); reused names
+//             resolve to the nearest preferred site, then the nearest other
+//   earfcn  - its "site" attribute names a site with a sector on its EARFCN;
+//             the sector pointing closest to the sample wins
+//   wedge   - it lies inside sector wedges (true arc, as in sitemapper/geodesy.py);
+//             the nearest site wins, then the sector pointing closest to it
+//   nearest - the sector of the nearest site pointing closest to it, within
+//             SERVING_NEAREST_MAX_DISTANCE
+// Samples are bucketed on a grid so each bucket asks the site index for its
+// candidate sites once. Clicks, popups and statistics then read the cached
+// assignments instead of scanning the points.
+
+const SERVING_METHODS = ['cell', 'earfcn', 'wedge', 'nearest'];
+const SERVING_NEAREST_MAX_DISTANCE = 10000; // meters
+const SERVING_BUCKET_SIZE = 0.05; // degrees
+
+/**
+ * Initial bearing in degrees (0-360) from one point to another
+ */
+function servingBearing(lat1, lng1, lat2, lng2) {
+    const phi1 = lat1 * Math.PI / 180;
+    const phi2 = lat2 * Math.PI / 180;
+    const dLambda = (lng2 - lng1) * Math.PI / 180;
+    const y = Math.sin(dLambda) * Math.cos(phi2);
+    const x = Math.cos(phi1) * Math.sin(phi2) - Math.sin(phi1) * Math.cos(phi2) * Math.cos(dLambda);
+    return (Math.atan2(y, x) * 180 / Math.PI + 360) % 360;
+}
+
+/**
+ * Angle in degrees (0-180) between a bearing and a sector's azimuth
+ */
+function servingOffset(bearing, azimuth) {
+    return Math.abs(((bearing - (Number(azimuth) || 0)) % 360 + 540) % 360 - 180);
+}
+
+/**
+ * Whether a sample `distance` meters away on `bearing` lies inside a sector
+ */
+function servingInSector(sector, distance, bearing) {
+    if (distance > (Number(sector.range) || 0)) return false;
+    const beamwidth = Number(sector.beamwidth) || 0;
+    return distance === 0 || beamwidth >= 360 || servingOffset(bearing, sector.azimuth) <= beamwidth / 2;
+}
+
+/**
+ * The sector of a site pointing closest to a bearing
+ */
+function servingClosestSector(sectors, bearing) {
+    let best = null;
+    let bestOffset = Infinity;
+    sectors.forEach(sector => {
+        const offset = servingOffset(bearing, sector.azimuth);
+        if (offset < bestOffset) {
+            bestOffset = offset;
+            best = sector;
+        }
+    });
+    return best;
+}
+
+function siteMaxRange(site) {
+    let range = 0;
+    (site.sectors || []).forEach(sector => { range = Math.max(range, Number(sector.range) || 0); });
+    return range;
+}
+
+class ServingIndex {
+    /**
+     * @param {ConnectionIndex} connectionIndex - Cell name / EARFCN lookups
+     * @param {SpatialGridIndex} siteIndex - Sites by position
+     * @param {Function} [preferSite] - site -> boolean; preferred sites win reused cell names
+     */
+    constructor(connectionIndex, siteIndex, preferSite = null) {
+        this.connectionIndex = connectionIndex;
+        this.siteIndex = siteIndex;
+        this.preferSite = preferSite;
+        this.assignments = new Map(); // point id -> { point, site, sector, method, distance } or null
+        this.bySector = new Map(); // sector -> Set of point ids
+        this.stats = new Map(); // sector -> statsFor() result
+        this.dirty = true;
+    }
+
+    /**
+     * Drops every assignment (sites changed, or which sites are preferred)
+     */
+    invalidate() {
+        this.assignments.clear();
+        this.bySector.clear();
+        this.stats.clear();
+        this.dirty = true;
+    }
+
+    /**
+     * Drops one sample's assignment; it is recomputed by the next assign()
+     */
+    forgetPoint(point) {
+        const assignment = this.assignments.get(point.id);
+        this.assignments.delete(point.id);
+        this.dirty = true;
+        if (!assignment) return;
+        const bucket = this.bySector.get(assignment.sector);
+        if (bucket) bucket.delete(point.id);
+        this.stats.delete(assignment.sector);
+    }
+
+    /**
+     * Assigns the KML samples of a list that have no assignment yet
+     * @param {Array} pointList - All points; other types are skipped
+     * @param {Array} siteList - All sites, for "site" attribute lookups
+     */
+    assign(pointList, siteList) {
+        if (!this.dirty) return;
+        this.dirty = false;
+
+        let sitesByName = null;
+        const buckets = new Map(); // grid cell -> samples left for geometry
+
+        for (let i = 0; i < pointList.length; i++) {
+            const point = pointList[i];
+            if (point.type !== 'kml_point' || this.assignments.has(point.id)) continue;
+            const lat = Number(point.latitude), lng = Number(point.longitude);
+
+            let result = this.matchCell(point, lat, lng);
+            if (!result) {
+                const record = this.connectionIndex.pointRecords.get(point.id);
+                if (record && record.earfcns.size > 0 && record.siteValues.size > 0) {
+                    if (!sitesByName) sitesByName = this.sitesByName(siteList);
+                    result = this.matchEarfcn(record, sitesByName, lat, lng);
+                }
+            }
+            if (result) {
+                this.store(point, result);
+            } else if (Number.isFinite(lat) && Number.isFinite(lng)) {
+                const key = `${Math.floor(lat / SERVING_BUCKET_SIZE)}:${Math.floor(lng / SERVING_BUCKET_SIZE)}`;
+                let bucket = buckets.get(key);
+                if (!bucket) buckets.set(key, bucket = []);
+                bucket.push(point);
+            } else {
+                this.assignments.set(point.id, null);
+            }
+        }
+
+        if (buckets.size > 0) this.matchGeometry(buckets);
+    }
+
+    matchCell(point, lat, lng) {
+        const cellName = pointCellName(point);
+        if (!cellName) return null;
+        let best = null;
+        let bestPreferred = false;
+        this.connectionIndex.findSectors(cellName).forEach(({ site, sector }) => {
+            const preferred = !this.preferSite || this.preferSite(site);
+            if (best && bestPreferred && !preferred) return;
+            const distance = spatialDistance(lat, lng, site.latitude, site.longitude);
+            if (!best || distance < best.distance || (preferred && !bestPreferred)) {
+                best = { site, sector, method: 'cell', distance };
+                bestPreferred = preferred;
+            }
+        });
+        return best;
+    }
+
+    sitesByName(siteList) {
+        const byName = new Map();
+        siteList.forEach(site => {
+            if (site.name) addToMultiMap(byName, normalizeMatchKey(site.name), site);
+        });
+        return byName;
+    }
+
+    matchEarfcn(record, sitesByName, lat, lng) {
+        let best = null;
+        let bestOffset = Infinity;
+        record.siteValues.forEach(value => {
+            const candidates = sitesByName.get(value);
+            if (!candidates) return;
+            candidates.forEach(site => {
+                const distance = spatialDistance(lat, lng, site.latitude, site.longitude);
+                const bearing = servingBearing(site.latitude, site.longitude, lat, lng);
+                (site.sectors || []).forEach(sector => {
+                    if (!sectorEarfcnValues(sector).some(earfcn => record.earfcns.has(earfcn))) return;
+                    const offset = servingOffset(bearing, sector.azimuth);
+                    if (offset < bestOffset) {
+                        bestOffset = offset;
+                        best = { site, sector, method: 'earfcn', distance };
+                    }
+                });
+            });
+        });
+        return best;
+    }
+
+    /**
+     * Wedge containment, then nearest site, for the samples left over
+     * @param {Map<string, Array>} buckets - Grid cell -> samples
+     */
+    matchGeometry(buckets) {
+        const ranges = new Map(); // site -> max sector range
+        let maxRange = 0;
+        this.siteIndex.entries.forEach(entry => {
+            const range = siteMaxRange(entry.item);
+            ranges.set(entry.item, range);
+            maxRange = Math.max(maxRange, range);
+        });
+
+        buckets.forEach(bucketPoints => {
+            let south = Infinity, west = Infinity, north = -Infinity, east = -Infinity;
+            bucketPoints.forEach(point => {
+                south = Math.min(south, point.latitude);
+                north = Math.max(north, point.latitude);
+                west = Math.min(west, point.longitude);
+                east = Math.max(east, point.longitude);
+            });
+            const latMargin = maxRange / SPATIAL_METERS_PER_DEGREE;
+            const lngMargin = latMargin / Math.max(0.01, Math.cos(Math.min(89, Math.max(Math.abs(south), Math.abs(north))) * Math.PI / 180));
+            const candidates = maxRange > 0
+                ? this.siteIndex.search(south - latMargin, west - lngMargin, north + latMargin, east + lngMargin)
+                : [];
+
+            bucketPoints.forEach(point => {
+                const lat = point.latitude, lng = point.longitude;
+                let best = null;
+                let bestOffset = Infinity;
+
+                candidates.forEach(site => {
+                    if (Math.abs(site.latitude - lat) > latMargin) return;
+                    const distance = spatialDistance(lat, lng, site.latitude, site.longitude);
+                    if (distance > ranges.get(site) || (best && distance > best.distance)) return;
+                    const bearing = servingBearing(site.latitude, site.longitude, lat, lng);
+                    (site.sectors || []).forEach(sector => {
+                        if (!servingInSector(sector, distance, bearing)) return;
+                        const offset = servingOffset(bearing, sector.azimuth);
+                        if (!best || distance < best.distance || offset < bestOffset) {
+                            best = { site, sector, method: 'wedge', distance };
+                            bestOffset = offset;
+                        }
+                    });
+                });
+
+                if (!best) {
+                    const nearest = this.siteIndex.nearest(lat, lng, 1, SERVING_NEAREST_MAX_DISTANCE,
+                        site => site.sectors && site.sectors.length > 0);
+                    if (nearest.length > 0) {
+                        const { item: site, distance } = nearest[0];
+                        const bearing = servingBearing(site.latitude, site.longitude, lat, lng);
+                        best = { site, sector: servingClosestSector(site.sectors, bearing), method: 'nearest', distance };
+                    }
+                }
+
+                if (best) this.store(point, best);
+                else this.assignments.set(point.id, null);
+            });
+        });
+    }
+
+    store(point, result) {
+        result.point = point;
+        this.assignments.set(point.id, result);
+        addToMultiMap(this.bySector, result.sector, point.id);
+        this.stats.delete(result.sector);
+    }
+
+    /**
+     * @returns {Object|null} { point, site, sector, method, distance } from the last assign()
+     */
+    assignmentFor(point) {
+        return this.assignments.get(point.id) || null;
+    }
+
+    /**
+     * Samples assigned to a sector
+     * @returns {Array}
+     */
+    pointsFor(sector) {
+        const bucket = this.bySector.get(sector);
+        if (!bucket) return [];
+        const result = [];
+        bucket.forEach(id => result.push(this.assignments.get(id).point));
+        return result;
+    }
+
+    /**
+     * Sample count per assignment method and min/mean/max of each numeric attribute
+     * @returns {{count: number, methods: Object, measures: Array<{name, count, min, mean, max}>}}
+     */
+    statsFor(sector) {
+        let stats = this.stats.get(sector);
+        if (stats) return stats;
+
+        const methods = {};
+        SERVING_METHODS.forEach(method => { methods[method] = 0; });
+        const measures = new Map();
+        const samples = this.pointsFor(sector);
+        samples.forEach(point => {
+            methods[this.assignments.get(point.id).method]++;
+            (point.customProperties || []).forEach(prop => {
+                if (!isNumericMatchValue(prop.value)) return;
+                const value = Number(prop.value);
+                let measure = measures.get(prop.name);
+                if (!measure) measures.set(prop.name, measure = { name: prop.name, count: 0, min: Infinity, sum: 0, max: -Infinity });
+                measure.count++;
+                measure.sum += value;
+                if (value < measure.min) measure.min = value;
+                if (value > measure.max) measure.max = value;
+            });
+        });
+
+        stats = {
+            count: samples.length,
+            methods,
+            measures: Array.from(measures.values()).map(({ name, count, min, sum, max }) => ({ name, count, min, mean: sum / count, max }))
+        };
+        this.stats.set(sector, stats);
+        return stats;
+    }
+}
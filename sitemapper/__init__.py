@@ -0,0 +1 @@
+"""Offline Python tooling for Site Sector Mapper data files."""
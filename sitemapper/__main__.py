@@ -0,0 +1,51 @@
+"""Command-line entry point: python -m sitemapper <command> [options].
+
+Each command is a module of this package and can also be run on its own
+(python -m sitemapper.tiles ...).
+
+Usage:
+    python -m sitemapper tiles sample_sites.csv -o tiles/sectors
+    python -m sitemapper kml-export sample_sites.csv --mode full -o sites_full.kml
+    python -m sitemapper <command> --help
+"""
+
+import importlib
+import sys
+
+COMMANDS = {
+    'ingest': ('kml_ingest', 'Stream a KML/KMZ into the KML Import point list'),
+    'columnar': ('columnar', 'Convert KML/KMZ or ingested JSON points to .ssmc'),
+    'kml-export': ('kml_export', 'Export a sites dataset to KML/KMZ'),
+    'merge': ('drive_merge', 'Merge, de-duplicate and downsample drive tests'),
+    'tiles': ('tiles', 'Precompute sector wedge tiles'),
+    'serve': ('server', 'Serve the app offline with compression, caching and /data'),
+    'mock-airtable': ('mock_airtable', 'Serve a local mock of the Airtable API'),
+    'synth': ('synth', 'Generate a synthetic network or drive test'),
+    'bench': ('bench', 'Benchmark the pipelines and the app on synthetic data'),
+    'vendor': ('vendor', 'Download the vendor/ copies of the app\'s libraries'),
+}
+
+
+def usage():
+    lines = ['usage: python -m sitemapper <command> [options]', '', 'commands:']
+    for name, (_, summary) in COMMANDS.items():
+        lines.append('  %-14s %s' % (name, summary))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    if argv[0] not in COMMANDS:
+        print('unknown command: %s\n\n%s' % (argv[0], usage()), file=sys.stderr)
+        sys.exit(2)
+
+    module = importlib.import_module('sitemapper.' + COMMANDS[argv[0]][0])
+    sys.argv[0] = 'sitemapper ' + argv[0]
+    module.main(argv[1:])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Benchmarks the Python pipelines and the app's data paths at several scales.
+
+For each scale N it generates (once, into --data) a network of N sectors and
+a drive test of N samples with sitemapper.synth, times the Python pipelines
+on them, then runs bench.js under Node for parseKml, processImportData,
+generateThematicSettings and exportToKML. All results go into one JSON file;
+with --baseline, timings more than --tolerance slower than the baseline's
+are listed and the exit status is 1, so the file can gate a change.
+
+Pipelines that need something missing here (NumPy for geodesy, Node, jsdom
+for parseKml) are recorded as skipped with the reason.
+
+Usage:
+    python -m sitemapper.bench -o bench.json
+    python -m sitemapper.bench --scales 10000 100000 --repeat 3 -o bench.json
+    python -m sitemapper.bench --scales 10000 --baseline bench.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from sitemapper import synth
+from sitemapper.columnar import write_columnar
+from sitemapper.kml_export import write_sites_kml
+from sitemapper.kml_ingest import iter_points, write_json
+from sitemapper.sites import load_sites
+from sitemapper.tiles import build_pyramid
+
+DEFAULT_SCALES = (10000, 100000, 1000000)
+PIPELINES = ('kml_ingest', 'columnar', 'sites', 'kml_export', 'tiles', 'geodesy', 'node')
+TILE_ZOOMS = (10, 12)
+
+BENCH_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench.js')
+
+
+def scale_label(scale):
+    for size, suffix in ((1000000, 'm'), (1000, 'k')):
+        if scale >= size and scale % size == 0:
+            return '%d%s' % (scale // size, suffix)
+    return str(scale)
+
+
+def dataset(data_dir, scale, seed=1):
+    """Paths of the sites CSV and drive KML for a scale, generating missing ones."""
+    label = scale_label(scale)
+    sites_path = os.path.join(data_dir, 'sites_%s.csv' % label)
+    kml_path = os.path.join(data_dir, 'drive_%s.kml' % label)
+    if not os.path.exists(sites_path):
+        with open(sites_path + '.tmp', 'w', encoding='utf-8', newline='') as out:
+            synth.write_network((scale + 2) // 3, out, seed)
+        os.replace(sites_path + '.tmp', sites_path)
+    if not os.path.exists(kml_path):
+        with open(kml_path + '.tmp', 'w', encoding='utf-8', newline='') as out:
+            synth.write_drive_kml(synth.drive_samples(load_sites(sites_path), scale, seed), out)
+        os.replace(kml_path + '.tmp', kml_path)
+    return sites_path, kml_path
+
+
+def timed(run, repeat):
+    """(best seconds, median seconds, last result) of `repeat` runs."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return times[0], times[len(times) // 2], result
+
+
+def python_results(sites_path, kml_path, pipelines, repeat, jobs):
+    results = []
+
+    def record(name, run, items=None):
+        best, median, output = timed(run, repeat)
+        results.append({'name': name, 'runtime': 'python', 'items': output if items is None else items,
+                        'seconds': best, 'median': median})
+        return output
+
+    def skip(name, reason):
+        results.append({'name': name, 'runtime': 'python', 'skipped': reason})
+
+    with open(os.devnull, 'w', encoding='utf-8') as null_text, open(os.devnull, 'wb') as null_bytes:
+        if 'kml_ingest' in pipelines:
+            record('kml_ingest', lambda: write_json(iter_points(kml_path), null_text))
+        if 'columnar' in pipelines:
+            record('columnar', lambda: write_columnar(iter_points(kml_path), null_bytes, 'bench'))
+        sites = load_sites(sites_path)
+        sector_count = sum(len(site['sectors']) for site in sites)
+        if 'sites' in pipelines:
+            record('load_sites', lambda: load_sites(sites_path), sector_count)
+        if 'kml_export' in pipelines:
+            record('kml_export full', lambda: write_sites_kml(sites, 'full', null_text), sector_count)
+
+    if 'tiles' in pipelines:
+        output = tempfile.mkdtemp(prefix='sitemapper-bench-')
+        try:
+            record('tiles z%d-%d' % TILE_ZOOMS,
+                   lambda: build_pyramid(sites, output, 'geojson', TILE_ZOOMS[0], TILE_ZOOMS[1], jobs), sector_count)
+        finally:
+            shutil.rmtree(output, ignore_errors=True)
+
+    if 'geodesy' in pipelines:
+        try:
+            import numpy as np
+            from sitemapper import geodesy
+        except ImportError:
+            skip('geodesy sector_hits', 'NumPy is not installed')
+        else:
+            coordinates = [(p['latitude'], p['longitude']) for p in iter_points(kml_path)]
+            lats = np.array([c[0] for c in coordinates])
+            lngs = np.array([c[1] for c in coordinates])
+            sectors = {key: np.array([site[key] for site in sites for _ in site['sectors']], dtype=float)
+                       for key in ('latitude', 'longitude')}
+            for key in ('azimuth', 'beamwidth', 'range'):
+                sectors[key] = np.array([sector[key] for site in sites for sector in site['sectors']], dtype=float)
+            record('geodesy sector_hits', lambda: geodesy.sector_hits(lats, lngs, sectors), len(lats))
+    return results
+
+
+def node_results(sites_path, kml_path, repeat):
+    node = shutil.which('node')
+    if not node:
+        return [{'name': 'bench.js', 'runtime': 'node', 'skipped': 'node is not on PATH'}], None
+    # 1M parsed samples outgrow Node's default heap
+    command = [node, '--max-old-space-size=8192', BENCH_JS, '--sites', sites_path, '--kml', kml_path,
+               '--repeat', str(repeat)]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, universal_newlines=True)
+    if completed.returncode != 0:
+        return [{'name': 'bench.js', 'runtime': 'node', 'skipped': 'exit status %d' % completed.returncode}], None
+    report = json.loads(completed.stdout)
+    return report['results'], report['node']
+
+
+def compare(results, baseline, tolerance):
+    """Results slower than their baseline entry by more than `tolerance` (a fraction)."""
+    previous = {(r['runtime'], r['name'], r['scale']): r for r in baseline['results'] if 'seconds' in r}
+    slower = []
+    for result in results:
+        base = previous.get((result['runtime'], result['name'], result['scale']))
+        if base and 'seconds' in result and result['seconds'] > base['seconds'] * (1 + tolerance):
+            slower.append((result, base))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Python pipelines and the app on synthetic data.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help='Samples and sectors per run (default: 10000 100000 1000000)')
+    parser.add_argument('--data', default='bench-data', help='Directory for generated datasets (default: bench-data)')
+    parser.add_argument('--only', nargs='+', choices=PIPELINES, default=list(PIPELINES),
+                        help='Pipelines to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per timing; the best is reported (default: 1)')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes for tiles (default: one per CPU)')
+    parser.add_argument('-o', '--output', help='Output JSON file (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against --baseline, as a fraction (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data, exist_ok=True)
+    report = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'node': None,
+        'results': [],
+    }
+
+    for scale in args.scales:
+        print('Scale %s: preparing data' % scale_label(scale), file=sys.stderr)
+        sites_path, kml_path = dataset(args.data, scale)
+        results = python_results(sites_path, kml_path, args.only, args.repeat, args.jobs)
+        if 'node' in args.only:
+            print('Scale %s: bench.js' % scale_label(scale), file=sys.stderr)
+            node_part, report['node'] = node_results(sites_path, kml_path, args.repeat)
+            results.extend(node_part)
+        for result in results:
+            result['scale'] = scale
+            if result.get('seconds'):
+                result['rate'] = round(result['items'] / result['seconds'], 1)
+            print('  %-6s %-44s %s' % (result['runtime'], result['name'],
+                                       '%.3f s' % result['seconds'] if 'seconds' in result
+                                       else 'skipped: ' + result['skipped']), file=sys.stderr)
+        report['results'].extend(results)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            out.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            slower = compare(report['results'], json.load(f), args.tolerance)
+        for result, base in slower:
+            print('SLOWER %s %s @ %s: %.3f s (baseline %.3f s)' % (result['runtime'], result['name'],
+                                                                 scale_label(result['scale']),
+                                                                 result['seconds'], base['seconds']),
+                  file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
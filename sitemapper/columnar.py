@@ -0,0 +1,312 @@
+"""Columnar binary point files ("SSMC") for the KML Import tab.
+
+The layout is documented in columnar.js, which reads and writes the same
+format in the browser:
+
+    'SSMC' | uint32 version | uint32 header length | JSON header | padding
+    | 8-byte aligned column arrays (little endian)
+
+Latitude/longitude are float64 arrays, repeated strings are dictionary
+encoded, canonical numeric attributes (RSCP, RSRP, EARFCN...) become float64
+columns and high-cardinality strings are stored as one UTF-8 blob with UTF-16
+offsets.
+
+Usage:
+    python -m sitemapper.columnar "Couverture 3G.kml" -o couverture.ssmc
+    python -m sitemapper.columnar couverture.json --group "Couverture 3G.kml"
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+
+from sitemapper import kml_ingest
+
+MAGIC = b'SSMC'
+VERSION = 1
+
+# Column name -> key in the kml_ingest point dict
+FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'group': 'group',
+    'color': 'color',
+}
+
+INDEX_TYPES = (('uint8', 'B', 0xFF), ('uint16', 'H', 0xFFFF), ('uint32', 'I', None))
+
+
+def js_number_string(value):
+    """Return String(Number(value)) as JavaScript would, or None.
+
+    Only values that round-trip exactly are stored as float64, so the browser
+    restores the very same attribute text.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+    if not math.isfinite(number) or (number == 0 and math.copysign(1, number) < 0):
+        return None
+    if number.is_integer() and abs(number) < 1e21:
+        return str(int(number))
+    text = repr(number)
+    if 'e' in text or abs(number) < 1e-6:
+        return None
+    return text
+
+
+class ColumnBuilder(object):
+    """Accumulates one column as dictionary indices while rows stream in."""
+
+    def __init__(self, name, role, start_row=0):
+        self.name = name
+        self.role = role
+        self.lookup = {}
+        self.values = []
+        # 0 = missing; rows seen before the column first appeared are missing
+        self.indices = array('I', [0] * start_row)
+
+    def append(self, value):
+        if value is None:
+            self.indices.append(0)
+            return
+        key = (type(value) is str, value)
+        idx = self.lookup.get(key)
+        if idx is None:
+            self.values.append(value)
+            idx = len(self.values)
+            self.lookup[key] = idx
+        self.indices.append(idx)
+
+    def pad(self, count):
+        while len(self.indices) < count:
+            self.indices.append(0)
+
+    def build(self):
+        """Return (descriptor, {buffer name: bytes})."""
+        count = len(self.indices)
+        present = count - self.indices.count(0)
+
+        if self.role == 'attribute' and present:
+            numbers = [js_number_string(v) for v in self.values]
+            all_numbers = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in self.values)
+            all_strings = all(isinstance(v, str) and n == v for v, n in zip(self.values, numbers))
+            if all_numbers or all_strings:
+                lookup = [float('nan')] + [float(v) for v in self.values]
+                data = array('d', (lookup[i] for i in self.indices))
+                descriptor = {'name': self.name, 'role': self.role, 'type': 'float64',
+                              'valueType': 'number' if all_numbers else 'string'}
+                return descriptor, {'data': data.tobytes()}
+
+        distinct = len(self.values)
+        if distinct <= 0xFFFF and distinct <= max(16, count >> 2):
+            for type_name, code, limit in INDEX_TYPES:
+                if limit is None or distinct + 1 < limit:
+                    break
+            indices = array(code, self.indices)
+            descriptor = {'name': self.name, 'role': self.role, 'type': 'dict',
+                          'index': type_name, 'dictionary': self.values}
+            return descriptor, {'indices': indices.tobytes()}
+
+        # High-cardinality strings: offsets are UTF-16 code units to match
+        # String.prototype.substring in the browser
+        offsets = array('I', [0])
+        presence = bytearray(count) if present < count else None
+        parts = []
+        length = 0
+        for row, idx in enumerate(self.indices):
+            if idx:
+                text = str(self.values[idx - 1])
+                parts.append(text)
+                length += len(text.encode('utf-16-le')) // 2
+                if presence is not None:
+                    presence[row] = 1
+            offsets.append(length)
+        buffers = {'offsets': offsets.tobytes(), 'blob': ''.join(parts).encode('utf-8')}
+        if presence is not None:
+            buffers['presence'] = bytes(presence)
+        return {'name': self.name, 'role': self.role, 'type': 'text'}, buffers
+
+
+def write_columnar(points, out, group=None):
+    """Stream point dicts (kml_ingest shape) into an SSMC file object.
+
+    Returns the number of points written.
+    """
+    latitude = array('d')
+    longitude = array('d')
+    fields = dict((name, ColumnBuilder(name, 'field')) for name in FIELDS)
+    attributes = {}
+    count = 0
+
+    for point in points:
+        latitude.append(float(point['latitude']))
+        longitude.append(float(point['longitude']))
+        for name, key in FIELDS.items():
+            value = point.get(key)
+            if name == 'group' and value is None:
+                value = group
+            fields[name].append(value)
+        for prop in point.get('customProperties') or ():
+            column = attributes.get(prop['name'])
+            if column is None:
+                column = attributes[prop['name']] = ColumnBuilder(prop['name'], 'attribute', count)
+            column.pad(count)
+            column.append(prop['value'])
+        count += 1
+
+    columns = [
+        ({'name': 'latitude', 'role': 'field', 'type': 'float64'}, {'data': latitude.tobytes()}),
+        ({'name': 'longitude', 'role': 'field', 'type': 'float64'}, {'data': longitude.tobytes()}),
+    ]
+    for builder in list(fields.values()) + list(attributes.values()):
+        builder.pad(count)
+        columns.append(builder.build())
+
+    if sys.byteorder != 'little':
+        raise RuntimeError('SSMC files are little endian; big endian hosts are not supported')
+
+    offset = 0
+    header_columns = []
+    for descriptor, buffers in columns:
+        descriptor = dict(descriptor, buffers={})
+        for key, data in buffers.items():
+            descriptor['buffers'][key] = {'offset': offset, 'byteLength': len(data)}
+            offset += (len(data) + 7) // 8 * 8
+        header_columns.append(descriptor)
+
+    header = json.dumps({'count': count, 'columns': header_columns},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    out.write(MAGIC)
+    out.write(struct.pack('<II', VERSION, len(header)))
+    out.write(header)
+    out.write(b'\0' * ((12 + len(header) + 7) // 8 * 8 - 12 - len(header)))
+
+    for _, buffers in columns:
+        for data in buffers.values():
+            out.write(data)
+            out.write(b'\0' * ((len(data) + 7) // 8 * 8 - len(data)))
+
+    return count
+
+
+def read_columnar(source):
+    """Read an SSMC file object into (count, {column name: descriptor}).
+
+    Column arrays are decoded into Python arrays/strings; see columnar_value().
+    """
+    data = source.read()
+    if data[:4] != MAGIC:
+        raise ValueError('Not a columnar point file')
+    version, header_length = struct.unpack_from('<II', data, 4)
+    if version > VERSION:
+        raise ValueError('Unsupported columnar format version %d' % version)
+    header = json.loads(data[12:12 + header_length].decode('utf-8'))
+    data_start = (12 + header_length + 7) // 8 * 8
+
+    columns = {}
+    for descriptor in header['columns']:
+        column = dict(descriptor)
+        for key, ref in descriptor['buffers'].items():
+            chunk = data[data_start + ref['offset']:data_start + ref['offset'] + ref['byteLength']]
+            if descriptor['type'] == 'float64':
+                column[key] = array('d', chunk)
+            elif descriptor['type'] == 'dict':
+                code = dict((t, c) for t, c, _ in INDEX_TYPES)[descriptor['index']]
+                column[key] = array(code, chunk)
+            elif key == 'offsets':
+                column[key] = array('I', chunk)
+            else:
+                column[key] = chunk
+        if descriptor['type'] == 'text':
+            column['text'] = column['blob'].decode('utf-8').encode('utf-16-le')
+        columns[descriptor['name']] = column
+    return header['count'], columns
+
+
+def columnar_value(column, row):
+    """Return one cell of a column from read_columnar(), or None if missing."""
+    kind = column['type']
+    if kind == 'float64':
+        number = column['data'][row]
+        if number != number:
+            return None
+        if column.get('valueType') == 'string':
+            return js_number_string(number)
+        return number
+    if kind == 'dict':
+        idx = column['indices'][row]
+        return column['dictionary'][idx - 1] if idx else None
+    if 'presence' in column and not column['presence'][row]:
+        return None
+    start, end = column['offsets'][row], column['offsets'][row + 1]
+    return column['text'][start * 2:end * 2].decode('utf-16-le')
+
+
+def iter_columnar_points(source):
+    """Yield kml_ingest-shaped point dicts from an SSMC file object."""
+    count, columns = read_columnar(source)
+    attributes = [c for c in columns.values() if c['role'] == 'attribute']
+    for row in range(count):
+        point = {
+            'latitude': columns['latitude']['data'][row],
+            'longitude': columns['longitude']['data'][row],
+        }
+        for name, key in FIELDS.items():
+            if name in columns:
+                value = columnar_value(columns[name], row)
+                if value is not None:
+                    point[key] = value
+        point['customProperties'] = [
+            {'name': c['name'], 'value': columnar_value(c, row)}
+            for c in attributes if columnar_value(c, row) is not None
+        ]
+        yield point
+
+
+def iter_input_points(path):
+    """Stream points from a .kml/.kmz, kml_ingest .json or .ssmc file."""
+    lower = path.lower()
+    if lower.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            for point in json.load(f):
+                yield point
+    elif lower.endswith('.ssmc'):
+        with open(path, 'rb') as f:
+            for point in iter_columnar_points(f):
+                yield point
+    else:
+        with kml_ingest.open_kml(path) as source:
+            for point in kml_ingest.iter_points(source):
+                yield point
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert KML/KMZ or ingested JSON points to the SSMC columnar format.')
+    parser.add_argument('input', help='KML, KMZ or kml_ingest JSON file')
+    parser.add_argument('-o', '--output', help='Output .ssmc file (default: input name with .ssmc)')
+    parser.add_argument('--group', help='KML group name stored with the points (default: input file name)')
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + '.ssmc'
+    group = args.group or os.path.basename(args.input)
+
+    with open(output, 'wb') as out:
+        count = write_columnar(iter_input_points(args.input), out, group=group)
+
+    print('Wrote %d points (%d bytes) to %s' % (count, os.path.getsize(output), output), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+"""Merge, de-duplicate and downsample drive-test KML/KMZ files.
+
+Overlapping drive tests are merged into one point file the KML Import tab
+loads (.kml, .kmz, .ssmc or kml_ingest .json). A sample is a duplicate of an
+earlier one when both sit at the same position (to --digits decimals) and
+carry the same time attribute; samples without a time must also carry the
+same attributes. With --grid, the samples are then downsampled onto a grid of
+that many meters: one point per cell at the mean position of its samples,
+with the mean of each measure (RSCP, RSRP...) as its value plus "<name> min",
+"<name> max" and "Samples" attributes; other attributes keep their most
+common value. Raw descriptions are dropped; their attributes are kept.
+
+Memory stays bounded however large the inputs are. Each input is streamed
+by a worker process into per-partition spill files, partitioned by grid cell
+(or rounded position), so duplicates and cell-mates always share a
+partition. The partitions are then de-duplicated and aggregated one per
+worker, and written out in order, so the output is the same whatever the
+number of workers.
+
+Usage:
+    python -m sitemapper.drive_merge "Couverture 3G.kml" drive_*.kmz -o merged.ssmc
+    python -m sitemapper.drive_merge archive/*.kmz --grid 50 -o coverage_50m.kml
+    python -m sitemapper.drive_merge day1.kml day2.kml --time-field "Time" --measure RSCP --measure Ec/Io -o merged.kmz
+"""
+
+import argparse
+import io
+import math
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from sitemapper.columnar import iter_input_points, write_columnar
+from sitemapper.kml_export import escape_fields, js_number
+from sitemapper.kml_ingest import DEFAULT_COLOR, write_json
+
+METERS_PER_DEGREE = 111320
+DEFAULT_PARTITIONS = 64
+SPILL_BATCH = 2000  # Records buffered per partition before a spill write
+
+# Attribute names read as the sample time when --time-field is not given
+TIME_FIELDS = ('time', 'timestamp', 'date time', 'datetime', 'date/time')
+# Numeric attributes that identify rather than measure; they keep their most common value
+IDENTIFIER_RE = re.compile(r'(?i)(arfcn|\bpci\b|\bpsc\b|\bsc\b|cell ?id|\bci\b|\blac\b|\btac\b|\benb|\bgnb|\bid\b|code)')
+
+KML_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+<name>%s</name>
+%s'''
+
+KML_STYLE = '<Style id="%s"><IconStyle><color>%s</color><scale>0.4</scale></IconStyle></Style>\n'
+
+KML_FOOTER = '''</Document>
+</kml>
+'''
+
+
+class MergeOptions(object):
+    """What the workers need to know, picklable for the process pool."""
+
+    def __init__(self, digits=6, grid=None, time_field=None, measures=None, partitions=DEFAULT_PARTITIONS):
+        self.digits = digits
+        self.grid = grid
+        self.time_fields = (time_field.lower(),) if time_field else TIME_FIELDS
+        self.measures = set(measures) if measures else None
+        self.partitions = partitions
+
+    def position_key(self, lat, lng):
+        scale = 10 ** self.digits
+        return int(round(lat * scale)), int(round(lng * scale))
+
+    def cell_key(self, lat, lng):
+        """(row, column) of the grid cell holding a position."""
+        cell_lat = self.grid / METERS_PER_DEGREE
+        row = math.floor(lat / cell_lat)
+        cos_lat = max(0.01, math.cos(math.radians((row + 0.5) * cell_lat)))
+        return row, math.floor(lng / (cell_lat / cos_lat))
+
+    def partition(self, lat, lng):
+        # Duplicates share a rounded position, so cells are taken from it too
+        key = self.position_key(lat, lng)
+        if self.grid:
+            scale = 10 ** self.digits
+            key = self.cell_key(key[0] / scale, key[1] / scale)
+        return hash(key) % self.partitions
+
+    def is_measure(self, name):
+        if self.measures is not None:
+            return name in self.measures
+        return not IDENTIFIER_RE.search(name)
+
+    def sample_time(self, properties):
+        for name, value in properties:
+            if name.lower() in self.time_fields:
+                return value
+        return None
+
+
+def spill_path(spill_dir, input_index, partition):
+    return os.path.join(spill_dir, '%05d-%04d.spill' % (input_index, partition))
+
+
+def spill_input(input_index, path, spill_dir, options):
+    """Streams one input into its partition spill files; returns the samples read."""
+    buffers = {}
+    count = 0
+
+    def flush(partition):
+        with open(spill_path(spill_dir, input_index, partition), 'ab') as out:
+            pickle.dump(buffers.pop(partition), out, pickle.HIGHEST_PROTOCOL)
+
+    for point in iter_input_points(path):
+        lat, lng = float(point['latitude']), float(point['longitude'])
+        properties = tuple((prop['name'], str(prop['value'])) for prop in point.get('customProperties') or ())
+        record = (lat, lng, point.get('name') or '', point.get('color') or DEFAULT_COLOR, properties)
+        partition = options.partition(lat, lng)
+        buffer = buffers.setdefault(partition, [])
+        buffer.append(record)
+        if len(buffer) >= SPILL_BATCH:
+            flush(partition)
+        count += 1
+    for partition in list(buffers):
+        flush(partition)
+    return count
+
+
+def read_spill(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            for record in batch:
+                yield record
+
+
+def unique_records(spill_dir, input_count, partition, options, stats):
+    """Records of one partition, in input order, without duplicates."""
+    seen = set()
+    for input_index in range(input_count):
+        path = spill_path(spill_dir, input_index, partition)
+        if not os.path.exists(path):
+            continue
+        for record in read_spill(path):
+            lat, lng, _, _, properties = record
+            time = options.sample_time(properties)
+            key = options.position_key(lat, lng) + ((True, time) if time is not None else (False, properties))
+            stats['read'] += 1
+            if key in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(key)
+            yield record
+
+
+def format_number(value):
+    return ('%.2f' % value).rstrip('0').rstrip('.')
+
+
+def to_number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+class Cell(object):
+    """Running aggregate of the samples in one grid cell."""
+
+    __slots__ = ('count', 'lat', 'lng', 'colors', 'measures', 'labels')
+
+    def __init__(self):
+        self.count = 0
+        self.lat = 0.0
+        self.lng = 0.0
+        self.colors = Counter()
+        self.measures = {}  # name -> [count, min, sum, max]
+        self.labels = {}  # name -> Counter of values
+
+    def add(self, record, options):
+        lat, lng, _, color, properties = record
+        self.count += 1
+        self.lat += lat
+        self.lng += lng
+        self.colors[color] += 1
+        for name, value in properties:
+            number = to_number(value) if options.is_measure(name) else None
+            if number is None:
+                self.labels.setdefault(name, Counter())[value] += 1
+                continue
+            measure = self.measures.get(name)
+            if measure is None:
+                self.measures[name] = [1, number, number, number]
+            else:
+                measure[0] += 1
+                measure[1] = min(measure[1], number)
+                measure[2] += number
+                measure[3] = max(measure[3], number)
+
+    def point(self):
+        properties = [{'name': 'Samples', 'value': str(self.count)}]
+        for name, (count, low, total, high) in self.measures.items():
+            properties.append({'name': name, 'value': format_number(total / count)})
+            properties.append({'name': name + ' min', 'value': js_number(low)})
+            properties.append({'name': name + ' max', 'value': js_number(high)})
+        for name, values in self.labels.items():
+            if name not in self.measures:
+                properties.append({'name': name, 'value': values.most_common(1)[0][0]})
+        return {
+            'name': '%d samples' % self.count,
+            'description': '',
+            'latitude': self.lat / self.count,
+            'longitude': self.lng / self.count,
+            'color': self.colors.most_common(1)[0][0],
+            'customProperties': properties,
+        }
+
+
+def record_point(record):
+    lat, lng, name, color, properties = record
+    return {
+        'name': name or 'Untitled Point',
+        'description': '',
+        'latitude': lat,
+        'longitude': lng,
+        'color': color,
+        'customProperties': [{'name': key, 'value': value} for key, value in properties],
+    }
+
+
+def reduce_partition(partition, spill_dir, input_count, options):
+    """De-duplicates (and aggregates) one partition into its part file.
+
+    Returns (samples read, duplicates, points written, colours used).
+    """
+    stats = {'read': 0, 'duplicates': 0}
+    records = unique_records(spill_dir, input_count, partition, options, stats)
+    if options.grid:
+        cells = {}
+        for record in records:
+            scale = 10 ** options.digits
+            key = options.position_key(record[0], record[1])
+            key = options.cell_key(key[0] / scale, key[1] / scale)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = Cell()
+            cell.add(record, options)
+        points = (cell.point() for cell in cells.values())
+    else:
+        points = (record_point(record) for record in records)
+
+    written = 0
+    colors = set()
+    with open(os.path.join(spill_dir, 'part-%04d' % partition), 'wb') as out:
+        batch = []
+        for point in points:
+            batch.append(point)
+            colors.add(point['color'])
+            if len(batch) >= SPILL_BATCH:
+                pickle.dump(batch, out, pickle.HIGHEST_PROTOCOL)
+                written += len(batch)
+                batch = []
+        if batch:
+            pickle.dump(batch, out, pickle.HIGHEST_PROTOCOL)
+            written += len(batch)
+    return stats['read'], stats['duplicates'], written, colors
+
+
+def style_id(color):
+    return 'c' + color.lstrip('#').lower()
+
+
+def write_points_kml(points, out, colors, name):
+    """Writes points as Placemarks with shared colour styles and ExtendedData."""
+    styles = ''.join(KML_STYLE % (style_id(color), 'ff' + color[5:7] + color[3:5] + color[1:3])
+                     for color in sorted(colors))
+    out.write(KML_HEADER % (escape_fields([name])[0], styles))
+    count = 0
+    for point in points:
+        properties = point['customProperties']
+        fields = escape_fields([point['name']] + [f for p in properties for f in (p['name'], p['value'])])
+        data = ''.join('<Data name="%s"><value>%s</value></Data>' % (fields[1 + 2 * i], fields[2 + 2 * i])
+                       for i in range(len(properties)))
+        out.write('<Placemark><name>%s</name><styleUrl>#%s</styleUrl>'
+                  '<Point><coordinates>%s,%s,0</coordinates></Point>'
+                  '<ExtendedData>%s</ExtendedData></Placemark>\n' % (
+                      fields[0], style_id(point['color']),
+                      js_number(round(point['longitude'], 7)), js_number(round(point['latitude'], 7)), data))
+        count += 1
+    out.write(KML_FOOTER)
+    return count
+
+
+def merged_points(spill_dir, partitions):
+    for partition in range(partitions):
+        for point in read_spill(os.path.join(spill_dir, 'part-%04d' % partition)):
+            yield point
+
+
+def write_output(points, output, colors, group):
+    lower = output.lower()
+    if lower.endswith('.ssmc'):
+        with open(output, 'wb') as out:
+            return write_columnar(points, out, group=group)
+    if lower.endswith('.json'):
+        with open(output, 'w', encoding='utf-8') as out:
+            return write_json(points, out)
+    if lower.endswith('.kmz'):
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as kmz:
+            with kmz.open('doc.kml', 'w', force_zip64=True) as entry:
+                with io.TextIOWrapper(entry, encoding='utf-8', newline='') as out:
+                    return write_points_kml(points, out, colors, group)
+    with open(output, 'w', encoding='utf-8', newline='') as out:
+        return write_points_kml(points, out, colors, group)
+
+
+def merge(inputs, output, options, group=None, jobs=None, temp_dir=None):
+    """Merges `inputs` into `output`; returns (samples read, duplicates, points written)."""
+    spill_dir = tempfile.mkdtemp(prefix='sitemapper-merge-', dir=temp_dir)
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs != 1 else None
+    run = pool.map if pool is not None else map
+    try:
+        count = len(inputs)
+        list(run(spill_input, range(count), inputs, [spill_dir] * count, [options] * count))
+
+        partitions = options.partitions
+        results = list(run(reduce_partition, range(partitions), [spill_dir] * partitions,
+                           [count] * partitions, [options] * partitions))
+        colors = set()
+        for result in results:
+            colors.update(result[3])
+
+        written = write_output(merged_points(spill_dir, partitions), output, colors,
+                               group or os.path.basename(output))
+        return sum(r[0] for r in results), sum(r[1] for r in results), written
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge, de-duplicate and downsample drive-test KML/KMZ files.')
+    parser.add_argument('inputs', nargs='+', help='KML, KMZ, kml_ingest JSON or .ssmc files')
+    parser.add_argument('-o', '--output', required=True, help='Output .kml, .kmz, .ssmc or .json file')
+    parser.add_argument('--grid', type=float, help='Downsample onto a grid of this many meters')
+    parser.add_argument('--digits', type=int, default=6,
+                        help='Decimals of latitude/longitude that must match for a duplicate (default: 6)')
+    parser.add_argument('--time-field', help='Attribute holding the sample time (default: Time, Timestamp...)')
+    parser.add_argument('--measure', action='append',
+                        help='Attribute to aggregate as min/mean/max with --grid; repeatable '
+                             '(default: every numeric attribute but identifiers such as EARFCN or PCI)')
+    parser.add_argument('--group', help='KML group name stored in .ssmc output (default: output file name)')
+    parser.add_argument('--partitions', type=int, default=DEFAULT_PARTITIONS,
+                        help='Spill partitions; more means less memory per worker (default: %d)' % DEFAULT_PARTITIONS)
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes (default: one per CPU; 1: no pool)')
+    parser.add_argument('--temp', help='Directory for spill files (default: the system temp directory)')
+    args = parser.parse_args(argv)
+
+    if args.grid is not None and args.grid <= 0:
+        parser.error('--grid must be positive')
+    if args.partitions < 1:
+        parser.error('--partitions must be at least 1')
+
+    options = MergeOptions(args.digits, args.grid, args.time_field, args.measure, args.partitions)
+    read, duplicates, written = merge(args.inputs, args.output, options, args.group, args.jobs, args.temp)
+    print('Read %d samples from %d files, dropped %d duplicates, wrote %d %s to %s' % (
+        read, len(args.inputs), duplicates, written, 'cells' if args.grid else 'points', args.output),
+        file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
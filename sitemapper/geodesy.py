@@ -0,0 +1,261 @@
+"""Vectorised spherical geometry on NumPy arrays.
+
+The batch counterparts of the browser geometry, on the same 6371 km sphere:
+destination() and buildSectorWedge() in sector-geometry.js, spatialDistance()
+and spatialPointInPolygon() in spatial-index.js (the distance the measure tool
+shows). Every function broadcasts its arguments, so one call classifies a
+whole drive test against a whole network:
+
+    destination(lat, lng, bearing, distance)      forward great-circle
+    inverse(lat1, lng1, lat2, lng2)               distance and initial bearing
+    haversine(lat1, lng1, lat2, lng2)             distance only
+    distance_matrix(lats, lngs, lats2, lngs2)     all pairs, as an (n, m) array
+    nearest(lats, lngs, lats2, lngs2)             closest target per point
+    in_sector(lat, lng, site_lat, site_lng, azimuth, beamwidth, range_)
+    sector_hits(lats, lngs, sectors)              (point, sector) pairs, pruned by latitude
+    points_in_polygon(lats, lngs, vertices)
+
+Unlike the rest of the package this module needs NumPy.
+
+geodesy_vectors.json holds inputs and the results of this module;
+test_geodesy.js recomputes them with the app's JavaScript and compares.
+
+Usage:
+    python -m sitemapper.geodesy --vectors geodesy_vectors.json
+    node test_geodesy.js
+"""
+
+import argparse
+import json
+import random
+
+import numpy as np
+
+EARTH_RADIUS = 6371e3
+NEAREST_CHUNK = 4096  # Points per matrix product in nearest()
+HITS_CHUNK = 4096  # Points per block in sector_hits()
+
+
+def _array(value):
+    return np.asarray(value, dtype=float)
+
+
+def destination(lat, lng, bearing, distance):
+    """destination(): the point `distance` meters from (lat, lng) along `bearing` degrees.
+
+    Returns (lat, lng) arrays.
+    """
+    lat_rad = _array(lat) * np.pi / 180
+    lng_rad = _array(lng) * np.pi / 180
+    bearing_rad = _array(bearing) * np.pi / 180
+    angular = _array(distance) / EARTH_RADIUS
+
+    lat_dest = np.arcsin(np.sin(lat_rad) * np.cos(angular) +
+                         np.cos(lat_rad) * np.sin(angular) * np.cos(bearing_rad))
+    lng_dest = lng_rad + np.arctan2(np.sin(bearing_rad) * np.sin(angular) * np.cos(lat_rad),
+                                    np.cos(angular) - np.sin(lat_rad) * np.sin(lat_dest))
+    return lat_dest * 180 / np.pi, lng_dest * 180 / np.pi
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """spatialDistance(): great-circle distance in meters."""
+    lat1, lng1, lat2, lng2 = _array(lat1), _array(lng1), _array(lat2), _array(lng2)
+    to_rad = np.pi / 180
+    d_lat = (lat2 - lat1) * to_rad
+    d_lng = (lng2 - lng1) * to_rad
+    a = (np.sin(d_lat / 2) ** 2 +
+         np.cos(lat1 * to_rad) * np.cos(lat2 * to_rad) * np.sin(d_lng / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(1, np.sqrt(a)))
+
+
+def inverse(lat1, lng1, lat2, lng2):
+    """Distance (meters) and initial bearing (degrees, [0, 360)) from point 1 to point 2."""
+    lat1, lng1, lat2, lng2 = _array(lat1), _array(lng1), _array(lat2), _array(lng2)
+    to_rad = np.pi / 180
+    phi1 = lat1 * to_rad
+    phi2 = lat2 * to_rad
+    d_lng = (lng2 - lng1) * to_rad
+    bearing = np.arctan2(np.sin(d_lng) * np.cos(phi2),
+                         np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(d_lng))
+    return haversine(lat1, lng1, lat2, lng2), (bearing * 180 / np.pi + 360) % 360
+
+
+def distance_matrix(lats, lngs, lats2, lngs2):
+    """Distances from every point to every target, shape (len(lats), len(lats2))."""
+    return haversine(_array(lats)[:, None], _array(lngs)[:, None], _array(lats2)[None, :], _array(lngs2)[None, :])
+
+
+def unit_vectors(lats, lngs):
+    """Points as (n, 3) unit vectors from the centre of the sphere."""
+    lat = _array(lats) * np.pi / 180
+    lng = _array(lngs) * np.pi / 180
+    return np.stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)], axis=-1)
+
+
+def nearest(lats, lngs, lats2, lngs2, chunk_size=NEAREST_CHUNK):
+    """Index of and distance to the closest target of every point.
+
+    The closest target has the largest dot product of unit vectors, so each
+    block of points is one matrix product; memory stays at chunk_size x
+    targets. Targets closer than ~0.1 m to each other may tie. Returns
+    (index, distance) arrays; index is -1 when there are no targets.
+    """
+    lats, lngs = _array(lats).ravel(), _array(lngs).ravel()
+    lats2, lngs2 = _array(lats2).ravel(), _array(lngs2).ravel()
+    index = np.full(len(lats), -1, dtype=np.int64)
+    distance = np.full(len(lats), np.inf)
+    if len(lats2) == 0:
+        return index, distance
+
+    targets = unit_vectors(lats2, lngs2).T
+    for start in range(0, len(lats), chunk_size):
+        end = start + chunk_size
+        index[start:end] = np.argmax(unit_vectors(lats[start:end], lngs[start:end]) @ targets, axis=1)
+    distance[:] = haversine(lats, lngs, lats2[index], lngs2[index])
+    return index, distance
+
+
+def in_sector(lat, lng, site_lat, site_lng, azimuth, beamwidth, range_):
+    """Whether points lie in sectors: within `range_` meters of the site and
+    `beamwidth / 2` degrees of `azimuth` (the true arc, which the wedge
+    polygons approximate with chords).
+    """
+    distance, bearing = inverse(site_lat, site_lng, lat, lng)
+    azimuth, beamwidth = _array(azimuth), _array(beamwidth)
+    offset = np.abs((bearing - azimuth + 540) % 360 - 180)
+    return (distance <= range_) & ((offset <= beamwidth / 2) | (beamwidth >= 360) | (distance == 0))
+
+
+def sector_hits(lats, lngs, sectors, chunk_size=HITS_CHUNK):
+    """Every (point, sector) pair with the point inside the sector.
+
+    `sectors` maps 'latitude', 'longitude', 'azimuth', 'beamwidth' and
+    'range' to arrays. Points are visited in latitude order, so each block is
+    only tested against the sectors whose range can reach its latitude band.
+    Longitude pruning does not wrap at the antimeridian. Returns (point
+    index, sector index) arrays, sorted by point.
+    """
+    lats, lngs = _array(lats).ravel(), _array(lngs).ravel()
+    s_lat, s_lng = _array(sectors['latitude']), _array(sectors['longitude'])
+    s_azimuth, s_beamwidth, s_range = (_array(sectors['azimuth']), _array(sectors['beamwidth']),
+                                       _array(sectors['range']))
+    if len(lats) == 0 or len(s_lat) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    margin = float(s_range.max()) / EARTH_RADIUS * 180 / np.pi
+    point_order = np.argsort(lats, kind='stable')
+    sector_order = np.argsort(s_lat, kind='stable')
+    sorted_s_lat = s_lat[sector_order]
+
+    point_hits, sector_hits_ = [], []
+    for start in range(0, len(lats), chunk_size):
+        block = point_order[start:start + chunk_size]
+        b_lat, b_lng = lats[block], lngs[block]
+        lo, hi = np.searchsorted(sorted_s_lat, [b_lat.min() - margin, b_lat.max() + margin], side='left')
+        candidates = sector_order[lo:hi]
+        if len(candidates) == 0:
+            continue
+
+        # Longitude degrees shrink towards the poles
+        top = min(89.9, max(abs(b_lat.min()), abs(b_lat.max())) + margin)
+        lng_margin = margin / np.cos(top * np.pi / 180)
+        near = (s_lng[candidates] >= b_lng.min() - lng_margin) & (s_lng[candidates] <= b_lng.max() + lng_margin)
+        candidates = candidates[near]
+        if len(candidates) == 0:
+            continue
+
+        inside = in_sector(b_lat[:, None], b_lng[:, None], s_lat[candidates][None, :], s_lng[candidates][None, :],
+                           s_azimuth[candidates][None, :], s_beamwidth[candidates][None, :],
+                           s_range[candidates][None, :])
+        rows, columns = np.nonzero(inside)
+        point_hits.append(block[rows])
+        sector_hits_.append(candidates[columns])
+
+    if not point_hits:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    points = np.concatenate(point_hits)
+    hits = np.concatenate(sector_hits_)
+    order = np.lexsort((hits, points))
+    return points[order], hits[order]
+
+
+def points_in_polygon(lats, lngs, vertices):
+    """spatialPointInPolygon() for many points; vertices are [[lat, lng], ...] without holes."""
+    lat, lng = _array(lats), _array(lngs)
+    vertices = _array(vertices)
+    inside = np.zeros(np.broadcast(lat, lng).shape, dtype=bool)
+    j = len(vertices) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(len(vertices)):
+            xi, yi = vertices[i]
+            xj, yj = vertices[j]
+            crosses = (yi > lng) != (yj > lng)
+            inside ^= crosses & (lat < (xj - xi) * (lng - yi) / (yj - yi) + xi)
+            j = i
+    return inside
+
+
+# ==================== TEST VECTORS ====================
+
+def make_vectors(count=200, seed=1):
+    """Random cases with this module's results, for test_geodesy.js."""
+    rng = random.Random(seed)
+    vectors = {'destination': [], 'inverse': [], 'in_sector': [], 'in_polygon': []}
+
+    for _ in range(count):
+        lat, lng = rng.uniform(-80, 80), rng.uniform(-180, 180)
+        bearing, distance = rng.uniform(0, 360), rng.choice([1, 50, 500, 5000, 50000, 2e6])
+        dest = destination(lat, lng, bearing, distance)
+        vectors['destination'].append({'lat': lat, 'lng': lng, 'bearing': bearing, 'distance': distance,
+                                       'expected': [float(dest[0]), float(dest[1])]})
+
+        lat2, lng2 = rng.uniform(-80, 80), rng.uniform(-180, 180)
+        if rng.random() < 0.5:
+            lat2, lng2 = lat + rng.uniform(-0.1, 0.1), lng + rng.uniform(-0.1, 0.1)
+        d, b = inverse(lat, lng, lat2, lng2)
+        vectors['inverse'].append({'lat1': lat, 'lng1': lng, 'lat2': lat2, 'lng2': lng2,
+                                   'distance': float(d), 'bearing': float(b)})
+
+    # Points well inside or outside the wedge: the 15-step polygon the browser
+    # draws only differs from the true arc within ~0.1% of the range
+    for _ in range(count):
+        site_lat, site_lng = rng.uniform(-60, 60), rng.uniform(-180, 180)
+        azimuth, beamwidth, range_ = rng.uniform(0, 360), rng.choice([30, 65, 90, 120]), rng.uniform(200, 5000)
+        ratio = rng.choice([rng.uniform(0.05, 0.95), rng.uniform(1.05, 1.5)])
+        offset = rng.choice([rng.uniform(0, beamwidth / 2 - 2), rng.uniform(beamwidth / 2 + 2, 180)])
+        bearing = azimuth + rng.choice([-1, 1]) * offset
+        lat, lng = destination(site_lat, site_lng, bearing, ratio * range_)
+        vectors['in_sector'].append({
+            'lat': float(lat), 'lng': float(lng), 'site_lat': site_lat, 'site_lng': site_lng,
+            'azimuth': azimuth, 'beamwidth': beamwidth, 'range': range_,
+            'expected': bool(in_sector(lat, lng, site_lat, site_lng, azimuth, beamwidth, range_)),
+        })
+
+    for _ in range(count // 10):
+        center_lat, center_lng = rng.uniform(-60, 60), rng.uniform(-170, 170)
+        sides = rng.randint(3, 9)
+        angles = sorted(rng.uniform(0, 2 * np.pi) for _ in range(sides))
+        vertices = [[center_lat + rng.uniform(0.2, 1) * np.sin(a), center_lng + rng.uniform(0.2, 1) * np.cos(a)]
+                    for a in angles]
+        lats = [center_lat + rng.uniform(-1.2, 1.2) for _ in range(20)]
+        lngs = [center_lng + rng.uniform(-1.2, 1.2) for _ in range(20)]
+        vectors['in_polygon'].append({'vertices': vertices, 'lats': lats, 'lngs': lngs,
+                                      'expected': points_in_polygon(lats, lngs, vertices).tolist()})
+    return vectors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write geodesy test vectors for test_geodesy.js.')
+    parser.add_argument('--vectors', required=True, metavar='FILE', help='Output JSON file')
+    parser.add_argument('--count', type=int, default=200, help='Cases per function (default: 200)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    vectors = make_vectors(args.count, args.seed)
+    with open(args.vectors, 'w', encoding='utf-8') as f:
+        json.dump(vectors, f, indent=1)
+    print('Wrote %s' % ', '.join('%d %s' % (len(cases), name) for name, cases in vectors.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Streaming KML/KMZ export of a site dataset.
+
+Writes the same document as writeSitesKml() in kml-export.js (the app's
+Export KML button), one site at a time, from a sites CSV or a JSON list of
+sites (see sitemapper.sites). Numbers are formatted the way JavaScript prints
+them; wedge vertices can still differ in the last digit where Python's libm
+and the browser's trigonometry round differently.
+
+Usage:
+    python -m sitemapper.kml_export sample_sites.csv --mode full -o sites_full.kml
+    python -m sitemapper.kml_export sites.json --mode full --kmz -o sites_full.kmz
+"""
+
+import argparse
+import io
+import math
+import sys
+import zipfile
+from decimal import Decimal
+
+from sitemapper.sites import load_sites
+
+EARTH_RADIUS = 6371e3
+WEDGE_STEPS = 10
+BATCH_SIZE = 500
+
+XML_ESCAPES = {'<': '&lt;', '>': '&gt;', '&': '&amp;', "'": '&apos;', '"': '&quot;'}
+XML_ESCAPE_TABLE = str.maketrans(XML_ESCAPES)
+
+HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+  <Document>
+    <name>Site Sector Map</name>
+    <description>Exported from Site Sector Mapper</description>
+    
+    <Style id="siteIcon">
+      <IconStyle>
+        <color>ff6366f1</color>
+        <scale>1.2</scale>
+        <Icon>
+          <href>http://maps.google.com/mapfiles/kml/shapes/placemark_circle.png</href>
+        </Icon>
+      </IconStyle>
+    </Style>
+'''
+
+FOOTER = '''  </Document>
+</kml>'''
+
+SITE_PLACEMARK = '''    <Placemark>
+      <name>{name}</name>
+      <description><![CDATA[
+        <h3>{name}</h3>
+        {description}
+        <p><strong>Coordinates:</strong> {lat}, {lng}</p>
+        <p><strong>Sectors:</strong> {sector_count}</p>
+      ]]></description>
+      <styleUrl>#siteIcon</styleUrl>
+      <Point>
+        <coordinates>{lng},{lat},0</coordinates>
+      </Point>
+    </Placemark>
+'''
+
+SECTOR_PLACEMARK = '''    <Placemark>
+      <name>{name} - Sector {number}</name>
+      <Style>
+        <IconStyle>
+          <scale>0</scale>
+        </IconStyle>
+        <LineStyle>
+          <color>{color}</color>
+          <width>1</width>
+        </LineStyle>
+        <PolyStyle>
+          <color>{color}</color>
+        </PolyStyle>
+      </Style>
+      <MultiGeometry>
+        <Point>
+          <coordinates>{label_lng},{label_lat},0</coordinates>
+        </Point>
+        <Polygon>
+          <outerBoundaryIs>
+            <LinearRing>
+              <coordinates>{coords}</coordinates>
+            </LinearRing>
+          </outerBoundaryIs>
+        </Polygon>
+      </MultiGeometry>
+    </Placemark>
+'''
+
+
+def js_number(value):
+    """Number.prototype.toString()."""
+    number = float(value)
+    if number == 0:
+        return '0'
+    if math.isnan(number):
+        return 'NaN'
+    if math.isinf(number):
+        return 'Infinity' if number > 0 else '-Infinity'
+
+    # Shortest round-trip digits (repr), laid out with the ECMAScript rules
+    _, digit_tuple, exponent = Decimal(repr(abs(number))).as_tuple()
+    digits = ''.join(map(str, digit_tuple))
+    n = len(digits) + exponent
+    digits = digits.rstrip('0')
+    k = len(digits)
+    prefix = '-' if number < 0 else ''
+    if k <= n <= 21:
+        return prefix + digits + '0' * (n - k)
+    if 0 < n <= 21:
+        return prefix + digits[:n] + '.' + digits[n:]
+    if -6 < n <= 0:
+        return prefix + '0.' + '0' * -n + digits
+    e = n - 1
+    mantissa = digits if k == 1 else digits[0] + '.' + digits[1:]
+    return '%s%se%s%d' % (prefix, mantissa, '+' if e > 0 else '-', abs(e))
+
+
+def js_value(value):
+    """${value} in a JavaScript template literal for numbers and strings."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return js_number(value)
+    return str(value)
+
+
+def destination(lat, lng, bearing, distance):
+    """destination() from sector-geometry.js."""
+    lat_rad = lat * math.pi / 180
+    lng_rad = lng * math.pi / 180
+    bearing_rad = bearing * math.pi / 180
+    lat_dest = math.asin(math.sin(lat_rad) * math.cos(distance / EARTH_RADIUS) +
+                         math.cos(lat_rad) * math.sin(distance / EARTH_RADIUS) * math.cos(bearing_rad))
+    lng_dest = lng_rad + math.atan2(math.sin(bearing_rad) * math.sin(distance / EARTH_RADIUS) * math.cos(lat_rad),
+                                    math.cos(distance / EARTH_RADIUS) - math.sin(lat_rad) * math.sin(lat_dest))
+    return lat_dest * 180 / math.pi, lng_dest * 180 / math.pi
+
+
+def sector_wedge(lat, lng, azimuth, beamwidth, distance, steps=WEDGE_STEPS):
+    """buildSectorWedge(): centre, steps + 1 arc points, centre as (lat, lng)."""
+    start = azimuth - beamwidth / 2
+    end = azimuth + beamwidth / 2
+    vertices = [(lat, lng)]
+    for i in range(steps + 1):
+        vertices.append(destination(lat, lng, start + (i / steps) * (end - start), distance))
+    vertices.append((lat, lng))
+    return vertices
+
+
+def escape_fields(values):
+    """escapeXmlFields(): escape a batch of fields with one translate()."""
+    strings = [str(value) if value else '' for value in values]
+    joined = '\0'.join(strings)
+    if not any(c in joined for c in XML_ESCAPES):
+        return strings
+    return joined.translate(XML_ESCAPE_TABLE).split('\0')
+
+
+def kml_color(color):
+    # '#RRGGBB' -> 'aabbggrr' at 50% opacity, sliced like the JS
+    return '80' + color[5:7] + color[3:5] + color[1:3]
+
+
+def site_placemark(site, name, description):
+    return SITE_PLACEMARK.format(
+        name=name,
+        description='<p>%s</p>' % description if description else '',
+        lat=js_value(site['latitude']),
+        lng=js_value(site['longitude']),
+        sector_count=len(site.get('sectors') or []),
+    )
+
+
+def sector_placemark(site, sector, index, name):
+    lat, lng = site['latitude'], site['longitude']
+    wedge = sector_wedge(lat, lng, sector['azimuth'], sector['beamwidth'], sector['range'])
+    label_lat, label_lng = destination(lat, lng, sector['azimuth'], sector['range'] * 0.7)
+    color = kml_color(sector.get('color') or '#3388ff')
+    return SECTOR_PLACEMARK.format(
+        name=name,
+        number=index + 1,
+        color=color,
+        label_lat=js_number(label_lat),
+        label_lng=js_number(label_lng),
+        coords=' '.join('%s,%s,0' % (js_number(v_lng), js_number(v_lat)) for v_lat, v_lng in wedge),
+    )
+
+
+def write_sites_kml(sites, mode, out):
+    """Write the export document to a text stream; returns the number of sites."""
+    out.write(HEADER)
+    for start in range(0, len(sites), BATCH_SIZE):
+        batch = sites[start:start + BATCH_SIZE]
+        escaped = escape_fields([field for site in batch for field in (site.get('name'), site.get('description'))])
+        parts = []
+        for i, site in enumerate(batch):
+            name = escaped[i * 2]
+            parts.append(site_placemark(site, name, escaped[i * 2 + 1]))
+            if mode == 'full':
+                for j, sector in enumerate(site.get('sectors') or []):
+                    parts.append(sector_placemark(site, sector, j, name))
+        out.write(''.join(parts))
+    out.write(FOOTER)
+    return len(sites)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a sites CSV or JSON dataset to the KML the app exports.')
+    parser.add_argument('input', help='Sites CSV (the import format) or JSON list of sites')
+    parser.add_argument('-o', '--output', help='Output .kml/.kmz file (default: stdout)')
+    parser.add_argument('--mode', choices=('sites', 'full'), default='sites',
+                        help='sites: one point per site; full: also sector wedges (default: sites)')
+    parser.add_argument('--kmz', action='store_true', help='Write a KMZ (zipped doc.kml); needs --output')
+    args = parser.parse_args(argv)
+
+    sites = load_sites(args.input)
+
+    if args.kmz:
+        if not args.output:
+            parser.error('--kmz needs --output')
+        with zipfile.ZipFile(args.output, 'w', compression=zipfile.ZIP_DEFLATED) as kmz:
+            with kmz.open('doc.kml', 'w', force_zip64=True) as entry:
+                with io.TextIOWrapper(entry, encoding='utf-8', newline='') as out:
+                    count = write_sites_kml(sites, args.mode, out)
+    elif args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as out:
+            count = write_sites_kml(sites, args.mode, out)
+    else:
+        count = write_sites_kml(sites, args.mode, sys.stdout)
+
+    print('Exported %d sites to %s' % (count, args.output or 'stdout'), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""Streaming KML ingestion for large drive-test files.
+
+Mirrors parseKml() in app.js, but walks the document with iterparse instead of
+building a DOM, so memory stays flat however many Placemarks the file holds.
+The output is the JSON array that importKmlData() consumes:
+
+    [{"name", "description", "latitude", "longitude", "color",
+      "customProperties": [{"name", "value"}, ...]}, ...]
+
+Usage:
+    python -m sitemapper.kml_ingest "Couverture 3G.kml" -o couverture.json
+"""
+
+import argparse
+import html
+import json
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+
+DEFAULT_COLOR = '#ef4444'
+
+# Description tables are tiny, regular HTML fragments, so a couple of regexes
+# are enough and far cheaper than an HTML parser per Placemark.
+ROW_RE = re.compile(r'<tr\b[^>]*>(.*?)</tr\s*>', re.IGNORECASE | re.DOTALL)
+CELL_RE = re.compile(r'<td\b[^>]*>(.*?)</td\s*>', re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+
+
+def local_name(tag):
+    # '{http://www.opengis.net/kml/2.2}Placemark' -> 'Placemark'
+    return tag.rsplit('}', 1)[-1]
+
+
+def kml_color_to_hex(kml_color):
+    # KML colours are aabbggrr
+    if kml_color and len(kml_color) == 8:
+        return '#' + kml_color[6:8] + kml_color[4:6] + kml_color[2:4]
+    return DEFAULT_COLOR
+
+
+def find_first(elem, name):
+    for child in elem.iter():
+        if child is not elem and local_name(child.tag) == name:
+            return child
+    return None
+
+
+def find_text(elem, name):
+    found = find_first(elem, name)
+    if found is None:
+        return ''
+    return ''.join(found.itertext()).strip()
+
+
+def icon_style_color(style_elem):
+    icon_style = find_first(style_elem, 'IconStyle')
+    if icon_style is None:
+        return ''
+    return find_text(icon_style, 'color')
+
+
+def cell_text(fragment):
+    return html.unescape(TAG_RE.sub('', fragment)).strip()
+
+
+def parse_description_table(description):
+    """Yield (key, value) pairs from the <table> rows of a description."""
+    for row in ROW_RE.finditer(description):
+        cells = CELL_RE.findall(row.group(1))
+        if len(cells) >= 2:
+            key = cell_text(cells[0])
+            if key.endswith(':'):
+                key = key[:-1]
+            value = cell_text(cells[1])
+            if key and value:
+                yield key, value
+
+
+def parse_description_text(description):
+    """Yield (key, value) pairs from 'Key = Value<br>' style descriptions."""
+    for line in BR_RE.split(description):
+        if line.strip().startswith('<'):
+            continue
+        parts = line.split('=')
+        if len(parts) >= 2:
+            key = parts[0].strip()
+            value = '='.join(parts[1:]).strip()
+            if key and value:
+                yield key, value
+
+
+def parse_placemark(placemark, styles):
+    """Convert one Placemark element to the importKmlData() point shape.
+
+    Returns None for Placemarks without a usable Point geometry.
+    """
+    point = find_first(placemark, 'Point')
+    if point is None:
+        return None
+
+    coordinates = find_text(point, 'coordinates')
+    parts = [p.strip() for p in coordinates.split(',')]
+    if len(parts) < 2:
+        return None
+    try:
+        lng = float(parts[0])
+        lat = float(parts[1])
+    except ValueError:
+        return None
+
+    name = find_text(placemark, 'name') or 'Untitled Point'
+    description = find_text(placemark, 'description')
+
+    color = DEFAULT_COLOR
+    style_url = find_text(placemark, 'styleUrl')
+    if style_url and style_url in styles:
+        color = kml_color_to_hex(styles[style_url])
+
+    # Inline style overrides styleUrl
+    inline_style = find_first(placemark, 'Style')
+    if inline_style is not None:
+        inline_color = icon_style_color(inline_style)
+        if inline_color:
+            color = kml_color_to_hex(inline_color)
+
+    custom_properties = []
+    seen = set()
+
+    def add(key, value, only_new=False):
+        if only_new and key in seen:
+            return
+        seen.add(key)
+        custom_properties.append({'name': key, 'value': value})
+
+    for elem in placemark.iter():
+        tag = local_name(elem.tag)
+        if tag == 'Data':
+            key = elem.get('name')
+            value = find_text(elem, 'value')
+            if key and value:
+                add(key, value)
+        elif tag == 'SimpleData':
+            key = elem.get('name')
+            value = ''.join(elem.itertext()).strip()
+            if key and value:
+                add(key, value)
+
+    # ExtendedData takes precedence over anything found in the description
+    if description:
+        if '<table' in description:
+            for key, value in parse_description_table(description):
+                add(key, value, only_new=True)
+        for key, value in parse_description_text(description):
+            add(key, value, only_new=True)
+
+    return {
+        'name': name,
+        'description': description,
+        'latitude': lat,
+        'longitude': lng,
+        'color': color,
+        'customProperties': custom_properties,
+    }
+
+
+def open_kml(path):
+    """Open a .kml file, or the first .kml document inside a .kmz archive."""
+    if path.lower().endswith('.kmz'):
+        archive = zipfile.ZipFile(path)
+        names = [n for n in archive.namelist() if n.lower().endswith('.kml')]
+        if not names:
+            raise ValueError('No KML document found in %s' % path)
+        # Prefer the conventional doc.kml at the archive root
+        names.sort(key=lambda n: (n.lower() != 'doc.kml', n))
+        return archive.open(names[0])
+    return open(path, 'rb')
+
+
+def iter_points(source):
+    """Stream parsed points from a KML file path or binary file object.
+
+    Styles are resolved once as they are encountered; KML producers emit
+    them ahead of the Placemarks that reference them.
+    """
+    styles = {}
+    stack = []
+    in_placemark = 0
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        tag = local_name(elem.tag)
+
+        if event == 'start':
+            stack.append(elem)
+            if tag == 'Placemark':
+                in_placemark += 1
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+
+        if tag == 'Style' and not in_placemark:
+            style_id = elem.get('id')
+            if style_id:
+                color = icon_style_color(elem)
+                if color:
+                    styles['#' + style_id] = color
+            if parent is not None:
+                parent.remove(elem)
+        elif tag == 'Placemark':
+            in_placemark -= 1
+            if in_placemark:
+                continue
+            parsed = parse_placemark(elem, styles)
+            if parsed is not None:
+                yield parsed
+            # Detach the finished Placemark so the tree never grows
+            if parent is not None:
+                parent.remove(elem)
+
+
+def write_json(points, out):
+    """Write points as a JSON array without holding them all in memory."""
+    count = 0
+    out.write('[')
+    for point in points:
+        if count:
+            out.write(',\n')
+        out.write(json.dumps(point, ensure_ascii=False, separators=(',', ':')))
+        count += 1
+    out.write(']\n')
+    return count
+
+
+def strip_descriptions(points):
+    for point in points:
+        point['description'] = ''
+        yield point
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream a KML/KMZ file into the JSON point list used by importKmlData().')
+    parser.add_argument('input', help='KML or KMZ file')
+    parser.add_argument('-o', '--output', help='Output JSON file (default: stdout)')
+    parser.add_argument('--strip-description', action='store_true',
+                        help='Drop raw descriptions once their attributes are extracted')
+    args = parser.parse_args(argv)
+
+    with open_kml(args.input) as source:
+        points = iter_points(source)
+        if args.strip_description:
+            points = strip_descriptions(points)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as out:
+                count = write_json(points, out)
+        else:
+            count = write_json(points, sys.stdout)
+
+    print('Ingested %d points from %s' % (count, args.input), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
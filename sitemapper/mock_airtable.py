@@ -0,0 +1,295 @@
+"""Local mock of the Airtable REST API for exercising the sync engine.
+
+Implements the subset airtable-sync.js and the Airtable import use: paginated
+listing (pageSize, offset, simple {Field}='value' filters), batch create and
+update of up to 10 records, single-record update and delete. Like Airtable it
+answers 429 above 5 requests per second per base, drops empty cells and
+enforces the 10-record limit; --fail-rate and --latency add flaky responses
+and slow round trips. CORS is open, so the app can be pointed at it through
+the API URL field of the Airtable form.
+
+GET /__stats returns request counts per method and the number of 429s.
+
+Usage:
+    python -m sitemapper.mock_airtable --port 8787 --records records.json
+    (API URL in the app: http://localhost:8787/v0)
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+MAX_BATCH = 10
+MAX_PAGE_SIZE = 100
+RATE_LIMIT = 5  # requests per second per base
+
+PATH_RE = re.compile(r'^/v0/([^/]+)/([^/]+)(?:/([^/]+))?$')
+FORMULA_RE = re.compile(r"^\(?\{([^}]+)\}\s*=\s*'((?:[^'\\]|\\.)*)'\)?$")
+
+
+class MockAirtable(object):
+    """In-memory tables keyed by (base id, table name)."""
+
+    def __init__(self, fail_rate=0.0, latency=0.0, rate_limit=RATE_LIMIT):
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.requests = {}  # base id -> deque of request times
+        self.stats = {'GET': 0, 'POST': 0, 'PATCH': 0, 'DELETE': 0, 'rate_limited': 0, 'failed': 0}
+
+    def table(self, base, name):
+        return self.tables.setdefault((base, name), OrderedDict())
+
+    def new_record(self, fields):
+        record_id = 'rec%014d' % next(self.ids)
+        return {'id': record_id, 'createdTime': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()),
+                'fields': clean_fields(fields)}
+
+    def seed(self, base, name, fields_list):
+        table = self.table(base, name)
+        for fields in fields_list:
+            record = self.new_record(fields)
+            table[record['id']] = record
+
+    def allow(self, base):
+        """Sliding one-second window per base."""
+        now = time.monotonic()
+        window = self.requests.setdefault(base, deque())
+        while window and now - window[0] >= 1:
+            window.popleft()
+        if len(window) >= self.rate_limit:
+            return False
+        window.append(now)
+        return True
+
+
+def clean_fields(fields):
+    # Airtable does not return empty cells
+    return {key: value for key, value in fields.items() if value not in (None, '', [])}
+
+
+def formula_filter(formula):
+    match = FORMULA_RE.match(formula.strip())
+    if not match:
+        return None
+    field, value = match.group(1), re.sub(r'\\(.)', r'\1', match.group(2))
+    return lambda record: str(record['fields'].get(field, '')) == value
+
+
+class ApiError(Exception):
+    def __init__(self, status, error_type, message=''):
+        Exception.__init__(self, message)
+        self.status = status
+        self.body = {'error': {'type': error_type, 'message': message}} if message else {'error': error_type}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = 'MockAirtable/1.0'
+    api = None  # MockAirtable, set by make_server()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PATCH, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Authorization, Content-Type')
+        self.send_header('Access-Control-Max-Age', '600')
+        self.end_headers()
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/__stats':
+            with self.api.lock:
+                self.send_json(200, dict(self.api.stats))
+            return
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            raise ApiError(422, 'INVALID_REQUEST_UNKNOWN', 'Could not parse request body')
+
+    def dispatch(self, method):
+        api = self.api
+        url = urlsplit(self.path)
+        match = PATH_RE.match(url.path)
+        if not match:
+            self.send_json(404, {'error': 'NOT_FOUND'})
+            return
+        base, table_name, record_id = match.group(1), unquote(match.group(2)), match.group(3)
+
+        if self.server.api_key and self.headers.get('Authorization') != 'Bearer %s' % self.server.api_key:
+            self.send_json(401, {'error': {'type': 'AUTHENTICATION_REQUIRED', 'message': 'Authentication required'}})
+            return
+
+        if api.latency:
+            time.sleep(api.latency)
+
+        with api.lock:
+            api.stats[method] += 1
+            if not api.allow(base):
+                api.stats['rate_limited'] += 1
+                self.send_json(429, {'error': {'type': 'RATE_LIMIT_REACHED',
+                                               'message': 'Rate limit exceeded. Please try again later'}})
+                return
+            if api.fail_rate and random.random() < api.fail_rate:
+                api.stats['failed'] += 1
+                self.send_json(503, {'error': 'SERVICE_UNAVAILABLE'})
+                return
+
+            try:
+                body = self.read_body() if method in ('POST', 'PATCH') else {}
+                status, result = self.apply(method, api.table(base, table_name), record_id, parse_qs(url.query), body)
+            except ApiError as e:
+                self.send_json(e.status, e.body)
+                return
+        self.send_json(status, result)
+
+    def apply(self, method, table, record_id, query, body):
+        if method == 'GET':
+            if record_id:
+                if record_id not in table:
+                    raise ApiError(404, 'NOT_FOUND')
+                return 200, table[record_id]
+            return 200, self.list_records(table, query)
+
+        if method == 'DELETE':
+            if record_id not in table:
+                raise ApiError(404, 'NOT_FOUND')
+            del table[record_id]
+            return 200, {'id': record_id, 'deleted': True}
+
+        if method == 'POST':
+            if 'records' not in body:
+                record = self.api.new_record(body.get('fields') or {})
+                table[record['id']] = record
+                return 200, record
+            records = self.batch(body)
+            created = [self.api.new_record(item.get('fields') or {}) for item in records]
+            for record in created:
+                table[record['id']] = record
+            return 200, {'records': created}
+
+        # PATCH
+        if record_id:
+            return 200, self.update(table, record_id, body.get('fields') or {})
+        records = self.batch(body)
+        for item in records:
+            if item.get('id') not in table:
+                raise ApiError(422, 'ROW_DOES_NOT_EXIST', 'Record ID %s does not exist in this table' % item.get('id'))
+        return 200, {'records': [self.update(table, item['id'], item.get('fields') or {}) for item in records]}
+
+    def batch(self, body):
+        records = body.get('records')
+        if not isinstance(records, list) or not records:
+            raise ApiError(422, 'INVALID_RECORDS', 'Request body must contain a non-empty records array')
+        if len(records) > MAX_BATCH:
+            raise ApiError(422, 'INVALID_RECORDS', 'Too many records: at most %d per request' % MAX_BATCH)
+        return records
+
+    def update(self, table, record_id, fields):
+        if record_id not in table:
+            raise ApiError(404, 'NOT_FOUND')
+        record = table[record_id]
+        merged = dict(record['fields'])
+        merged.update(fields)
+        record['fields'] = clean_fields(merged)
+        return record
+
+    def list_records(self, table, query):
+        try:
+            page_size = min(int(query.get('pageSize', [MAX_PAGE_SIZE])[0]), MAX_PAGE_SIZE)
+            start = int(query.get('offset', ['0'])[0] or 0)
+        except ValueError:
+            raise ApiError(422, 'LIST_RECORDS_ITERATOR_NOT_AVAILABLE')
+
+        records = list(table.values())
+        formula = query.get('filterByFormula', [''])[0]
+        if formula:
+            matches = formula_filter(formula)
+            if matches is None:
+                raise ApiError(422, 'INVALID_FILTER_BY_FORMULA', 'Only {Field}=\'value\' formulas are supported')
+            records = [record for record in records if matches(record)]
+
+        page = records[start:start + page_size]
+        result = {'records': page}
+        if start + page_size < len(records):
+            result['offset'] = str(start + page_size)
+        return result
+
+
+def make_server(host, port, api, api_key=None, verbose=False):
+    handler = type('BoundHandler', (Handler,), {'api': api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.api_key = api_key
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a local mock of the Airtable REST API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--api-key', help='Require this bearer token (default: accept any)')
+    parser.add_argument('--base', default='appMOCK', help='Base id for --records (default: appMOCK)')
+    parser.add_argument('--table', default='Sites', help='Table name for --records (default: Sites)')
+    parser.add_argument('--records', help='JSON list of field objects to preload into --base/--table')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT, help='Requests per second per base')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args(argv)
+
+    api = MockAirtable(fail_rate=args.fail_rate, latency=args.latency, rate_limit=args.rate_limit)
+    if args.records:
+        with open(args.records, encoding='utf-8') as f:
+            api.seed(args.base, args.table, json.load(f))
+
+    server = make_server(args.host, args.port, api, api_key=args.api_key, verbose=args.verbose)
+    print('Mock Airtable on http://%s:%d/v0' % (args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+"""Local server for the app and its datasets, for use without a network.
+
+Serves a directory like `python3 -m http.server`, plus:
+
+- Compression: a fresh precompressed sibling (app.js.br, app.js.gz) is sent
+  when the client accepts it; other text assets are gzipped on the fly and
+  kept in memory. --precompress writes the siblings up front (.br only when
+  the brotli package is installed; nothing else is needed).
+- Caching: ETag and Last-Modified with 304 answers. HTML, scripts, styles and
+  JSON are revalidated on every load, since the ?v= query strings in
+  index.html are not bumped on every change; other files are cached for a day.
+- HTTP Range (one range per request, with If-Range) for large datasets such
+  as .kmz, .ssmc and tiles.
+- /data: bounding-box queries over the site and point datasets given on the
+  command line, answered from a grid index (sitemapper.spatial_index).
+
+Endpoints:
+    GET /data                                              datasets with counts and bounds
+    GET /data/sites?bbox=west,south,east,north[&limit=N]   sites, with their sectors
+    GET /data/points?bbox=west,south,east,north[&group=G][&limit=N]
+
+Usage:
+    python -m sitemapper.server --port 8080
+    python -m sitemapper.server --sites sample_sites.csv --points "Couverture 3G.kml" --precompress
+"""
+
+import argparse
+import email.utils
+import functools
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from sitemapper.columnar import iter_input_points
+from sitemapper.sites import load_sites
+from sitemapper.spatial_index import GridIndex
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/geo+json',
+                      'application/xml', 'application/vnd.google-earth.kml+xml', 'application/manifest+json',
+                      'application/vnd.mapbox-vector-tile', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 1024
+GZIP_CACHE_BYTES = 64 << 20
+REVALIDATE_TYPES = ('text/html', 'text/javascript', 'application/javascript', 'text/css', 'application/json')
+CACHE_MAX_AGE = 86400
+COPY_CHUNK = 64 << 10
+DEFAULT_LIMIT = 5000
+MAX_LIMIT = 100000
+
+EXTRA_TYPES = {
+    '.js': 'text/javascript',
+    '.json': 'application/json',
+    '.geojson': 'application/geo+json',
+    '.kml': 'application/vnd.google-earth.kml+xml',
+    '.kmz': 'application/vnd.google-earth.kmz',
+    '.mvt': 'application/vnd.mapbox-vector-tile',
+    '.ssmc': 'application/octet-stream',
+    '.webmanifest': 'application/manifest+json',
+}
+
+
+def guess_type(path):
+    ext = os.path.splitext(path)[1].lower()
+    return EXTRA_TYPES.get(ext) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(header):
+    """Codings named in Accept-Encoding, without those refused with q=0."""
+    accepted = set()
+    for part in (header or '').split(','):
+        fields = [field.strip() for field in part.split(';')]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for field in fields[1:]:
+            if field.startswith('q='):
+                try:
+                    q = float(field[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(fields[0].lower())
+    return accepted
+
+
+def parse_range(header, size):
+    """One 'bytes=' range as (start, end) inclusive.
+
+    None means send the whole file (no range, several ranges or a malformed
+    header, which RFC 9110 says to ignore); False means unsatisfiable.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[6:].strip().partition('-')
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                return False
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return False
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def is_fresh(path, source_stat):
+    try:
+        return os.stat(path).st_mtime >= source_stat.st_mtime
+    except OSError:
+        return False
+
+
+class GzipCache(object):
+    """Gzipped file bodies, least recently used dropped past `max_bytes`."""
+
+    def __init__(self, max_bytes=GZIP_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # path -> (mtime_ns, size, data)
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, st):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self.entries.move_to_end(path)
+                return entry[2]
+
+        with open(path, 'rb') as f:
+            data = gzip.compress(f.read(), compresslevel=6, mtime=0)
+
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old:
+                self.bytes -= len(old[2])
+            self.entries[path] = (st.st_mtime_ns, st.st_size, data)
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, dropped = self.entries.popitem(last=False)
+                self.bytes -= len(dropped[2])
+        return data
+
+
+class DataStore(object):
+    """Site and point datasets with a grid index each."""
+
+    def __init__(self, site_paths=(), point_paths=()):
+        self.sites = GridIndex()
+        self.points = GridIndex()
+        self.groups = {}  # group -> point count
+        self.files = []
+        for path in site_paths:
+            for site in load_sites(path):
+                self.sites.insert(site)
+            self.files.append(path)
+        for path in point_paths:
+            group = os.path.basename(path)
+            for point in iter_input_points(path):
+                point.setdefault('group', group)
+                if self.points.insert(point):
+                    self.groups[point['group']] = self.groups.get(point['group'], 0) + 1
+            self.files.append(path)
+
+        # Changes whenever the inputs do (they are read once, at start-up)
+        signature = ';'.join('%s:%d' % (path, os.stat(path).st_mtime_ns) for path in self.files)
+        self.version = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12]
+
+    def summary(self):
+        return {
+            'sites': {'count': len(self.sites), 'bounds': self.sites.bounds()},
+            'points': {'count': len(self.points), 'bounds': self.points.bounds(), 'groups': self.groups},
+        }
+
+    def query(self, kind, query):
+        """Items of `kind` ('sites' or 'points') in query['bbox']; raises ValueError on bad parameters."""
+        try:
+            west, south, east, north = [float(value) for value in query['bbox'][0].split(',')]
+        except (KeyError, ValueError):
+            raise ValueError('bbox=west,south,east,north is required')
+        if south > north:
+            raise ValueError('bbox south is above north')
+        try:
+            limit = min(MAX_LIMIT, max(0, int(query.get('limit', [DEFAULT_LIMIT])[0])))
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        group = query.get('group', [None])[0]
+
+        items = []
+        total = 0
+        for item in getattr(self, kind).query_bbox(south, west, north, east):
+            if group is not None and item.get('group') != group:
+                continue
+            total += 1
+            if len(items) < limit:
+                items.append(item)
+        return {'bbox': [west, south, east, north], 'total': total, 'truncated': total > len(items), kind: items}
+
+
+class Handler(SimpleHTTPRequestHandler):
+    server_version = 'SiteSectorMapper/1.0'
+    protocol_version = 'HTTP/1.1'  # Keep-alive: every response carries a Content-Length
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **EXTRA_TYPES)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            SimpleHTTPRequestHandler.log_message(self, format, *args)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def respond(self, head):
+        url_path = urlsplit(self.path).path
+        if url_path == '/data' or url_path.startswith('/data/'):
+            self.send_data(url_path, head)
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, 'index.html')
+            if not url_path.endswith('/') or not os.path.isfile(index):
+                # Redirect or directory listing, as http.server does
+                SimpleHTTPRequestHandler.do_HEAD(self) if head else SimpleHTTPRequestHandler.do_GET(self)
+                return
+            path = index
+        self.send_file(path, head)
+
+    # ==================== STATIC FILES ====================
+
+    def not_modified(self, etag, mtime=None):
+        """Whether a conditional request matches; /data has no mtime, only its ETag."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or 'W/' + etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and mtime is not None:
+            try:
+                return int(mtime) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_file(self, path, head):
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+            return
+
+        content_type = self.guess_type(path)
+        compressible = is_compressible(content_type)
+        etag = '"%x-%x"' % (st.st_mtime_ns // 1000, st.st_size)
+        byte_range = parse_range(self.headers.get('Range'), st.st_size)
+        if_range = self.headers.get('If-Range')
+        if byte_range is not None and if_range is not None and if_range.strip() != etag:
+            byte_range = None
+
+        # Ranges address the file itself, so they are never compressed
+        encoding = None
+        body_path = path
+        body = None
+        if compressible and byte_range is None and st.st_size >= MIN_COMPRESS_SIZE:
+            accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+            if 'br' in accepted and is_fresh(path + '.br', st):
+                encoding, body_path = 'br', path + '.br'
+            elif 'gzip' in accepted:
+                encoding = 'gzip'
+                if is_fresh(path + '.gz', st):
+                    body_path = path + '.gz'
+                else:
+                    body = self.server.gzip_cache.get(path, st)
+        if encoding:
+            etag = etag[:-1] + '-' + encoding + '"'
+
+        headers = [
+            ('ETag', etag),
+            ('Last-Modified', self.date_time_string(st.st_mtime)),
+            ('Cache-Control', 'no-cache' if content_type.startswith(REVALIDATE_TYPES)
+             else 'public, max-age=%d' % CACHE_MAX_AGE),
+        ]
+        if compressible:
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        if self.not_modified(etag, st.st_mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for key, value in headers:
+                self.send_header(key, value)
+            self.end_headers()
+            return
+
+        if byte_range is False:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header('Content-Range', 'bytes */%d' % st.st_size)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if body is not None:
+            start, length = 0, len(body)
+        else:
+            start, length = 0, os.stat(body_path).st_size
+        if byte_range is not None:
+            start, length = byte_range[0], byte_range[1] - byte_range[0] + 1
+
+        self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        else:
+            self.send_header('Accept-Ranges', 'bytes')
+        if byte_range:
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (byte_range[0], byte_range[1], st.st_size))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+
+        if head:
+            return
+        if body is not None:
+            self.wfile.write(body)
+            return
+        with open(body_path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(COPY_CHUNK, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    # ==================== DATA API ====================
+
+    def send_json(self, status, body, head=False, etag=None):
+        data = json.dumps(body, separators=(',', ':')).encode('utf-8')
+        encoding = None
+        if len(data) >= MIN_COMPRESS_SIZE and 'gzip' in accepted_encodings(self.headers.get('Accept-Encoding')):
+            data = gzip.compress(data, compresslevel=5, mtime=0)
+            encoding = 'gzip'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def send_data(self, url_path, head):
+        store = self.server.store
+        etag = '"data-%s-%s"' % (store.version, hashlib.sha1(self.path.encode('utf-8')).hexdigest()[:12])
+        if self.not_modified(etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        kind = url_path[len('/data/'):].strip('/') if url_path != '/data' else ''
+        if kind == '':
+            self.send_json(HTTPStatus.OK, store.summary(), head, etag)
+        elif kind in ('sites', 'points'):
+            try:
+                result = store.query(kind, parse_qs(urlsplit(self.path).query))
+            except ValueError as e:
+                self.send_json(HTTPStatus.BAD_REQUEST, {'error': str(e)}, head)
+                return
+            self.send_json(HTTPStatus.OK, result, head, etag)
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {'error': 'Unknown dataset: %s' % kind}, head)
+
+
+# ==================== SERVER ====================
+
+def precompress(root, verbose=False):
+    """Writes .gz (and .br with brotli installed) next to every compressible file under `root`."""
+    written = 0
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not name.startswith('.') and name != 'node_modules']
+        for name in filenames:
+            path = os.path.join(directory, name)
+            if name.endswith(('.gz', '.br')) or not is_compressible(guess_type(path)):
+                continue
+            st = os.stat(path)
+            if st.st_size < MIN_COMPRESS_SIZE:
+                continue
+            targets = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                targets.append(('.br', lambda data: brotli.compress(data, quality=11)))
+            data = None
+            for suffix, compress in targets:
+                if is_fresh(path + suffix, st):
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                with open(path + suffix, 'wb') as f:
+                    f.write(compress(data))
+                written += 1
+                if verbose:
+                    print('  %s%s' % (os.path.relpath(path, root), suffix))
+    return written
+
+
+def make_server(host, port, root, store=None, verbose=False):
+    server = ThreadingHTTPServer((host, port), functools.partial(Handler, directory=root))
+    server.store = store or DataStore()
+    server.gzip_cache = GzipCache()
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the app with compression, caching, ranges and a /data API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--root', default='.', help='Directory to serve (default: current directory)')
+    parser.add_argument('--sites', action='append', default=[], metavar='FILE',
+                        help='Sites CSV or JSON for /data/sites (repeatable)')
+    parser.add_argument('--points', action='append', default=[], metavar='FILE',
+                        help='Points .kml/.kmz/.json/.ssmc for /data/points, grouped by file name (repeatable)')
+    parser.add_argument('--precompress', action='store_true',
+                        help='Write .gz%s files next to compressible assets first' % ('/.br' if brotli else ''))
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args(argv)
+
+    root = os.path.abspath(args.root)
+    if args.precompress:
+        print('Precompressed %d files' % precompress(root, args.verbose))
+
+    store = DataStore(args.sites, args.points)
+    server = make_server(args.host, args.port, root, store, args.verbose)
+    print('Serving %s on http://%s:%d (%d sites, %d points)' % (
+        root, args.host, args.port, len(store.sites), len(store.points)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Site datasets: the sites CSV the app imports, or a JSON list of sites.
+
+Mirrors normalizeCSVHeaders(), parseNumber(), mapImportRows() and
+groupRowsIntoSites() in import-parsers.js, so a CSV loads into the same site
+objects the browser builds:
+
+    {"id", "name", "latitude", "longitude", "description", "group",
+     "sectors": [{"name", "azimuth", "beamwidth", "range", "color", ...}]}
+"""
+
+import csv
+import json
+import math
+import re
+
+HEADER_MAPPINGS = {
+    'site name': 'site_name',
+    'site_name': 'site_name',
+    'name': 'site_name',
+    'latitude': 'latitude',
+    'lat': 'latitude',
+    'longitude': 'longitude',
+    'lon': 'longitude',
+    'lng': 'longitude',
+    'description': 'description',
+    'sector name': 'sector_name',
+    'sector_name': 'sector_name',
+    'azimuth': 'azimuth',
+    'bearing': 'azimuth',
+    'azimut': 'azimuth',
+    'beamwidth': 'beamwidth',
+    'range': 'range',
+    'radius': 'range',
+    'technology': 'technology',
+    'tech': 'technology',
+    'frequency': 'frequency',
+    'freq': 'frequency',
+    'color': 'color',
+    'opacity': 'opacity',
+    'physical_cell_id': 'pci',
+    'physical cell id': 'pci',
+    'pci': 'pci',
+    'sc physical cell id': 'pci',
+    'cell_name': 'cell_name',
+    'cell name': 'cell_name',
+    'cellname': 'cell_name',
+    'cellid': 'cell_name',
+}
+
+STANDARD_KEYS = ('site_name', 'latitude', 'longitude', 'description', 'sector_name', 'azimuth', 'beamwidth',
+                 'range', 'color', 'opacity', 'technology', 'frequency', 'pci', 'cell_name')
+
+# JavaScript parseFloat(): the longest numeric prefix after leading whitespace
+FLOAT_PREFIX_RE = re.compile(r'\s*([+-]?(?:Infinity|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?))')
+
+
+def normalize_headers(keys):
+    header_map = {}
+    for key in keys:
+        mapped = HEADER_MAPPINGS.get(key.lower().strip())
+        if mapped:
+            header_map[key] = mapped
+    return header_map
+
+
+def parse_float(text):
+    match = FLOAT_PREFIX_RE.match(text)
+    if not match:
+        return None
+    return float(match.group(1).replace('Infinity', 'inf'))
+
+
+def parse_number(value, is_coordinate=False):
+    """parseNumber() from import-parsers.js; None where it returns null."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        clean = value.strip()
+        if clean.count('.') > 1:
+            clean = clean.replace('.', '')
+        elif ',' in clean and '.' not in clean:
+            clean = clean.replace(',', '.', 1)
+        number = parse_float(clean)
+    else:
+        number = float(value)
+    if number is None or math.isnan(number):
+        return None
+    if is_coordinate:
+        iterations = 0
+        while (number > 180 or number < -180) and iterations < 15:
+            number = number / 10
+            iterations += 1
+    return number
+
+
+def map_rows(raw_rows):
+    """Rename keys to the standard names and drop rows without a site and coordinates."""
+    header_map = None
+    for raw in raw_rows:
+        if header_map is None:
+            header_map = normalize_headers(raw.keys())
+        row = {}
+        for key, value in raw.items():
+            row[header_map.get(key, key)] = value
+        if (row.get('site_name') and parse_number(row.get('latitude'), True) is not None
+                and parse_number(row.get('longitude'), True) is not None):
+            yield row
+
+
+def group_rows_into_sites(rows):
+    sites = {}
+    for row in rows:
+        name = row['site_name']
+        site = sites.get(name)
+        if site is None:
+            site = {
+                'id': 'site-%d' % (len(sites) + 1),
+                'name': name,
+                'latitude': parse_number(row['latitude'], True),
+                'longitude': parse_number(row['longitude'], True),
+                'description': row.get('description') or '',
+                'group': 'CSV Import',
+                'sectors': [],
+            }
+            sites[name] = site
+
+        azimuth = parse_number(row.get('azimuth'))
+        if azimuth is None:
+            continue
+        site['sectors'].append({
+            'name': row.get('sector_name') or '',
+            'azimuth': azimuth,
+            'beamwidth': parse_number(row.get('beamwidth')) or 65,
+            'range': parse_number(row.get('range')) or 500,
+            'color': row.get('color') or '#3388ff',
+            'opacity': parse_number(row.get('opacity')) or 0.5,
+            'technology': row.get('technology') or '',
+            'frequency': row.get('frequency') or '',
+            'pci': row.get('pci') or '',
+            'cell_name': row.get('cell_name') or '',
+            'customProperties': [{'name': key, 'value': value}
+                                 for key, value in row.items() if key not in STANDARD_KEYS],
+        })
+    return list(sites.values())
+
+
+def read_sites_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        # PapaParse skipEmptyLines: rows whose fields are all empty are ignored
+        rows = (row for row in csv.DictReader(f) if any(value for value in row.values()))
+        return group_rows_into_sites(map_rows(rows))
+
+
+def load_sites(path):
+    """Sites from a sites CSV, or from a JSON list (or {"sites": [...]}) of site objects."""
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data['sites'] if isinstance(data, dict) else data
+    return read_sites_csv(path)
@@ -0,0 +1,75 @@
+"""Uniform latitude/longitude grid over sites or points.
+
+The Python side of SpatialGridIndex in spatial-index.js: items with
+latitude/longitude go into fixed-size cells, so a bounding-box query only
+visits the cells it overlaps. Built once from a list; there are no moves or
+deletes.
+"""
+
+import math
+
+
+class GridIndex(object):
+    def __init__(self, items=(), cell_size=0.02):
+        self.cell_size = cell_size
+        self.rows = int(math.ceil(180 / cell_size)) + 1
+        self.columns = int(math.ceil(360 / cell_size)) + 1
+        self.cells = {}  # row * columns + column -> [(lat, lng, item)]
+        self.size = 0
+        self.south = self.west = math.inf
+        self.north = self.east = -math.inf
+        for item in items:
+            self.insert(item)
+
+    def __len__(self):
+        return self.size
+
+    def cell_row(self, lat):
+        return min(self.rows - 1, max(0, int(math.floor((lat + 90) / self.cell_size))))
+
+    def cell_column(self, lng):
+        return min(self.columns - 1, max(0, int(math.floor((lng + 180) / self.cell_size))))
+
+    def insert(self, item):
+        """Adds an item; items without finite coordinates are skipped."""
+        try:
+            lat = float(item['latitude'])
+            lng = float(item['longitude'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        if not (math.isfinite(lat) and math.isfinite(lng)):
+            return False
+
+        key = self.cell_row(lat) * self.columns + self.cell_column(lng)
+        self.cells.setdefault(key, []).append((lat, lng, item))
+        self.size += 1
+        self.south, self.north = min(self.south, lat), max(self.north, lat)
+        self.west, self.east = min(self.west, lng), max(self.east, lng)
+        return True
+
+    def bounds(self):
+        """[west, south, east, north], or None when empty."""
+        return [self.west, self.south, self.east, self.north] if self.size else None
+
+    def query_bbox(self, south, west, north, east):
+        """Items inside a box (inclusive); a box with west > east crosses the antimeridian."""
+        if west > east:
+            for item in self.query_bbox(south, west, north, 180):
+                yield item
+            for item in self.query_bbox(south, -180, north, east):
+                yield item
+            return
+
+        r0, r1 = self.cell_row(south), self.cell_row(north)
+        c0, c1 = self.cell_column(west), self.cell_column(east)
+        # Few occupied cells in a big box: walk the occupied ones instead
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self.cells):
+            keys = [key for key in self.cells
+                    if r0 <= key // self.columns <= r1 and c0 <= key % self.columns <= c1]
+        else:
+            keys = [row * self.columns + column for row in range(r0, r1 + 1) for column in range(c0, c1 + 1)]
+
+        for key in keys:
+            for lat, lng, item in self.cells.get(key, ()):
+                if south <= lat <= north and west <= lng <= east:
+                    yield item
@@ -0,0 +1,271 @@
+"""Synthetic networks and drive tests for benchmarks and load testing.
+
+network writes N sites x 3 sectors as the sites CSV the app imports, with
+cell name, EARFCN and PCI columns, scattered around Moroccan cities like
+sample_sites.csv. drive writes M samples as a TEMS-style KML like
+"Couverture 3G.kml": walks of ~15 m steps, colour-class styles, and HTML
+table descriptions naming the serving cell, its EARFCN and site and an RSCP
+that falls off with distance. The same seed always gives the same files, and
+both are written as they are generated, so 1M rows need no more memory than
+10k.
+
+Usage:
+    python -m sitemapper.synth network --sites 3334 -o sites_10k.csv
+    python -m sitemapper.synth drive --samples 1000000 --network sites_10k.csv -o drive_1m.kml
+"""
+
+import argparse
+import csv
+import math
+import random
+import sys
+
+from sitemapper.kml_export import destination
+from sitemapper.sites import load_sites
+from sitemapper.spatial_index import GridIndex
+
+# (name, latitude, longitude, spread in degrees, weight)
+CITIES = (
+    ('Casablanca', 33.5731, -7.5898, 0.12, 6),
+    ('Rabat', 34.0209, -6.8416, 0.08, 3),
+    ('Marrakech', 31.6295, -7.9811, 0.08, 3),
+    ('Fes', 34.0181, -5.0078, 0.07, 2),
+    ('Tangier', 35.7595, -5.8340, 0.07, 2),
+    ('Agadir', 30.4278, -9.5981, 0.06, 1),
+    ('Oujda', 34.6814, -1.9086, 0.05, 1),
+)
+
+# (technology, frequency, EARFCN, range in meters)
+LAYERS = (
+    ('4G', '1800 MHz', '1320', 900),
+    ('4G', '2600 MHz', '3050', 600),
+    ('4G', '800 MHz', '6300', 1500),
+    ('3G', '2100 MHz', '10638', 1200),
+    ('5G', '3500 MHz', '636666', 400),
+)
+
+NETWORK_FIELDS = ('site_name', 'latitude', 'longitude', 'description', 'azimuth', 'beamwidth', 'range',
+                  'technology', 'frequency', 'cell_name', 'EARFCN', 'PCI')
+
+# RSCP classes: KML style id, aabbggrr colour, lower bound in dBm
+RSCP_CLASSES = (
+    ('n0', 'FF00ff00', -80),
+    ('n1', 'FF00ffff', -95),
+    ('n2', 'FF0000ff', None),
+)
+
+STEP_METERS = 15
+WALK_LENGTH = 2000  # Samples per walk before jumping to another site
+RESELECT_EVERY = 10  # Samples between serving-cell reselections
+
+KML_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://earth.google.com/kml/2.2">
+<Document>
+%s
+<Folder>
+'''
+
+KML_STYLE = '''<Style id="%s">
+<IconStyle>
+<color>%s</color>
+<scale>0.30</scale>
+<Icon>
+<href>http://td.analytics.tems.net/TDD/GoogleEarth/dot.png</href>
+</Icon>
+</IconStyle>
+</Style>
+'''
+
+KML_FOOTER = '''</Folder>
+</Document>
+</kml>
+'''
+
+PLACEMARK = '''<Placemark>
+<styleUrl>#%s</styleUrl>
+<Point>
+<coordinates>%.7f,%.7f, 0</coordinates>
+</Point>
+<description>
+<![CDATA[
+<table border=0 style='font-size: 12px; width: 200px;'>
+%s</table>]]></description>
+</Placemark>
+'''
+
+TABLE_ROW = "<tr><td>%s:</td> <td><p align=right>%s</p></td></tr>\n"
+
+
+def pick_city(rng):
+    total = sum(city[4] for city in CITIES)
+    target = rng.uniform(0, total)
+    for city in CITIES:
+        target -= city[4]
+        if target <= 0:
+            return city
+    return CITIES[-1]
+
+
+def network_rows(site_count, seed=1):
+    """Yield sites CSV rows: three sectors per site, one layer per site."""
+    rng = random.Random(seed)
+    for i in range(site_count):
+        city, lat, lng, spread, _ = pick_city(rng)
+        lat = rng.gauss(lat, spread)
+        lng = rng.gauss(lng, spread / math.cos(math.radians(lat)))
+        technology, frequency, earfcn, range_ = LAYERS[rng.randrange(len(LAYERS))]
+        site_name = '%s_%s_%05d' % (city[:3].upper(), technology, i + 1)
+        first_azimuth = rng.randrange(0, 120, 10)
+        for k in range(3):
+            yield {
+                'site_name': site_name,
+                'latitude': '%.6f' % lat,
+                'longitude': '%.6f' % lng,
+                'description': '%s %s site' % (city, technology),
+                'azimuth': first_azimuth + 120 * k,
+                'beamwidth': 65,
+                'range': int(range_ * rng.uniform(0.7, 1.3)),
+                'technology': technology,
+                'frequency': frequency,
+                'cell_name': '%s_%d' % (site_name, k + 1),
+                'EARFCN': earfcn,
+                'PCI': (i * 3 + k) % 504,
+            }
+
+
+def write_network(site_count, out, seed=1):
+    writer = csv.DictWriter(out, NETWORK_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    rows = 0
+    for row in network_rows(site_count, seed):
+        writer.writerow(row)
+        rows += 1
+    return rows
+
+
+def bearing(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_lambda = math.radians(lng2 - lng1)
+    y = math.sin(d_lambda) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(d_lambda)
+    return math.degrees(math.atan2(y, x)) % 360
+
+
+def distance(lat1, lng1, lat2, lng2):
+    """spatialDistance() from spatial-index.js."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 6371e3 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def serving_cell(index, lat, lng):
+    """(site, sector, distance) of the closest site within 3 km, sector facing the sample."""
+    margin = 3000 / 111320
+    best = None
+    for site in index.query_bbox(lat - margin, lng - margin * 1.3, lat + margin, lng + margin * 1.3):
+        d = distance(lat, lng, site['latitude'], site['longitude'])
+        if site['sectors'] and (best is None or d < best[2]):
+            best = (site, None, d)
+    if best is None:
+        return None
+    site = best[0]
+    b = bearing(site['latitude'], site['longitude'], lat, lng)
+    sector = min(site['sectors'], key=lambda s: abs((b - s['azimuth'] + 540) % 360 - 180))
+    return site, sector, best[2]
+
+
+def rscp_class(rscp):
+    for style_id, _, floor in RSCP_CLASSES:
+        if floor is None or rscp >= floor:
+            return style_id
+    return RSCP_CLASSES[-1][0]
+
+
+def sector_property(sector, name):
+    for prop in sector.get('customProperties') or ():
+        if prop['name'] == name:
+            return prop['value']
+    return ''
+
+
+def drive_samples(sites, sample_count, seed=1):
+    """Yield (lng, lat, style id, [(key, value)]) along walks between sites."""
+    rng = random.Random(seed)
+    sites = [site for site in sites if site.get('sectors')]
+    if not sites:
+        raise ValueError('The network has no sectors')
+    index = GridIndex(sites, 0.02)
+
+    serving = None
+    for i in range(sample_count):
+        if i % WALK_LENGTH == 0:
+            start = sites[rng.randrange(len(sites))]
+            lat, lng = start['latitude'], start['longitude']
+            heading = rng.uniform(0, 360)
+        else:
+            heading = (heading + rng.gauss(0, 8)) % 360
+            lat, lng = destination(lat, lng, heading, STEP_METERS * rng.uniform(0.6, 1.4))
+        if i % RESELECT_EVERY == 0 or serving is None:
+            serving = serving_cell(index, lat, lng)
+
+        if serving is None:
+            rscp = -115 + rng.gauss(0, 2)
+            attributes = [('Categorized RSCP:A1', '%.1f' % rscp)]
+        else:
+            site, sector, _ = serving
+            d = max(20.0, distance(lat, lng, site['latitude'], site['longitude']))
+            rscp = max(-120.0, -45 - 32 * math.log10(d / 20) + rng.gauss(0, 4))
+            attributes = [
+                ('Categorized RSCP:A1', '%.1f' % rscp),
+                ('Cell Name', sector.get('cell_name') or sector.get('name') or ''),
+                ('EARFCN', sector_property(sector, 'EARFCN')),
+                ('Site', site['name']),
+            ]
+        yield lng, lat, rscp_class(rscp), attributes
+
+
+def write_drive_kml(samples, out):
+    out.write(KML_HEADER % ''.join(KML_STYLE % (style_id, color) for style_id, color, _ in RSCP_CLASSES))
+    count = 0
+    for lng, lat, style_id, attributes in samples:
+        rows = ''.join(TABLE_ROW % (key, value) for key, value in attributes if value != '')
+        out.write(PLACEMARK % (style_id, lng, lat, rows))
+        count += 1
+    out.write(KML_FOOTER)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic networks and drive tests.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    network = commands.add_parser('network', help='Sites CSV: N sites x 3 sectors')
+    network.add_argument('--sites', type=int, default=1000, help='Number of sites (default: 1000)')
+    network.add_argument('--seed', type=int, default=1)
+    network.add_argument('-o', '--output', help='Output .csv (default: stdout)')
+
+    drive = commands.add_parser('drive', help='Drive-test KML served by a network')
+    drive.add_argument('--samples', type=int, default=10000, help='Number of samples (default: 10000)')
+    drive.add_argument('--network', required=True, help='Sites CSV or JSON the samples are served by')
+    drive.add_argument('--seed', type=int, default=1)
+    drive.add_argument('-o', '--output', help='Output .kml (default: stdout)')
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        if args.command == 'network':
+            count = write_network(args.sites, out, args.seed)
+            summary = '%d sectors' % count
+        else:
+            count = write_drive_kml(drive_samples(load_sites(args.network), args.samples, args.seed), out)
+            summary = '%d samples' % count
+    finally:
+        if args.output:
+            out.close()
+    print('Wrote %s to %s' % (summary, args.output or 'stdout'), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+"""Precomputed sector coverage tiles.
+
+Builds the wedge of every sector with the spherical destination() of
+sector-geometry.js and writes them as a z/x/y pyramid the app can load
+instead of building wedges in the browser (Sector Tiles in the CSV import
+panel). Arc resolution per zoom follows SECTOR_ARC_STEPS.
+
+GeoJSON tiles hold whole, unclipped wedges with a numeric id shared by every
+tile the wedge touches, so the app draws each wedge once. MVT tiles (for
+vector tile viewers such as QGIS or MapLibre) are clipped to the tile plus a
+buffer, as those renderers expect. A TileJSON tileset.json describes the
+pyramid.
+
+Wedges are computed per chunk of sectors in bulk with NumPy when it is
+installed (per sector in Python otherwise), and chunks are tiled and tiles
+written in a process pool.
+
+Usage:
+    python -m sitemapper.tiles sample_sites.csv -o tiles/sectors
+    python -m sitemapper.tiles sites.json -o tiles/sectors --format mvt --min-zoom 8 --max-zoom 15 -j 8
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from sitemapper.kml_export import EARTH_RADIUS, sector_wedge
+from sitemapper.sites import load_sites
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# SECTOR_ARC_STEPS in sector-geometry.js: (min zoom, arc segments)
+ARC_STEPS = ((13, 15), (11, 8), (0, 4))
+CHUNK_SIZE = 5000  # Sectors per pool task
+COORD_DIGITS = 7  # ~1 cm
+MAX_LATITUDE = 85.0511287798
+LAYER_NAME = 'sectors'
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+EXTENSIONS = {'geojson': 'geojson', 'mvt': 'mvt'}
+
+# Sector fields copied into feature properties
+PROPERTIES = ('name', 'cell_name', 'azimuth', 'beamwidth', 'range', 'technology', 'frequency', 'color', 'opacity')
+# Every property a feature can carry, listed in tileset.json
+FIELDS = ('site', 'site_id', 'group') + PROPERTIES
+
+
+def arc_steps(zoom):
+    for min_zoom, steps in ARC_STEPS:
+        if zoom >= min_zoom:
+            return steps
+    return ARC_STEPS[-1][1]
+
+
+def sector_records(sites):
+    """(id, lat, lng, azimuth, beamwidth, range, properties) for every sector."""
+    records = []
+    for site in sites:
+        for sector in site.get('sectors') or []:
+            properties = {'site': site['name'], 'group': site.get('group') or 'Other'}
+            if site.get('id') not in (None, ''):
+                properties['site_id'] = site['id']
+            for key in PROPERTIES:
+                value = sector.get(key)
+                if value not in (None, ''):
+                    properties[key] = value
+            records.append((len(records), float(site['latitude']), float(site['longitude']),
+                            float(sector['azimuth']), float(sector.get('beamwidth') or 65),
+                            float(sector.get('range') or 500), properties))
+    return records
+
+
+def wedges(lats, lngs, azimuths, beamwidths, ranges, steps):
+    """buildSectorWedge() for many sectors.
+
+    Returns (lats, lngs): one list of steps + 3 vertices per sector.
+    """
+    if np is None:
+        rings = [sector_wedge(*args, steps=steps) for args in zip(lats, lngs, azimuths, beamwidths, ranges)]
+        return [[p[0] for p in ring] for ring in rings], [[p[1] for p in ring] for ring in rings]
+
+    lat = np.asarray(lats, dtype=float)[:, None]
+    lng = np.asarray(lngs, dtype=float)[:, None]
+    azimuth = np.asarray(azimuths, dtype=float)[:, None]
+    beamwidth = np.asarray(beamwidths, dtype=float)[:, None]
+    distance = np.asarray(ranges, dtype=float)[:, None] / EARTH_RADIUS
+
+    start = azimuth - beamwidth / 2
+    end = azimuth + beamwidth / 2
+    bearing = (start + (np.arange(steps + 1) / steps) * (end - start)) * np.pi / 180
+    lat_rad = lat * np.pi / 180
+    lng_rad = lng * np.pi / 180
+
+    lat_dest = np.arcsin(np.sin(lat_rad) * np.cos(distance) +
+                         np.cos(lat_rad) * np.sin(distance) * np.cos(bearing))
+    lng_dest = lng_rad + np.arctan2(np.sin(bearing) * np.sin(distance) * np.cos(lat_rad),
+                                    np.cos(distance) - np.sin(lat_rad) * np.sin(lat_dest))
+
+    ring_lats = np.concatenate([lat, lat_dest * 180 / np.pi, lat], axis=1)
+    ring_lngs = np.concatenate([lng, lng_dest * 180 / np.pi, lng], axis=1)
+    return ring_lats.tolist(), ring_lngs.tolist()
+
+
+# ==================== TILE MATH ====================
+
+def world_x(lng):
+    """Web Mercator x in [0, 1]."""
+    return (lng + 180) / 360
+
+
+def world_y(lat):
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    rad = lat * math.pi / 180
+    return (1 - math.log(math.tan(rad) + 1 / math.cos(rad)) / math.pi) / 2
+
+
+def tile_range(min_x, min_y, max_x, max_y, zoom):
+    """Tiles (x0, y0, x1, y1) covering a world-coordinate box."""
+    n = 1 << zoom
+    clamp = lambda value: max(0, min(n - 1, int(math.floor(value * n))))
+    return clamp(min_x), clamp(min_y), clamp(max_x), clamp(max_y)
+
+
+def tile_chunk(records, zooms, tile_format):
+    """Tiles the sectors of one chunk: {(z, x, y): [feature]}.
+
+    A feature is its encoded GeoJSON text, or (id, properties, ring) for MVT
+    with a closed ring of [lng, lat]. Every zoom using the same arc resolution
+    shares it, so a wedge is encoded once however many tiles it touches.
+    """
+    tiles = {}
+    by_steps = {}
+    for zoom in zooms:
+        by_steps.setdefault(arc_steps(zoom), []).append(zoom)
+
+    columns = list(zip(*records))
+    for steps, step_zooms in sorted(by_steps.items()):
+        ring_lats, ring_lngs = wedges(columns[1], columns[2], columns[3], columns[4], columns[5], steps)
+        for record, lats, lngs in zip(records, ring_lats, ring_lngs):
+            ring = [[round(lng, COORD_DIGITS), round(lat, COORD_DIGITS)] for lat, lng in zip(lats, lngs)]
+            feature = (record[0], record[6], ring)
+            if tile_format == 'geojson':
+                feature = geojson_feature(*feature)
+            # North is smaller y
+            box = (world_x(min(lngs)), world_y(max(lats)), world_x(max(lngs)), world_y(min(lats)))
+            for zoom in step_zooms:
+                x0, y0, x1, y1 = tile_range(box[0], box[1], box[2], box[3], zoom)
+                for x in range(x0, x1 + 1):
+                    for y in range(y0, y1 + 1):
+                        tiles.setdefault((zoom, x, y), []).append(feature)
+    return tiles
+
+
+# ==================== ENCODING ====================
+
+def geojson_feature(feature_id, properties, ring):
+    return json.dumps({'type': 'Feature', 'id': feature_id, 'properties': properties,
+                       'geometry': {'type': 'Polygon', 'coordinates': [ring]}}, separators=(',', ':'))
+
+
+def geojson_tile(features):
+    return ('{"type":"FeatureCollection","features":[%s]}' % ','.join(features)).encode('utf-8')
+
+
+def varint(value, out):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def message_field(field, payload, out):
+    varint((field << 3) | 2, out)
+    varint(len(payload), out)
+    out.extend(payload)
+
+
+def mvt_value(value):
+    out = bytearray()
+    if isinstance(value, bool):
+        out.append((7 << 3) | 0)
+        out.append(1 if value else 0)
+    elif isinstance(value, int):
+        out.append((6 << 3) | 0)
+        varint(zigzag(value), out)
+    elif isinstance(value, float):
+        out.append((3 << 3) | 1)
+        out.extend(struct.pack('<d', value))
+    else:
+        message_field(1, str(value).encode('utf-8'), out)
+    return bytes(out)
+
+
+def clip_ring(points, low, high):
+    """Sutherland-Hodgman clip of a ring to the square [low, high]^2."""
+    edges = ((0, low, False), (0, high, True), (1, low, False), (1, high, True))
+    for axis, bound, is_max in edges:
+        if not points:
+            break
+        inside = (lambda p: p[axis] <= bound) if is_max else (lambda p: p[axis] >= bound)
+        clipped = []
+        previous = points[-1]
+        for point in points:
+            if inside(point) != inside(previous):
+                t = (bound - previous[axis]) / (point[axis] - previous[axis])
+                crossing = [previous[0] + t * (point[0] - previous[0]), previous[1] + t * (point[1] - previous[1])]
+                crossing[axis] = bound
+                clipped.append(crossing)
+            if inside(point):
+                clipped.append(point)
+            previous = point
+        points = clipped
+    return points
+
+
+def mvt_ring(ring, zoom, x, y):
+    """Ring in tile coordinates: clipped, quantised, open, exterior winding; None if empty."""
+    n = 1 << zoom
+    points = [[(world_x(lng) * n - x) * MVT_EXTENT, (world_y(lat) * n - y) * MVT_EXTENT] for lng, lat in ring[:-1]]
+    points = clip_ring(points, -MVT_BUFFER, MVT_EXTENT + MVT_BUFFER)
+
+    quantised = []
+    for px, py in points:
+        point = (int(round(px)), int(round(py)))
+        if not quantised or point != quantised[-1]:
+            quantised.append(point)
+    while len(quantised) > 1 and quantised[0] == quantised[-1]:
+        quantised.pop()
+    if len(quantised) < 3:
+        return None
+
+    # Exterior rings have a positive surveyor's area in tile coordinates (y down)
+    area = sum(quantised[i - 1][0] * quantised[i][1] - quantised[i][0] * quantised[i - 1][1]
+               for i in range(len(quantised)))
+    if area == 0:
+        return None
+    if area < 0:
+        quantised.reverse()
+    return quantised
+
+
+def mvt_geometry(points):
+    out = []
+    cursor_x = cursor_y = 0
+    for i, (px, py) in enumerate(points):
+        if i == 0:
+            out.append(1 | (1 << 3))  # MoveTo
+        elif i == 1:
+            out.append(2 | ((len(points) - 1) << 3))  # LineTo
+        out.append(zigzag(px - cursor_x))
+        out.append(zigzag(py - cursor_y))
+        cursor_x, cursor_y = px, py
+    out.append(7 | (1 << 3))  # ClosePath
+    return out
+
+
+def mvt_tile(features, zoom, x, y):
+    keys, values = {}, {}
+    encoded = bytearray()
+    for feature_id, properties, ring in features:
+        points = mvt_ring(ring, zoom, x, y)
+        if points is None:
+            continue
+        tags = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(mvt_value(value), len(values)))
+
+        feature = bytearray()
+        feature.append((1 << 3) | 0)
+        varint(feature_id, feature)
+        packed = bytearray()
+        for tag in tags:
+            varint(tag, packed)
+        message_field(2, packed, feature)
+        feature.append((3 << 3) | 0)
+        feature.append(3)  # POLYGON
+        packed = bytearray()
+        for command in mvt_geometry(points):
+            varint(command, packed)
+        message_field(4, packed, feature)
+        message_field(2, feature, encoded)
+
+    if not encoded:
+        return None
+
+    layer = bytearray()
+    message_field(1, LAYER_NAME.encode('utf-8'), layer)
+    layer.extend(encoded)
+    for key in keys:
+        message_field(3, key.encode('utf-8'), layer)
+    for value in values:
+        message_field(4, value, layer)
+    layer.append((5 << 3) | 0)
+    varint(MVT_EXTENT, layer)
+    layer.append((15 << 3) | 0)
+    layer.append(2)
+
+    tile = bytearray()
+    message_field(3, layer, tile)
+    return bytes(tile)
+
+
+def write_tiles(output, tile_format, batch):
+    """Writes [((z, x, y), features)]; returns the number of files written."""
+    written = 0
+    for (zoom, x, y), features in batch:
+        data = geojson_tile(features) if tile_format == 'geojson' else mvt_tile(features, zoom, x, y)
+        if data is None:
+            continue
+        directory = os.path.join(output, str(zoom), str(x))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '%d.%s' % (y, EXTENSIONS[tile_format])), 'wb') as f:
+            f.write(data)
+        written += 1
+    return written
+
+
+# ==================== PYRAMID ====================
+
+def tilejson(records, site_count, tile_format, min_zoom, max_zoom):
+    lats = [record[1] for record in records]
+    lngs = [record[2] for record in records]
+    bounds = [min(lngs), min(lats), max(lngs), max(lats)] if records else [-180, -MAX_LATITUDE, 180, MAX_LATITUDE]
+    data = {
+        'tilejson': '3.0.0',
+        'name': 'Site Sector Mapper sectors',
+        'format': tile_format,
+        'tiles': ['{z}/{x}/{y}.%s' % EXTENSIONS[tile_format]],
+        'minzoom': min_zoom,
+        'maxzoom': max_zoom,
+        'bounds': bounds,
+        'center': [(bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2, max(min_zoom, min(max_zoom, 12))],
+        'sites': site_count,
+        'sectors': len(records),
+        'fields': list(FIELDS),
+    }
+    if tile_format == 'mvt':
+        data['vector_layers'] = [{'id': LAYER_NAME, 'minzoom': min_zoom, 'maxzoom': max_zoom,
+                                  'fields': dict.fromkeys(FIELDS, 'String')}]
+    return data
+
+
+def build_pyramid(sites, output, tile_format='geojson', min_zoom=10, max_zoom=14, jobs=None):
+    """Tiles every sector of `sites` into `output`; returns the TileJSON written."""
+    records = sector_records(sites)
+    zooms = list(range(min_zoom, max_zoom + 1))
+    chunks = [records[i:i + CHUNK_SIZE] for i in range(0, len(records), CHUNK_SIZE)]
+
+    tiles = {}
+    if jobs == 1:
+        results = (tile_chunk(chunk, zooms, tile_format) for chunk in chunks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(tile_chunk, chunks, [zooms] * len(chunks), [tile_format] * len(chunks))
+
+    try:
+        for result in results:
+            for key, features in result.items():
+                tiles.setdefault(key, []).extend(features)
+
+        os.makedirs(output, exist_ok=True)
+        items = sorted(tiles.items())
+        batch_size = max(1, len(items) // (4 * (jobs or os.cpu_count() or 1)))
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        if pool is None:
+            written = sum(write_tiles(output, tile_format, batch) for batch in batches)
+        else:
+            written = sum(pool.map(write_tiles, [output] * len(batches), [tile_format] * len(batches), batches))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    data = tilejson(records, len(sites), tile_format, min_zoom, max_zoom)
+    data['tile_count'] = written
+    with open(os.path.join(output, 'tileset.json'), 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute sector wedge tiles from a sites CSV or JSON dataset.')
+    parser.add_argument('input', help='Sites CSV (the import format) or JSON list of sites')
+    parser.add_argument('-o', '--output', required=True, help='Output directory (tileset.json and z/x/y tiles)')
+    parser.add_argument('--format', choices=sorted(EXTENSIONS), default='geojson',
+                        help='geojson: loadable in the app; mvt: Mapbox Vector Tiles (default: geojson)')
+    parser.add_argument('--min-zoom', type=int, default=10, help='Lowest zoom level (default: 10)')
+    parser.add_argument('--max-zoom', type=int, default=14,
+                        help='Highest zoom level; the app over-zooms beyond it (default: 14)')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes (default: one per CPU; 1: no pool)')
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.min_zoom <= args.max_zoom <= 22:
+        parser.error('zoom levels must satisfy 0 <= --min-zoom <= --max-zoom <= 22')
+
+    sites = load_sites(args.input)
+    data = build_pyramid(sites, args.output, args.format, args.min_zoom, args.max_zoom, args.jobs)
+    print('Wrote %d tiles for %d sectors of %d sites to %s%s' % (
+        data['tile_count'], data['sectors'], data['sites'], args.output,
+        '' if np is not None else ' (install numpy for faster wedges)'), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
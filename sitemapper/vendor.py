@@ -0,0 +1,120 @@
+"""Downloads the third-party libraries the app serves from vendor/.
+
+The files are the { local, cdn } entries of vendor.js, so the page, the
+import worker, the service worker and this script share one list. Existing
+files are kept unless --force is given; --check only reports what is missing.
+
+index.html loads Leaflet and markercluster with plain <script>/<link> tags.
+After downloading, each tag is pointed at the local copy when the file is
+there and at the CDN when it is not, so the page never requests a missing
+file (a 404 costs a round trip before first paint, and a scripted fallback is
+blocked on slow connections). Running this is what makes a deployment work
+offline, not what makes it work at all.
+
+Usage:
+    python -m sitemapper.vendor
+    python -m sitemapper.vendor --root /srv/site-sector-mapper --force
+    python -m sitemapper.vendor --check
+"""
+
+import argparse
+import os
+import re
+import sys
+import urllib.request
+
+VENDOR_ENTRY = re.compile(r"\{\s*local:\s*'([^']+)',\s*cdn:\s*'([^']+)'\s*\}")
+TIMEOUT = 60
+
+
+def vendor_files(root):
+    """[(local path, CDN URL)] listed in <root>/vendor.js."""
+    with open(os.path.join(root, 'vendor.js'), encoding='utf-8') as f:
+        return VENDOR_ENTRY.findall(f.read())
+
+
+def link_page(root, files, page='index.html'):
+    """Points the page's tags at local copies that exist and at the CDN for
+    the rest; returns the number of URLs changed."""
+    path = os.path.join(root, page)
+    with open(path, encoding='utf-8') as f:
+        html = original = f.read()
+    changed = 0
+    for local, url in files:
+        present = os.path.exists(os.path.join(root, local))
+        old, new = ('"%s"' % url, '"%s"' % local) if present else ('"%s"' % local, '"%s"' % url)
+        changed += html.count(old)
+        html = html.replace(old, new)
+    if html != original:
+        with open(path + '.tmp', 'w', encoding='utf-8') as out:
+            out.write(html)
+        os.replace(path + '.tmp', path)
+    return changed
+
+
+def page_misses(root, files, page='index.html'):
+    """Local paths the page references that do not exist."""
+    with open(os.path.join(root, page), encoding='utf-8') as f:
+        html = f.read()
+    return [local for local, _ in files
+            if '"%s"' % local in html and not os.path.exists(os.path.join(root, local))]
+
+
+def download(url, path):
+    """Writes `url` to `path` through a temporary file; returns the size."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    request = urllib.request.Request(url, headers={'User-Agent': 'sitemapper-vendor'})
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        data = response.read()
+    with open(path + '.tmp', 'wb') as out:
+        out.write(data)
+    os.replace(path + '.tmp', path)
+    return len(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Download the libraries listed in vendor.js into vendor/.')
+    parser.add_argument('--root', default='.', help='App directory holding vendor.js (default: current directory)')
+    parser.add_argument('--force', action='store_true', help='Download files that already exist')
+    parser.add_argument('--check', action='store_true', help='Only list missing files; exit status 1 if any')
+    args = parser.parse_args(argv)
+
+    try:
+        files = vendor_files(args.root)
+    except OSError as error:
+        parser.error(str(error))
+    if not files:
+        parser.error('no vendor entries found in %s' % os.path.join(args.root, 'vendor.js'))
+
+    missing = [(local, url) for local, url in files
+               if args.force or not os.path.exists(os.path.join(args.root, local))]
+    if args.check:
+        for local, _ in missing:
+            print('missing %s' % local)
+        broken = page_misses(args.root, files)
+        for local in broken:
+            print('index.html loads missing %s' % local)
+        print('%d of %d vendor files present' % (len(files) - len(missing), len(files)), file=sys.stderr)
+        sys.exit(1 if missing or broken else 0)
+
+    failed = 0
+    for local, url in missing:
+        try:
+            size = download(url, os.path.join(args.root, local))
+        except (OSError, ValueError) as error:
+            failed += 1
+            print('FAILED %s: %s' % (url, error), file=sys.stderr)
+        else:
+            print('%8d  %s' % (size, local), file=sys.stderr)
+
+    print('Downloaded %d, kept %d, failed %d' % (len(missing) - failed, len(files) - len(missing), failed),
+          file=sys.stderr)
+    linked = link_page(args.root, files)
+    if linked:
+        print('Repointed %d tags in index.html' % linked, file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
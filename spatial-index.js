@@ -0,0 +1,261 @@
+// Site Sector Mapper - Spatial Index
+//
+// Uniform latitude/longitude grid over items with { id, latitude, longitude }.
+// Each occupied cell is one bucket in a Map, so inserts, moves and deletes are
+// O(1), and bounding-box, polygon and nearest-neighbour queries only visit the
+// cells around the answer instead of every site or point.
+
+const SPATIAL_EARTH_RADIUS = 6371e3;
+const SPATIAL_METERS_PER_DEGREE = SPATIAL_EARTH_RADIUS * Math.PI / 180;
+
+/**
+ * Great-circle distance in meters (haversine)
+ */
+function spatialDistance(lat1, lng1, lat2, lng2) {
+    const toRad = Math.PI / 180;
+    const dLat = (lat2 - lat1) * toRad;
+    const dLng = (lng2 - lng1) * toRad;
+    const a = Math.sin(dLat / 2) ** 2 +
+        Math.cos(lat1 * toRad) * Math.cos(lat2 * toRad) * Math.sin(dLng / 2) ** 2;
+    return 2 * SPATIAL_EARTH_RADIUS * Math.asin(Math.min(1, Math.sqrt(a)));
+}
+
+/**
+ * Ray-casting point in polygon test
+ * @param {Array<Array<number>>} vertices - [[lat, lng], ...] without holes
+ */
+function spatialPointInPolygon(lat, lng, vertices) {
+    let inside = false;
+    for (let i = 0, j = vertices.length - 1; i < vertices.length; j = i++) {
+        const xi = vertices[i][0], yi = vertices[i][1];
+        const xj = vertices[j][0], yj = vertices[j][1];
+        if (((yi > lng) !== (yj > lng)) && (lat < (xj - xi) * (lng - yi) / (yj - yi) + xi)) {
+            inside = !inside;
+        }
+    }
+    return inside;
+}
+
+class SpatialGridIndex {
+    /**
+     * @param {number} cellSize - Cell edge in degrees
+     */
+    constructor(cellSize = 0.02) {
+        this.cellSize = cellSize;
+        this.rows = Math.ceil(180 / cellSize) + 1;
+        this.columns = Math.ceil(360 / cellSize) + 1;
+        this.cells = new Map(); // cell key -> entries
+        this.entries = new Map(); // item id -> { item, lat, lng, key, slot }
+    }
+
+    get size() {
+        return this.entries.size;
+    }
+
+    cellRow(lat) {
+        return Math.min(this.rows - 1, Math.max(0, Math.floor((lat + 90) / this.cellSize)));
+    }
+
+    cellColumn(lng) {
+        return Math.min(this.columns - 1, Math.max(0, Math.floor((lng + 180) / this.cellSize)));
+    }
+
+    /**
+     * Adds an item, or moves it if its id is already indexed
+     */
+    insert(item) {
+        const lat = Number(item.latitude);
+        const lng = Number(item.longitude);
+        const existing = this.entries.get(item.id);
+
+        if (!Number.isFinite(lat) || !Number.isFinite(lng)) {
+            if (existing) this.remove(item.id);
+            return;
+        }
+
+        const key = this.cellRow(lat) * this.columns + this.cellColumn(lng);
+        if (existing) {
+            existing.item = item;
+            existing.lat = lat;
+            existing.lng = lng;
+            if (existing.key === key) return;
+            this.detach(existing);
+            this.attach(existing, key);
+            return;
+        }
+
+        const entry = { item, lat, lng, key: -1, slot: -1 };
+        this.entries.set(item.id, entry);
+        this.attach(entry, key);
+    }
+
+    remove(id) {
+        const entry = this.entries.get(id);
+        if (!entry) return false;
+        this.detach(entry);
+        this.entries.delete(id);
+        return true;
+    }
+
+    /**
+     * Replaces the whole index content
+     */
+    load(items) {
+        this.clear();
+        for (let i = 0; i < items.length; i++) this.insert(items[i]);
+    }
+
+    clear() {
+        this.cells.clear();
+        this.entries.clear();
+    }
+
+    attach(entry, key) {
+        let bucket = this.cells.get(key);
+        if (!bucket) {
+            bucket = [];
+            this.cells.set(key, bucket);
+        }
+        entry.key = key;
+        entry.slot = bucket.length;
+        bucket.push(entry);
+    }
+
+    detach(entry) {
+        // Swap-remove keeps bucket deletes O(1)
+        const bucket = this.cells.get(entry.key);
+        const last = bucket.pop();
+        if (last !== entry) {
+            bucket[entry.slot] = last;
+            last.slot = entry.slot;
+        }
+        if (bucket.length === 0) this.cells.delete(entry.key);
+    }
+
+    /**
+     * Calls visit(bucket) for every occupied cell overlapping a bounding box
+     */
+    forEachCell(south, west, north, east, visit) {
+        const r0 = this.cellRow(south), r1 = this.cellRow(north);
+        const c0 = this.cellColumn(west), c1 = this.cellColumn(east);
+
+        if ((r1 - r0 + 1) * (c1 - c0 + 1) > this.cells.size) {
+            // Zoomed far out: cheaper to walk the occupied cells than the empty ones
+            this.cells.forEach((bucket, key) => {
+                const row = Math.floor(key / this.columns);
+                const column = key - row * this.columns;
+                if (row >= r0 && row <= r1 && column >= c0 && column <= c1) visit(bucket);
+            });
+            return;
+        }
+
+        for (let row = r0; row <= r1; row++) {
+            for (let column = c0; column <= c1; column++) {
+                const bucket = this.cells.get(row * this.columns + column);
+                if (bucket) visit(bucket);
+            }
+        }
+    }
+
+    /**
+     * Items inside a bounding box
+     * @param {Function} [filter] - Optional item predicate
+     * @returns {Array}
+     */
+    search(south, west, north, east, filter = null) {
+        const result = [];
+        this.forEachCell(south, west, north, east, bucket => {
+            for (let i = 0; i < bucket.length; i++) {
+                const entry = bucket[i];
+                if (entry.lat >= south && entry.lat <= north && entry.lng >= west && entry.lng <= east &&
+                    (!filter || filter(entry.item))) {
+                    result.push(entry.item);
+                }
+            }
+        });
+        return result;
+    }
+
+    /**
+     * Items inside a polygon
+     * @param {Array<Array<number>>} vertices - [[lat, lng], ...]
+     * @param {Function} [filter] - Optional item predicate
+     */
+    searchPolygon(vertices, filter = null) {
+        if (vertices.length < 3) return [];
+        let south = Infinity, west = Infinity, north = -Infinity, east = -Infinity;
+        vertices.forEach(([lat, lng]) => {
+            if (lat < south) south = lat;
+            if (lat > north) north = lat;
+            if (lng < west) west = lng;
+            if (lng > east) east = lng;
+        });
+
+        const result = [];
+        this.forEachCell(south, west, north, east, bucket => {
+            for (let i = 0; i < bucket.length; i++) {
+                const entry = bucket[i];
+                if (spatialPointInPolygon(entry.lat, entry.lng, vertices) && (!filter || filter(entry.item))) {
+                    result.push(entry.item);
+                }
+            }
+        });
+        return result;
+    }
+
+    /**
+     * Nearest items by great-circle distance, searching rings of cells outwards
+     * @param {number} [count=1] - Maximum number of results
+     * @param {number} [maxDistance=Infinity] - Search radius in meters
+     * @param {Function} [filter] - Optional item predicate
+     * @returns {Array<{item, distance}>} Closest first
+     */
+    nearest(lat, lng, count = 1, maxDistance = Infinity, filter = null) {
+        const best = [];
+        if (this.entries.size === 0 || count < 1) return best;
+
+        const consider = entry => {
+            const distance = spatialDistance(lat, lng, entry.lat, entry.lng);
+            if (distance > maxDistance || (best.length === count && distance >= best[count - 1].distance)) return;
+            if (filter && !filter(entry.item)) return;
+            if (best.length === count) best.pop();
+            let i = best.length;
+            while (i > 0 && best[i - 1].distance > distance) i--;
+            best.splice(i, 0, { item: entry.item, distance });
+        };
+
+        const row = this.cellRow(lat);
+        const column = this.cellColumn(lng);
+        let visited = 0;
+
+        for (let ring = 0; ; ring++) {
+            // Cells from this ring outwards are at least `reach` meters away
+            const cosLat = Math.cos(Math.min(89, Math.abs(lat) + ring * this.cellSize) * Math.PI / 180);
+            const reach = (ring - 1) * this.cellSize * SPATIAL_METERS_PER_DEGREE * cosLat;
+            if (ring > 0 && (reach > maxDistance || (best.length === count && best[count - 1].distance <= reach))) break;
+
+            if (visited >= this.cells.size || (2 * ring + 1) ** 2 > 4 * this.cells.size) {
+                // Sparse data far from the query: finish with one pass over everything
+                best.length = 0;
+                this.entries.forEach(consider);
+                break;
+            }
+
+            for (let dr = -ring; dr <= ring; dr++) {
+                const r = row + dr;
+                if (r < 0 || r >= this.rows) continue;
+                const step = (dr === -ring || dr === ring) ? 1 : 2 * ring;
+                for (let dc = -ring; dc <= ring; dc += step) {
+                    const c = column + dc;
+                    if (c < 0 || c >= this.columns) continue;
+                    const bucket = this.cells.get(r * this.columns + c);
+                    if (!bucket) continue;
+                    visited++;
+                    bucket.forEach(consider);
+                }
+            }
+        }
+
+        return best;
+    }
+}
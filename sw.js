@@ -0,0 +1,137 @@
+// Site Sector Mapper - Service Worker
+//
+// Precaches the app shell (every local script, stylesheet and image
+// index.html references, plus the workers), the vendor/ libraries and the
+// CDN libraries the page loads while vendor/ is not installed, so the app
+// starts from cache and works without a network:
+//   - pages and shell files are served from the cache and refreshed from the
+//     network in the background, since the ?v= query strings in index.html
+//     are not bumped on every change; the refreshed copy is used next load
+//   - vendor/ and CDN library files are versioned, so cache first
+//   - anything else (/data, datasets, map tiles, Airtable, geocoding) goes
+//     straight to the network
+// Bump CACHE_VERSION to drop every cached file on the next visit.
+
+importScripts('vendor.js?v=1');
+
+const CACHE_VERSION = 'v1';
+const SHELL_CACHE = `site-sector-mapper-shell-${CACHE_VERSION}`;
+const CDN_CACHE = `site-sector-mapper-cdn-${CACHE_VERSION}`;
+
+// Loaded by scripts rather than named in index.html
+const SHELL_EXTRAS = ['./', 'index.html', 'import-worker.js?v=1', 'coverage-worker.js?v=1', 'favicon.ico', 'bg_login_v3.png'];
+const CDN_HOSTS = new Set(['fonts.googleapis.com', 'fonts.gstatic.com']);
+Object.keys(VENDOR_LIBRARIES).forEach(name => {
+    const library = VENDOR_LIBRARIES[name];
+    library.scripts.concat(library.styles, library.assets).forEach(file => CDN_HOSTS.add(new URL(file.cdn).host));
+});
+
+/**
+ * Local src/href URLs of a page
+ * @param {string} html
+ * @returns {Array<string>}
+ */
+function shellUrls(html) {
+    const urls = [];
+    const pattern = /\s(?:src|href)="([^"#:]+)"/g;
+    let match;
+    while ((match = pattern.exec(html)) !== null) urls.push(match[1]);
+    return urls;
+}
+
+/**
+ * CDN URLs a page loads directly (its library tags before vendor/ is installed)
+ * @param {string} html
+ * @returns {Array<string>}
+ */
+function cdnUrls(html) {
+    const urls = [];
+    const pattern = /\s(?:src|href)="(https:\/\/[^"]+)"/g;
+    let match;
+    while ((match = pattern.exec(html)) !== null) {
+        if (CDN_HOSTS.has(new URL(match[1]).host)) urls.push(match[1]);
+    }
+    return urls;
+}
+
+/**
+ * Caches each URL on its own, so one missing file (e.g. vendor/ before
+ * `python -m sitemapper vendor` has run) does not fail the install
+ */
+function cacheEach(cache, urls) {
+    return Promise.all(urls.map(url => cache.add(new Request(url, { cache: 'reload' }))
+        .catch(error => console.warn(`Not precached: ${url}`, error))));
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(SHELL_CACHE);
+        const page = await fetch('index.html', { cache: 'reload' });
+        if (!page.ok) throw new Error(`index.html: HTTP ${page.status}`);
+        const html = await page.clone().text();
+        const urls = new Set(SHELL_EXTRAS.concat(shellUrls(html), vendorFiles()));
+        await cache.put('index.html', page);
+        urls.delete('index.html');
+        await cacheEach(cache, Array.from(urls));
+        await cacheEach(await caches.open(CDN_CACHE), cdnUrls(html));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const keep = [SHELL_CACHE, CDN_CACHE];
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter(name => name.startsWith('site-sector-mapper-') && !keep.includes(name))
+            .map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+/**
+ * Answers from the cache and refreshes the entry from the network; waits
+ * for the network only when nothing is cached yet
+ */
+async function staleWhileRevalidate(event, cacheName, key) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(key);
+    const refresh = fetch(event.request).then(response => {
+        if (response.ok) return cache.put(key, response.clone()).then(() => response);
+        return response;
+    });
+    if (!cached) return refresh;
+    event.waitUntil(refresh.catch(() => {}));
+    return cached;
+}
+
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    // Cross-origin <script> and <link> loads are opaque (status 0)
+    if (response.ok || response.type === 'opaque') await cache.put(request, response.clone());
+    return response;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET' || request.headers.has('range')) return;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        if (CDN_HOSTS.has(url.host)) event.respondWith(cacheFirst(request, CDN_CACHE));
+        return;
+    }
+    if (request.mode === 'navigate') {
+        event.respondWith(staleWhileRevalidate(event, SHELL_CACHE, 'index.html'));
+        return;
+    }
+    if (url.pathname.includes('/vendor/')) {
+        event.respondWith(cacheFirst(request, SHELL_CACHE));
+        return;
+    }
+    event.respondWith(caches.match(request, { cacheName: SHELL_CACHE }).then(cached =>
+        cached ? staleWhileRevalidate(event, SHELL_CACHE, request) : fetch(request)));
+});
@@ -0,0 +1,65 @@
+// Checks sitemapper/geodesy.py against the app's geometry code.
+// geodesy_vectors.json holds inputs with the Python results; they are
+// recomputed here with sector-geometry.js and spatial-index.js.
+//
+//   python3 -m sitemapper.geodesy --vectors geodesy_vectors.json
+//   node test_geodesy.js
+const fs = require("fs");
+const path = require("path");
+const vm = require("vm");
+
+["sector-geometry.js", "spatial-index.js"].forEach(file => {
+    vm.runInThisContext(fs.readFileSync(path.join(__dirname, file), "utf8"), { filename: file });
+});
+
+const vectors = JSON.parse(fs.readFileSync(path.join(__dirname, "geodesy_vectors.json"), "utf8"));
+const DEGREE_TOLERANCE = 1e-9;
+const METER_TOLERANCE = 1e-6;
+let failures = 0;
+
+function check(name, ok, details) {
+    if (ok) return;
+    failures++;
+    if (failures <= 20) console.log(`FAIL ${name}: ${JSON.stringify(details)}`);
+}
+
+function closeDegrees(a, b) {
+    // Longitudes may come back a full turn apart
+    const diff = Math.abs(a - b) % 360;
+    return Math.min(diff, 360 - diff) <= DEGREE_TOLERANCE;
+}
+
+vectors.destination.forEach(v => {
+    const dest = destination(v.lat, v.lng, v.bearing, v.distance);
+    check("destination", closeDegrees(dest.lat, v.expected[0]) && closeDegrees(dest.lng, v.expected[1]),
+        { input: v, got: [dest.lat, dest.lng] });
+});
+
+vectors.inverse.forEach(v => {
+    const distance = spatialDistance(v.lat1, v.lng1, v.lat2, v.lng2);
+    check("inverse distance", Math.abs(distance - v.distance) <= METER_TOLERANCE * Math.max(1, v.distance / 1e6),
+        { input: v, got: distance });
+
+    // No inverse in the app: going back out along the bearing must land on point 2
+    const dest = destination(v.lat1, v.lng1, v.bearing, v.distance);
+    check("inverse bearing", spatialDistance(dest.lat, dest.lng, v.lat2, v.lng2) <= 1e-3,
+        { input: v, got: [dest.lat, dest.lng] });
+});
+
+vectors.in_sector.forEach(v => {
+    // The wedge polygon the map draws
+    const wedge = buildSectorWedge(v.site_lat, v.site_lng, v.azimuth, v.beamwidth, v.range, 15);
+    const inside = spatialPointInPolygon(v.lat, v.lng, wedge);
+    check("in_sector", inside === v.expected, { input: v, got: inside });
+});
+
+vectors.in_polygon.forEach(v => {
+    v.lats.forEach((lat, i) => {
+        const inside = spatialPointInPolygon(lat, v.lngs[i], v.vertices);
+        check("in_polygon", inside === v.expected[i], { lat, lng: v.lngs[i], got: inside });
+    });
+});
+
+const total = Object.values(vectors).reduce((sum, cases) => sum + cases.length, 0);
+console.log(failures === 0 ? `OK: ${total} cases` : `${failures} failures in ${total} cases`);
+process.exit(failures === 0 ? 0 : 1);
@@ -0,0 +1,296 @@
+// Site Sector Mapper - Thematic Engine
+//
+// Statistics and colour lookups for thematic analysis. An attribute is read
+// from every sector or KML point once into a ThematicColumn: raw values become
+// category codes, numbers go into a Float64Array (NaN where missing), and the
+// counts, unique values and min/max come out of the same pass. Breaks
+// (equal-interval or quantile), histograms and the per-item class of each
+// range are computed from the typed arrays, so renderers look an item's
+// colour up by row instead of re-reading and re-classifying its value.
+//
+// Uses parseNumber() from import-parsers.js.
+
+const THEMATIC_NO_DATA = -1;
+const THEMATIC_NO_DATA_COLOR = '#999999';
+const THEMATIC_HISTOGRAM_BINS = 24;
+const THEMATIC_CATEGORY_LIMIT = 10000; // Distinct values coded in the first pass
+
+/**
+ * Value of an attribute on a sector or point; custom attributes live in customProperties
+ */
+function thematicItemValue(item, attribute, isCustom) {
+    if (!isCustom) return item[attribute];
+    const props = item.customProperties;
+    if (!props) return null;
+    for (let i = 0; i < props.length; i++) {
+        if (props[i].name === attribute) return props[i].value;
+    }
+    return null;
+}
+
+function isThematicValuePresent(value) {
+    return value !== undefined && value !== null && value !== '';
+}
+
+/**
+ * parseNumber() of a present value, with a fast path for plain decimals
+ * @returns {number} NaN where parseNumber() returns null
+ */
+function thematicNumber(value) {
+    if (typeof value === 'number') return value;
+    // Number() agrees with parseNumber() except on blanks (0) and 0x/0b/0o literals
+    const number = Number(value);
+    if (number === number && number !== 0 &&
+        !(typeof value === 'string' && (value.charCodeAt(0) === 48 || value.charCodeAt(0) <= 32) && /^\s*0[a-z]/i.test(value))) {
+        return number;
+    }
+    const parsed = parseNumber(value);
+    return parsed === null ? NaN : Number(parsed);
+}
+
+class ThematicColumn {
+    /**
+     * @param {Array<Object>} items - Sectors or points
+     * @param {string} attribute
+     * @param {boolean} isCustom
+     */
+    constructor(items, attribute, isCustom) {
+        const count = items.length;
+        this.items = items;
+        this.attribute = attribute;
+        this.isCustom = isCustom;
+        this.codes = new Int32Array(count); // Index into categories, or THEMATIC_NO_DATA
+        this.numbers = new Float64Array(count); // NaN where missing or not numeric
+        this.categories = [];
+        this.categoryCounts = [];
+        this.categoriesComplete = true; // False once THEMATIC_CATEGORY_LIMIT is passed
+        this.rows = new WeakMap(); // item -> row
+        this.count = 0; // Items with a value
+        this.numericCount = 0;
+        this.min = Infinity;
+        this.max = -Infinity;
+
+        // Drive-test measurements are mostly distinct: coding every one would
+        // dominate the pass, so coding stops at the limit (see ensureCategories)
+        let codeOf = new Map();
+        for (let i = 0; i < count; i++) {
+            const item = items[i];
+            this.rows.set(item, i);
+
+            const value = thematicItemValue(item, attribute, isCustom);
+            if (!isThematicValuePresent(value)) {
+                this.codes[i] = THEMATIC_NO_DATA;
+                this.numbers[i] = NaN;
+                continue;
+            }
+            this.count++;
+
+            if (codeOf) {
+                let code = codeOf.get(value);
+                if (code === undefined) {
+                    code = this.categories.length;
+                    codeOf.set(value, code);
+                    this.categories.push(value);
+                    this.categoryCounts.push(0);
+                    if (code === THEMATIC_CATEGORY_LIMIT) {
+                        codeOf = null;
+                        this.categoriesComplete = false;
+                    }
+                }
+                this.codes[i] = code;
+                this.categoryCounts[code]++;
+            }
+
+            const number = thematicNumber(value);
+            this.numbers[i] = number;
+            if (number !== number) continue;
+            this.numericCount++;
+            if (number < this.min) this.min = number;
+            if (number > this.max) this.max = number;
+        }
+    }
+
+    /**
+     * Codes every value when the first pass stopped at THEMATIC_CATEGORY_LIMIT
+     */
+    ensureCategories() {
+        if (this.categoriesComplete) return;
+        const codeOf = new Map();
+        this.categories = [];
+        this.categoryCounts = [];
+        for (let i = 0; i < this.items.length; i++) {
+            if (this.codes[i] === THEMATIC_NO_DATA) continue;
+            const value = thematicItemValue(this.items[i], this.attribute, this.isCustom);
+            let code = codeOf.get(value);
+            if (code === undefined) {
+                code = this.categories.length;
+                codeOf.set(value, code);
+                this.categories.push(value);
+                this.categoryCounts.push(0);
+            }
+            this.codes[i] = code;
+            this.categoryCounts[code]++;
+        }
+        this.categoriesComplete = true;
+    }
+
+    get allNumeric() {
+        return this.count > 0 && this.numericCount === this.count;
+    }
+
+    /**
+     * Row of an item, or undefined for items added or edited since the column was built
+     */
+    rowOf(item) {
+        return this.rows.get(item);
+    }
+
+    forget(item) {
+        this.rows.delete(item);
+    }
+
+    /**
+     * { value: count } over the present values (after ensureCategories())
+     */
+    counts() {
+        const counts = {};
+        this.categories.forEach((value, code) => {
+            counts[value] = (counts[value] || 0) + this.categoryCounts[code];
+        });
+        return counts;
+    }
+
+    /**
+     * Numeric values, sorted ascending (computed once)
+     */
+    sortedNumbers() {
+        if (!this._sorted) {
+            const sorted = new Float64Array(this.numericCount);
+            let n = 0;
+            for (let i = 0; i < this.numbers.length; i++) {
+                if (this.numbers[i] === this.numbers[i]) sorted[n++] = this.numbers[i];
+            }
+            this._sorted = sorted.sort();
+        }
+        return this._sorted;
+    }
+
+    /**
+     * `classes + 1` boundaries splitting [min, max] into equal widths
+     */
+    equalIntervalBreaks(classes) {
+        if (this.numericCount === 0) return [];
+        const step = (this.max - this.min) / classes;
+        if (step === 0) return [this.min, this.max];
+        const breaks = [];
+        for (let i = 0; i <= classes; i++) breaks.push(this.min + i * step);
+        return breaks;
+    }
+
+    /**
+     * Boundaries putting about the same number of values in each class;
+     * repeated boundaries (heavily skewed data) are merged
+     */
+    quantileBreaks(classes) {
+        const sorted = this.sortedNumbers();
+        if (sorted.length === 0) return [];
+        const breaks = [sorted[0]];
+        for (let i = 1; i <= classes; i++) {
+            const value = sorted[Math.min(sorted.length - 1, Math.round(i * (sorted.length - 1) / classes))];
+            if (value > breaks[breaks.length - 1]) breaks.push(value);
+        }
+        if (breaks.length === 1) breaks.push(sorted[0]);
+        return breaks;
+    }
+
+    /**
+     * Counts of the numeric values in `bins` equal bins over [min, max]
+     * @returns {Uint32Array}
+     */
+    histogram(bins, min = this.min, max = this.max) {
+        const counts = new Uint32Array(bins);
+        if (this.numericCount === 0) return counts;
+        const width = (max - min) / bins;
+        const numbers = this.numbers;
+        for (let i = 0; i < numbers.length; i++) {
+            const value = numbers[i];
+            if (!(value >= min && value <= max)) continue; // Also skips NaN
+            const bin = width > 0 ? Math.min(bins - 1, Math.floor((value - min) / width)) : 0;
+            counts[bin]++;
+        }
+        return counts;
+    }
+
+    /**
+     * Index of the first range holding each numeric value; range.count is updated
+     * @param {Array<{min, max}>} ranges
+     * @returns {Int32Array} Range index per row, THEMATIC_NO_DATA where none matches
+     */
+    classify(ranges) {
+        const numbers = this.numbers;
+        const classes = new Int32Array(numbers.length);
+        const counts = new Array(ranges.length).fill(0);
+        const mins = Float64Array.from(ranges, r => r.min);
+        const maxs = Float64Array.from(ranges, r => r.max);
+
+        for (let i = 0; i < numbers.length; i++) {
+            classes[i] = thematicRangeIndex(numbers[i], mins, maxs);
+            if (classes[i] !== THEMATIC_NO_DATA) counts[classes[i]]++;
+        }
+        ranges.forEach((range, index) => { range.count = counts[index]; });
+        return classes;
+    }
+}
+
+/**
+ * First range (as parallel min/max arrays) holding a value, inclusive at both ends
+ */
+function thematicRangeIndex(value, mins, maxs) {
+    if (value !== value) return THEMATIC_NO_DATA;
+    for (let r = 0; r < mins.length; r++) {
+        if (value >= mins[r] && value <= maxs[r]) return r;
+    }
+    return THEMATIC_NO_DATA;
+}
+
+/**
+ * Re-runs classify() after ranges were added, removed or moved
+ */
+function reclassifyThematic(settings) {
+    if (settings && settings.type === 'numerical' && settings.column) {
+        settings.classes = settings.column.classify(settings.ranges);
+    }
+}
+
+/**
+ * Colour of a number under numerical thematic settings (e.g. a coverage cell mean)
+ * @returns {string}
+ */
+function thematicRangeColor(settings, number) {
+    if (number !== number) return THEMATIC_NO_DATA_COLOR;
+    const range = settings.ranges.find(r => number >= r.min && number <= r.max);
+    return range ? range.color : THEMATIC_NO_DATA_COLOR;
+}
+
+/**
+ * Colour of an item under thematic settings (see generateThematicSettings in app.js)
+ * @returns {string}
+ */
+function thematicColor(settings, item) {
+    const column = settings.column;
+    const row = column ? column.rowOf(item) : undefined;
+
+    if (row === undefined) {
+        // Not in the column (added or edited since): classify the live value
+        const value = thematicItemValue(item, settings.attribute, settings.isCustom);
+        if (settings.type === 'categorical') return settings.mapping[value] || THEMATIC_NO_DATA_COLOR;
+        return thematicRangeColor(settings, isThematicValuePresent(value) ? thematicNumber(value) : NaN);
+    }
+
+    if (settings.type === 'categorical') {
+        const code = column.codes[row];
+        return code === THEMATIC_NO_DATA ? THEMATIC_NO_DATA_COLOR : (settings.mapping[column.categories[code]] || THEMATIC_NO_DATA_COLOR);
+    }
+    const index = settings.classes[row];
+    return index === THEMATIC_NO_DATA ? THEMATIC_NO_DATA_COLOR : settings.ranges[index].color;
+}
@@ -0,0 +1,171 @@
+// Site Sector Mapper - Vendor Libraries
+//
+// The third-party libraries, as { local, cdn } pairs: local copies under
+// vendor/ are written by `python -m sitemapper vendor`, which reads this list
+// and points the page's <script>/<link> tags at the copies it has (at the CDN
+// otherwise), so the page never requests a file that is not there. Shared by
+// the page, the import worker (importVendorScripts) and the service worker
+// (vendorFiles, to precache). Leaflet and markercluster load with the page;
+// the others only when the feature that needs them is first used
+// (loadVendorLibrary).
+
+const VENDOR_LIBRARIES = {
+    leaflet: {
+        global: 'L',
+        scripts: [
+            { local: 'vendor/leaflet/leaflet.js', cdn: 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.js' }
+        ],
+        styles: [
+            { local: 'vendor/leaflet/leaflet.css', cdn: 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.css' }
+        ],
+        assets: [
+            { local: 'vendor/leaflet/images/layers.png', cdn: 'https://unpkg.com/leaflet@1.9.4/dist/images/layers.png' },
+            { local: 'vendor/leaflet/images/layers-2x.png', cdn: 'https://unpkg.com/leaflet@1.9.4/dist/images/layers-2x.png' },
+            { local: 'vendor/leaflet/images/marker-icon.png', cdn: 'https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon.png' },
+            { local: 'vendor/leaflet/images/marker-icon-2x.png', cdn: 'https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon-2x.png' },
+            { local: 'vendor/leaflet/images/marker-shadow.png', cdn: 'https://unpkg.com/leaflet@1.9.4/dist/images/marker-shadow.png' }
+        ]
+    },
+    markercluster: {
+        global: 'L.MarkerClusterGroup',
+        scripts: [
+            { local: 'vendor/markercluster/leaflet.markercluster.js', cdn: 'https://unpkg.com/leaflet.markercluster@1.5.3/dist/leaflet.markercluster.js' }
+        ],
+        styles: [
+            { local: 'vendor/markercluster/MarkerCluster.css', cdn: 'https://unpkg.com/leaflet.markercluster@1.5.3/dist/MarkerCluster.css' },
+            { local: 'vendor/markercluster/MarkerCluster.Default.css', cdn: 'https://unpkg.com/leaflet.markercluster@1.5.3/dist/MarkerCluster.Default.css' }
+        ],
+        assets: []
+    },
+    draw: {
+        global: 'L.Control.Draw',
+        scripts: [
+            { local: 'vendor/leaflet-draw/leaflet.draw.js', cdn: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.draw/1.0.4/leaflet.draw.js' }
+        ],
+        styles: [
+            { local: 'vendor/leaflet-draw/leaflet.draw.css', cdn: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.draw/1.0.4/leaflet.draw.css' }
+        ],
+        assets: [
+            { local: 'vendor/leaflet-draw/images/spritesheet.png', cdn: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.draw/1.0.4/images/spritesheet.png' },
+            { local: 'vendor/leaflet-draw/images/spritesheet-2x.png', cdn: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.draw/1.0.4/images/spritesheet-2x.png' },
+            { local: 'vendor/leaflet-draw/images/spritesheet.svg', cdn: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.draw/1.0.4/images/spritesheet.svg' }
+        ]
+    },
+    papaparse: {
+        global: 'Papa',
+        scripts: [
+            { local: 'vendor/papaparse/papaparse.min.js', cdn: 'https://unpkg.com/papaparse@5.4.1/papaparse.min.js' }
+        ],
+        styles: [],
+        assets: []
+    },
+    xlsx: {
+        global: 'XLSX',
+        scripts: [
+            { local: 'vendor/xlsx/xlsx.full.min.js', cdn: 'https://cdn.sheetjs.com/xlsx-0.20.1/package/dist/xlsx.full.min.js' }
+        ],
+        styles: [],
+        assets: []
+    }
+};
+
+/**
+ * The value a library defines once loaded ('L.Control.Draw' -> L.Control.Draw)
+ */
+function vendorGlobal(name) {
+    return VENDOR_LIBRARIES[name].global.split('.')
+        .reduce((scope, key) => (scope ? scope[key] : undefined), self);
+}
+
+/**
+ * Local paths of every vendor file, for precaching
+ * @returns {Array<string>}
+ */
+function vendorFiles() {
+    const files = [];
+    Object.keys(VENDOR_LIBRARIES).forEach(name => {
+        const library = VENDOR_LIBRARIES[name];
+        library.scripts.concat(library.styles, library.assets).forEach(file => files.push(file.local));
+    });
+    return files;
+}
+
+/**
+ * Loads a library into a worker; a missing local copy falls back to the CDN
+ * @param {boolean} [local=true] - Try vendor/ first (see vendorInstalled)
+ */
+function importVendorScripts(name, local = true) {
+    if (vendorGlobal(name)) return;
+    VENDOR_LIBRARIES[name].scripts.forEach(file => {
+        if (!local) {
+            importScripts(file.cdn);
+            return;
+        }
+        try {
+            importScripts(file.local);
+        } catch (error) {
+            importScripts(file.cdn);
+        }
+    });
+}
+
+// ==================== PAGE ====================
+
+/**
+ * Whether this deployment has local copies: `python -m sitemapper vendor`
+ * points the page's Leaflet tag at vendor/ once the file is there. Without
+ * them, lazy loads go straight to the CDN instead of through a 404.
+ */
+function vendorInstalled() {
+    return !!document.querySelector('script[src^="vendor/"]');
+}
+
+function appendVendorElement(tag, attributes) {
+    return new Promise((resolve, reject) => {
+        const element = document.createElement(tag);
+        Object.keys(attributes).forEach(key => { element[key] = attributes[key]; });
+        element.onload = () => resolve(element);
+        element.onerror = () => {
+            element.remove();
+            reject(new Error(`Could not load ${attributes.src || attributes.href}`));
+        };
+        document.head.appendChild(element);
+    });
+}
+
+const vendorLoads = new Map(); // library name -> Promise
+
+/**
+ * Loads a library into the page on first use
+ * @param {string} name - Key of VENDOR_LIBRARIES
+ * @returns {Promise} Resolves once the library's global is defined
+ */
+function loadVendorLibrary(name) {
+    if (vendorGlobal(name)) return Promise.resolve();
+    if (vendorLoads.has(name)) return vendorLoads.get(name);
+
+    const library = VENDOR_LIBRARIES[name];
+    const local = vendorInstalled();
+    const append = (tag, key, file, attributes) => {
+        const cdn = () => appendVendorElement(tag, { ...attributes, [key]: file.cdn });
+        return local ? appendVendorElement(tag, { ...attributes, [key]: file.local }).catch(cdn) : cdn();
+    };
+
+    // Stylesheets do not block the script; a missing one only costs the styling
+    library.styles.forEach(file => {
+        append('link', 'href', file, { rel: 'stylesheet' }).catch(error => console.warn(error.message));
+    });
+
+    const load = library.scripts.reduce((previous, file) => previous.then(() =>
+        append('script', 'src', file, { async: false })
+    ), Promise.resolve()).then(() => {
+        if (!vendorGlobal(name)) throw new Error(`${library.global} is not defined after loading`);
+    });
+
+    // A failed load can be retried, e.g. once back online
+    vendorLoads.set(name, load.catch(error => {
+        vendorLoads.delete(name);
+        throw error;
+    }));
+    return vendorLoads.get(name);
+}
@@ -0,0 +1,236 @@
+// Site Sector Mapper - Virtual List
+//
+// Grouped, windowed list used by the Sites and KML panels. Only the group
+// headers and rows that intersect the scrolling viewport are in the DOM; the
+// rest of the list is a spacer of the right height. Headers and rows have a
+// fixed height each, so any scroll position maps to rows by arithmetic.
+
+const VIRTUAL_LIST_OVERSCAN = 6;
+
+/**
+ * Lowercased names of a list of items, searched by substring
+ *
+ * Typing usually extends the previous term, so a search that contains the
+ * previous one only rescans the previous matches.
+ */
+class NameSearchIndex {
+    constructor(items, getName) {
+        this.items = items;
+        this.names = items.map(item => String(getName(item) || '').toLowerCase());
+        this.lastTerm = '';
+        this.lastMatches = null;
+    }
+
+    /**
+     * @returns {Array} Matching items in their original order
+     */
+    search(term) {
+        term = String(term || '').toLowerCase();
+        if (!term) {
+            this.lastTerm = '';
+            this.lastMatches = null;
+            return this.items;
+        }
+
+        const matches = [];
+        if (this.lastMatches && term.includes(this.lastTerm)) {
+            for (let i = 0; i < this.lastMatches.length; i++) {
+                const index = this.lastMatches[i];
+                if (this.names[index].includes(term)) matches.push(index);
+            }
+        } else {
+            for (let i = 0; i < this.names.length; i++) {
+                if (this.names[i].includes(term)) matches.push(i);
+            }
+        }
+
+        this.lastTerm = term;
+        this.lastMatches = matches;
+        return matches.map(index => this.items[index]);
+    }
+}
+
+function findScrollParent(element) {
+    for (let el = element.parentElement; el; el = el.parentElement) {
+        const overflowY = getComputedStyle(el).overflowY;
+        if (overflowY === 'auto' || overflowY === 'scroll') return el;
+    }
+    return document.scrollingElement || document.documentElement;
+}
+
+class VirtualGroupedList {
+    /**
+     * @param {HTMLElement} container
+     * @param {Object} options
+     * @param {number} options.headerHeight - Group header height (px)
+     * @param {number} options.rowHeight - Item row height (px)
+     * @param {Function} options.getId - item => id
+     * @param {Function} options.renderHeader - (group, collapsed) => HTML
+     * @param {Function} options.renderRow - (item, highlighted) => HTML
+     * @param {string} options.emptyHtml - Shown when there are no groups
+     */
+    constructor(container, options) {
+        this.container = container;
+        this.options = options;
+        this.groups = [];
+        this.offsets = []; // top of each group, plus the total height at the end
+        this.collapsed = new Set();
+        this.highlightedId = null;
+        this.renderedRange = null;
+        this.frame = null;
+
+        this.container.innerHTML = '';
+        this.spacer = document.createElement('div');
+        this.spacer.className = 'virtual-list';
+        this.container.appendChild(this.spacer);
+        this.scrollParent = findScrollParent(this.container);
+
+        this.scheduleRender = this.scheduleRender.bind(this);
+        this.scrollParent.addEventListener('scroll', this.scheduleRender, { passive: true });
+        window.addEventListener('resize', this.scheduleRender);
+        // Fires when a hidden tab becomes visible, as well as on real resizes
+        if (typeof ResizeObserver !== 'undefined') {
+            new ResizeObserver(this.scheduleRender).observe(this.container);
+        }
+
+        this.spacer.addEventListener('click', (e) => {
+            const header = e.target.closest('.virtual-group-row');
+            if (!header || e.target.closest('.group-actions')) return;
+            this.toggleGroup(this.groups[Number(header.dataset.group)].name);
+        });
+    }
+
+    /**
+     * Replaces the list content
+     * @param {Array<{name: string, items: Array}>} groups - In display order
+     */
+    setGroups(groups) {
+        this.groups = groups;
+        this.layout();
+        this.render(true);
+    }
+
+    layout() {
+        const { headerHeight, rowHeight } = this.options;
+        this.offsets = new Array(this.groups.length + 1);
+        let top = 0;
+        this.groups.forEach((group, i) => {
+            this.offsets[i] = top;
+            top += headerHeight + (this.collapsed.has(group.name) ? 0 : group.items.length * rowHeight);
+        });
+        this.offsets[this.groups.length] = top;
+        this.spacer.style.height = `${top}px`;
+    }
+
+    toggleGroup(name) {
+        if (this.collapsed.has(name)) this.collapsed.delete(name);
+        else this.collapsed.add(name);
+        this.layout();
+        this.render(true);
+    }
+
+    scheduleRender() {
+        if (this.frame) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+
+    /**
+     * Viewport in spacer coordinates; a hidden list renders its first screenful
+     */
+    viewport() {
+        const parentRect = this.scrollParent.getBoundingClientRect();
+        const spacerRect = this.spacer.getBoundingClientRect();
+        const top = parentRect.top - spacerRect.top;
+        return { top, bottom: top + (this.scrollParent.clientHeight || window.innerHeight) };
+    }
+
+    /**
+     * Index of the last group starting at or above a y offset
+     */
+    groupAt(y) {
+        let lo = 0;
+        let hi = this.groups.length - 1;
+        while (lo < hi) {
+            const mid = (lo + hi + 1) >> 1;
+            if (this.offsets[mid] <= y) lo = mid;
+            else hi = mid - 1;
+        }
+        return lo;
+    }
+
+    render(force = false) {
+        if (this.groups.length === 0) {
+            this.spacer.style.height = '';
+            this.spacer.innerHTML = this.options.emptyHtml;
+            this.renderedRange = null;
+            return;
+        }
+
+        const { headerHeight, rowHeight } = this.options;
+        const overscan = VIRTUAL_LIST_OVERSCAN * rowHeight;
+        const view = this.viewport();
+        const top = Math.max(0, view.top - overscan);
+        const bottom = Math.min(this.offsets[this.groups.length], view.bottom + overscan);
+
+        const rangeKey = `${Math.floor(top / rowHeight)}:${Math.ceil(bottom / rowHeight)}`;
+        if (!force && rangeKey === this.renderedRange) return;
+        this.renderedRange = rangeKey;
+
+        let html = '';
+        for (let g = this.groupAt(top); g < this.groups.length && this.offsets[g] < bottom; g++) {
+            const group = this.groups[g];
+            const groupTop = this.offsets[g];
+            const collapsed = this.collapsed.has(group.name);
+
+            if (groupTop + headerHeight > top) {
+                html += `<div class="virtual-row virtual-group-row" data-group="${g}" style="top: ${groupTop}px; height: ${headerHeight}px;">${this.options.renderHeader(group, collapsed)}</div>`;
+            }
+            if (collapsed) continue;
+
+            const rowsTop = groupTop + headerHeight;
+            const first = Math.max(0, Math.floor((top - rowsTop) / rowHeight));
+            const last = Math.min(group.items.length, Math.ceil((bottom - rowsTop) / rowHeight));
+            for (let i = first; i < last; i++) {
+                const item = group.items[i];
+                const highlighted = this.highlightedId !== null && this.options.getId(item) === this.highlightedId;
+                html += `<div class="virtual-row" style="top: ${rowsTop + i * rowHeight}px; height: ${rowHeight}px;">${this.options.renderRow(item, highlighted)}</div>`;
+            }
+        }
+        this.spacer.innerHTML = html;
+    }
+
+    clearHighlight() {
+        if (this.highlightedId === null) return;
+        this.highlightedId = null;
+        this.render(true);
+    }
+
+    /**
+     * Expands the item's group, scrolls its row to the middle of the viewport
+     * and renders it highlighted
+     * @returns {boolean} Whether the item is in the list
+     */
+    reveal(id) {
+        const { headerHeight, rowHeight } = this.options;
+        for (let g = 0; g < this.groups.length; g++) {
+            const index = this.groups[g].items.findIndex(item => this.options.getId(item) === id);
+            if (index === -1) continue;
+
+            this.highlightedId = id;
+            if (this.collapsed.has(this.groups[g].name)) {
+                this.collapsed.delete(this.groups[g].name);
+                this.layout();
+            }
+            const rowTop = this.offsets[g] + headerHeight + index * rowHeight;
+            const view = this.viewport();
+            const viewHeight = view.bottom - view.top;
+            this.scrollParent.scrollTop += rowTop - view.top - (viewHeight - rowHeight) / 2;
+            this.render(true);
+            return true;
+        }
+        return false;
+    }
+}